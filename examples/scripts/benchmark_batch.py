@@ -0,0 +1,33 @@
+#
+# Benchmark solving the SPM for many particle radii, one at a time and as a batch
+#
+import pybamm
+import numpy as np
+
+model = pybamm.li_ion.SPM()
+parameter_values = model.default_parameter_values
+radius = parameter_values["Positive particle radius"]
+# leave the radius as an input parameter, given when the model is solved
+parameter_values["Positive particle radius"] = "[input]"
+geometry = model.default_geometry
+parameter_values.process_geometry(geometry)
+parameter_values.process_model(model)
+mesh = pybamm.Mesh(geometry, model.default_submesh_types, model.default_submesh_pts)
+disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+disc.process_model(model)
+
+t_eval = np.linspace(0, 0.02, 100)
+inputs_list = [
+    {"Positive particle radius": radius * factor}
+    for factor in np.linspace(0.5, 1.5, 100)
+]
+solver = pybamm.ScipySolver(method="BDF")
+
+timer = pybamm.Timer()
+for inputs in inputs_list:
+    solver.solve(model, t_eval, inputs=inputs)
+print("one at a time: {}".format(timer.format(timer.time())))
+
+timer.reset()
+solver.solve_batch(model, t_eval, inputs_list)
+print("as a batch: {}".format(timer.format(timer.time())))
@@ -0,0 +1,32 @@
+#
+# Benchmark the time taken to import pybamm, and to first use the modules that are
+# imported lazily
+#
+import pybamm
+
+import subprocess
+import sys
+
+codes = {
+    "import pybamm": "import pybamm",
+    "and build the standard parameters": "import pybamm;"
+    "pybamm.standard_parameters_lithium_ion.c_n_max",
+}
+n_repeats = 10
+timer = pybamm.Timer()
+
+for name, code in codes.items():
+    # run each import in a new python process, so that nothing is imported already
+    script = (
+        "import timeit; start = timeit.default_timer(); {};"
+        "print(timeit.default_timer() - start)".format(code)
+    )
+    times = sorted(
+        float(subprocess.check_output([sys.executable, "-c", script]))
+        for i in range(n_repeats)
+    )
+    print(
+        "{}: best {}, median {}".format(
+            name, timer.format(times[0]), timer.format(times[n_repeats // 2])
+        )
+    )
@@ -0,0 +1,25 @@
+#
+# Benchmark the time taken to process the parameters of some models
+#
+import pybamm
+
+models = [pybamm.li_ion.SPM, pybamm.lead_acid.LOQS, pybamm.ReactionDiffusionModel]
+n_repeats = 10
+
+for model_class in models:
+    times = []
+    for i in range(n_repeats):
+        # create a new model each time, since processing is in place
+        model = model_class()
+        parameter_values = model.default_parameter_values
+        timer = pybamm.Timer()
+        parameter_values.process_model(model)
+        times.append(timer.time())
+    # the first time includes loading the functions of any function parameters
+    print(
+        "{}: first processing {}, then {} on average".format(
+            model_class.__name__,
+            timer.format(times[0]),
+            timer.format(sum(times[1:]) / (n_repeats - 1)),
+        )
+    )
@@ -0,0 +1,52 @@
+#
+# Benchmark the construction time and memory use of expression trees
+#
+import pybamm
+
+import time
+import tracemalloc
+
+n_terms = 5000
+
+# parameters and variables shared by every term
+a = pybamm.Parameter("a")
+b = pybamm.Parameter("b")
+var = pybamm.Variable("var")
+parameter_values = pybamm.ParameterValues({"a": 2, "b": 3})
+
+
+def build_tree():
+    # build a (balanced) sum of n_terms terms, each with 5 nodes
+    terms = [a * var + i for i in range(n_terms)]
+    while len(terms) > 1:
+        terms = [
+            terms[i] + terms[i + 1] if i + 1 < len(terms) else terms[i]
+            for i in range(0, len(terms), 2)
+        ]
+    return terms[0] * b
+
+
+# construction time and memory
+tracemalloc.start()
+tic = time.perf_counter()
+expr = build_tree()
+construction_time = time.perf_counter() - tic
+memory, _ = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+
+n_nodes = len(list(expr.pre_order()))
+# identical subtrees (e.g. `a * var`) are shared, so there are fewer distinct nodes
+n_distinct_nodes = len({id(node) for node in expr.pre_order()})
+print("Number of nodes: {} ({} distinct)".format(n_nodes, n_distinct_nodes))
+print("Construction time per node: {:.2f} us".format(1e6 * construction_time / n_nodes))
+print("Memory per node: {:.0f} bytes".format(memory / n_nodes))
+
+# time to process the parameters in the tree
+tic = time.perf_counter()
+parameter_values.process_symbol(expr)
+processing_time = time.perf_counter() - tic
+print(
+    "Parameter processing time per node: {:.2f} us".format(
+        1e6 * processing_time / n_nodes
+    )
+)
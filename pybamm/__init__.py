@@ -46,11 +46,12 @@ ABSOLUTE_PATH = os.path.join(os.path.split(script_path)[0], "..")
 from .util import Timer
 from .util import profile
 from .util import load_function
+from .util import loaded_function_file
 
 #
 # Classes for the Expression Tree
 #
-from .expression_tree.symbol import Symbol
+from .expression_tree.symbol import Symbol, InternedSymbol, INTERNED_SYMBOLS
 from .expression_tree.binary_operators import (
     BinaryOperator,
     Addition,
@@ -59,15 +60,18 @@ from .expression_tree.binary_operators import (
     Multiplication,
     MatrixMultiplication,
     Division,
+    RowScaling,
 )
 from .expression_tree.concatenations import (
     Concatenation,
     NumpyConcatenation,
     DomainConcatenation,
+    SparseStack,
 )
 from .expression_tree.array import Array
 from .expression_tree.matrix import Matrix
 from .expression_tree.parameter import Parameter
+from .expression_tree.input_parameter import InputParameter, UnknownInputs
 from .expression_tree.unary_operators import (
     UnaryOperator,
     Negate,
@@ -95,6 +99,27 @@ from .expression_tree.independent_variable import t
 from .expression_tree.vector import Vector, StateVector
 
 from .expression_tree.exceptions import DomainError, ModelError
+from .expression_tree.evaluate import (
+    EvaluatorPython,
+    EvaluatorTape,
+    SharedEvaluator,
+    to_python,
+    to_python_into,
+    to_tape,
+)
+from .expression_tree.sparsity import jacobian_sparsity
+from .expression_tree.batch import (
+    batch_symbol,
+    batch_inputs,
+    batch_vectors,
+    unbatch_vectors,
+    batch_matrices,
+)
+from .expression_tree.simplify import simplify, Simplification, rebuild
+from .expression_tree.linear_decomposition import (
+    LinearDecomposition,
+    linear_decomposition,
+)
 
 #
 # Model classes
@@ -104,6 +129,7 @@ from .models.reaction_diffusion import ReactionDiffusionModel
 from .models.simple_ode_model import SimpleODEModel
 from .models import lead_acid
 from .models import li_ion
+from .models.model_io import save_model, load_model
 
 #
 # Submodel classes
@@ -116,10 +142,16 @@ from .models.submodels import electrolyte, interface
 from .meshes.meshes import KNOWN_DOMAINS  # need this for importing standard parameters
 from .parameters.parameter_values import ParameterValues
 from .parameters import standard_current_functions
-from .parameters import standard_parameters
 
-# The following modules call standard_parameters
-from .parameters import standard_parameters_lithium_ion, standard_parameters_lead_acid
+# The standard parameters are only built when they are first used (the lithium-ion
+# and lead-acid parameters use the standard parameters)
+standard_parameters = util.lazy_import("pybamm.parameters.standard_parameters")
+standard_parameters_lithium_ion = util.lazy_import(
+    "pybamm.parameters.standard_parameters_lithium_ion"
+)
+standard_parameters_lead_acid = util.lazy_import(
+    "pybamm.parameters.standard_parameters_lead_acid"
+)
 
 #
 # Geometry
@@ -147,7 +179,9 @@ from .spatial_methods.finite_volume import FiniteVolume, NodeToEdge
 #
 # Simulation class
 #
+from .model_cache import ModelCache, content_hash
 from .simulation import Simulation
+from .ensemble_runner import EnsembleRunner, EnsembleResult
 
 #
 # Solver classes
@@ -155,7 +189,12 @@ from .simulation import Simulation
 from .solvers.base_solver import BaseSolver
 from .solvers.ode_solver import OdeSolver
 from .solvers.dae_solver import DaeSolver
+from .solvers.finite_difference_jacobian import (
+    FiniteDifferenceJacobian,
+    colour_columns,
+)
 from .solvers.scipy_solver import ScipySolver
+from .solvers.exponential_solver import ExponentialSolver
 from .solvers.scikits_dae_solver import ScikitsDaeSolver
 from .solvers.scikits_ode_solver import ScikitsOdeSolver
 
@@ -5,7 +5,6 @@ from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 import pybamm
 
-import copy
 import numpy as np
 
 
@@ -30,16 +29,34 @@ class Discretisation(object):
             spatial_methods["negative electrode"] = method
             spatial_methods["separator"] = method
             spatial_methods["positive electrode"] = method
+        # Use one instance of each spatial method, shared with any other
+        # discretisation on the mesh
         self._spatial_methods = {
-            dom: method(mesh) for dom, method in spatial_methods.items()
+            dom: mesh.spatial_method(method) for dom, method in spatial_methods.items()
         }
         self._bcs = {}
         self._y_slices = {}
+        self._simplification = pybamm.Simplification()
+        self._discretised_symbols = None
+        self._timings = {}
 
     @property
     def mesh(self):
         return self._mesh
 
+    @property
+    def nodes_removed(self):
+        """The number of nodes removed by simplifying the last discretised model"""
+        return self._simplification.nodes_removed
+
+    @property
+    def timings(self):
+        """
+        The time (in seconds) taken by each phase of discretising the last model
+        ("initial conditions", "rhs and algebraic", "variables" and "events")
+        """
+        return self._timings
+
     def process_model(self, model):
         """Discretise a model.
         Currently inplace, could be changed to return a new model.
@@ -51,33 +68,62 @@ class Discretisation(object):
             boundary_conditions (all dicts of {variable: equation})
 
         """
+        # Simplify the discretised symbols, keeping count of the nodes removed
+        self._simplification = pybamm.Simplification()
+        self._timings = {}
+        timer = pybamm.Timer()
+
         # set boundary conditions (only need key ids for boundary_conditions)
         self._bcs = {key.id: value for key, value in model.boundary_conditions.items()}
         # set variables (we require the full variable not just id)
         variables = list(model.rhs.keys()) + list(model.algebraic.keys())
 
-        # Set the y split for variables
+        # Set the y split for variables, and record it in the model
         self.set_variable_slices(variables)
+        model.y_slices = self._variable_slices
+
+        # Discretise each symbol only once while processing this model
+        self._discretised_symbols = {}
 
         # Process initial condtions
+        timer.reset()
         self.process_initial_conditions(model)
+        self._timings["initial conditions"] = timer.time()
 
         # Process parabolic and elliptic equations
+        timer.reset()
         self.process_rhs_and_algebraic(model)
+        self._timings["rhs and algebraic"] = timer.time()
 
         # Discretise variables (applying boundary conditions)
         # Note that we **do not** discretise the keys of model.rhs,
         # model.initial_conditions and model.boundary_conditions
+        timer.reset()
         model.variables = self.process_dict(model.variables)
+        self._timings["variables"] = timer.time()
 
         # Process events
+        timer.reset()
         for idx, event in enumerate(model.events):
-            model.events[idx] = self.process_symbol(event)
+            model.events[idx] = self._simplification.simplify(
+                self.process_symbol(event)
+            )
         model.concatenated_events = self.concatenate(*model.events)
+        self._timings["events"] = timer.time()
+
+        # Free the discretised symbols
+        self._discretised_symbols = None
 
         # Check that resulting model makes sense
         self.check_model(model)
 
+        # Create the Jacobian of the discretised model and its sparsity pattern
+        model.jacobian = self.create_jacobian(model)
+        model.jacobian_sparsity = self.create_jacobian_sparsity(model)
+
+        # Split the rhs into its linear, constant and nonlinear parts
+        model.linear_decomposition = self.create_linear_decomposition(model)
+
     def set_variable_slices(self, variables):
         """Sets the slicing for variables.
 
@@ -93,6 +139,7 @@ class Discretisation(object):
                 unpacked_variables.append(symbol)
         # Set up y_slices
         y_slices = {variable.id: None for variable in unpacked_variables}
+        variable_slices = {}
         start = 0
         end = 0
         # Iterate through unpacked variables, adding appropriate slices to y_slices
@@ -105,8 +152,10 @@ class Discretisation(object):
                 for dom in variable.domain:
                     end += self._spatial_methods[dom].mesh[dom].npts_for_broadcast
             y_slices[variable.id] = slice(start, end)
+            variable_slices[variable] = y_slices[variable.id]
             start = end
         self._y_slices = y_slices
+        self._variable_slices = variable_slices
 
         assert isinstance(self._y_slices, dict), ValueError(
             """y_slices should be dict, not {}""".format(type(self._y_slices))
@@ -189,14 +238,18 @@ class Discretisation(object):
                         eqn, eqn_key.domain
                     )
 
-            # Process symbol (original or broadcasted)
-            var_eqn_dict[eqn_key] = self.process_symbol(eqn)
+            # Process symbol (original or broadcasted), and simplify it
+            var_eqn_dict[eqn_key] = self._simplification.simplify(
+                self.process_symbol(eqn)
+            )
             # note we are sending in the key.id here so we don't have to
             # keep calling .id
         return var_eqn_dict
 
     def process_symbol(self, symbol):
-        """Discretise operators in model equations.
+        """Discretise operators in model equations. While a model is being processed
+        (see :meth:`process_model()`), each symbol (identified by its id) is only
+        discretised once, and then reused.
 
         Parameters
         ----------
@@ -209,6 +262,17 @@ class Discretisation(object):
             Discretised symbol
 
         """
+        if self._discretised_symbols is None:
+            return self._process_symbol(symbol)
+        try:
+            return self._discretised_symbols[symbol.id]
+        except KeyError:
+            discretised_symbol = self._process_symbol(symbol)
+            self._discretised_symbols[symbol.id] = discretised_symbol
+            return discretised_symbol
+
+    def _process_symbol(self, symbol):
+        """ See :meth:`Discretisation.process_symbol()`. """
         if isinstance(symbol, pybamm.Gradient):
             child = symbol.children[0]
             discretised_child = self.process_symbol(child)
@@ -277,9 +341,8 @@ class Discretisation(object):
             return new_symbol
 
         else:
-            new_symbol = copy.deepcopy(symbol)
-            new_symbol.parent = None
-            return new_symbol
+            # symbols are immutable, so can be reused in the new expression tree
+            return symbol
 
     def process_binary_operators(self, bin_op):
         """Discretise binary operators in model equations.  Performs appropriate
@@ -330,6 +393,99 @@ class Discretisation(object):
         # Return new binary operator with appropriate class
         return bin_op.__class__(new_left, new_right)
 
+    def create_jacobian(self, model):
+        """Create the Jacobian of the discretised model equations (rhs and algebraic,
+        concatenated) with respect to the state vector y.
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel` (or subclass)
+            Discretised model. Must have attributes concatenated_rhs,
+            concatenated_algebraic and concatenated_initial_conditions
+
+        Returns
+        -------
+        :class:`pybamm.Symbol` or None
+            Expression tree that evaluates to the Jacobian of the model as a
+            :class:`scipy.sparse` matrix, or None if the model equations cannot be
+            differentiated (in which case the solvers fall back to finite differences)
+
+        """
+        y0 = model.concatenated_initial_conditions
+        y = pybamm.StateVector(slice(0, np.size(y0)))
+        equations = self.concatenate(
+            model.concatenated_rhs, model.concatenated_algebraic
+        )
+        try:
+            jacobian = equations.jac(y)
+            # Check that the Jacobian can be evaluated and has the right shape
+            # (with unknown values of any input parameters)
+            jacobian_shape = jacobian.evaluate(0, y0, pybamm.UnknownInputs()).shape
+        except (NotImplementedError, ValueError):
+            return None
+        if jacobian_shape != (np.size(y0), np.size(y0)):
+            return None
+        return jacobian
+
+    def create_jacobian_sparsity(self, model):
+        """Find the structural sparsity pattern of the Jacobian of the discretised
+        model equations (rhs and algebraic, concatenated) with respect to the state
+        vector y. See :func:`pybamm.jacobian_sparsity()`.
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel` (or subclass)
+            Discretised model. Must have attributes concatenated_rhs,
+            concatenated_algebraic and concatenated_initial_conditions
+
+        Returns
+        -------
+        :class:`scipy.sparse.csr_matrix` or None
+            The sparsity pattern of the Jacobian of the model, or None if it cannot
+            be found (in which case the Jacobian is assumed to be dense)
+
+        """
+        y0 = model.concatenated_initial_conditions
+        y = pybamm.StateVector(slice(0, np.size(y0)))
+        equations = self.concatenate(
+            model.concatenated_rhs, model.concatenated_algebraic
+        )
+        try:
+            sparsity = pybamm.jacobian_sparsity(
+                equations, y, y0, pybamm.UnknownInputs()
+            )
+        except (NotImplementedError, ValueError):
+            return None
+        if sparsity.shape != (np.size(y0), np.size(y0)):
+            return None
+        return sparsity
+
+    def create_linear_decomposition(self, model):
+        """Decompose the concatenated rhs of the discretised model into
+        `A @ y + b(t) + g(t, y)`. See :func:`pybamm.linear_decomposition()`.
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel` (or subclass)
+            Discretised model. Must have attributes concatenated_rhs and
+            concatenated_initial_conditions
+
+        Returns
+        -------
+        :class:`pybamm.LinearDecomposition` or None
+            The decomposition of the rhs, or None if the sizes of its nodes cannot be
+            found
+
+        """
+        y0 = model.concatenated_initial_conditions
+        y = pybamm.StateVector(slice(0, np.size(y0)))
+        try:
+            return pybamm.linear_decomposition(
+                model.concatenated_rhs, y, y0, pybamm.UnknownInputs()
+            )
+        except (NotImplementedError, TypeError, ValueError):
+            return None
+
     def concatenate(self, *symbols):
         return pybamm.NumpyConcatenation(*symbols)
 
@@ -403,27 +559,29 @@ class Discretisation(object):
             )
         )
 
-        # Check initial conditions and rhs have the same shape
+        # Check initial conditions and rhs have the same shape (the values of any
+        # input parameters don't affect the shapes)
         y0 = model.concatenated_initial_conditions
+        inputs = pybamm.UnknownInputs()
         # Individual
         for var in model.rhs.keys():
             assert (
-                model.rhs[var].evaluate(0, y0).shape
+                model.rhs[var].evaluate(0, y0, inputs).shape
                 == model.initial_conditions[var].evaluate(0, None).shape
             ), pybamm.ModelError(
                 """
                 rhs and initial_conditions must have the same shape after discretisation
                 but rhs.shape = {} and initial_conditions.shape = {} for variable '{}'.
                 """.format(
-                    model.rhs[var].evaluate(0, y0).shape,
+                    model.rhs[var].evaluate(0, y0, inputs).shape,
                     model.initial_conditions[var].evaluate(0, None).shape,
                     var,
                 )
             )
         # Concatenated
         assert (
-            model.concatenated_rhs.evaluate(0, y0).shape[0]
-            + model.concatenated_algebraic.evaluate(0, y0).shape[0]
+            model.concatenated_rhs.evaluate(0, y0, inputs).shape[0]
+            + model.concatenated_algebraic.evaluate(0, y0, inputs).shape[0]
             == y0.shape[0]
         ), pybamm.ModelError(
             """
@@ -431,8 +589,8 @@ class Discretisation(object):
             same shape after discretisation but rhs.shape = {}, algebraic.shape = {},
             and initial_conditions.shape = {}.
             """.format(
-                model.concatenated_rhs.evaluate(0, y0).shape,
-                model.concatenated_algebraic.evaluate(0, y0).shape,
+                model.concatenated_rhs.evaluate(0, y0, inputs).shape,
+                model.concatenated_algebraic.evaluate(0, y0, inputs).shape,
                 y0.shape,
             )
         )
@@ -441,17 +599,17 @@ class Discretisation(object):
         # Be lenient with size check if the variable in model.variables is broadcasted
         for var in model.rhs.keys():
             if var.name in model.variables.keys():
-                assert model.rhs[var].evaluate(0, y0).shape == model.variables[
+                assert model.rhs[var].evaluate(0, y0, inputs).shape == model.variables[
                     var.name
-                ].evaluate(0, y0).shape or isinstance(
+                ].evaluate(0, y0, inputs).shape or isinstance(
                     model.variables[var.name], pybamm.NumpyBroadcast
                 ), pybamm.ModelError(
                     """
                     variable and its eqn must have the same shape after discretisation
                     but variable.shape = {} and rhs.shape = {} for variable '{}'.
                     """.format(
-                        model.variables[var.name].evaluate(0, y0).shape,
-                        model.rhs[var].evaluate(0, y0).shape,
+                        model.variables[var.name].evaluate(0, y0, inputs).shape,
+                        model.rhs[var].evaluate(0, y0, inputs).shape,
                         var,
                     )
                 )
@@ -0,0 +1,249 @@
+#
+# Run a model for many parameter values and meshes in a pool of processes
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import concurrent.futures
+import copy
+import traceback
+
+
+class EnsembleRunner(object):
+    """
+    Run the pipeline of a model (process the parameters, discretise and solve) for
+    each member of an ensemble of parameter values and/or mesh settings, sharing the
+    members out between a pool of processes
+    (:class:`concurrent.futures.ProcessPoolExecutor`).
+
+    The model, solver and times are sent to each process once, when it starts. The
+    members are then sent in chunks of `chunksize` members, and each member is
+    solved with its own copy of the model (which is not modified). A member whose
+    pipeline raises an exception doesn't stop the other members: the exception is
+    kept in its :class:`EnsembleResult`.
+
+    Parameters
+    ----------
+    model : :class:`pybamm.BaseModel` (or subclass)
+        The model to run, before its parameters are processed
+    t_eval : numeric type
+        The times at which to compute the solution of each member
+    solver : :class:`pybamm.BaseSolver`, optional
+        The solver to use (default is the default solver of the model)
+    max_workers : int, optional
+        The number of processes to use (default is the number of processors)
+    chunksize : int, optional
+        The number of members sent to a process at a time (default is 1). Larger
+        chunks reduce the overhead of sending the members to the processes, at the
+        cost of sharing them out less evenly.
+    """
+
+    def __init__(self, model, t_eval, solver=None, max_workers=None, chunksize=1):
+        self.model = model
+        self.t_eval = t_eval
+        self.solver = solver or model.default_solver
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+
+    @property
+    def chunksize(self):
+        return self._chunksize
+
+    @chunksize.setter
+    def chunksize(self, value):
+        if value < 1:
+            raise ValueError("chunksize must be at least 1, not {}".format(value))
+        self._chunksize = value
+
+    def run(self, parameter_values=None, submesh_pts=None):
+        """
+        Run the pipeline of the model for each member of the ensemble.
+
+        Parameters
+        ----------
+        parameter_values : list of :class:`pybamm.ParameterValues`, optional
+            The parameter values of each member. A member whose parameter values are
+            None uses the default parameter values of the model.
+        submesh_pts : list of dict, optional
+            The number of points in each submesh of each member (see
+            :class:`pybamm.Mesh`). A member whose submesh points are None uses the
+            default submesh points of the model.
+
+        Returns
+        -------
+        list of :class:`EnsembleResult`
+            The result of each member, in the same order as the members
+
+        Raises
+        ------
+        ValueError
+            If neither `parameter_values` nor `submesh_pts` are given, or if they
+            have different lengths
+        """
+        if parameter_values is None and submesh_pts is None:
+            raise ValueError("either parameter_values or submesh_pts must be given")
+        elif parameter_values is None:
+            parameter_values = [None] * len(submesh_pts)
+        elif submesh_pts is None:
+            submesh_pts = [None] * len(parameter_values)
+        elif len(parameter_values) != len(submesh_pts):
+            raise ValueError(
+                "parameter_values and submesh_pts must have the same length, "
+                "not {} and {}".format(len(parameter_values), len(submesh_pts))
+            )
+
+        members = list(enumerate(zip(parameter_values, submesh_pts)))
+        chunks = [
+            members[i : i + self.chunksize]
+            for i in range(0, len(members), self.chunksize)
+        ]
+        results = [None] * len(members)
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=initialise_worker,
+            initargs=(self.model, self.solver, self.t_eval),
+        ) as executor:
+            futures = [executor.submit(run_chunk, chunk) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                try:
+                    chunk_results = future.result()
+                except Exception as error:
+                    # the whole chunk failed (e.g. its process died, or its results
+                    # could not be sent back), so record the error for each member
+                    error_traceback = "".join(
+                        traceback.format_exception(
+                            type(error), error, error.__traceback__
+                        )
+                    )
+                    chunk_results = [
+                        (
+                            index,
+                            EnsembleResult(
+                                *member, error=error, traceback=error_traceback
+                            ),
+                        )
+                        for index, member in chunk
+                    ]
+                for index, result in chunk_results:
+                    results[index] = result
+        return results
+
+
+class EnsembleResult(object):
+    """
+    The result of a member of an ensemble (see :class:`EnsembleRunner`).
+
+    Parameters
+    ----------
+    parameter_values : :class:`pybamm.ParameterValues` or None
+        The parameter values of the member
+    submesh_pts : dict or None
+        The number of points in each submesh of the member
+    model : :class:`pybamm.BaseModel`, optional
+        The processed and discretised model of the member
+    t : :class:`numpy.array`, optional
+        The times of the solution
+    y : :class:`numpy.array`, optional
+        The values of the solution
+    error : Exception, optional
+        The exception raised by the pipeline of the member, if it failed
+    traceback : str, optional
+        The traceback of `error`
+    """
+
+    def __init__(
+        self,
+        parameter_values,
+        submesh_pts,
+        model=None,
+        t=None,
+        y=None,
+        error=None,
+        traceback=None,
+    ):
+        self.parameter_values = parameter_values
+        self.submesh_pts = submesh_pts
+        self.model = model
+        self.t = t
+        self.y = y
+        self.error = error
+        self.traceback = traceback
+
+    @property
+    def success(self):
+        """Whether the pipeline of the member finished without raising an exception"""
+        return self.error is None
+
+
+# The model, solver and times of the process, set when the process starts
+_WORKER_SETTINGS = {}
+
+
+def initialise_worker(model, solver, t_eval):
+    """Store the model, solver and times in a new process of an ensemble"""
+    _WORKER_SETTINGS.update({"model": model, "solver": solver, "t_eval": t_eval})
+
+
+def run_chunk(chunk):
+    """
+    Run the pipeline of each member of a chunk of an ensemble, in a process whose
+    settings have been stored by :func:`initialise_worker()`
+
+    Parameters
+    ----------
+    chunk : list
+        The index, parameter values and submesh points of each member, as
+        `(index, (parameter_values, submesh_pts))`
+
+    Returns
+    -------
+    list
+        The index and :class:`EnsembleResult` of each member
+    """
+    results = []
+    for index, (parameter_values, submesh_pts) in chunk:
+        try:
+            result = run_member(
+                _WORKER_SETTINGS["model"],
+                _WORKER_SETTINGS["solver"],
+                _WORKER_SETTINGS["t_eval"],
+                parameter_values,
+                submesh_pts,
+            )
+        except Exception as error:
+            result = EnsembleResult(
+                parameter_values,
+                submesh_pts,
+                error=error,
+                traceback=traceback.format_exc(),
+            )
+        results.append((index, result))
+    return results
+
+
+def run_member(model, solver, t_eval, parameter_values=None, submesh_pts=None):
+    """
+    Process the parameters of a copy of `model`, discretise it and solve it
+
+    Returns
+    -------
+    :class:`EnsembleResult`
+        The result of the member
+    """
+    model = copy.deepcopy(model)
+    if parameter_values is None:
+        parameter_values = model.default_parameter_values
+    if submesh_pts is None:
+        submesh_pts = model.default_submesh_pts
+
+    geometry = model.default_geometry
+    parameter_values.process_geometry(geometry)
+    parameter_values.process_model(model)
+    mesh = pybamm.Mesh(geometry, model.default_submesh_types, submesh_pts)
+    disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+    disc.process_model(model)
+    solver.solve(model, t_eval)
+    return EnsembleResult(
+        parameter_values, submesh_pts, model=model, t=solver.t, y=solver.y
+    )
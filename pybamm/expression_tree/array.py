@@ -5,6 +5,10 @@ from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 import pybamm
 
+import numpy as np
+
+sparse = pybamm.util.lazy_import("scipy.sparse")
+
 
 class Array(pybamm.Symbol):
     """node in the expression tree that holds an tensor type variable
@@ -23,11 +27,53 @@ class Array(pybamm.Symbol):
     *Extends:* :class:`Symbol`
     """
 
+    __slots__ = ["_entries", "_entries_hash"]
+
     def __init__(self, entries, name=None, domain=[]):
         if name is None:
             name = "Array of shape {!s}".format(entries.shape)
         super().__init__(name, domain=domain)
         self._entries = entries
+        self._entries_hash = self.hash_entries(entries)
+
+    def id_from_children_ids(self, children_ids):
+        """
+        See :meth:`pybamm.Symbol.id_from_children_ids()`. Unlike other symbols, the
+        id of an array depends on its entries, so that arrays with the same shape but
+        different entries have different ids.
+        """
+        return hash(
+            (self.__class__, self.name, self._entries_hash) + tuple(self.domain)
+        )
+
+    def __setstate__(self, state):
+        """ See :meth:`pybamm.Symbol.__setstate__()`. """
+        # the hash of the entries changes between python sessions, so find it again
+        state = dict(state)
+        state["_entries_hash"] = self.hash_entries(state["_entries"])
+        super().__setstate__(state)
+
+    def content_state(self):
+        """ See :meth:`pybamm.Symbol.content_state()`. """
+        # the hash of the entries changes between python sessions
+        state = super().content_state()
+        del state["_entries_hash"]
+        return state
+
+    def hash_entries(self, entries):
+        """Hash the entries (dense or sparse) of an array"""
+        if sparse.issparse(entries):
+            entries = sparse.csr_matrix(entries)
+            return hash(
+                (
+                    entries.shape,
+                    entries.data.tobytes(),
+                    entries.indices.tobytes(),
+                    entries.indptr.tobytes(),
+                )
+            )
+        entries = np.asarray(entries)
+        return hash((entries.shape, entries.dtype.str, entries.tobytes()))
 
     @property
     def entries(self):
@@ -48,6 +94,6 @@ class Array(pybamm.Symbol):
         """ returns the total number of entries in the tensor"""
         return self._entries.size
 
-    def evaluate(self, t=None, y=None):
+    def evaluate(self, t=None, y=None, inputs=None):
         """ See :meth:`pybamm.Symbol.evaluate()`. """
         return self._entries
@@ -0,0 +1,365 @@
+#
+# Evaluate a discretised expression tree for a batch of input parameter values
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import numpy as np
+
+sparse = pybamm.util.lazy_import("scipy.sparse")
+
+
+def batch_symbol(symbol, n_batch, y, inputs=None):
+    """
+    Create an expression tree that evaluates the discretised expression tree
+    `symbol` for `n_batch` members at once, each with its own state vector and its
+    own values of the input parameters (see :class:`pybamm.InputParameter`).
+
+    The state vectors of the members are interleaved into a single state vector,
+    so that entry `i` of member `k` is entry `i * n_batch + k` (see
+    :func:`pybamm.batch_vectors()`), and the value of the batched tree is
+    interleaved in the same way. Input parameters evaluate to an array with the
+    value of each member (see :func:`pybamm.batch_inputs()`). With this ordering:
+
+    - a :class:`pybamm.StateVector` with slice `a:b` reads the slice
+      `a * n_batch:b * n_batch` of the batched state vector
+    - a constant matrix `A` acts on every member at once as `kron(A, I)`, so that
+      each matrix multiplication is a single sparse matrix multiplication for the
+      whole batch
+    - elementwise operations and concatenations are unchanged
+
+    Parts of the tree that are the same for every member (i.e. that don't depend on
+    the state vector or on the input parameters) are only evaluated once, and
+    repeated for each member where needed.
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol`
+        The discretised expression tree, for a single member
+    n_batch : int
+        The number of members in the batch
+    y : :class:`numpy.array`
+        A value of the state vector of a single member, used to find the sizes of
+        the nodes
+    inputs : dict, optional
+        The values of any input parameters in the tree for a single member, used to
+        find the sizes of the nodes (defaults to :class:`pybamm.UnknownInputs`)
+
+    Returns
+    -------
+    :class:`pybamm.Symbol`
+        The batched expression tree, whose value is the value of `symbol` for each
+        member, interleaved
+
+    Raises
+    ------
+    NotImplementedError
+        If the tree contains a node that cannot be batched (e.g. a
+        :class:`pybamm.Function` that does not act elementwise)
+    """
+    if inputs is None:
+        inputs = pybamm.UnknownInputs()
+    value, batched = find_batched(symbol, n_batch, y, {}, inputs)
+    if batched is None:
+        return repeat_members(symbol, value, n_batch)
+    elif np.size(value) == 0:
+        return batched
+    else:
+        return broadcast_members(batched, value, np.size(value), n_batch)
+
+
+def find_batched(symbol, n_batch, y, known_symbols, inputs):
+    """
+    Find the value of `symbol` for a single member and the batched version of
+    `symbol`. See :func:`pybamm.batch_symbol()`.
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol`
+        The expression tree
+    n_batch : int
+        The number of members in the batch
+    y : :class:`numpy.array`
+        A value of the state vector of a single member
+    known_symbols : dict
+        The values and batched symbols found so far, so that shared nodes are only
+        visited once ({symbol key: (value, batched symbol)})
+    inputs : dict
+        The values of any input parameters in the tree for a single member
+
+    Returns
+    -------
+    value : numeric type
+        The value of `symbol` for a single member
+    batched : :class:`pybamm.Symbol` or None
+        The batched expression tree, or None if `symbol` is the same for every
+        member
+    """
+    key = id(symbol)
+    if key in known_symbols:
+        return known_symbols[key]
+
+    if not (symbol.has_state_vector() or symbol.has_input_parameter()):
+        value = symbol.evaluate(0, y, inputs)
+        batched = None
+
+    elif isinstance(symbol, pybamm.StateVector):
+        value = symbol.evaluate(0, y, inputs)
+        y_slice = symbol.y_slice
+        batched = pybamm.StateVector(
+            slice(y_slice.start * n_batch, y_slice.stop * n_batch),
+            domain=symbol.domain,
+        )
+
+    elif isinstance(symbol, pybamm.InputParameter):
+        # the batched inputs hold the value of every member, but make the batched
+        # symbol a vector explicitly, as input parameters evaluate to numbers
+        # otherwise (e.g. with pybamm.UnknownInputs)
+        value = symbol.evaluate(0, y, inputs)
+        batched = pybamm.Vector(np.ones(n_batch)) * symbol
+
+    else:
+        children = [
+            find_batched(child, n_batch, y, known_symbols, inputs)
+            for child in symbol.children
+        ]
+        values = [child_value for child_value, _ in children]
+
+        if isinstance(symbol, pybamm.MatrixMultiplication):
+            if children[0][1] is not None or not symbol.children[0].is_constant():
+                raise NotImplementedError(
+                    """batching a matrix multiplication is only implemented when
+                       the left child is constant"""
+                )
+            value = symbol._binary_evaluate(*values)
+            batched = pybamm.MatrixMultiplication(
+                batch_matrix(values[0], n_batch), children[1][1]
+            )
+
+        elif isinstance(symbol, pybamm.BinaryOperator):
+            # elementwise, broadcasting children that evaluate to a single value
+            value = symbol._binary_evaluate(*values)
+            batched = symbol.__class__(
+                *[
+                    batch_operand(child, child_value, child_batched, value, n_batch)
+                    for child, (child_value, child_batched) in zip(
+                        symbol.children, children
+                    )
+                ]
+            )
+
+        elif isinstance(symbol, pybamm.NumpyBroadcast):
+            if np.size(values[0]) != 1:
+                raise NotImplementedError(
+                    "batching a broadcast is only implemented for a child of size 1"
+                )
+            value = symbol._unary_evaluate(values[0])
+            batched = broadcast_members(children[0][1], values[0], value.size, n_batch)
+
+        elif isinstance(symbol, pybamm.NodeToEdge):
+            value = symbol._unary_evaluate(values[0])
+            if isinstance(values[0], np.ndarray) and values[0].ndim == 1:
+                # the node-to-edge functions are linear, so find their matrix
+                matrix = symbol._unary_evaluate(
+                    sparse.csr_matrix(sparse.eye(values[0].size))
+                )
+                batched = pybamm.MatrixMultiplication(
+                    batch_matrix(matrix, n_batch), children[0][1]
+                )
+            else:
+                batched = children[0][1]
+
+        elif isinstance(symbol, (pybamm.Negate, pybamm.AbsoluteValue, pybamm.Function)):
+            value = symbol._unary_evaluate(values[0])
+            if np.size(value) != np.size(values[0]):
+                raise NotImplementedError(
+                    "batching {!s} is only implemented if it acts elementwise".format(
+                        symbol
+                    )
+                )
+            if isinstance(symbol, pybamm.Function):
+                batched = pybamm.Function(symbol.func, children[0][1])
+            else:
+                batched = symbol.__class__(children[0][1])
+
+        elif isinstance(symbol, pybamm.NumpyConcatenation):
+            value = symbol._concatenation_evaluate(values)
+            batched = pybamm.NumpyConcatenation(
+                *[
+                    batch_concatenated(child, child_value, child_batched, n_batch)
+                    for child, (child_value, child_batched) in zip(
+                        symbol.children, children
+                    )
+                ]
+            )
+
+        elif isinstance(symbol, pybamm.DomainConcatenation):
+            # stack the children, then permute the rows of every member at once
+            value = symbol._concatenation_evaluate(values)
+            batched = pybamm.MatrixMultiplication(
+                batch_matrix(symbol._permutation_matrix(), n_batch),
+                pybamm.NumpyConcatenation(
+                    *[
+                        batch_concatenated(child, child_value, child_batched, n_batch)
+                        for child, (child_value, child_batched) in zip(
+                            symbol.children, children
+                        )
+                    ]
+                ),
+            )
+
+        else:
+            raise NotImplementedError(
+                "batching symbol {!s} of type {} not implemented".format(
+                    symbol, type(symbol)
+                )
+            )
+
+    known_symbols[key] = (value, batched)
+    return value, batched
+
+
+def batch_operand(child, child_value, child_batched, value, n_batch):
+    """
+    Batch the child `child` of an elementwise binary operator whose value for a
+    single member is `value`, so that it has the same size as the other child
+    (children that are the same for every member and have a single value are left to
+    broadcast)
+    """
+    if child_batched is None:
+        if np.size(child_value) == 1:
+            return child
+        return repeat_members(child, child_value, n_batch)
+    return broadcast_members(child_batched, child_value, np.size(value), n_batch)
+
+
+def batch_concatenated(child, child_value, child_batched, n_batch):
+    """
+    Batch the child `child` of a concatenation, so that it has its own size for
+    each member
+    """
+    if child_batched is None:
+        return repeat_members(child, child_value, n_batch)
+    return child_batched
+
+
+def repeat_members(symbol, value, n_batch):
+    """
+    Batch a symbol that is the same for every member (and whose value is `value`),
+    by repeating each of its entries for every member
+    """
+    if symbol.is_constant():
+        return pybamm.Vector(np.repeat(np.reshape(value, -1), n_batch))
+    elif np.size(value) == 1:
+        return pybamm.Vector(np.ones(n_batch)) * symbol
+    repeat = sparse.kron(
+        sparse.eye(np.size(value)), np.ones((n_batch, 1)), format="csr"
+    )
+    return pybamm.MatrixMultiplication(pybamm.Matrix(repeat), symbol)
+
+
+def broadcast_members(batched, value, size, n_batch):
+    """
+    Give a batched symbol of a single value for each member (whose value for a
+    single member is `value`) the size `size` for each member. If `size` is None or
+    1, or if the symbol already has more than one value for each member, it is left
+    as it is.
+    """
+    if size is None or size == 1 or np.size(value) != 1:
+        return batched
+    broadcast = sparse.kron(np.ones((size, 1)), sparse.eye(n_batch))
+    return pybamm.MatrixMultiplication(
+        pybamm.Matrix(sparse.csr_matrix(broadcast)), batched
+    )
+
+
+def batch_matrix(matrix, n_batch):
+    """
+    Create the :class:`pybamm.Matrix` that applies `matrix` to every member of a
+    batch of interleaved vectors, i.e. `kron(matrix, I)`
+    """
+    return pybamm.Matrix(
+        sparse.kron(sparse.csr_matrix(matrix), sparse.eye(n_batch), format="csr")
+    )
+
+
+def batch_inputs(inputs_list):
+    """
+    Combine the inputs of each member of a batch into the inputs of the batched
+    expression trees (see :func:`pybamm.batch_symbol()`).
+
+    Parameters
+    ----------
+    inputs_list : list of dict
+        The values of the input parameters of each member
+
+    Returns
+    -------
+    dict
+        The array of the values of each input parameter, in order of the members
+
+    Raises
+    ------
+    ValueError
+        If the members don't all have the same input parameters
+    """
+    names = set(inputs_list[0]) if inputs_list else set()
+    for inputs in inputs_list:
+        if set(inputs) != names:
+            raise ValueError(
+                "all the members of a batch must have the same inputs, "
+                "not {} and {}".format(sorted(names), sorted(inputs))
+            )
+    return {
+        name: np.array([inputs[name] for inputs in inputs_list], dtype=float)
+        for name in names
+    }
+
+
+def batch_vectors(vectors):
+    """
+    Interleave the state vectors of the members of a batch (see
+    :func:`pybamm.batch_symbol()`), so that entry `i` of member `k` is entry
+    `i * len(vectors) + k`
+    """
+    return np.stack(vectors, axis=-1).reshape(-1)
+
+
+def unbatch_vectors(y, n_batch):
+    """
+    Split the interleaved state vector (or a solution, with one column per time)
+    `y` of a batch into the state vectors of each member. This is the inverse of
+    :func:`pybamm.batch_vectors()`, and returns views of `y`.
+    """
+    return [y[k::n_batch] for k in range(n_batch)]
+
+
+def batch_matrices(matrices):
+    """
+    Combine the matrices of each member of a batch (e.g. the Jacobian of each
+    member) into the block-diagonal matrix that acts on the interleaved vectors of
+    the batch (see :func:`pybamm.batch_symbol()`).
+
+    Parameters
+    ----------
+    matrices : list of :class:`scipy.sparse` matrix
+        The matrix of each member, all of the same shape
+
+    Returns
+    -------
+    :class:`scipy.sparse.csr_matrix`
+        The batched matrix
+    """
+    n_batch = len(matrices)
+    n_rows, n_cols = matrices[0].shape
+    rows, cols, data = [], [], []
+    for k, matrix in enumerate(matrices):
+        matrix = sparse.coo_matrix(matrix)
+        rows.append(matrix.row * n_batch + k)
+        cols.append(matrix.col * n_batch + k)
+        data.append(matrix.data)
+    return sparse.csr_matrix(
+        (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(n_rows * n_batch, n_cols * n_batch),
+    )
@@ -6,6 +6,9 @@ from __future__ import print_function, unicode_literals
 import pybamm
 
 import numbers
+import numpy as np
+
+sparse = pybamm.util.lazy_import("scipy.sparse")
 
 
 class BinaryOperator(pybamm.Symbol):
@@ -27,6 +30,8 @@ class BinaryOperator(pybamm.Symbol):
 
     """
 
+    __slots__ = []
+
     def __init__(self, name, left, right):
         assert isinstance(left, (pybamm.Symbol, numbers.Number)) and isinstance(
             right, (pybamm.Symbol, numbers.Number)
@@ -48,6 +53,33 @@ class BinaryOperator(pybamm.Symbol):
         """ See :meth:`pybamm.Symbol.__str__()`. """
         return "{!s} {} {!s}".format(self.children[0], self.name, self.children[1])
 
+    def evaluate(self, t=None, y=None, inputs=None):
+        """ See :meth:`pybamm.Symbol.evaluate()`. """
+        left = self.children[0].evaluate(t, y, inputs)
+        right = self.children[1].evaluate(t, y, inputs)
+        return self._binary_evaluate(left, right)
+
+    def _binary_evaluate(self, left, right):
+        """Perform the binary operation on the evaluated children `left` and `right`.
+        Derived classes must implement this."""
+        raise NotImplementedError
+
+    def _jac(self, variable):
+        """ See :meth:`pybamm.Symbol._jac()`. """
+        left, right = self.children
+        return self._binary_jac(left, right, variable)
+
+    def _binary_jac(self, left, right, variable):
+        """Calculate the Jacobian of the binary operation, given the children `left`
+        and `right` (at least one of which depends on y). Derived classes that can be
+        differentiated must implement this."""
+        raise NotImplementedError(
+            """method self.jac() not implemented
+               for symbol {!s} of type {}""".format(
+                self, type(self)
+            )
+        )
+
     def get_children_domains(self, ldomain, rdomain):
         if ldomain == rdomain:
             return ldomain
@@ -65,13 +97,27 @@ class Power(BinaryOperator):
     **Extends:** :class:`BinaryOperator`
     """
 
+    __slots__ = []
+
     def __init__(self, left, right):
         """ See :meth:`pybamm.BinaryOperator.__init__()`. """
         super().__init__("**", left, right)
 
-    def evaluate(self, t=None, y=None):
-        """ See :meth:`pybamm.Symbol.evaluate()`. """
-        return self.children[0].evaluate(t, y) ** self.children[1].evaluate(t, y)
+    def _binary_evaluate(self, left, right):
+        """ See :meth:`pybamm.BinaryOperator._binary_evaluate()`. """
+        return left ** right
+
+    def _binary_jac(self, left, right, variable):
+        """ See :meth:`pybamm.BinaryOperator._binary_jac()`. """
+        # d(f^g) = g * f^(g - 1) * df + f^g * log(f) * dg
+        if not right.has_state_vector():
+            return RowScaling(right * left ** (right - 1), left.jac(variable))
+        right_jac = RowScaling(
+            left ** right * pybamm.Function(np.log, left), right.jac(variable)
+        )
+        if not left.has_state_vector():
+            return right_jac
+        return RowScaling(right * left ** (right - 1), left.jac(variable)) + right_jac
 
 
 class Addition(BinaryOperator):
@@ -80,13 +126,24 @@ class Addition(BinaryOperator):
     **Extends:** :class:`BinaryOperator`
     """
 
+    __slots__ = []
+
     def __init__(self, left, right):
         """ See :meth:`pybamm.BinaryOperator.__init__()`. """
         super().__init__("+", left, right)
 
-    def evaluate(self, t=None, y=None):
-        """ See :meth:`pybamm.Symbol.evaluate()`. """
-        return self.children[0].evaluate(t, y) + self.children[1].evaluate(t, y)
+    def _binary_evaluate(self, left, right):
+        """ See :meth:`pybamm.BinaryOperator._binary_evaluate()`. """
+        return left + right
+
+    def _binary_jac(self, left, right, variable):
+        """ See :meth:`pybamm.BinaryOperator._binary_jac()`. """
+        if not left.has_state_vector():
+            return right.jac(variable)
+        elif not right.has_state_vector():
+            return left.jac(variable)
+        else:
+            return left.jac(variable) + right.jac(variable)
 
 
 class Subtraction(BinaryOperator):
@@ -95,14 +152,25 @@ class Subtraction(BinaryOperator):
     **Extends:** :class:`BinaryOperator`
     """
 
+    __slots__ = []
+
     def __init__(self, left, right):
         """ See :meth:`pybamm.BinaryOperator.__init__()`. """
 
         super().__init__("-", left, right)
 
-    def evaluate(self, t=None, y=None):
-        """ See :meth:`pybamm.Symbol.evaluate()`. """
-        return self.children[0].evaluate(t, y) - self.children[1].evaluate(t, y)
+    def _binary_evaluate(self, left, right):
+        """ See :meth:`pybamm.BinaryOperator._binary_evaluate()`. """
+        return left - right
+
+    def _binary_jac(self, left, right, variable):
+        """ See :meth:`pybamm.BinaryOperator._binary_jac()`. """
+        if not left.has_state_vector():
+            return -right.jac(variable)
+        elif not right.has_state_vector():
+            return left.jac(variable)
+        else:
+            return left.jac(variable) - right.jac(variable)
 
 
 class Multiplication(BinaryOperator):
@@ -111,14 +179,28 @@ class Multiplication(BinaryOperator):
     **Extends:** :class:`BinaryOperator`
     """
 
+    __slots__ = []
+
     def __init__(self, left, right):
         """ See :meth:`pybamm.BinaryOperator.__init__()`. """
 
         super().__init__("*", left, right)
 
-    def evaluate(self, t=None, y=None):
-        """ See :meth:`pybamm.Symbol.evaluate()`. """
-        return self.children[0].evaluate(t, y) * self.children[1].evaluate(t, y)
+    def _binary_evaluate(self, left, right):
+        """ See :meth:`pybamm.BinaryOperator._binary_evaluate()`. """
+        return left * right
+
+    def _binary_jac(self, left, right, variable):
+        """ See :meth:`pybamm.BinaryOperator._binary_jac()`. """
+        # d(f * g) = g * df + f * dg
+        if not left.has_state_vector():
+            return RowScaling(left, right.jac(variable))
+        elif not right.has_state_vector():
+            return RowScaling(right, left.jac(variable))
+        else:
+            return RowScaling(right, left.jac(variable)) + RowScaling(
+                left, right.jac(variable)
+            )
 
 
 class MatrixMultiplication(BinaryOperator):
@@ -127,14 +209,32 @@ class MatrixMultiplication(BinaryOperator):
     **Extends:** :class:`BinaryOperator`
     """
 
+    __slots__ = []
+
     def __init__(self, left, right):
         """ See :meth:`pybamm.BinaryOperator.__init__()`. """
 
         super().__init__("*", left, right)
 
-    def evaluate(self, t=None, y=None):
-        """ See :meth:`pybamm.Symbol.evaluate()`. """
-        return self.children[0].evaluate(t, y) @ self.children[1].evaluate(t, y)
+    def _binary_evaluate(self, left, right):
+        """ See :meth:`pybamm.BinaryOperator._binary_evaluate()`. """
+        return left @ right
+
+    def _binary_jac(self, left, right, variable):
+        """ See :meth:`pybamm.BinaryOperator._binary_jac()`. """
+        # We only need the case where left is a constant matrix (e.g. from the
+        # discretisation of a spatial operator)
+        if left.has_state_vector():
+            raise NotImplementedError(
+                """jac of a matrix multiplication is only implemented when the left
+                   child does not depend on y, but left child is {!s}""".format(
+                    left
+                )
+            )
+        # Convert dense constant matrices to sparse, so that the Jacobian is sparse
+        if left.is_constant() and isinstance(left.evaluate(), np.ndarray):
+            left = pybamm.Matrix(sparse.csr_matrix(left.evaluate()))
+        return left @ right.jac(variable)
 
 
 class Division(BinaryOperator):
@@ -143,10 +243,57 @@ class Division(BinaryOperator):
     **Extends:** :class:`BinaryOperator`
     """
 
+    __slots__ = []
+
     def __init__(self, left, right):
         """ See :meth:`pybamm.BinaryOperator.__init__()`. """
         super().__init__("/", left, right)
 
-    def evaluate(self, t=None, y=None):
-        """ See :meth:`pybamm.Symbol.evaluate()`. """
-        return self.children[0].evaluate(t, y) / self.children[1].evaluate(t, y)
+    def _binary_evaluate(self, left, right):
+        """ See :meth:`pybamm.BinaryOperator._binary_evaluate()`. """
+        return left / right
+
+    def _binary_jac(self, left, right, variable):
+        """ See :meth:`pybamm.BinaryOperator._binary_jac()`. """
+        # d(f / g) = df / g - f / g^2 * dg
+        if not right.has_state_vector():
+            return RowScaling(1 / right, left.jac(variable))
+        right_jac = RowScaling(-left / right ** 2, right.jac(variable))
+        if not left.has_state_vector():
+            return right_jac
+        return RowScaling(1 / right, left.jac(variable)) + right_jac
+
+
+class RowScaling(BinaryOperator):
+    """A node in the expression tree that scales the rows of a (sparse) matrix by the
+    entries of a vector, i.e. that evaluates to `diag(left) @ right`. This is used to
+    build the Jacobians of elementwise operations (see :meth:`pybamm.Symbol.jac()`).
+
+    If `left` evaluates to a number, or to an array of size one, every row is scaled
+    by the same value. If `right` evaluates to a matrix with a single row, the row is
+    broadcast (the outer product of `left` and `right` is returned).
+
+    **Extends:** :class:`BinaryOperator`
+    """
+
+    __slots__ = []
+
+    def __init__(self, left, right):
+        """ See :meth:`pybamm.BinaryOperator.__init__()`. """
+        super().__init__("diag*", left, right)
+
+    def _binary_evaluate(self, left, right):
+        """ See :meth:`pybamm.BinaryOperator._binary_evaluate()`. """
+        if isinstance(left, numbers.Number):
+            return left * right
+        left = np.ravel(left).astype(float)
+        if left.size == 1:
+            return left[0] * right
+        elif right.shape[0] == 1:
+            if sparse.issparse(right):
+                return sparse.csr_matrix(left[:, np.newaxis]) @ right
+            return left[:, np.newaxis] * right
+        elif sparse.issparse(right):
+            return sparse.diags(left) @ right
+        else:
+            return left[:, np.newaxis] * right
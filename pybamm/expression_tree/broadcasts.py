@@ -7,6 +7,8 @@ import pybamm
 import numbers
 import numpy as np
 
+sparse = pybamm.util.lazy_import("scipy.sparse")
+
 
 class Broadcast(pybamm.SpatialOperator):
     """A node in the expression tree representing a broadcasting operator.
@@ -26,6 +28,8 @@ class Broadcast(pybamm.SpatialOperator):
     **Extends:** :class:`SpatialOperator`
     """
 
+    __slots__ = []
+
     def __init__(self, child, domain, name=None):
         # Convert child to Scalar if it is a number
         if isinstance(child, numbers.Number):
@@ -42,16 +46,16 @@ class Broadcast(pybamm.SpatialOperator):
             )
         if name is None:
             name = "broadcast"
-        super().__init__(name, child)
         # overwrite child domain ([]) with specified broadcasting domain
-        self.domain = domain
+        super().__init__(name, child, domain=domain)
 
 
 class NumpyBroadcast(Broadcast):
     """A node in the expression tree implementing a broadcasting operator using numpy.
-    Broadcasts a child (which *must* have empty domain) to a specified domain. To do
-    this, creates a np array of ones of the same shape as the submesh domain, and then
-    multiplies the child by that array upon evaluation
+    Broadcasts a child (which *must* have empty domain) to a specified domain. Upon
+    evaluation, the value of the child is broadcast to the shape of the submesh domain
+    with :func:`numpy.broadcast_to`, which returns a read-only view of the child's
+    value instead of a new array
 
     Parameters
     ----------
@@ -65,6 +69,8 @@ class NumpyBroadcast(Broadcast):
     **Extends:** :class:`SpatialOperator`
     """
 
+    __slots__ = ["_mesh", "_broadcasting_vector_size", "_broadcasting_vector"]
+
     def __init__(self, child, domain, mesh):
         # Only accept a 'constant' input if it evaluates to a number (i.e. no vectors
         # and matrices)
@@ -72,22 +78,55 @@ class NumpyBroadcast(Broadcast):
             raise TypeError("cannot Broadcast a constant Vector or Matrix")
 
         super().__init__(child, domain, name="numpy broadcast")
+        self._mesh = mesh
         # determine broadcasting vector size (size 1 if the domain is empty)
         if domain == []:
-            self.broadcasting_vector_size = 1
+            self._broadcasting_vector_size = 1
         else:
-            self.broadcasting_vector_size = sum(
+            self._broadcasting_vector_size = sum(
                 [mesh[dom].npts_for_broadcast for dom in domain]
             )
         # create broadcasting vector (vector of ones with shape determined by the
         # domain)
-        self.broadcasting_vector = np.ones(self.broadcasting_vector_size)
+        self._broadcasting_vector = np.ones(self._broadcasting_vector_size)
+
+    @property
+    def mesh(self):
+        """the mesh on which to broadcast (None if the node was loaded from a file)"""
+        return self._mesh
+
+    @property
+    def broadcasting_vector_size(self):
+        """the size of the broadcast vector"""
+        return self._broadcasting_vector_size
 
-    def evaluate(self, t=None, y=None):
-        """ See :meth:`pybamm.Symbol.evaluate()`. """
-        child = self.children[0]
-        child_eval = child.evaluate(t, y)
+    @property
+    def broadcasting_vector(self):
+        """a vector of ones of the size of the broadcast vector"""
+        return self._broadcasting_vector
 
+    def id_from_children_ids(self, children_ids):
+        """ See :meth:`pybamm.Symbol.id_from_children_ids()`. """
+        return hash(
+            (self.__class__, self.name, self.broadcasting_vector_size)
+            + tuple(children_ids)
+            + tuple(self.domain)
+        )
+
+    def __setstate__(self, state):
+        """ See :meth:`pybamm.Symbol.__setstate__()`. """
+        # nodes loaded from their content (see pybamm.load_model()) have no mesh
+        super().__setstate__(dict({"_mesh": None}, **state))
+
+    def content_state(self):
+        """ See :meth:`pybamm.Symbol.content_state()`. """
+        # the broadcasting vector is found from the mesh
+        state = super().content_state()
+        del state["_mesh"]
+        return state
+
+    def _unary_evaluate(self, child_eval):
+        """ See :meth:`pybamm.UnaryOperator._unary_evaluate()`. """
         # Different broadcasting based on the shape of child_eval
         try:
             child_eval_size = child_eval.size
@@ -95,7 +134,8 @@ class NumpyBroadcast(Broadcast):
             child_eval_size = 0
 
         if child_eval_size <= 1:
-            return child_eval * self.broadcasting_vector
+            shape = np.broadcast(child_eval, self.broadcasting_vector).shape
+            return np.broadcast_to(np.asarray(child_eval, dtype=float), shape)
         if child_eval_size > 1:
             # Possible shapes for a child with a shape:
             # (n,) -> (e.g. time-like object) broadcast to (n, broadcasting_size)
@@ -106,14 +146,24 @@ class NumpyBroadcast(Broadcast):
             # (n,m,k,...) -> error
             if child_eval.ndim == 1:
                 # shape (n,)
-                return np.repeat(
-                    child_eval[np.newaxis, :], self.broadcasting_vector_size, axis=0
+                return np.broadcast_to(
+                    child_eval, (self.broadcasting_vector_size,) + child_eval.shape
                 )
             elif child_eval.ndim == 2:
                 if child_eval.shape[0] == 1:
                     # shape (1, m) since size > 1
-                    return np.repeat(child_eval, self.broadcasting_vector_size, axis=0)
+                    return np.broadcast_to(
+                        child_eval,
+                        (self.broadcasting_vector_size, child_eval.shape[1]),
+                    )
             # All other cases
             raise ValueError(
                 "cannot broadcast child with shape '{}'".format(child_eval.shape)
             )
+
+    def _jac(self, variable):
+        """ See :meth:`pybamm.Symbol._jac()`. """
+        # Only children that evaluate to a single value can be differentiated, in
+        # which case each entry of the broadcast has the Jacobian of the child
+        ones = sparse.csr_matrix(np.ones((self.broadcasting_vector_size, 1)))
+        return pybamm.Matrix(ones) @ self.children[0].jac(variable)
@@ -7,6 +7,8 @@ import pybamm
 
 import numpy as np
 
+sparse = pybamm.util.lazy_import("scipy.sparse")
+
 
 class Concatenation(pybamm.Symbol):
     """A node in the expression tree representing a concatenation of symbols
@@ -20,13 +22,15 @@ class Concatenation(pybamm.Symbol):
 
     """
 
+    __slots__ = []
+
     def __init__(self, *children, name=None):
         if name is None:
             name = "concatenation"
         domain = self.get_children_domains(children)
         super().__init__(name, children, domain=domain)
 
-    def evaluate(self, t=None, y=None):
+    def evaluate(self, t=None, y=None, inputs=None):
         """ See :meth:`pybamm.Symbol.evaluate()`. """
         raise NotImplementedError
 
@@ -64,6 +68,8 @@ class NumpyConcatenation(pybamm.Symbol):
 
     """
 
+    __slots__ = []
+
     def __init__(self, *children):
         children = list(children)
         # Turn objects that evaluate to scalars to objects that evaluate to vectors,
@@ -73,12 +79,36 @@ class NumpyConcatenation(pybamm.Symbol):
                 children[i] = pybamm.NumpyBroadcast(child, [], None)
         super().__init__("model concatenation", children, domain=[])
 
-    def evaluate(self, t=None, y=None):
+    def evaluate(self, t=None, y=None, inputs=None):
         """ See :meth:`pybamm.Symbol.evaluate()`. """
-        if len(self.children) == 0:
-            return np.array([])
-        else:
-            return np.concatenate([child.evaluate(t, y) for child in self.children])
+        children_eval = [child.evaluate(t, y, inputs) for child in self.children]
+        return self._concatenation_evaluate(children_eval)
+
+    def evaluate_into(self, out, t=None, y=None, inputs=None):
+        """ See :meth:`pybamm.Symbol.evaluate_into()`. """
+        children_eval = [child.evaluate(t, y, inputs) for child in self.children]
+        return self._concatenation_evaluate(children_eval, out)
+
+    def _concatenation_evaluate(self, children_eval, out=None):
+        """Concatenate the evaluated children `children_eval` (into `out`, if
+        given)."""
+        if out is None:
+            if len(children_eval) == 0:
+                return np.array([])
+            else:
+                return np.concatenate(children_eval)
+        # write each child into its slice of the (flattened) output
+        entries = out if np.ndim(out) == 1 else np.reshape(out, -1)
+        start = 0
+        for child_vector in children_eval:
+            stop = start + np.size(child_vector)
+            entries[start:stop] = np.ravel(child_vector)
+            start = stop
+        return out
+
+    def _jac(self, variable):
+        """ See :meth:`pybamm.Symbol._jac()`. """
+        return SparseStack(*[child.jac(variable) for child in self.children])
 
 
 class DomainConcatenation(Concatenation):
@@ -102,6 +132,8 @@ class DomainConcatenation(Concatenation):
 
     """
 
+    __slots__ = ["_mesh", "_slices", "_size", "_children_slices", "_indices"]
+
     def __init__(self, children, mesh):
         # Convert any constant symbols in children to a Vector of the right size for
         # concatenation
@@ -111,6 +143,8 @@ class DomainConcatenation(Concatenation):
         # Allow the base class to sort the domains into the correct order
         super().__init__(*children, name="domain concatenation")
 
+        self._mesh = mesh
+
         # create dict of domain => slice of final vector
         self._slices = self.create_slices(self, mesh)
 
@@ -122,6 +156,84 @@ class DomainConcatenation(Concatenation):
         for child in self.children:
             self._children_slices.append(self.create_slices(child, mesh))
 
+        # precompute the gather that puts the stacked children in order
+        self._indices = self._find_indices()
+
+    @property
+    def mesh(self):
+        """the mesh of the domains (None if the node was loaded from a file)"""
+        return self._mesh
+
+    def id_from_children_ids(self, children_ids):
+        """ See :meth:`pybamm.Symbol.id_from_children_ids()`. """
+        # the slices depend on the mesh, so include them in the id
+        children_slices = tuple(
+            (dom, slices[dom].start, slices[dom].stop)
+            for slices in self._children_slices
+            for dom in slices
+        )
+        return hash(
+            (self.__class__, self.name, self._size)
+            + children_slices
+            + tuple(children_ids)
+            + tuple(self.domain)
+        )
+
+    def __setstate__(self, state):
+        """ See :meth:`pybamm.Symbol.__setstate__()`. """
+        # nodes loaded from their content (see pybamm.load_model()) have no mesh, and
+        # their indices are found from the slices
+        super().__setstate__(dict({"_mesh": None}, **state))
+        if "_indices" not in state:
+            self._indices = self._find_indices()
+
+    def content_state(self):
+        """ See :meth:`pybamm.Symbol.content_state()`. """
+        # the slices are found from the mesh, and the indices from the slices
+        state = super().content_state()
+        del state["_mesh"]
+        state.pop("_indices", None)
+        return state
+
+    def _jac(self, variable):
+        """ See :meth:`pybamm.Symbol._jac()`. """
+        # Stack the Jacobians of the children, then permute the rows so that they
+        # are in the same order as the entries of the concatenated vector
+        return pybamm.Matrix(self._permutation_matrix()) @ SparseStack(
+            *[child.jac(variable) for child in self.children]
+        )
+
+    def _permutation_matrix(self):
+        """
+        The matrix that permutes the children stacked on top of each other into the
+        order of the entries of the concatenated vector
+        """
+        rows = np.arange(self._size) if self._indices is None else self._indices
+        return sparse.csr_matrix(
+            (np.ones(self._size), (np.arange(self._size), rows)),
+            shape=(self._size, self._size),
+        )
+
+    def _find_indices(self):
+        """
+        The index, in the children stacked on top of each other, of each entry of
+        the concatenated vector, so that the vector is gathered from the stacked
+        children with a single indexing operation (instead of a copy for each
+        domain). Returns None if the children are already in order.
+        """
+        indices = np.empty(self._size, dtype=int)
+        start = 0
+        for child, slices in zip(self.children, self._children_slices):
+            for dom in child.domain:
+                child_indices = np.arange(slices[dom].start, slices[dom].stop) + start
+                indices[self._slices[dom]] = child_indices
+            start += sum(
+                slices[dom].stop - slices[dom].start for dom in child.domain
+            )
+        if np.array_equal(indices, np.arange(self._size)):
+            return None
+        return indices
+
     def create_slices(self, node, mesh):
         slices = {}
         start = 0
@@ -132,15 +244,64 @@ class DomainConcatenation(Concatenation):
             start = end
         return slices
 
-    def evaluate(self, t=None, y=None):
+    def evaluate(self, t=None, y=None, inputs=None):
         """ See :meth:`pybamm.Symbol.evaluate()`. """
-        # preallocate vector
-        vector = np.empty(self._size)
+        children_eval = [child.evaluate(t, y, inputs) for child in self.children]
+        return self._concatenation_evaluate(children_eval)
+
+    def evaluate_into(self, out, t=None, y=None, inputs=None):
+        """ See :meth:`pybamm.Symbol.evaluate_into()`. """
+        children_eval = [child.evaluate(t, y, inputs) for child in self.children]
+        return self._concatenation_evaluate(children_eval, out)
+
+    def _concatenation_evaluate(self, children_eval, out=None):
+        """Concatenate the evaluated children `children_eval`, respecting domains
+        (into `out`, if given)."""
+        if self._indices is not None:
+            # stack the children, then gather the entries in the order of the domains
+            stacked = np.concatenate(children_eval)
+            if out is None:
+                return stacked[self._indices]
+            return np.take(stacked, self._indices, axis=0, out=out)
+        elif out is None:
+            return np.concatenate(children_eval)
+
+        # the children are in order, so write each of them into its slice of `out`
+        start = 0
+        for child_vector in children_eval:
+            stop = start + len(child_vector)
+            out[start:stop] = child_vector
+            start = stop
+        return out
 
-        # loop through domains of children writing subvectors to final vector
-        for child, slices in zip(self.children, self._children_slices):
-            child_vector = child.evaluate(t, y)
-            for dom in child.domain:
-                vector[self._slices[dom]] = child_vector[slices[dom]]
 
-        return vector
+class SparseStack(pybamm.Symbol):
+    """A node in the expression tree representing a vertical stack of sparse matrices
+    (e.g. the Jacobians of the children of a concatenation).
+
+    Upon evaluation, the matrices are stacked using :func:`scipy.sparse.vstack`.
+
+    **Extends**: :class:`pybamm.Symbol`
+
+    Parameters
+    ----------
+    children : iterable of :class:`pybamm.Symbol`
+        The symbols to stack
+
+    """
+
+    __slots__ = []
+
+    def __init__(self, *children):
+        super().__init__("sparse stack", children, domain=[])
+
+    def evaluate(self, t=None, y=None, inputs=None):
+        """ See :meth:`pybamm.Symbol.evaluate()`. """
+        children_eval = [child.evaluate(t, y, inputs) for child in self.children]
+        return self._concatenation_evaluate(children_eval)
+
+    def _concatenation_evaluate(self, children_eval):
+        """Stack the evaluated children `children_eval`."""
+        return sparse.vstack(
+            [sparse.csr_matrix(child) for child in children_eval], format="csr"
+        )
@@ -0,0 +1,1030 @@
+#
+# Compile an expression tree to a python function
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import numbers
+import numpy as np
+import operator
+
+
+def find_symbols(symbol, constant_symbols, variable_symbols, nodes=None):
+    """
+    Find all the symbols in the expression tree `symbol` (in post-order, so that each
+    child is found before its parent), storing constants in `constant_symbols` and
+    the python code that evaluates every other node in `variable_symbols`. Symbols
+    are keyed by their id (see :meth:`pybamm.Symbol.id`), so that subexpressions
+    that appear more than once are only evaluated once.
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol`
+        The symbol or expression tree to convert
+    constant_symbols : dict
+        The constants found in the tree so far ({symbol key: value}), these are bound
+        to the generated function when it is compiled
+    variable_symbols : dict
+        The python code found so far for the rest of the tree ({symbol key: code})
+    nodes : dict, optional
+        If given, the nodes of the rest of the tree are stored in it too
+        ({symbol key: symbol})
+
+    Returns
+    -------
+    str
+        The python code that evaluates to the value of `symbol`
+    """
+    key = symbol.id
+    if key in constant_symbols or key in variable_symbols:
+        return id_to_python_variable(key, key in constant_symbols)
+
+    # Constant leaves: (finite) scalars are inlined, arrays are bound to the function
+    if (
+        isinstance(symbol, pybamm.Scalar)
+        and isinstance(symbol.value, numbers.Real)
+        and np.isfinite(symbol.value)
+    ):
+        return "({!r})".format(float(symbol.value))
+    elif isinstance(symbol, (pybamm.Scalar, pybamm.Array)):
+        constant_symbols[key] = symbol.evaluate()
+        return id_to_python_variable(key, True)
+
+    children_vars = [
+        find_symbols(child, constant_symbols, variable_symbols, nodes)
+        for child in symbol.children
+    ]
+
+    if isinstance(symbol, pybamm.BinaryOperator):
+        operators = {
+            pybamm.Addition: "+",
+            pybamm.Subtraction: "-",
+            pybamm.Multiplication: "*",
+            pybamm.Division: "/",
+            pybamm.Power: "**",
+            pybamm.MatrixMultiplication: "@",
+        }
+        if type(symbol) in operators:
+            symbol_str = "{} {} {}".format(
+                children_vars[0], operators[type(symbol)], children_vars[1]
+            )
+        else:
+            symbol_str = bind_method(
+                symbol._binary_evaluate, constant_symbols, children_vars
+            )
+
+    elif isinstance(symbol, pybamm.Negate):
+        symbol_str = "-{}".format(children_vars[0])
+
+    elif isinstance(symbol, pybamm.AbsoluteValue):
+        symbol_str = "np.abs({})".format(children_vars[0])
+
+    elif isinstance(symbol, pybamm.Function):
+        symbol_str = bind_method(symbol.func, constant_symbols, children_vars)
+
+    elif isinstance(symbol, pybamm.UnaryOperator):
+        symbol_str = bind_method(
+            symbol._unary_evaluate, constant_symbols, children_vars
+        )
+
+    elif isinstance(symbol, pybamm.NumpyConcatenation):
+        if len(children_vars) == 0:
+            symbol_str = "np.array([])"
+        else:
+            symbol_str = "np.concatenate(({},))".format(",".join(children_vars))
+
+    elif isinstance(symbol, pybamm.DomainConcatenation):
+        # stack the children, then (if they aren't in the order of the domains of the
+        # concatenation) gather the entries with the precomputed indices
+        symbol_str = "np.concatenate(({},))".format(",".join(children_vars))
+        if symbol._indices is not None:
+            constant_symbols[id(symbol._indices)] = symbol._indices
+            symbol_str = "{}[{}]".format(
+                symbol_str, id_to_python_variable(id(symbol._indices), True)
+            )
+
+    elif isinstance(symbol, pybamm.SparseStack):
+        symbol_str = bind_method(
+            symbol._concatenation_evaluate,
+            constant_symbols,
+            ["[{}]".format(", ".join(children_vars))],
+        )
+
+    elif isinstance(symbol, pybamm.StateVector):
+        symbol_str = "y[{}]".format(slice_to_python(symbol.y_slice))
+
+    elif isinstance(symbol, pybamm.Time):
+        symbol_str = "t"
+
+    elif isinstance(symbol, pybamm.InputParameter):
+        symbol_str = "inputs[{!r}]".format(symbol.name)
+
+    else:
+        # fall back to the symbol's own (recursive) evaluation
+        symbol_str = bind_method(
+            symbol.evaluate, constant_symbols, ["t", "y", "inputs"]
+        )
+
+    variable_symbols[key] = symbol_str
+    if nodes is not None:
+        nodes[key] = symbol
+    return id_to_python_variable(key, False)
+
+
+def bind_method(method, constant_symbols, args):
+    """Bind `method` as a constant of the generated function and return the python
+    code that calls it with arguments `args`"""
+    constant_symbols[id(method)] = method
+    return "{}({})".format(id_to_python_variable(id(method), True), ", ".join(args))
+
+
+def id_to_python_variable(symbol_id, constant=False):
+    """Convert a symbol key into the name of a python variable"""
+    if constant:
+        var_format = "const_{:05d}"
+    else:
+        var_format = "var_{:05d}"
+    # symbol keys can be negative, so replace "-" with "m"
+    return var_format.format(symbol_id).replace("-", "m")
+
+
+def slice_to_python(y_slice):
+    """Convert a slice with a step of 1 into python code"""
+    if y_slice.step not in (None, 1):
+        raise ValueError(
+            "can only convert slices with a step of 1, not {}".format(y_slice.step)
+        )
+    return "{}:{}".format(
+        "" if y_slice.start is None else y_slice.start,
+        "" if y_slice.stop is None else y_slice.stop,
+    )
+
+
+def to_python(symbol):
+    """
+    Convert an expression tree into straight-line python code that evaluates it.
+    Each unique node of the tree is assigned to its own local variable, and constant
+    arrays and functions are bound to the generated function.
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol` or list of :class:`pybamm.Symbol`
+        The symbol or expression tree to convert. If a list of expression trees is
+        given, the generated code evaluates all of them together (evaluating their
+        common subexpressions once), and returns a list of their values
+
+    Returns
+    -------
+    constant_values : dict
+        {variable name: value} for the constants used by the generated code
+    str
+        The body of the python function that evaluates `symbol`, as a function of
+        `t`, `y` and `inputs`
+    """
+    constant_symbols = {}
+    variable_symbols = {}
+    if isinstance(symbol, (list, tuple)):
+        results = [
+            find_symbols(root, constant_symbols, variable_symbols) for root in symbol
+        ]
+        result = "[{}]".format(", ".join(results))
+    else:
+        result = find_symbols(symbol, constant_symbols, variable_symbols)
+
+    lines = [
+        "{} = {}".format(id_to_python_variable(key, False), code)
+        for key, code in variable_symbols.items()
+    ]
+    lines.append("return {}".format(result))
+    constant_values = {
+        id_to_python_variable(key, True): value
+        for key, value in constant_symbols.items()
+    }
+    return constant_values, "\n".join(lines)
+
+
+def to_python_into(symbol, values, outs):
+    """
+    Convert an expression tree into straight-line python code that evaluates it into
+    preallocated arrays (see :meth:`pybamm.EvaluatorPython.evaluate_into()`). The
+    code is specialised to the types and shapes of the values of the nodes, which
+    are found beforehand by running the code of :func:`pybamm.to_python()`:
+
+    - the elementwise operations (and functions that are numpy ufuncs) whose values
+      are float arrays write them into scratch arrays, which are allocated once and
+      bound to the generated function
+    - the concatenations whose values are float vectors write the values of their
+      children into slices of their scratch arrays (or, for the children of domain
+      concatenations whose domains aren't contiguous, into the entries given by
+      precomputed arrays of indices), and the elementwise operations
+      and concatenations that are only used by a concatenation write their values
+      directly into their slices of its array
+    - the value of each expression tree is written into its output array (so if the
+      expression tree is a concatenation, its children are written into slices of
+      the output array)
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol` or list of :class:`pybamm.Symbol`
+        The symbol or expression tree to convert (or a list of expression trees)
+    values : dict
+        {variable name: value} for the nodes of the tree, at typical values of
+        `t`, `y` and `inputs` (e.g. the local variables of the code of
+        :func:`pybamm.to_python()`)
+    outs : list
+        For each expression tree, a typical array that its value is written into, or
+        None if its value is returned as a new array
+
+    Returns
+    -------
+    constant_values : dict
+        {variable name: value} for the constants (including the scratch arrays)
+        used by the generated code
+    str
+        The body of the python function that evaluates `symbol`, as a function of
+        `outs` (the list of output arrays), `t`, `y` and `inputs`. It returns a list
+        with the value of each expression tree (i.e. its output array, if it has
+        one).
+    """
+    ufuncs = {
+        pybamm.Addition: "np.add",
+        pybamm.Subtraction: "np.subtract",
+        pybamm.Multiplication: "np.multiply",
+        pybamm.Division: "np.true_divide",
+        pybamm.Power: "np.power",
+        pybamm.Negate: "np.negative",
+        pybamm.AbsoluteValue: "np.absolute",
+    }
+    concatenations = (pybamm.NumpyConcatenation, pybamm.DomainConcatenation)
+
+    roots = list(symbol) if isinstance(symbol, (list, tuple)) else [symbol]
+    constant_symbols = {}
+    variable_symbols = {}
+    nodes = {}
+    results = [
+        find_symbols(root, constant_symbols, variable_symbols, nodes) for root in roots
+    ]
+    root_keys = {root.id for root in roots}
+
+    def variable(node):
+        # the python code of a node (already found, so this doesn't recurse)
+        return find_symbols(node, constant_symbols, variable_symbols)
+
+    def value(node):
+        if node.id in variable_symbols:
+            return values[id_to_python_variable(node.id, False)]
+        return node.evaluate()
+
+    def is_float_array(value):
+        return type(value) is np.ndarray and value.dtype == np.float64
+
+    def writes_into(node):
+        # whether the node can write its value into a preallocated array
+        if node.id not in variable_symbols or not is_float_array(value(node)):
+            return False
+        if isinstance(node, concatenations):
+            return value(node).ndim == 1 and len(node.children) > 0
+        if type(node) in ufuncs or (
+            isinstance(node, pybamm.Function)
+            and isinstance(node.func, np.ufunc)
+            and node.func.nin == len(node.children)
+            and node.func.nout == 1
+        ):
+            return all(
+                type(value(child)) is np.ndarray
+                or isinstance(value(child), numbers.Number)
+                for child in node.children
+            )
+        return False
+
+    def children_entries(node):
+        # the entries of the value of the concatenation `node` that each child fills,
+        # as a slice (or as an array of indices, if they aren't contiguous)
+        if isinstance(node, pybamm.NumpyConcatenation):
+            start = 0
+            for child in node.children:
+                stop = start + np.size(value(child))
+                yield child, slice(start, stop)
+                start = stop
+        else:
+            for child in node.children:
+                slices = [node._slices[dom] for dom in child.domain]
+                if all(a.stop == b.start for a, b in zip(slices[:-1], slices[1:])):
+                    yield child, slice(slices[0].start, slices[-1].stop)
+                else:
+                    yield child, np.concatenate(
+                        [np.arange(a.start, a.stop) for a in slices]
+                    )
+
+    def children_slices(node):
+        # the children of the concatenation `node` that fill a single slice of it
+        for child, entries in children_entries(node):
+            if isinstance(entries, slice):
+                yield child, entries
+
+    # the number of times the value of each node is used
+    uses = {}
+    for key, node in nodes.items():
+        for child in node.children:
+            uses[child.id] = uses.get(child.id, 0) + 1
+    for root in roots:
+        uses[root.id] = uses.get(root.id, 0) + 1
+
+    # Find the array that each node writes into, visiting each node before its
+    # children. Roots are written into their output arrays (or returned as new
+    # arrays), and the other nodes into scratch arrays or slices of the arrays of
+    # the concatenations that use them
+    constant_values = {}
+    setup_lines = []
+    arrays = {}
+    in_place = set()
+    for i, (root, out) in enumerate(zip(roots, outs)):
+        if (
+            out is not None
+            and root.id not in arrays
+            and writes_into(root)
+            and value(root).shape == np.shape(out)
+            and out.dtype == np.float64
+        ):
+            arrays[root.id] = "out_{}".format(i)
+    for key in reversed(list(variable_symbols)):
+        node = nodes[key]
+        if key not in arrays:
+            if key in root_keys or not writes_into(node):
+                continue
+            arrays[key] = id_to_python_variable(key, False).replace("var", "array")
+            constant_values[arrays[key]] = np.empty_like(value(node))
+        if isinstance(node, concatenations):
+            for child, child_slice in children_slices(node):
+                if (
+                    child.id not in arrays
+                    and child.id not in root_keys
+                    and uses[child.id] == 1
+                    and writes_into(child)
+                    and value(child).shape == (child_slice.stop - child_slice.start,)
+                ):
+                    name = id_to_python_variable(child.id, False).replace(
+                        "var", "array"
+                    )
+                    arrays[child.id] = name
+                    in_place.add(child.id)
+                    if arrays[key] in constant_values:
+                        constant_values[name] = constant_values[arrays[key]][
+                            child_slice
+                        ]
+                    else:
+                        setup_lines.append(
+                            "{} = {}[{}]".format(
+                                name, arrays[key], slice_to_python(child_slice)
+                            )
+                        )
+
+    lines = [
+        "out_{0} = outs[{0}]".format(i) for i, out in enumerate(outs) if out is not None
+    ] + setup_lines
+    for key, code in variable_symbols.items():
+        node = nodes[key]
+        name = id_to_python_variable(key, False)
+        if key not in arrays:
+            lines.append("{} = {}".format(name, code))
+            continue
+        array = arrays[key]
+        children_vars = [variable(child) for child in node.children]
+        if isinstance(node, concatenations):
+            # write each child into its entries, with a single (fancy) indexing
+            # operation
+            for i, ((child, entries), child_var) in enumerate(
+                zip(children_entries(node), children_vars)
+            ):
+                if child.id in in_place:
+                    continue
+                if isinstance(entries, slice):
+                    index = slice_to_python(entries)
+                else:
+                    index = "{}_index_{}".format(array, i)
+                    constant_values[index] = entries
+                lines.append("{}[{}] = {}".format(array, index, child_var))
+            code = array
+        elif isinstance(node, pybamm.Function):
+            code = bind_method(
+                node.func, constant_symbols, children_vars + ["out=" + array]
+            )
+        else:
+            code = "{}({}, out={})".format(
+                ufuncs[type(node)], ", ".join(children_vars), array
+            )
+        lines.append("{} = {}".format(name, code))
+
+    # Copy the values that were not written into their output arrays
+    returns = []
+    for i, (root, out, result) in enumerate(zip(roots, outs, results)):
+        if out is None:
+            returns.append(result)
+            continue
+        if arrays.get(root.id) != "out_{}".format(i):
+            lines.append(
+                "out_{0}[...] = np.reshape({1}, np.shape(out_{0}))".format(i, result)
+            )
+        returns.append("out_{}".format(i))
+    lines.append("return [{}]".format(", ".join(returns)))
+    constant_values.update(
+        {
+            id_to_python_variable(key, True): constant
+            for key, constant in constant_symbols.items()
+        }
+    )
+    return constant_values, "\n".join(lines)
+
+
+def compile_function(source, name, constants, symbol):
+    """Compile the python function `name` in `source`, with the constants bound to
+    it, and return it"""
+    namespace = {"np": np}
+    namespace.update(constants)
+    exec(compile(source, "<{!s}>".format(symbol), "exec"), namespace)
+    return namespace[name]
+
+
+def copy_into(out, value):
+    """Copy `value` into the array `out` (which has as many entries), and return
+    `out`"""
+    out[...] = np.reshape(value, np.shape(out))
+    return out
+
+
+def into_key(outs, y, inputs):
+    """The shapes (and types) of the output arrays and of `y` and `inputs`, for which
+    the code that evaluates into the output arrays is specialised"""
+    return (
+        tuple(None if out is None else (np.shape(out), out.dtype) for out in outs),
+        np.shape(y),
+        (
+            None
+            if inputs is None
+            else tuple((name, np.shape(value)) for name, value in inputs.items())
+        ),
+    )
+
+
+class EvaluatorPython(object):
+    """
+    Converts an expression tree into a single compiled python function, avoiding the
+    cost of recursively calling :meth:`pybamm.Symbol.evaluate()` on every node.
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol` or list of :class:`pybamm.Symbol`
+        The symbol or expression tree to compile (or a list of expression trees, see
+        :func:`pybamm.to_python`)
+
+    Examples
+    --------
+
+    >>> import pybamm
+    >>> import numpy as np
+    >>> y = pybamm.StateVector(slice(0, 2))
+    >>> evaluator = pybamm.EvaluatorPython(2 * y + 1)
+    >>> evaluator.evaluate(0, np.array([1.0, 2.0]))
+    array([3., 5.])
+    """
+
+    def __init__(self, symbol):
+        self._symbol = symbol
+        self.compile()
+        # the function that evaluates into preallocated arrays is compiled when it
+        # is first used, for the shapes of the arrays it is used with
+        self._evaluate_into = None
+        self._into_key = None
+
+    @property
+    def symbol(self):
+        """The expression tree that has been compiled"""
+        return self._symbol
+
+    @property
+    def source(self):
+        """The python source code of the generated function"""
+        return self._source
+
+    def compile(self):
+        """Generate the python code for the expression tree and compile it"""
+        constants, body = to_python(self._symbol)
+        self._source = "def evaluate(t=None, y=None, inputs=None):\n" + "\n".join(
+            "    " + line for line in body.split("\n")
+        )
+        self._evaluate = compile_function(
+            self._source, "evaluate", constants, self._symbol
+        )
+
+    def compile_into(self, outs, t=None, y=None, inputs=None):
+        """
+        Generate the python code that evaluates the expression tree into
+        preallocated arrays (see :func:`pybamm.to_python_into()`) for output arrays
+        like `outs` and values of the nodes like those at (t, y, inputs), and
+        compile it
+        """
+        # find the values of the nodes, by running the code of the expression tree
+        # with the local variables returned
+        constants, body = to_python(self._symbol)
+        body = body.split("\n")[:-1] + ["return locals()"]
+        probe = compile_function(
+            "def probe(t=None, y=None, inputs=None):\n"
+            + "\n".join("    " + line for line in body),
+            "probe",
+            constants,
+            self._symbol,
+        )
+        values = probe(t, y, inputs)
+
+        constants, body = to_python_into(self._symbol, values, outs)
+        source = "def evaluate_into(outs, t=None, y=None, inputs=None):\n" + "\n".join(
+            "    " + line for line in body.split("\n")
+        )
+        self._into_source = source
+        self._evaluate_into = compile_function(
+            source, "evaluate_into", constants, self._symbol
+        )
+
+    def evaluate(self, t=None, y=None, inputs=None):
+        """
+        Evaluate the compiled expression tree.
+        See :meth:`pybamm.Symbol.evaluate()`.
+        """
+        return self._evaluate(t, y, inputs)
+
+    def evaluate_into(self, out, t=None, y=None, inputs=None):
+        """
+        Evaluate the compiled expression tree into the preallocated array `out`
+        (see :meth:`pybamm.Symbol.evaluate_into()`), using scratch arrays owned by
+        the evaluator for the intermediate values of elementwise operations, so that
+        (apart from the operations that always allocate their values, e.g. sparse
+        matrix multiplications) no arrays are allocated.
+
+        The function that does this is compiled when this is first called, and
+        again whenever the shapes of `y`, `inputs` or `out` change.
+
+        Parameters
+        ----------
+        out : :class:`numpy.array` or list
+            The array to write the value into. If the evaluator evaluates a list of
+            expression trees, a list with an array (or None, to return the value as
+            a new array) for each of them
+        t, y, inputs
+            See :meth:`pybamm.Symbol.evaluate()`
+
+        Returns
+        -------
+        :class:`numpy.array` or list
+            The array `out` (or a list with the value of each expression tree)
+        """
+        several = isinstance(self._symbol, (list, tuple))
+        outs = out if several else [out]
+        key = into_key(outs, y, inputs)
+        if key != self._into_key:
+            self.compile_into(outs, t, y, inputs)
+            self._into_key = key
+        values = self._evaluate_into(outs, t, y, inputs)
+        return values if several else values[0]
+
+    def __call__(self, t=None, y=None, inputs=None):
+        """ See :meth:`pybamm.EvaluatorPython.evaluate()`. """
+        return self._evaluate(t, y, inputs)
+
+
+class _ConcatenationCall(object):
+    """Call the `_concatenation_evaluate` method of a concatenation with the evaluated
+    children passed as separate arguments, as done by :class:`EvaluatorTape`"""
+
+    def __init__(self, concatenation):
+        self.concatenate = concatenation._concatenation_evaluate
+
+    def __call__(self, *children_eval):
+        return self.concatenate(list(children_eval))
+
+
+def to_tape(symbol):
+    """
+    Flatten an expression tree into a linear "tape" of instructions, ordered so that
+    every node comes after its children. Values are stored in integer registers:
+    register 0 holds `t`, register 1 holds `y`, register 2 holds `inputs`, constants
+    are loaded into their own registers once, and the registers holding intermediate
+    values are reused as soon as their value is no longer needed.
+
+    The tree is traversed without recursion, so arbitrarily deep trees can be
+    flattened. Nodes are identified by their id (see :meth:`pybamm.Symbol.id`), so
+    that subexpressions that appear more than once are only evaluated once.
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol` or list of :class:`pybamm.Symbol`
+        The symbol or expression tree to flatten (or a list of expression trees to
+        flatten into a single tape)
+
+    Returns
+    -------
+    instructions : list of tuples
+        (function, output register, input registers) for each operation
+    constants : dict
+        {register: value} for the constant registers
+    n_registers : int
+        The total number of registers used by the tape
+    result : int or list of int
+        The register that holds the value of `symbol` after running the tape (or
+        the registers that hold the value of each symbol, if `symbol` is a list)
+    """
+    binary_operators = {
+        pybamm.Addition: operator.add,
+        pybamm.Subtraction: operator.sub,
+        pybamm.Multiplication: operator.mul,
+        pybamm.Division: operator.truediv,
+        pybamm.Power: operator.pow,
+        pybamm.MatrixMultiplication: operator.matmul,
+    }
+
+    if isinstance(symbol, (list, tuple)):
+        roots = list(symbol)
+    else:
+        roots = [symbol]
+
+    # Post-order traversal with an explicit stack, recording each node (once) after
+    # its children
+    ordered_nodes = []
+    visited = set()
+    stack = [(root, False) for root in reversed(roots)]
+    while stack:
+        node, children_done = stack.pop()
+        if id(node) in visited:
+            continue
+        if children_done or isinstance(node, (pybamm.Scalar, pybamm.Array)):
+            visited.add(id(node))
+            ordered_nodes.append(node)
+        else:
+            stack.append((node, True))
+            for child in reversed(node.children):
+                stack.append((child, False))
+
+    # Keep only the first node with each id (ids are calculated when the nodes are
+    # created, so this is cheap)
+    keys = {}
+    unique_keys = set()
+    unique_nodes = []
+    for node in ordered_nodes:
+        key = node.id
+        keys[id(node)] = key
+        if key not in unique_keys:
+            unique_keys.add(key)
+            unique_nodes.append(node)
+
+    # Assign constant registers and build the (not yet allocated) instructions
+    constants = {}
+    node_register = {}
+    operations = []
+    n_registers = 3
+    for node in unique_nodes:
+        key = keys[id(node)]
+        if isinstance(node, (pybamm.Scalar, pybamm.Array)):
+            constants[n_registers] = node.evaluate()
+            node_register[key] = n_registers
+            n_registers += 1
+            continue
+        if isinstance(node, pybamm.Time):
+            node_register[key] = 0
+            continue
+
+        args = [keys[id(child)] for child in node.children]
+        if type(node) in binary_operators:
+            func = binary_operators[type(node)]
+        elif isinstance(node, pybamm.BinaryOperator):
+            func = node._binary_evaluate
+        elif isinstance(node, pybamm.Negate):
+            func = operator.neg
+        elif isinstance(node, pybamm.AbsoluteValue):
+            func = np.abs
+        elif isinstance(node, pybamm.Function):
+            func = node.func
+        elif isinstance(node, pybamm.UnaryOperator):
+            func = node._unary_evaluate
+        elif isinstance(
+            node,
+            (
+                pybamm.NumpyConcatenation,
+                pybamm.DomainConcatenation,
+                pybamm.SparseStack,
+            ),
+        ):
+            func = _ConcatenationCall(node)
+        elif isinstance(node, pybamm.StateVector):
+            # y[y_slice], with the slice stored in a constant register
+            constants[n_registers] = node.y_slice
+            func = operator.getitem
+            args = [1, n_registers]
+            n_registers += 1
+        elif isinstance(node, pybamm.InputParameter):
+            # inputs[name], with the name stored in a constant register
+            constants[n_registers] = node.name
+            func = operator.getitem
+            args = [2, n_registers]
+            n_registers += 1
+        else:
+            # fall back to the symbol's own (recursive) evaluation
+            func = node.evaluate
+            args = [0, 1, 2]
+        operations.append((key, func, args))
+
+    def register(key):
+        # keys are either already registers (ints below n_registers) or node ids
+        if key in node_register:
+            return node_register[key]
+        return key
+
+    # Find the last instruction that reads each node's value (the values of the
+    # roots are needed until the end)
+    last_use = {}
+    for i, (key, func, args) in enumerate(operations):
+        for arg in args:
+            last_use[arg] = i
+    for root in roots:
+        last_use[keys[id(root)]] = len(operations)
+
+    # Allocate registers for intermediate values, reusing freed registers
+    free_registers = []
+    instructions = []
+    for i, (key, func, args) in enumerate(operations):
+        in_registers = tuple(register(arg) for arg in args)
+        # free registers of intermediate values that are not needed any more
+        for arg in set(args):
+            if arg in node_register and last_use[arg] == i:
+                reg = node_register[arg]
+                if reg not in constants and reg > 2:
+                    free_registers.append(reg)
+        if free_registers:
+            out = free_registers.pop()
+        else:
+            out = n_registers
+            n_registers += 1
+        node_register[key] = out
+        instructions.append((func, out, in_registers))
+
+    if isinstance(symbol, (list, tuple)):
+        result = [node_register[keys[id(root)]] for root in roots]
+    else:
+        result = node_register[keys[id(symbol)]]
+    return instructions, constants, n_registers, result
+
+
+class EvaluatorTape(object):
+    """
+    Evaluates an expression tree by running a linear tape of instructions (see
+    :func:`pybamm.to_tape`) in a loop over a preallocated list of registers, instead
+    of recursively calling :meth:`pybamm.Symbol.evaluate()`. This avoids python
+    recursion (and hence recursion-limit failures on deep trees) and repeated
+    attribute lookups, and the tape can be reused for any number of evaluations.
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol` or list of :class:`pybamm.Symbol`
+        The symbol or expression tree to flatten (or a list of expression trees, in
+        which case :meth:`evaluate` returns a list of their values)
+
+    Examples
+    --------
+
+    >>> import pybamm
+    >>> import numpy as np
+    >>> y = pybamm.StateVector(slice(0, 2))
+    >>> evaluator = pybamm.EvaluatorTape(2 * y + 1)
+    >>> evaluator.evaluate(0, np.array([1.0, 2.0]))
+    array([3., 5.])
+    """
+
+    def __init__(self, symbol):
+        self._symbol = symbol
+        instructions, constants, n_registers, result = to_tape(symbol)
+        self._instructions = instructions
+        self._result = result
+        # Preallocate registers and load the constants once
+        self._registers = [None] * n_registers
+        for reg, value in constants.items():
+            self._registers[reg] = value
+
+    @property
+    def symbol(self):
+        """The expression tree that has been flattened"""
+        return self._symbol
+
+    @property
+    def instructions(self):
+        """The instructions of the tape, as (function, output, inputs) tuples"""
+        return self._instructions
+
+    @property
+    def n_registers(self):
+        """The number of registers used by the tape"""
+        return len(self._registers)
+
+    def evaluate(self, t=None, y=None, inputs=None):
+        """
+        Evaluate the expression tree by running the tape.
+        See :meth:`pybamm.Symbol.evaluate()`.
+        """
+        registers = self._registers
+        registers[0] = t
+        registers[1] = y
+        registers[2] = inputs
+        for func, out, args in self._instructions:
+            if len(args) == 2:
+                registers[out] = func(registers[args[0]], registers[args[1]])
+            elif len(args) == 1:
+                registers[out] = func(registers[args[0]])
+            else:
+                registers[out] = func(*[registers[arg] for arg in args])
+        if isinstance(self._result, list):
+            return [registers[result] for result in self._result]
+        return registers[self._result]
+
+    def evaluate_into(self, out, t=None, y=None, inputs=None):
+        """
+        Evaluate the expression tree by running the tape, and copy its value into the
+        preallocated array `out` (or, if the tape evaluates a list of expression
+        trees, the value of each of them into the corresponding array of the list
+        `out`, if it isn't None).
+        See :meth:`pybamm.EvaluatorPython.evaluate_into()`.
+        """
+        values = self.evaluate(t, y, inputs)
+        if not isinstance(self._result, list):
+            return copy_into(out, values)
+        return [
+            value if array is None else copy_into(array, value)
+            for array, value in zip(out, values)
+        ]
+
+    def __call__(self, t=None, y=None, inputs=None):
+        """ See :meth:`pybamm.EvaluatorTape.evaluate()`. """
+        return self.evaluate(t, y, inputs)
+
+
+class SharedEvaluator(object):
+    """
+    Evaluates several expression trees together (e.g. the rhs, algebraic equations
+    and events of a model) with a single compiled evaluator, so that subexpressions
+    that appear in more than one of them are only evaluated once. The values at the
+    last (t, y, inputs) are remembered, so evaluating each of the expression trees in
+    turn at the same (t, y, inputs) only evaluates the shared evaluator once.
+
+    Parameters
+    ----------
+    symbols : list of :class:`pybamm.Symbol`
+        The expression trees to evaluate together
+    evaluator : str, optional
+        How the expression trees are evaluated (default is "python"). "python" uses
+        :class:`pybamm.EvaluatorPython`, "tape" uses :class:`pybamm.EvaluatorTape`.
+
+    Examples
+    --------
+
+    >>> import pybamm
+    >>> import numpy as np
+    >>> y = pybamm.StateVector(slice(0, 2))
+    >>> evaluator = pybamm.SharedEvaluator([2 * y, 2 * y + 1])
+    >>> evaluator.evaluate(0, np.array([1.0, 2.0]))
+    [array([2., 4.]), array([3., 5.])]
+    >>> evaluator[1].evaluate(0, np.array([1.0, 2.0]))
+    array([3., 5.])
+    """
+
+    def __init__(self, symbols, evaluator="python"):
+        self._symbols = list(symbols)
+        if evaluator == "tape":
+            self._evaluator = EvaluatorTape(self._symbols)
+        elif evaluator == "python":
+            self._evaluator = EvaluatorPython(self._symbols)
+        else:
+            raise ValueError(
+                "evaluator must be 'python' or 'tape', not '{}'".format(evaluator)
+            )
+        self._t = None
+        self._y = None
+        self._inputs = None
+        self._values = None
+
+    @property
+    def symbols(self):
+        """The expression trees that are evaluated together"""
+        return self._symbols
+
+    def evaluate(self, t=None, y=None, inputs=None):
+        """
+        Evaluate all the expression trees at (t, y, inputs), reusing the values from
+        the last evaluation if (t, y, inputs) hasn't changed
+
+        Returns
+        -------
+        list
+            The value of each expression tree
+        """
+        if not self.is_current(t, y, inputs) or any(
+            value is None for value in self._values
+        ):
+            self.remember(t, y, inputs, self._evaluator.evaluate(t, y, inputs))
+        return self._values
+
+    def evaluate_into(self, outs, t=None, y=None, inputs=None):
+        """
+        Evaluate all the expression trees at (t, y, inputs), writing the value of
+        each expression tree that has an array in `outs` into that array (see
+        :meth:`pybamm.EvaluatorPython.evaluate_into()`). If (t, y, inputs) hasn't
+        changed since the last evaluation, its values are copied instead.
+
+        Parameters
+        ----------
+        outs : list
+            An array (or None, to return the value as a new array) for each
+            expression tree
+        t, y, inputs
+            See :meth:`pybamm.Symbol.evaluate()`
+
+        Returns
+        -------
+        list
+            The value of each expression tree (i.e. its array, if it has one)
+        """
+        if self.is_current(t, y, inputs) and all(
+            value is not None for value in self._values
+        ):
+            return [
+                value if out is None else copy_into(out, value)
+                for value, out in zip(self._values, outs)
+            ]
+        values = self._evaluator.evaluate_into(outs, t, y, inputs)
+        # the output arrays belong to the caller (and can be changed), so their
+        # values are not remembered
+        self.remember(
+            t,
+            y,
+            inputs,
+            [value if out is None else None for value, out in zip(values, outs)],
+        )
+        return values
+
+    def is_current(self, t, y, inputs):
+        """Whether the values of the last evaluation are at (t, y, inputs)"""
+        return (
+            self._values is not None
+            and t == self._t
+            and np.array_equal(y, self._y)
+            and self.inputs_equal(inputs, self._inputs)
+        )
+
+    @staticmethod
+    def inputs_equal(inputs, other):
+        """Whether two dicts of inputs have the same keys and values (which can be
+        arrays)"""
+        if inputs is None or other is None:
+            return inputs is other
+        return inputs.keys() == other.keys() and all(
+            np.array_equal(value, other[key]) for key, value in inputs.items()
+        )
+
+    def remember(self, t, y, inputs, values):
+        """Remember the values of the expression trees at (t, y, inputs)"""
+        self._values = values
+        self._t = t
+        # copy y and inputs (and any array inputs), as they can be changed in place
+        self._y = None if y is None else np.copy(y)
+        if inputs is None:
+            self._inputs = None
+        else:
+            self._inputs = {
+                key: np.copy(value) if isinstance(value, np.ndarray) else value
+                for key, value in inputs.items()
+            }
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def __getitem__(self, index):
+        """
+        An evaluator for the expression tree `index` only, with the same signature
+        as :meth:`pybamm.Symbol.evaluate()`
+        """
+        return _SharedEvaluation(self, index)
+
+
+class _SharedEvaluation(object):
+    """Evaluate one of the expression trees of a :class:`SharedEvaluator`"""
+
+    def __init__(self, shared_evaluator, index):
+        self.shared_evaluator = shared_evaluator
+        self.index = index
+
+    def evaluate(self, t=None, y=None, inputs=None):
+        return self.shared_evaluator.evaluate(t, y, inputs)[self.index]
+
+    def evaluate_into(self, out, t=None, y=None, inputs=None):
+        outs = [None] * len(self.shared_evaluator)
+        outs[self.index] = out
+        return self.shared_evaluator.evaluate_into(outs, t, y, inputs)[self.index]
+
+    def __call__(self, t=None, y=None, inputs=None):
+        return self.evaluate(t, y, inputs)
@@ -23,5 +23,7 @@ class FunctionParameter(pybamm.UnaryOperator):
 
     """
 
+    __slots__ = []
+
     def __init__(self, name, child):
         super().__init__(name, child)
@@ -21,9 +21,16 @@ class IndependentVariable(pybamm.Symbol):
     *Extends:* :class:`Symbol`
     """
 
+    __slots__ = []
+
     def __init__(self, name, domain=[]):
         super().__init__(name, domain=domain)
 
+    def set_structure_flags(self):
+        """ See :meth:`pybamm.Symbol.set_structure_flags()`. """
+        super().set_structure_flags()
+        self._is_constant = False
+
 
 class Time(IndependentVariable):
     """A node in the expression tree representing time
@@ -31,10 +38,12 @@ class Time(IndependentVariable):
     *Extends:* :class:`Symbol`
     """
 
+    __slots__ = []
+
     def __init__(self):
         super().__init__("time")
 
-    def evaluate(self, t, y=None):
+    def evaluate(self, t, y=None, inputs=None):
         """ See :meth:`pybamm.Symbol.evaluate()`. """
         if t is None:
             raise ValueError("t must be provided")
@@ -54,6 +63,8 @@ class SpatialVariable(IndependentVariable):
     *Extends:* :class:`Symbol`
     """
 
+    __slots__ = []
+
     def __init__(self, name, domain):
         if name not in ["x", "y", "z", "r"]:
             raise ValueError(
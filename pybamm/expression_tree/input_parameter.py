@@ -0,0 +1,72 @@
+#
+# Parameter classes whose values are given when the model is evaluated
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import numpy as np
+
+
+class InputParameter(pybamm.Symbol):
+    """A node in the expression tree representing an input parameter, i.e. a
+    parameter whose value is only given when the expression is evaluated, through
+    the `inputs` dictionary (see :meth:`pybamm.Symbol.evaluate()`).
+
+    Input parameters are left in the expression tree by
+    :meth:`pybamm.ParameterValues.process_model()` (for parameters whose value is
+    "[input]") and by discretisation, so that a model can be processed and
+    discretised once, and then solved for many different values of its inputs.
+    Input parameters can be used in the model equations, variables and events, but
+    not in the initial conditions (which are evaluated when the model is
+    discretised).
+
+    Parameters
+    ----------
+
+    name : str
+        name of the node (and key of its value in the inputs)
+    domain : iterable of str, optional
+        list of domains the parameter is valid over, defaults to empty list
+
+    *Extends:* :class:`Symbol`
+    """
+
+    __slots__ = []
+
+    def __init__(self, name, domain=[]):
+        super().__init__(name, domain=domain)
+
+    def set_structure_flags(self):
+        """ See :meth:`pybamm.Symbol.set_structure_flags()`. """
+        super().set_structure_flags()
+        # the value of the node is not known until it is evaluated
+        self._is_constant = False
+        self._has_input_parameter = True
+
+    def evaluate(self, t=None, y=None, inputs=None):
+        """ See :meth:`pybamm.Symbol.evaluate()`. """
+        if inputs is None:
+            raise TypeError(
+                "InputParameter '{}' cannot evaluate input 'inputs=None'".format(
+                    self.name
+                )
+            )
+        try:
+            return inputs[self.name]
+        except KeyError:
+            raise KeyError("Input parameter '{}' not found in inputs".format(self.name))
+
+
+class UnknownInputs(dict):
+    """
+    Inputs (see :class:`InputParameter`) in which every input parameter has the
+    value nan. Input parameters are numbers, so this is used to find the size of an
+    expression that contains input parameters before their values are known (e.g.
+    when a model is discretised).
+
+    *Extends:* :class:`dict`
+    """
+
+    def __missing__(self, key):
+        return np.nan
@@ -0,0 +1,334 @@
+#
+# Decomposition of an expression tree into its linear, constant and nonlinear parts
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import numpy as np
+
+sparse = pybamm.util.lazy_import("scipy.sparse")
+
+
+class LinearDecomposition(object):
+    """
+    The decomposition of an expression tree `f(t, y)` into `A @ y + b(t) + g(t, y)`,
+    where `A` is a constant (sparse) matrix, `b` doesn't depend on y and `g` holds
+    the terms that are not linear in y with constant coefficients. See
+    :func:`pybamm.linear_decomposition()`.
+
+    Parameters
+    ----------
+    A : :class:`scipy.sparse.csr_matrix`
+        The matrix of the linear part
+    linear : :class:`pybamm.Symbol` or None
+        Expression tree that evaluates to `A @ y` (None if `A` is zero). It is a
+        single sparse matrix multiplication where possible, but keeps the matrices
+        that take differences (see :func:`pybamm.simplify()`) as separate factors.
+    b : :class:`pybamm.Symbol` or None
+        The part that doesn't depend on y (None if it is zero)
+    g : :class:`pybamm.Symbol` or None
+        The nonlinear remainder (None if `f` is affine in y)
+    """
+
+    def __init__(self, A, linear, b, g):
+        self.A = A
+        self.linear = linear
+        self.b = b
+        self.g = g
+
+    @property
+    def is_affine(self):
+        """Whether the expression tree is affine in y, i.e. has no nonlinear part"""
+        return self.g is None
+
+    @property
+    def symbol(self):
+        """
+        Expression tree that evaluates to `A @ y + b + g`, i.e. to the decomposed
+        expression tree, by adding up the parts that are not zero
+        """
+        parts = [part for part in [self.linear, self.b, self.g] if part is not None]
+        if not parts:
+            return pybamm.Vector(np.zeros(self.A.shape[0]))
+        symbol = parts[0]
+        for part in parts[1:]:
+            symbol = symbol + part
+        return symbol
+
+
+def linear_decomposition(symbol, variable, y, inputs=None):
+    """
+    Decompose the (discretised) expression tree `symbol` into a linear part
+    `A @ y`, where `A` is a constant sparse matrix, a part `b` that doesn't depend
+    on y and a nonlinear remainder `g`. The tree is split at sums, concatenations
+    and products with constants: for example, `-(D @ y1) + 2 * t` and `exp(y2)`,
+    concatenated, give `A = [[-D, 0], [0, 0]]`, `b = [2 * t, 0]` and
+    `g = [0, exp(y2)]`. Terms that are linear in y but whose coefficients are not
+    constant (e.g. depend on t or on input parameters) are kept in `g`.
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol`
+        The (discretised) expression tree
+    variable : :class:`pybamm.StateVector`
+        The state vector y
+    y : :class:`numpy.array`
+        A value of the state vector, used to find the sizes of the nodes
+    inputs : dict, optional
+        The values of any input parameters in the tree, used to find the sizes of
+        the nodes (see :class:`pybamm.UnknownInputs`)
+
+    Returns
+    -------
+    :class:`pybamm.LinearDecomposition`
+        The matrix `A`, and the expression trees of `A @ y`, `b` and `g`
+    """
+    with np.errstate(all="ignore"):
+        linear, b, g = decompose(symbol, variable, y, inputs, {})
+    if linear is None:
+        size = variable.y_slice.stop - variable.y_slice.start
+        A = sparse.csr_matrix((np.size(symbol.evaluate(0, y, inputs)), size))
+    else:
+        A = sparse.csr_matrix(linear.jac(variable).evaluate(0, y, inputs))
+    if b is not None:
+        b = pybamm.simplify(b)
+    return LinearDecomposition(A, linear, b, g)
+
+
+def decompose(symbol, variable, y, inputs, known_symbols):
+    """
+    Split `symbol` into the expression trees of its linear part, constant part and
+    nonlinear part (each None if it is zero). See
+    :func:`pybamm.linear_decomposition()`.
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol`
+        The expression tree
+    variable : :class:`pybamm.StateVector`
+        The state vector y
+    y : :class:`numpy.array`
+        A value of the state vector
+    inputs : dict
+        The values of any input parameters in the tree
+    known_symbols : dict
+        The parts of the nodes that have already been split, {id: parts}
+
+    Returns
+    -------
+    tuple
+        The linear part (a :class:`pybamm.Symbol` that evaluates to `A @ y`), the
+        part that doesn't depend on y and the nonlinear part
+    """
+    try:
+        return known_symbols[symbol.id]
+    except KeyError:
+        pass
+
+    nonlinear = (None, None, symbol)
+    if not symbol.has_state_vector():
+        parts = (None, symbol, None)
+    elif isinstance(symbol, pybamm.StateVector):
+        parts = (pybamm.simplify(symbol.jac(variable) @ variable), None, None)
+    elif isinstance(symbol, pybamm.Negate):
+        linear, b, g = decompose(symbol.children[0], variable, y, inputs, known_symbols)
+        parts = tuple(None if part is None else -part for part in (linear, b, g))
+        parts = (simplify_linear(parts[0]),) + parts[1:]
+    elif isinstance(symbol, (pybamm.Addition, pybamm.Subtraction)):
+        left_parts, right_parts = [
+            decompose(child, variable, y, inputs, known_symbols)
+            for child in symbol.children
+        ]
+        if isinstance(symbol, pybamm.Subtraction):
+            right_parts = tuple(None if part is None else -part for part in right_parts)
+        parts = (
+            add_linear(left_parts[0], right_parts[0]),
+            add(left_parts[1], right_parts[1]),
+            add(left_parts[2], right_parts[2]),
+        )
+    elif isinstance(symbol, (pybamm.Multiplication, pybamm.Division)):
+        # products with a constant number or vector
+        left, right = symbol.children
+        if is_constant_factor(right):
+            constant, child = right, left
+        elif is_constant_factor(left) and isinstance(symbol, pybamm.Multiplication):
+            constant, child = left, right
+        else:
+            constant = None
+        if constant is None:
+            parts = nonlinear
+        else:
+            factor = constant.evaluate(0, y, inputs)
+            linear, b, g = decompose(child, variable, y, inputs, known_symbols)
+            if isinstance(symbol, pybamm.Division):
+                factor = 1 / factor
+                b, g = [None if part is None else part / constant for part in (b, g)]
+            else:
+                b, g = [None if part is None else constant * part for part in (b, g)]
+            parts = (None if linear is None else scale_linear(linear, factor), b, g)
+    elif isinstance(symbol, pybamm.MatrixMultiplication):
+        left, right = symbol.children
+        if left.is_constant():
+            matrix = pybamm.Matrix(left.evaluate(0, y, inputs))
+            linear, b, g = decompose(right, variable, y, inputs, known_symbols)
+            parts = (
+                None if linear is None else simplify_linear(matrix @ linear),
+                None if b is None else left @ b,
+                None if g is None else left @ g,
+            )
+        else:
+            parts = nonlinear
+    elif isinstance(symbol, pybamm.NumpyConcatenation):
+        sizes = [np.size(child.evaluate(0, y, inputs)) for child in symbol.children]
+        children_parts = [
+            [
+                broadcast(part, size, y, inputs)
+                for part in decompose(child, variable, y, inputs, known_symbols)
+            ]
+            for child, size in zip(symbol.children, sizes)
+        ]
+        if any(part is False for parts in children_parts for part in parts):
+            children_parts = [(None, None, child) for child in symbol.children]
+        n_y = variable.y_slice.stop - variable.y_slice.start
+        linears = [
+            pybamm.Matrix(sparse.csr_matrix((size, n_y))) @ variable
+            if parts[0] is None
+            else parts[0]
+            for parts, size in zip(children_parts, sizes)
+        ]
+        if all(parts[0] is None for parts in children_parts):
+            linear = None
+        else:
+            linear = concatenate_products(linears)
+        parts = (
+            linear,
+            concatenate([parts[1] for parts in children_parts], sizes),
+            concatenate([parts[2] for parts in children_parts], sizes),
+        )
+    else:
+        parts = nonlinear
+
+    # the linear part must have the size of the symbol (and not be broadcast by it)
+    if parts[0] is not None:
+        size = np.size(symbol.evaluate(0, y, inputs))
+        try:
+            if np.size(parts[0].evaluate(0, y, inputs)) != size:
+                parts = nonlinear
+        except ValueError:
+            # matrices and vectors of incompatible shapes
+            parts = nonlinear
+    known_symbols[symbol.id] = parts
+    return parts
+
+
+def broadcast(part, size, y, inputs):
+    """
+    Broadcast a part that evaluates to a number to a vector of size `size`, so that
+    it can be concatenated. Returns False if the part has a different size.
+    """
+    if part is None:
+        return None
+    part_size = np.size(part.evaluate(0, y, inputs))
+    if part_size == size:
+        return part
+    elif part_size == 1:
+        return pybamm.Vector(np.ones(size)) * part
+    return False
+
+
+def is_constant_factor(symbol):
+    """
+    Returns True if `symbol` is a constant number or vector, by which the linear
+    part of the other side of a product can be scaled
+    """
+    if not symbol.is_constant():
+        return False
+    value = symbol.evaluate()
+    if sparse.issparse(value):
+        return False
+    return np.ndim(value) <= 1 or (np.ndim(value) == 2 and value.shape[1] == 1)
+
+
+def scale_linear(linear, factor):
+    """Multiply the linear part `linear` by a constant number or vector `factor`"""
+    if np.size(factor) == 1:
+        return simplify_linear(pybamm.Scalar(float(np.ravel(factor)[0])) * linear)
+    scaling = sparse.diags(np.ravel(factor).astype(float)).tocsr()
+    return simplify_linear(pybamm.Matrix(scaling) @ linear)
+
+
+def simplify_linear(linear):
+    """Simplify a linear part (premultiplying its matrices where possible)"""
+    if linear is None:
+        return None
+    return pybamm.simplify(linear)
+
+
+def add_linear(left, right):
+    """
+    Add two linear parts, adding their matrices if they multiply the same symbol
+    """
+    if left is None:
+        return right
+    elif right is None:
+        return left
+    elif (
+        is_matrix_product(left)
+        and is_matrix_product(right)
+        and left.children[1].id == right.children[1].id
+        and left.children[0].shape == right.children[0].shape
+    ):
+        matrix = left.children[0].entries + right.children[0].entries
+        return pybamm.Matrix(sparse.csr_matrix(matrix)) @ left.children[1]
+    return left + right
+
+
+def add(left, right):
+    """Add two parts (either of which can be None, i.e. zero)"""
+    if left is None:
+        return right
+    elif right is None:
+        return left
+    return left + right
+
+
+def concatenate(parts, sizes):
+    """
+    Concatenate parts of the children of a concatenation, with zeros for the parts
+    that are None (or return None if they all are)
+    """
+    if all(part is None for part in parts):
+        return None
+    return pybamm.NumpyConcatenation(
+        *[
+            pybamm.Vector(np.zeros(size)) if part is None else part
+            for part, size in zip(parts, sizes)
+        ]
+    )
+
+
+def concatenate_products(linears):
+    """
+    Concatenate the linear parts of the children of a concatenation. If they are
+    all `M_i @ x_i`, this is the block-diagonal matrix of the `M_i` times the
+    concatenation of the `x_i` (or, if the `x_i` are the same, the stacked `M_i`
+    times `x_i`), so that the concatenation is evaluated with a single sparse
+    matrix multiplication at each level.
+    """
+    if not all(is_matrix_product(linear) for linear in linears):
+        return pybamm.NumpyConcatenation(*linears)
+    matrices = [sparse.csr_matrix(linear.children[0].entries) for linear in linears]
+    children = [linear.children[1] for linear in linears]
+    if all(child.id == children[0].id for child in children):
+        return pybamm.Matrix(sparse.vstack(matrices).tocsr()) @ children[0]
+    return pybamm.Matrix(sparse.block_diag(matrices).tocsr()) @ (
+        concatenate_products(children)
+    )
+
+
+def is_matrix_product(symbol):
+    """Returns True if `symbol` is a constant matrix times another symbol"""
+    return isinstance(symbol, pybamm.MatrixMultiplication) and isinstance(
+        symbol.children[0], pybamm.Matrix
+    )
@@ -21,6 +21,8 @@ class Matrix(pybamm.Array):
 
     """
 
+    __slots__ = []
+
     def __init__(self, entries, name=None, domain=[]):
         if name is None:
             name = "Matrix of shape {!s}".format(entries.shape)
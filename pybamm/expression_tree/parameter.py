@@ -21,5 +21,7 @@ class Parameter(pybamm.Symbol):
 
     """
 
+    __slots__ = []
+
     def __init__(self, name, domain=[]):
         super().__init__(name, domain=domain)
@@ -24,6 +24,8 @@ class Scalar(pybamm.Symbol):
 
     """
 
+    __slots__ = ["_value"]
+
     def __init__(self, value, name=None, domain=[]):
         """
 
@@ -33,29 +35,17 @@ class Scalar(pybamm.Symbol):
             name = str(value)
 
         super().__init__(name, domain=domain)
-        self.value = value
-
-    @property
-    def id(self):
-        """
-        The immutable "identity" of a variable (for identifying y_slices).
-
-        This is identical to what we'd put in a __hash__ function
-        However, implementing __hash__ requires also implementing __eq__,
-        which would then mess with loop-checking in the anytree module
-        """
+        self._value = value
 
-        return hash((self.__class__, self.name, self.value))
+    def id_from_children_ids(self, children_ids):
+        """ See :meth:`pybamm.Symbol.id_from_children_ids()`. """
+        return hash((self.__class__, self.name, self.value) + tuple(self.domain))
 
     @property
     def value(self):
         """the value returned by the node when evaluated"""
         return self._value
 
-    @value.setter
-    def value(self, value):
-        self._value = value
-
-    def evaluate(self, t=None, y=None):
+    def evaluate(self, t=None, y=None, inputs=None):
         """ See :meth:`pybamm.Symbol.evaluate()`. """
         return self._value
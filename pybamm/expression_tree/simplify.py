@@ -0,0 +1,409 @@
+#
+# Simplify expression trees
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import numbers
+import numpy as np
+
+sparse = pybamm.util.lazy_import("scipy.sparse")
+
+
+def simplify(symbol):
+    """
+    Simplify an expression tree. See :class:`pybamm.Simplification`.
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol`
+        The symbol or expression tree to simplify
+
+    Returns
+    -------
+    :class:`pybamm.Symbol`
+        The simplified expression tree
+    """
+    return Simplification().simplify(symbol)
+
+
+class Simplification(object):
+    """
+    Simplify expression trees, keeping count of the number of nodes removed. The
+    simplification is done from the bottom of the tree up, so that:
+
+    - constant subtrees (whose children are all :class:`pybamm.Scalar` or
+      :class:`pybamm.Array`) are evaluated once and replaced by a
+      :class:`pybamm.Scalar`, :class:`pybamm.Vector` or :class:`pybamm.Matrix`
+    - identities such as `x * 1`, `x + 0`, `x / 1`, `x ** 1` and `--x` are removed
+    - products of constant matrices with a matrix multiplication (e.g.
+      `A @ (B @ x)`, `2 * (A @ x)` or `-(A @ x)`) are pre-multiplied, so that
+      each matrix multiplication only happens once
+    - elementwise operations on broadcasts (e.g. `exp(broadcast(a)) * 2`) are
+      applied before broadcasting (`broadcast(exp(a) * 2)`, see
+      :func:`lift_broadcasts()`), so that they act on the value of the child
+      instead of on the broadcast array
+    - concatenations of :class:`pybamm.StateVector` nodes whose slices are
+      contiguous are merged into a single state vector (see
+      :func:`coalesce_state_vectors()`), which evaluates to a view of y
+
+    Simplifying the same tree always gives the same result, so that the ids of
+    simplified symbols can still be compared (e.g. to find boundary conditions).
+    """
+
+    def __init__(self):
+        self._nodes_removed = 0
+
+    @property
+    def nodes_removed(self):
+        """The number of nodes removed by all the simplifications so far"""
+        return self._nodes_removed
+
+    def simplify(self, symbol):
+        """
+        Simplify the expression tree `symbol`
+
+        Parameters
+        ----------
+        symbol : :class:`pybamm.Symbol`
+            The symbol or expression tree to simplify
+
+        Returns
+        -------
+        :class:`pybamm.Symbol`
+            The simplified expression tree
+        """
+        new_symbol = self._simplify(symbol, {})
+        self._nodes_removed += count_nodes(symbol) - count_nodes(new_symbol)
+        return new_symbol
+
+    def _simplify(self, symbol, simplified_symbols):
+        """Simplify `symbol`, remembering the simplified symbols (by key) so that
+        shared nodes are only simplified once"""
+        key = id(symbol)
+        if key in simplified_symbols:
+            return simplified_symbols[key]
+
+        if len(symbol.children) == 0:
+            new_symbol = symbol
+        else:
+            children = [
+                self._simplify(child, simplified_symbols) for child in symbol.children
+            ]
+            new_symbol = rebuild(symbol, children)
+            new_symbol = fold_constants(new_symbol)
+            new_symbol = remove_identities(new_symbol)
+            new_symbol = premultiply_matrices(new_symbol)
+            new_symbol = lift_broadcasts(new_symbol)
+            new_symbol = coalesce_state_vectors(new_symbol)
+
+        simplified_symbols[key] = new_symbol
+        return new_symbol
+
+
+def count_nodes(symbol):
+    """Count the nodes in the expression tree `symbol`"""
+    return len(list(symbol.pre_order()))
+
+
+def is_constant_leaf(symbol):
+    """Returns True if `symbol` is a :class:`pybamm.Scalar` or :class:`pybamm.Array`"""
+    return isinstance(symbol, (pybamm.Scalar, pybamm.Array))
+
+
+def is_scalar(symbol, value):
+    """Returns True if `symbol` is a :class:`pybamm.Scalar` with value `value`"""
+    return isinstance(symbol, pybamm.Scalar) and symbol.value == value
+
+
+def rebuild(symbol, children):
+    """
+    Create a copy of `symbol` with new children `children`. If the children are
+    unchanged, or if `symbol` is of a type that cannot be rebuilt, `symbol` is
+    returned.
+    """
+    if all(new is old for new, old in zip(children, symbol.children)):
+        return symbol
+
+    if isinstance(symbol, pybamm.BinaryOperator):
+        return symbol.__class__(*children)
+    elif isinstance(symbol, pybamm.Function):
+        return pybamm.Function(symbol.func, *children)
+    elif isinstance(symbol, pybamm.NodeToEdge):
+        return pybamm.NodeToEdge(*children, symbol._node_to_edge_function)
+    elif isinstance(symbol, pybamm.NumpyBroadcast):
+        return pybamm.NumpyBroadcast(*children, symbol.domain, symbol.mesh)
+    elif isinstance(symbol, pybamm.Broadcast):
+        return pybamm.Broadcast(*children, symbol.domain)
+    elif isinstance(symbol, pybamm.Integral):
+        return pybamm.Integral(*children, symbol.integration_variable)
+    elif isinstance(
+        symbol,
+        (
+            pybamm.Negate,
+            pybamm.AbsoluteValue,
+            pybamm.Gradient,
+            pybamm.Divergence,
+            pybamm.SurfaceValue,
+        ),
+    ):
+        return symbol.__class__(*children)
+    elif isinstance(symbol, pybamm.NumpyConcatenation):
+        return pybamm.NumpyConcatenation(*children)
+    elif isinstance(symbol, pybamm.DomainConcatenation):
+        return pybamm.DomainConcatenation(children, symbol.mesh)
+    elif isinstance(symbol, pybamm.Concatenation):
+        return pybamm.Concatenation(*children)
+    else:
+        # can't rebuild this type of symbol, so don't simplify its children
+        return symbol
+
+
+def fold_constants(symbol):
+    """
+    Replace `symbol` by its value, as a :class:`pybamm.Scalar`,
+    :class:`pybamm.Vector` or :class:`pybamm.Matrix`, if all its children are
+    constant and it can be evaluated
+    """
+    if not all(is_constant_leaf(child) for child in symbol.children):
+        return symbol
+    try:
+        value = symbol.evaluate()
+    except NotImplementedError:
+        return symbol
+
+    if isinstance(value, numbers.Number):
+        return pybamm.Scalar(value, domain=symbol.domain)
+    elif isinstance(value, np.ndarray) and value.ndim == 1:
+        return pybamm.Vector(value, domain=symbol.domain)
+    elif sparse.issparse(value) or (isinstance(value, np.ndarray) and value.ndim == 2):
+        return pybamm.Matrix(value, domain=symbol.domain)
+    else:
+        return symbol
+
+
+def remove_identities(symbol):
+    """
+    Remove operations that don't change their child (e.g. `x * 1`, `x + 0`), and
+    replace `0 * x` by `0` when `x` evaluates to a number
+    """
+    new_symbol = symbol
+    if isinstance(symbol, pybamm.BinaryOperator):
+        left, right = symbol.children
+        if isinstance(symbol, pybamm.Addition):
+            if is_scalar(left, 0):
+                new_symbol = right
+            elif is_scalar(right, 0):
+                new_symbol = left
+        elif isinstance(symbol, pybamm.Subtraction):
+            if is_scalar(right, 0):
+                new_symbol = left
+            elif is_scalar(left, 0):
+                new_symbol = pybamm.Negate(right)
+        elif isinstance(symbol, pybamm.Multiplication):
+            if is_scalar(left, 1):
+                new_symbol = right
+            elif is_scalar(right, 1):
+                new_symbol = left
+            elif is_scalar(left, 0) and right.evaluates_to_number():
+                new_symbol = pybamm.Scalar(0, domain=symbol.domain)
+            elif is_scalar(right, 0) and left.evaluates_to_number():
+                new_symbol = pybamm.Scalar(0, domain=symbol.domain)
+        elif isinstance(symbol, pybamm.Division):
+            if is_scalar(right, 1):
+                new_symbol = left
+            elif is_scalar(left, 0) and right.evaluates_to_number():
+                new_symbol = pybamm.Scalar(0, domain=symbol.domain)
+        elif isinstance(symbol, pybamm.Power):
+            if is_scalar(right, 1):
+                new_symbol = left
+            elif is_scalar(right, 0) and left.evaluates_to_number():
+                new_symbol = pybamm.Scalar(1, domain=symbol.domain)
+    elif isinstance(symbol, pybamm.Negate):
+        if isinstance(symbol.children[0], pybamm.Negate):
+            new_symbol = symbol.children[0].children[0]
+
+    # only simplify if the domain is unchanged
+    if new_symbol.domain != symbol.domain:
+        return symbol
+    return new_symbol
+
+
+def premultiply_matrices(symbol):
+    """
+    Combine constant matrices (and numbers) with the left child of a matrix
+    multiplication, e.g. `A @ (B @ x)` becomes `(A @ B) @ x`, so that the matrix
+    product is only calculated once. Matrices that take differences (see
+    :func:`takes_differences()`) are only premultiplied by matrices with at most one
+    entry in each row, which scale the differences without adding them up.
+    """
+    new_symbol = symbol
+    if isinstance(symbol, pybamm.MatrixMultiplication):
+        left, right = symbol.children
+        if isinstance(left, pybamm.Matrix) and is_matrix_product(right):
+            matrix, child = right.children
+            # leave matrices with incompatible shapes for evaluation to complain about
+            if left.entries.shape[1] == matrix.entries.shape[0] and (
+                max_row_entries(left) <= 1 or not takes_differences(matrix)
+            ):
+                new_symbol = pybamm.Matrix(left.entries @ matrix.entries) @ child
+    elif isinstance(symbol, pybamm.Multiplication):
+        left, right = symbol.children
+        if isinstance(left, pybamm.Scalar) and is_matrix_product(right):
+            matrix, child = right.children
+            new_symbol = pybamm.Matrix(left.value * matrix.entries) @ child
+        elif isinstance(right, pybamm.Scalar) and is_matrix_product(left):
+            matrix, child = left.children
+            new_symbol = pybamm.Matrix(right.value * matrix.entries) @ child
+    elif isinstance(symbol, pybamm.Division):
+        left, right = symbol.children
+        if isinstance(right, pybamm.Scalar) and is_matrix_product(left):
+            matrix, child = left.children
+            new_symbol = pybamm.Matrix(matrix.entries / right.value) @ child
+    elif isinstance(symbol, pybamm.Negate):
+        child = symbol.children[0]
+        if is_matrix_product(child):
+            matrix, grandchild = child.children
+            new_symbol = pybamm.Matrix(-matrix.entries) @ grandchild
+
+    # only simplify if the domain is unchanged
+    if new_symbol.domain != symbol.domain:
+        return symbol
+    return new_symbol
+
+
+def lift_broadcasts(symbol):
+    """
+    Move a :class:`pybamm.NumpyBroadcast` above the elementwise operation that uses
+    it (an arithmetic operation, a negation, an absolute value or a function that is
+    a numpy ufunc), if the other children of the operation are numbers or the same
+    broadcast of other symbols. For example, `broadcast(a) * broadcast(b) + 2`
+    becomes `broadcast(a * b + 2)`. Broadcasts evaluate to read-only views of the
+    value of their child, so the operations then act on the (small) value of the
+    child, and the broadcast array is only created where it is needed (e.g. by a
+    concatenation, or in the output).
+    """
+    elementwise = (
+        pybamm.Addition,
+        pybamm.Subtraction,
+        pybamm.Multiplication,
+        pybamm.Division,
+        pybamm.Power,
+        pybamm.Negate,
+        pybamm.AbsoluteValue,
+    )
+    if not (
+        type(symbol) in elementwise
+        or (isinstance(symbol, pybamm.Function) and isinstance(symbol.func, np.ufunc))
+    ):
+        return symbol
+    broadcasts = [
+        child for child in symbol.children if isinstance(child, pybamm.NumpyBroadcast)
+    ]
+    if not broadcasts:
+        return symbol
+    broadcast = broadcasts[0]
+    if not all(
+        (
+            isinstance(child, pybamm.NumpyBroadcast)
+            and child.domain == broadcast.domain
+            and child.broadcasting_vector_size == broadcast.broadcasting_vector_size
+        )
+        or (isinstance(child, pybamm.Scalar) and child.domain == [])
+        for child in symbol.children
+    ):
+        return symbol
+    children = [
+        child.children[0] if isinstance(child, pybamm.NumpyBroadcast) else child
+        for child in symbol.children
+    ]
+    new_child = fold_constants(rebuild(symbol, children))
+    new_symbol = pybamm.NumpyBroadcast(new_child, broadcast.domain, broadcast.mesh)
+
+    # only simplify if the domain is unchanged
+    if new_symbol.domain != symbol.domain:
+        return symbol
+    return new_symbol
+
+
+def coalesce_state_vectors(symbol):
+    """
+    Merge the adjacent children of a :class:`pybamm.NumpyConcatenation` that are
+    :class:`pybamm.StateVector` nodes with contiguous slices (e.g. `y[0:3]` and
+    `y[3:5]`) into a single state vector (`y[0:5]`), and replace the concatenation
+    by the state vector if it is the only child left. A
+    :class:`pybamm.DomainConcatenation` of state vectors is replaced by a single
+    state vector if its entries, in the order of its domains, are a contiguous
+    slice of y (e.g. a variable concatenated from variables in each subdomain).
+    State vectors evaluate to views of y, so this saves copying the slices.
+    """
+    new_symbol = symbol
+    if isinstance(symbol, pybamm.NumpyConcatenation):
+        children = []
+        for child in symbol.children:
+            if (
+                children
+                and isinstance(child, pybamm.StateVector)
+                and isinstance(children[-1], pybamm.StateVector)
+                and children[-1].y_slice.stop == child.y_slice.start
+            ):
+                children[-1] = pybamm.StateVector(
+                    slice(children[-1].y_slice.start, child.y_slice.stop)
+                )
+            else:
+                children.append(child)
+        if len(children) == 1 and isinstance(children[0], pybamm.StateVector):
+            new_symbol = children[0]
+        elif len(children) < len(symbol.children):
+            new_symbol = pybamm.NumpyConcatenation(*children)
+    elif isinstance(symbol, pybamm.DomainConcatenation) and all(
+        isinstance(child, pybamm.StateVector) for child in symbol.children
+    ):
+        # the slice of y that each domain is read from, in the order of the domains
+        y_slices = {}
+        for child, child_slices in zip(symbol.children, symbol._children_slices):
+            start = child.y_slice.start
+            for dom in child.domain:
+                y_slices[dom] = slice(
+                    start + child_slices[dom].start, start + child_slices[dom].stop
+                )
+        y_slices = [y_slices[dom] for dom in symbol.domain]
+        if all(a.stop == b.start for a, b in zip(y_slices[:-1], y_slices[1:])):
+            new_symbol = pybamm.StateVector(
+                slice(y_slices[0].start, y_slices[-1].stop), domain=symbol.domain
+            )
+
+    # only simplify if the domain is unchanged
+    if new_symbol.domain != symbol.domain:
+        return symbol
+    return new_symbol
+
+
+def takes_differences(matrix):
+    """
+    Returns True if a row of `matrix` takes a difference, i.e. has several nonzero
+    entries that sum to zero (e.g. a finite volume gradient or divergence matrix).
+    The difference of close entries of a vector is exact, but after premultiplying
+    by another matrix the rounding errors of the product can be much larger than the
+    differences (e.g. `div(grad(c))` isn't exactly zero for a constant `c`).
+    """
+    entries = sparse.csr_matrix(matrix.entries)
+    row_sums = np.abs(np.asarray(entries.sum(axis=1))).ravel()
+    row_sizes = np.asarray(abs(entries).sum(axis=1)).ravel()
+    row_nnz = np.diff(entries.indptr)
+    return bool(
+        np.any((row_nnz > 1) & (row_sums <= np.finfo(float).eps * row_sizes))
+    )
+
+
+def max_row_entries(matrix):
+    """Returns the largest number of nonzero entries in a row of `matrix`"""
+    return max(np.diff(sparse.csr_matrix(matrix.entries).indptr), default=0)
+
+
+def is_matrix_product(symbol):
+    """Returns True if `symbol` is a constant matrix times another symbol"""
+    return isinstance(symbol, pybamm.MatrixMultiplication) and isinstance(
+        symbol.children[0], pybamm.Matrix
+    )
@@ -0,0 +1,175 @@
+#
+# Structural sparsity pattern of the Jacobian of an expression tree
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import numpy as np
+
+sparse = pybamm.util.lazy_import("scipy.sparse")
+
+
+def jacobian_sparsity(symbol, variable, y, inputs=None):
+    """
+    Find the structural sparsity pattern of the Jacobian of the expression tree
+    `symbol` with respect to `variable`, i.e. which entries of the Jacobian can be
+    nonzero. Unlike :meth:`pybamm.Symbol.jac()`, this does not require the
+    derivatives of the nodes to be known: the pattern is found from the slices of
+    the :class:`pybamm.StateVector` nodes and the nonzeros of the constant matrices,
+    assuming that each :class:`pybamm.Function` acts elementwise (or, if the size of
+    its output differs from the size of its input, that each output depends on
+    every input).
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol`
+        The (discretised) expression tree
+    variable : :class:`pybamm.StateVector`
+        The state vector to differentiate with respect to
+    y : :class:`numpy.array`
+        A value of the state vector, used to find the sizes of the nodes
+    inputs : dict, optional
+        The values of any input parameters in the tree, used to find the sizes of
+        the nodes (see :class:`pybamm.UnknownInputs`)
+
+    Returns
+    -------
+    :class:`scipy.sparse.csr_matrix`
+        Matrix of ones (where the Jacobian can be nonzero) and zeros
+
+    Raises
+    ------
+    NotImplementedError
+        If the tree contains a node whose sparsity pattern cannot be found
+    """
+    _, pattern = find_sparsity(symbol, variable, y, {}, inputs)
+    return pattern
+
+
+def find_sparsity(symbol, variable, y, known_symbols, inputs=None):
+    """
+    Find the value of `symbol` at `y`, and the sparsity pattern of its Jacobian
+    with respect to `variable`. See :func:`pybamm.jacobian_sparsity()`.
+
+    Parameters
+    ----------
+    symbol : :class:`pybamm.Symbol`
+        The expression tree
+    variable : :class:`pybamm.StateVector`
+        The state vector to differentiate with respect to
+    y : :class:`numpy.array`
+        A value of the state vector
+    known_symbols : dict
+        The values and patterns found so far, so that shared nodes are only visited
+        once ({symbol key: (value, pattern)})
+    inputs : dict, optional
+        The values of any input parameters in the tree
+
+    Returns
+    -------
+    value : numeric type
+        The value of `symbol` at `y`
+    pattern : :class:`scipy.sparse.csr_matrix`
+        The sparsity pattern of the Jacobian of `symbol`
+    """
+    key = id(symbol)
+    if key in known_symbols:
+        return known_symbols[key]
+
+    variable_size = variable.y_slice.stop - variable.y_slice.start
+
+    if not symbol.has_state_vector():
+        value = symbol.evaluate(0, y, inputs)
+        pattern = sparse.csr_matrix((np.size(value), variable_size))
+
+    elif isinstance(symbol, pybamm.StateVector):
+        value = symbol.evaluate(0, y, inputs)
+        pattern = symbol.jac(variable).evaluate()
+
+    else:
+        children = [
+            find_sparsity(child, variable, y, known_symbols, inputs)
+            for child in symbol.children
+        ]
+        values = [child_value for child_value, _ in children]
+        patterns = [child_pattern for _, child_pattern in children]
+
+        if isinstance(symbol, pybamm.MatrixMultiplication):
+            if symbol.children[0].has_state_vector():
+                raise NotImplementedError(
+                    """sparsity of a matrix multiplication is only implemented when
+                       the left child does not depend on y"""
+                )
+            value = symbol._binary_evaluate(*values)
+            pattern = abs(sparse.csr_matrix(values[0])) @ patterns[1]
+
+        elif isinstance(symbol, pybamm.BinaryOperator):
+            # elementwise, broadcasting children that evaluate to a single value
+            value = symbol._binary_evaluate(*values)
+            pattern = broadcast_pattern(patterns[0], np.size(value)) + (
+                broadcast_pattern(patterns[1], np.size(value))
+            )
+
+        elif isinstance(symbol, pybamm.NumpyBroadcast):
+            if np.size(values[0]) != 1:
+                raise NotImplementedError(
+                    "sparsity of broadcast is only implemented for a child of size 1"
+                )
+            value = symbol._unary_evaluate(values[0])
+            pattern = broadcast_pattern(patterns[0], np.size(value))
+
+        elif isinstance(symbol, pybamm.NodeToEdge):
+            # the node-to-edge functions are linear, so act on the pattern directly
+            value = symbol._unary_evaluate(values[0])
+            pattern = abs(symbol._unary_evaluate(patterns[0]))
+
+        elif isinstance(symbol, pybamm.UnaryOperator):
+            value = symbol._unary_evaluate(values[0])
+            if np.size(value) == np.size(values[0]):
+                # elementwise
+                pattern = patterns[0]
+            else:
+                # each output depends on every input
+                union = sparse.csr_matrix(patterns[0].sum(axis=0))
+                pattern = broadcast_pattern(union, np.size(value))
+
+        elif isinstance(symbol, pybamm.NumpyConcatenation):
+            value = symbol._concatenation_evaluate(values)
+            pattern = sparse.vstack(patterns)
+
+        elif isinstance(symbol, pybamm.DomainConcatenation):
+            # stack the rows of the children, then gather them in the order of the
+            # domains
+            value = symbol._concatenation_evaluate(values)
+            pattern = sparse.vstack(patterns, format="csr")
+            if symbol._indices is not None:
+                pattern = pattern[symbol._indices]
+
+        else:
+            raise NotImplementedError(
+                "sparsity of symbol {!s} of type {} not implemented".format(
+                    symbol, type(symbol)
+                )
+            )
+
+    # store the pattern as ones and zeros
+    pattern = sparse.csr_matrix(pattern)
+    pattern.eliminate_zeros()
+    pattern.data[:] = 1
+    known_symbols[key] = (value, pattern)
+    return value, pattern
+
+
+def broadcast_pattern(pattern, size):
+    """Broadcast a sparsity pattern with a single row to `size` rows"""
+    if pattern.shape[0] == size:
+        return pattern
+    elif pattern.shape[0] == 1:
+        return sparse.csr_matrix(np.ones((size, 1))) @ pattern
+    else:
+        raise ValueError(
+            "cannot broadcast pattern with {} rows to {} rows".format(
+                pattern.shape[0], size
+            )
+        )
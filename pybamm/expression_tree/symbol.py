@@ -5,16 +5,105 @@ from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 import pybamm
 
-import anytree
 import numbers
-import copy
+import subprocess
+import weakref
+import numpy as np
 
-from anytree.exporter import DotExporter
+sparse = pybamm.util.lazy_import("scipy.sparse")
 
+# All the symbols that currently exist, keyed by id. Only weak references are kept,
+# so that symbols are removed from the table when they are no longer used.
+INTERNED_SYMBOLS = weakref.WeakValueDictionary()
 
-class Symbol(anytree.NodeMixin):
+
+class InternedSymbol(type):
+    """
+    Metaclass of :class:`Symbol`, that hash-conses symbols: once a symbol has been
+    created, its id is calculated (once) from the ids of its children, and if an
+    identical symbol (i.e. one with the same id and the same content, see
+    :meth:`Symbol.is_same_node()`) already exists, the existing symbol is returned
+    instead of the new one. For example, building `a + b` twice gives the same node.
+    New symbols also store their structural flags (see
+    :meth:`Symbol.set_structure_flags()`), so that these are only found once.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        symbol = super().__call__(*args, **kwargs)
+        symbol._id, existing_symbol = find_interned_id(symbol)
+        if existing_symbol is not None:
+            return existing_symbol
+        symbol.set_structure_flags()
+        INTERNED_SYMBOLS[symbol._id] = symbol
+        return symbol
+
+
+def find_interned_id(symbol):
+    """
+    Find the id of `symbol` (see :meth:`Symbol.id_from_children_ids()`), and the
+    interned symbol that is the same node, if there is one. The ids are hashes, so
+    different symbols can have the same hash (e.g. `hash(-1) == hash(-2)`): if the
+    interned symbol with that id is a different node, the id is hashed again until it
+    is free or belongs to the same node, so that different nodes that exist at the
+    same time never share an id.
+
+    Returns
+    -------
+    int
+        The id of the symbol
+    :class:`Symbol` or None
+        The interned symbol that is the same node, or None
+    """
+    symbol_id = symbol.id_from_children_ids([child.id for child in symbol.children])
+    while True:
+        existing_symbol = INTERNED_SYMBOLS.get(symbol_id)
+        if existing_symbol is None or existing_symbol.is_same_node(symbol):
+            return symbol_id, existing_symbol
+        symbol_id = hash((symbol_id, "collision"))
+
+
+def values_equal(left, right):
+    """
+    Returns True if the values of the slots of two nodes (see
+    :meth:`Symbol.content_state()`) are equal, and of the same types
+    """
+    if type(left) is not type(right):
+        return False
+    if isinstance(left, np.ndarray):
+        return (
+            left.shape == right.shape
+            and left.dtype == right.dtype
+            and np.array_equal(left, right)
+        )
+    if sparse.issparse(left):
+        return (
+            left.shape == right.shape
+            and left.dtype == right.dtype
+            and (left != right).nnz == 0
+        )
+    if isinstance(left, (list, tuple)):
+        return len(left) == len(right) and all(
+            values_equal(a, b) for a, b in zip(left, right)
+        )
+    if isinstance(left, dict):
+        return left.keys() == right.keys() and all(
+            values_equal(left[key], right[key]) for key in left
+        )
+    return left is right or bool(left == right)
+
+
+class Symbol(object, metaclass=InternedSymbol):
     """Base node class for the expression tree
 
+    Nodes are immutable, and store their children in a tuple: a child is not copied
+    when it is added to a node, so the same symbol can be the child of several
+    nodes. Nodes use `__slots__` (derived classes declare any extra attributes in
+    their own `__slots__`) so that large trees use as little memory as possible.
+
+    Identical nodes are only created once (see :class:`pybamm.InternedSymbol`), so
+    expression trees are directed acyclic graphs in which identical subtrees are
+    shared.
+
     Parameters
     ----------
 
@@ -28,21 +117,69 @@ class Symbol(anytree.NodeMixin):
 
     """
 
+    __slots__ = [
+        "_name",
+        "_children",
+        "_domain",
+        "_id",
+        "_is_constant",
+        "_has_gradient",
+        "_has_divergence",
+        "_has_state_vector",
+        "_has_input_parameter",
+        "_evaluates_to_number",
+        "__weakref__",
+    ]
+
     def __init__(self, name, children=[], domain=[]):
-        super(Symbol, self).__init__()
         self._name = name
+        self._children = tuple(children)
+        self._domain = self.check_domain(domain)
+
+    def __getstate__(self):
+        """Get the values of all the slots, except the id (used by pickle and copy)"""
+        state = {}
+        for cls in type(self).__mro__:
+            for slot in getattr(cls, "__slots__", []):
+                if slot not in ["_id", "__weakref__"] and hasattr(self, slot):
+                    state[slot] = getattr(self, slot)
+        return state
+
+    def __setstate__(self, state):
+        """
+        Set the values of the slots, and recalculate the id (which depends on the
+        hashes of strings, which can change between python sessions)
+        """
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self._id, _ = find_interned_id(self)
 
-        for child in children:
-            # copy child before adding
-            # this also adds copy.copy(child) to self.children
-            copy.copy(child).parent = self
-        self.domain = domain
+    def content_state(self):
+        """
+        The values that, with the children, define the content of the node, used to
+        find a hash of the expression tree that is the same in every python session
+        (see :func:`pybamm.content_hash()`). These are the name, the domain and the
+        values of the slots of derived classes (see :meth:`__getstate__()`), but not
+        the structural flags, which are found from the content (some of them only
+        when they are first needed). Classes with slots that aren't part of the
+        content (e.g. a mesh) extend this.
+        """
+        return {
+            slot: value
+            for slot, value in Symbol.__getstate__(self).items()
+            if slot in ["_name", "_domain"] or slot not in Symbol.__slots__
+        }
 
     @property
     def name(self):
         """name of the node"""
         return self._name
 
+    @property
+    def children(self):
+        """the children of the node (tuple)"""
+        return self._children
+
     @property
     def domain(self):
         """list of applicable domains
@@ -53,8 +190,13 @@ class Symbol(anytree.NodeMixin):
         """
         return self._domain
 
-    @domain.setter
-    def domain(self, domain):
+    def check_domain(self, domain):
+        """
+        Check that `domain` is a list of known domains, in the order of
+        :data:`pybamm.KNOWN_DOMAINS`, and return it (as a list, if it is a string).
+        Nodes are shared (see :class:`InternedSymbol`), so the domain can only be set
+        when the node is created.
+        """
         if isinstance(domain, str):
             domain = [domain]
         try:
@@ -83,7 +225,20 @@ class Symbol(anytree.NodeMixin):
                     )
                 )
 
-            self._domain = domain
+            return domain
+
+    def is_same_node(self, other):
+        """
+        Returns True if `other` is the same node as this one: a symbol of the same
+        class, with the same content (see :meth:`content_state()`) and the same
+        children
+        """
+        return (
+            type(self) is type(other)
+            and len(self.children) == len(other.children)
+            and all(a.id == b.id for a, b in zip(self.children, other.children))
+            and values_equal(self.content_state(), other.content_state())
+        )
 
     @property
     def id(self):
@@ -92,51 +247,102 @@ class Symbol(anytree.NodeMixin):
 
         This is identical to what we'd put in a __hash__ function
         However, implementing __hash__ requires also implementing __eq__,
-        which would then mess with loop-checking in the anytree module
+        which would then change the meaning of `==` between symbols
+
+        The id is calculated once, when the symbol is created (see
+        :class:`pybamm.InternedSymbol`).
+        """
+        return self._id
+
+    def id_from_children_ids(self, children_ids):
+        """
+        The id of this node, given the ids of its children (see :meth:`id`). This
+        allows the ids of all the nodes of a tree to be found in a single pass from
+        the bottom of the tree up, instead of recursively for every node.
+
+        Parameters
+        ----------
+        children_ids : iterable of int
+            The ids of the children of this node
         """
         return hash(
-            (self.__class__, self.name)
-            + tuple([child.id for child in self.children])
-            + tuple(self.domain)
+            (self.__class__, self.name) + tuple(children_ids) + tuple(self.domain)
+        )
+
+    def set_structure_flags(self):
+        """
+        Find whether the expression tree is constant, and whether it contains a
+        gradient, divergence, state vector or input parameter, from the (already
+        known) flags of the children. Nodes are immutable, so this only needs to be
+        done once, when the node is created. Classes that are not constant (e.g.
+        :class:`Variable`), or that are themselves a gradient, divergence, state
+        vector or input parameter, extend this.
+        """
+        self._is_constant = all(child._is_constant for child in self.children)
+        self._has_gradient = any(child._has_gradient for child in self.children)
+        self._has_divergence = any(child._has_divergence for child in self.children)
+        self._has_state_vector = any(
+            child._has_state_vector for child in self.children
+        )
+        self._has_input_parameter = any(
+            child._has_input_parameter for child in self.children
         )
+        # found by evaluating the node, the first time it is needed
+        self._evaluates_to_number = None
 
     @property
     def orphans(self):
         """
-        Returning deepcopies of the children, with parents removed to avoid corrupting
-        the expression tree internal data
+        The children of the node. As nodes are immutable and don't keep track of
+        their parents, the children can be reused directly in other expression trees.
         """
-        orp = []
-        for child in self.children:
-            new_child = copy.deepcopy(child)
-            new_child.parent = None
-            orp.append(new_child)
-        return tuple(orp)
+        return self.children
 
     def render(self):
         """print out a visual representation of the tree (this node and its
         children)
         """
-        for pre, _, node in anytree.RenderTree(self):
-            print("%s%s" % (pre, str(node)))
+        # (node, prefix for the node, prefix for the node's children)
+        stack = [(self, "", "")]
+        while stack:
+            node, prefix, children_prefix = stack.pop()
+            print("%s%s" % (prefix, str(node)))
+            # add the children in reverse, so that they are printed in order
+            last = len(node.children) - 1
+            for i, child in reversed(list(enumerate(node.children))):
+                if i == last:
+                    branch, fill = "└── ", "    "
+                else:
+                    branch, fill = "├── ", "│   "
+                stack.append((child, children_prefix + branch, children_prefix + fill))
 
     def visualise(self, filename, test=False):
         """Produces a .png file of the tree (this node and its children) with the
-        name filename"""
+        name filename, using graphviz"""
 
-        new_node, counter = self.relabel_tree(self, 0)
+        _, lines, counter = self.relabel_tree(self, 0)
 
         # check that filename ends in .png.
         filename = "view_tree/" + filename + ".png"
 
         if test is False:
-            DotExporter(
-                new_node, nodeattrfunc=lambda node: 'label="{}"'.format(node.label)
-            ).to_picture(filename)
+            source = "digraph tree {\n" + "\n".join(lines) + "\n}"
+            subprocess.run(
+                ["dot", "-Tpng", "-o", filename], input=source.encode(), check=True
+            )
 
     def relabel_tree(self, symbol, counter):
         """ Finds all children of a symbol and assigns them a new id so that they can be
                 visualised properly using the graphviz output
+
+        Returns
+        -------
+        node : str
+            the new id of `symbol`
+        lines : list of str
+            the graphviz (dot) statements for the nodes and edges of the tree
+        counter : int
+            the next unused id
         """
         name = symbol.name
         if name == "div":
@@ -156,20 +362,23 @@ class Symbol(anytree.NodeMixin):
         elif name == "epsilon_s":
             name = "&#603;"
 
-        new_node = anytree.Node(str(counter), label=name)
+        new_node = str(counter)
+        lines = ['"{}" [label="{}"];'.format(new_node, name)]
         counter += 1
 
         if isinstance(symbol, pybamm.BinaryOperator):
-            left, right = symbol.children
-            new_left, counter = self.relabel_tree(left, counter)
-            new_right, counter = self.relabel_tree(right, counter)
-            new_node.children = [new_left, new_right]
-
+            children = symbol.children
         elif isinstance(symbol, pybamm.UnaryOperator):
-            new_child, counter = self.relabel_tree(symbol.children[0], counter)
-            new_node.children = [new_child]
+            children = symbol.children[:1]
+        else:
+            children = []
 
-        return new_node, counter
+        for child in children:
+            new_child, child_lines, counter = self.relabel_tree(child, counter)
+            lines.extend(child_lines)
+            lines.append('"{}" -> "{}";'.format(new_node, new_child))
+
+        return new_node, lines, counter
 
     def pre_order(self):
         """returns an iterable that steps through the tree in pre-order
@@ -188,7 +397,11 @@ class Symbol(anytree.NodeMixin):
         b
 
         """
-        return anytree.PreOrderIter(self)
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
 
     def __str__(self):
         """return a string representation of the node and its children"""
@@ -296,7 +509,7 @@ class Symbol(anytree.NodeMixin):
         """return an :class:`AbsoluteValue` object"""
         return pybamm.AbsoluteValue(self)
 
-    def evaluate(self, t=None, y=None):
+    def evaluate(self, t=None, y=None, inputs=None):
         """evaluate expression tree
 
         will raise a ``NotImplementedError`` if this member function has not
@@ -312,6 +525,10 @@ class Symbol(anytree.NodeMixin):
         y : numpy.array, optional
             array to evaluate when solving (default None)
 
+        inputs : dict, optional
+            the values of any :class:`InputParameter` in the expression tree, keyed
+            by name (default None)
+
         """
         raise NotImplementedError(
             """method self.evaluate() not implemented
@@ -320,6 +537,80 @@ class Symbol(anytree.NodeMixin):
             )
         )
 
+    def evaluate_into(self, out, t=None, y=None, inputs=None):
+        """Evaluate the expression tree into the preallocated array `out` (which must
+        have as many entries as the value of the expression tree), instead of
+        returning a new array. Concatenations write the values of their children
+        directly into slices of `out`.
+
+        Parameters
+        ----------
+
+        out : :class:`numpy.array`
+            The array to write the value into
+
+        t, y, inputs
+            See :meth:`pybamm.Symbol.evaluate()`
+
+        Returns
+        -------
+        :class:`numpy.array`
+            The array `out`
+
+        """
+        out[...] = np.reshape(self.evaluate(t, y, inputs), np.shape(out))
+        return out
+
+    def jac(self, variable):
+        """
+        Differentiate the expression with respect to a :class:`pybamm.StateVector`.
+        The result is an expression tree that evaluates to the (sparse) Jacobian
+        matrix of the expression, with one row for each entry of the expression and
+        one column for each entry of `variable`.
+
+        Parameters
+        ----------
+        variable : :class:`pybamm.StateVector`
+            The state vector (or slice of the state vector) to differentiate with
+            respect to
+
+        Returns
+        -------
+        :class:`pybamm.Symbol`
+            An expression tree that evaluates to a :class:`scipy.sparse` matrix
+
+        Raises
+        ------
+        NotImplementedError
+            If the expression contains a node that cannot be differentiated (e.g. a
+            :class:`pybamm.Function` with an unknown derivative)
+        """
+        if not isinstance(variable, pybamm.StateVector):
+            raise TypeError(
+                "can only differentiate with respect to a StateVector, not {}".format(
+                    type(variable)
+                )
+            )
+        if not self.has_state_vector():
+            # the Jacobian of an expression that doesn't depend on y is zero
+            size = np.size(self.evaluate(0, None, pybamm.UnknownInputs()))
+            variable_size = variable.y_slice.stop - variable.y_slice.start
+            return pybamm.Matrix(sparse.csr_matrix((size, variable_size)))
+        return self._jac(variable)
+
+    def _jac(self, variable):
+        """
+        Differentiate an expression that depends on y with respect to `variable`.
+        See :meth:`pybamm.Symbol.jac()`. Derived classes that can be differentiated
+        must implement this.
+        """
+        raise NotImplementedError(
+            """method self.jac() not implemented
+               for symbol {!s} of type {}""".format(
+                self, type(self)
+            )
+        )
+
     def is_constant(self):
         """returns true if evaluating the expression is not dependent on `t` or `y`
 
@@ -328,13 +619,7 @@ class Symbol(anytree.NodeMixin):
         evaluate : evaluate the expression
 
         """
-
-        # if any of the nodes are instances of any of these types, then the whole
-        # expression depends on either t or y
-        search_types = (pybamm.Variable, pybamm.StateVector, pybamm.IndependentVariable)
-
-        # do the search, return true if no relevent nodes are found
-        return all([not isinstance(n, search_types) for n in self.pre_order()])
+        return self._is_constant
 
     def evaluates_to_number(self):
         """Returns True if evaluating the expression returns a number.
@@ -342,14 +627,28 @@ class Symbol(anytree.NodeMixin):
         is raised.
         !Not to be confused with isinstance(self, pybamm.Scalar)!
 
+        The expression is evaluated (at most) once, and the result is stored.
+
         See Also
         --------
         evaluate : evaluate the expression
 
         """
+        if self._evaluates_to_number is None:
+            self._evaluates_to_number = self._find_evaluates_to_number()
+        return self._evaluates_to_number
+
+    def _find_evaluates_to_number(self):
+        """See :meth:`evaluates_to_number()`"""
+        if self._has_state_vector:
+            # evaluating a StateVector with y=None raises an error
+            return False
         try:
-            # return true if node evaluates to a number
-            return isinstance(self.evaluate(t=0), numbers.Number)
+            # return true if node evaluates to a number (input parameters are
+            # numbers, so their values don't matter)
+            return isinstance(
+                self.evaluate(t=0, inputs=pybamm.UnknownInputs()), numbers.Number
+            )
         except NotImplementedError:
             # return false if NotImplementedError is raised
             # (there is a e.g. Parameter, Variable, ... in the tree)
@@ -364,18 +663,24 @@ class Symbol(anytree.NodeMixin):
 
     def has_spatial_derivatives(self):
         """Returns True if equation has spatial derivatives (grad or div)."""
-        return self.has_gradient() or self.has_divergence()
+        return self._has_gradient or self._has_divergence
 
     def has_gradient_and_not_divergence(self):
         """Returns True if equation has a Gradient term and not Divergence term."""
-        return self.has_gradient() and not self.has_divergence()
+        return self._has_gradient and not self._has_divergence
+
+    def has_state_vector(self):
+        """Returns True if equation has a StateVector term (i.e. depends on y)."""
+        return self._has_state_vector
+
+    def has_input_parameter(self):
+        """Returns True if equation has an InputParameter term."""
+        return self._has_input_parameter
 
     def has_gradient(self):
         """Returns True if equation has a Gradient term."""
-        return any([isinstance(symbol, pybamm.Gradient) for symbol in self.pre_order()])
+        return self._has_gradient
 
     def has_divergence(self):
         """Returns True if equation has a Divergence term."""
-        return any(
-            [isinstance(symbol, pybamm.Divergence) for symbol in self.pre_order()]
-        )
+        return self._has_divergence
@@ -24,13 +24,32 @@ class UnaryOperator(pybamm.Symbol):
 
     """
 
-    def __init__(self, name, child):
-        super().__init__(name, children=[child], domain=child.domain)
+    __slots__ = []
+
+    def __init__(self, name, child, domain=None):
+        if domain is None:
+            domain = child.domain
+        super().__init__(name, children=[child], domain=domain)
 
     def __str__(self):
         """ See :meth:`pybamm.Symbol.__str__()`. """
         return "{}({!s})".format(self.name, self.children[0])
 
+    def evaluate(self, t=None, y=None, inputs=None):
+        """ See :meth:`pybamm.Symbol.evaluate()`. """
+        child = self.children[0].evaluate(t, y, inputs)
+        return self._unary_evaluate(child)
+
+    def _unary_evaluate(self, child):
+        """Perform the unary operation on the evaluated child `child`.
+        Derived classes that can be evaluated must implement this."""
+        raise NotImplementedError(
+            """method self.evaluate() not implemented
+               for symbol {!s} of type {}""".format(
+                self, type(self)
+            )
+        )
+
 
 class Negate(UnaryOperator):
     """A node in the expression tree representing a `-` negation operator
@@ -38,13 +57,19 @@ class Negate(UnaryOperator):
     **Extends:** :class:`UnaryOperator`
     """
 
+    __slots__ = []
+
     def __init__(self, child):
         """ See :meth:`pybamm.UnaryOperator.__init__()`. """
         super().__init__("-", child)
 
-    def evaluate(self, t=None, y=None):
-        """ See :meth:`pybamm.Symbol.evaluate()`. """
-        return -self.children[0].evaluate(t, y)
+    def _unary_evaluate(self, child):
+        """ See :meth:`pybamm.UnaryOperator._unary_evaluate()`. """
+        return -child
+
+    def _jac(self, variable):
+        """ See :meth:`pybamm.Symbol._jac()`. """
+        return -self.children[0].jac(variable)
 
     def __str__(self):
         """ See :meth:`pybamm.Symbol.__str__()`. """
@@ -57,13 +82,20 @@ class AbsoluteValue(UnaryOperator):
     **Extends:** :class:`UnaryOperator`
     """
 
+    __slots__ = []
+
     def __init__(self, child):
         """ See :meth:`pybamm.UnaryOperator.__init__()`. """
         super().__init__("abs", child)
 
-    def evaluate(self, t=None, y=None):
-        """ See :meth:`pybamm.Symbol.evaluate()`. """
-        return np.abs(self.children[0].evaluate(t, y))
+    def _unary_evaluate(self, child):
+        """ See :meth:`pybamm.UnaryOperator._unary_evaluate()`. """
+        return np.abs(child)
+
+    def _jac(self, variable):
+        """ See :meth:`pybamm.Symbol._jac()`. """
+        child = self.children[0]
+        return pybamm.RowScaling(Function(np.sign, child), child.jac(variable))
 
 
 class Function(UnaryOperator):
@@ -72,14 +104,105 @@ class Function(UnaryOperator):
     **Extends:** :class:`UnaryOperator`
     """
 
+    __slots__ = ["_func"]
+
     def __init__(self, func, child):
         """ See :meth:`pybamm.UnaryOperator.__init__()`. """
         super().__init__("function ({})".format(func.__name__), child)
-        self.func = func
+        self._func = func
 
-    def evaluate(self, t=None, y=None):
-        """ See :meth:`pybamm.Symbol.evaluate()`. """
-        return self.func(self.children[0].evaluate(t, y))
+    @property
+    def func(self):
+        """the function applied to the child"""
+        return self._func
+
+    def id_from_children_ids(self, children_ids):
+        """ See :meth:`pybamm.Symbol.id_from_children_ids()`. """
+        # different functions can have the same name (e.g. lambda functions), so
+        # include the function itself in the id
+        return hash(
+            (self.__class__, self.name, self.func)
+            + tuple(children_ids)
+            + tuple(self.domain)
+        )
+
+    def __getstate__(self):
+        """ See :meth:`pybamm.Symbol.__getstate__()`. """
+        state = super().__getstate__()
+        # functions loaded from a file by pybamm.load_function() are not in an
+        # importable module, so they can't be pickled: keep their file instead, and
+        # load them again when unpickling
+        filename = pybamm.loaded_function_file(self.func)
+        if filename is not None:
+            del state["_func"]
+            state["func_file"] = filename
+        return state
+
+    def __setstate__(self, state):
+        """ See :meth:`pybamm.Symbol.__setstate__()`. """
+        if "func_file" in state:
+            state = dict(state)
+            state["_func"] = pybamm.load_function(state.pop("func_file"))
+        super().__setstate__(state)
+
+    def _unary_evaluate(self, child):
+        """ See :meth:`pybamm.UnaryOperator._unary_evaluate()`. """
+        return self.func(child)
+
+    def _jac(self, variable):
+        """ See :meth:`pybamm.Symbol._jac()`. """
+        try:
+            derivative = KNOWN_DERIVATIVES[self.func]
+        except (KeyError, TypeError):
+            raise NotImplementedError(
+                "derivative of function '{}' is not known".format(self.func.__name__)
+            )
+        child = self.children[0]
+        return pybamm.RowScaling(Function(derivative, child), child.jac(variable))
+
+
+#
+# Derivatives of functions, used by Function to calculate Jacobians
+#
+
+
+def _sqrt_derivative(x):
+    """Derivative of :func:`numpy.sqrt`"""
+    return 0.5 / np.sqrt(x)
+
+
+def _cos_derivative(x):
+    """Derivative of :func:`numpy.cos`"""
+    return -np.sin(x)
+
+
+def _tanh_derivative(x):
+    """Derivative of :func:`numpy.tanh`"""
+    return 1 - np.tanh(x) ** 2
+
+
+def _arcsinh_derivative(x):
+    """Derivative of :func:`numpy.arcsinh`"""
+    return 1 / np.sqrt(1 + x ** 2)
+
+
+def _zero_derivative(x):
+    """Derivative of piecewise-constant functions (e.g. :func:`numpy.sign`)"""
+    return np.zeros_like(x)
+
+
+KNOWN_DERIVATIVES = {
+    np.exp: np.exp,
+    np.log: np.reciprocal,
+    np.sqrt: _sqrt_derivative,
+    np.sin: np.cos,
+    np.cos: _cos_derivative,
+    np.sinh: np.cosh,
+    np.cosh: np.sinh,
+    np.tanh: _tanh_derivative,
+    np.arcsinh: _arcsinh_derivative,
+    np.sign: _zero_derivative,
+}
 
 
 class SpatialOperator(UnaryOperator):
@@ -103,8 +226,10 @@ class SpatialOperator(UnaryOperator):
 
     """
 
-    def __init__(self, name, child):
-        super().__init__(name, child)
+    __slots__ = []
+
+    def __init__(self, name, child, domain=None):
+        super().__init__(name, child, domain=domain)
 
 
 class Gradient(SpatialOperator):
@@ -113,9 +238,16 @@ class Gradient(SpatialOperator):
     **Extends:** :class:`SpatialOperator`
     """
 
+    __slots__ = []
+
     def __init__(self, child):
         super().__init__("grad", child)
 
+    def set_structure_flags(self):
+        """ See :meth:`pybamm.Symbol.set_structure_flags()`. """
+        super().set_structure_flags()
+        self._has_gradient = True
+
 
 class Divergence(SpatialOperator):
     """A node in the expression tree representing a div operator
@@ -123,9 +255,16 @@ class Divergence(SpatialOperator):
     **Extends:** :class:`SpatialOperator`
     """
 
+    __slots__ = []
+
     def __init__(self, child):
         super().__init__("div", child)
 
+    def set_structure_flags(self):
+        """ See :meth:`pybamm.Symbol.set_structure_flags()`. """
+        super().set_structure_flags()
+        self._has_divergence = True
+
 
 class Integral(SpatialOperator):
     """A node in the expression tree representing an integral operator (definite or
@@ -150,6 +289,8 @@ class Integral(SpatialOperator):
     **Extends:** :class:`SpatialOperator`
     """
 
+    __slots__ = ["_integration_variable"]
+
     def __init__(self, child, integration_variable):
         if isinstance(integration_variable, pybamm.SpatialVariable):
             # Check that child and integration_variable domains agree
@@ -181,12 +322,12 @@ class SurfaceValue(SpatialOperator):
     **Extends:** :class:`SpatialOperator`
     """
 
-    def __init__(self, child):
-        super().__init__("surf", child)
+    __slots__ = []
 
+    def __init__(self, child):
         # Domain of SurfaceValue must be ([]) so that expressions can be formed
         # of surface values of variables in different domains
-        self.domain = []
+        super().__init__("surf", child, domain=[])
 
 
 #
@@ -24,16 +24,16 @@ class Variable(pybamm.Symbol):
     *Extends:* :class:`Symbol`
     """
 
+    __slots__ = []
+
     def __init__(self, name, domain=[]):
         super().__init__(name, domain=domain)
 
-    @property
-    def id(self):
-        """
-        The immutable "identity" of a variable (for identifying y_slices).
+    def set_structure_flags(self):
+        """ See :meth:`pybamm.Symbol.set_structure_flags()`. """
+        super().set_structure_flags()
+        self._is_constant = False
 
-        This is identical to what we'd put in a __hash__ function
-        However, implementing __hash__ requires also implementing __eq__,
-        which would then mess with loop-checking in the anytree module
-        """
+    def id_from_children_ids(self, children_ids):
+        """ See :meth:`pybamm.Symbol.id_from_children_ids()`. """
         return hash((self.__class__, self.name, tuple(self.domain)))
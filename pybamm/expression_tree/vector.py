@@ -5,6 +5,10 @@ from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 import pybamm
 
+import numpy as np
+
+sparse = pybamm.util.lazy_import("scipy.sparse")
+
 
 class Vector(pybamm.Array):
     """node in the expression tree that holds a vector type (e.g. :class:`numpy.array`)
@@ -23,6 +27,8 @@ class Vector(pybamm.Array):
 
     """
 
+    __slots__ = []
+
     def __init__(self, entries, name=None, domain=[]):
         # make sure that entries are a vector
         if entries.ndim != 1:
@@ -51,6 +57,8 @@ class StateVector(pybamm.Symbol):
     *Extends:* :class:`Array`
     """
 
+    __slots__ = ["_y_slice"]
+
     def __init__(self, y_slice, name=None, domain=[]):
         if name is None:
             name = "StateVector with slice '{!s}'".format(y_slice)
@@ -62,7 +70,20 @@ class StateVector(pybamm.Symbol):
         """Slice of an external y to read"""
         return self._y_slice
 
-    def evaluate(self, t=None, y=None):
+    def set_structure_flags(self):
+        """ See :meth:`pybamm.Symbol.set_structure_flags()`. """
+        super().set_structure_flags()
+        self._is_constant = False
+        self._has_state_vector = True
+
+    def id_from_children_ids(self, children_ids):
+        """ See :meth:`pybamm.Symbol.id_from_children_ids()`. """
+        return hash(
+            (self.__class__, self.name, self.y_slice.start, self.y_slice.stop)
+            + tuple(self.domain)
+        )
+
+    def evaluate(self, t=None, y=None, inputs=None):
         """ See :meth:`pybamm.Symbol.evaluate()`. """
         if y is None:
             raise TypeError("StateVector cannot evaluate input 'y=None'")
@@ -72,3 +93,21 @@ class StateVector(pybamm.Symbol):
             )
         else:
             return y[self._y_slice]
+
+    def _jac(self, variable):
+        """ See :meth:`pybamm.Symbol._jac()`. """
+        # The Jacobian has a one wherever the entry of y read by this StateVector is
+        # also read by `variable`
+        rows = np.arange(self.y_slice.start, self.y_slice.stop)
+        columns = rows - variable.y_slice.start
+        variable_size = variable.y_slice.stop - variable.y_slice.start
+        in_variable = (columns >= 0) & (columns < variable_size)
+        return pybamm.Matrix(
+            sparse.csr_matrix(
+                (
+                    np.ones(np.count_nonzero(in_variable)),
+                    (np.flatnonzero(in_variable), columns[in_variable]),
+                ),
+                shape=(len(rows), variable_size),
+            )
+        )
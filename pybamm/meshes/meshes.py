@@ -38,16 +38,31 @@ class Mesh(dict):
     def __init__(self, geometry, submesh_types, submesh_pts):
         super().__init__()
         self.submesh_pts = submesh_pts
+        # Combined submeshes, {submesh names: submesh}, and instances of spatial
+        # methods, {spatial method class: instance}, for this mesh
+        self._combined_submeshes = {}
+        self._spatial_methods = {}
         for domain in geometry:
             submesh_type = submesh_types[domain]
             submesh_pt = submesh_pts[domain]
             self[domain] = submesh_type(geometry[domain], submesh_pt)
 
+    def __setitem__(self, name, submesh):
+        # replacing a submesh invalidates the combined submeshes, and the operators
+        # cached by the spatial methods
+        if name in self:
+            self._combined_submeshes = {}
+            self._spatial_methods = {}
+        super().__setitem__(name, submesh)
+
     def combine_submeshes(self, *submeshnames):
         """Combine submeshes into a new submesh, using self.submeshclass
         Raises pybamm.DomainError if submeshes to be combined do not match up (edges are
         not aligned).
 
+        Combined submeshes are kept, so combining the same submeshes again returns
+        the same submesh.
+
         Parameters
         ----------
         submeshnames: list of str
@@ -58,6 +73,9 @@ class Mesh(dict):
         submesh: :class:`self.submeshclass`
             A new submesh with the class defined by self.submeshclass
         """
+        if submeshnames in self._combined_submeshes:
+            return self._combined_submeshes[submeshnames]
+
         # Check that the final edge of each submesh is the same as the first edge of the
         # next submesh
 
@@ -75,10 +93,32 @@ class Mesh(dict):
                 [self[submeshnames[0]].edges]
                 + [self[submeshname].edges[1:] for submeshname in submeshnames[1:]]
             )
-            return pybamm.SubMesh1D(combined_submesh_edges)
+            submesh = pybamm.SubMesh1D(combined_submesh_edges)
+            self._combined_submeshes[submeshnames] = submesh
+            return submesh
         else:
             raise pybamm.DomainError("submesh edges are not aligned")
 
+    def spatial_method(self, method):
+        """
+        The instance of a spatial method for this mesh. It is created the first time,
+        and shared by all the discretisations on the mesh, so that the operators it
+        builds (e.g. the finite volume gradient matrices) are only built once.
+
+        Parameters
+        ----------
+        method : :class:`pybamm.SpatialMethod` (or subclass)
+            The class of the spatial method
+
+        Returns
+        -------
+        :class:`pybamm.SpatialMethod` (or subclass)
+            The spatial method for this mesh
+        """
+        if method not in self._spatial_methods:
+            self._spatial_methods[method] = method(self)
+        return self._spatial_methods[method]
+
     def add_ghost_meshes(self):
         """
         Create meshes for potential ghost nodes on either side of each submesh, using
@@ -0,0 +1,334 @@
+#
+# Content hashes of models and settings, and an on-disk cache of processed models
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import hashlib
+import numbers
+import os
+import pickle
+import tempfile
+import time
+import types
+import numpy as np
+
+sparse = pybamm.util.lazy_import("scipy.sparse")
+
+
+def content_hash(*objects):
+    """
+    Find a hash of the content of `objects` (e.g. a model, its parameter values,
+    geometry, submesh settings and spatial methods) that is the same in every python
+    session, unlike :meth:`pybamm.Symbol.id` (which uses python's `hash()`, whose
+    value for strings changes between sessions). The hash can therefore be used as a
+    persistent key, e.g. by :class:`ModelCache`.
+
+    The objects can be expression trees, models, dicts (such as
+    :class:`pybamm.ParameterValues` and :class:`pybamm.Geometry`), lists, tuples,
+    sets, slices, strings, numbers, numpy arrays, sparse matrices, classes and
+    functions. Functions loaded by :func:`pybamm.load_function()` are hashed by the
+    contents of their file, and other functions by their module and name.
+
+    Parameters
+    ----------
+    objects : iterable
+        The objects to hash
+
+    Returns
+    -------
+    str
+        The SHA-256 hash, as a hexadecimal string
+
+    Raises
+    ------
+    TypeError
+        If one of the objects (or one of their parts) cannot be hashed, e.g. a
+        lambda function
+    """
+    return content_digest(objects, {}).hex()
+
+
+def content_digest(obj, known_digests):
+    """
+    Find the SHA-256 digest of the content of `obj`. See
+    :func:`pybamm.content_hash()`.
+
+    Parameters
+    ----------
+    obj : object
+        The object to hash
+    known_digests : dict
+        The digests of the symbols that have already been hashed, keyed by python
+        id (along with the symbols, so that their ids are not reused)
+
+    Returns
+    -------
+    bytes
+        The digest of `obj`
+    """
+    if isinstance(obj, pybamm.Symbol):
+        try:
+            return known_digests[id(obj)][1]
+        except KeyError:
+            digest = combine_digests(
+                b"symbol",
+                content_digest(type(obj), known_digests),
+                content_digest(obj.children, known_digests),
+                content_digest(obj.content_state(), known_digests),
+            )
+            known_digests[id(obj)] = (obj, digest)
+            return digest
+    elif isinstance(obj, pybamm.BaseModel):
+        equations = {
+            "rhs": obj.rhs,
+            "algebraic": obj.algebraic,
+            "initial_conditions": obj.initial_conditions,
+            "initial_conditions_ydot": obj.initial_conditions_ydot,
+            "boundary_conditions": obj.boundary_conditions,
+            "variables": obj.variables,
+            "events": obj.events,
+        }
+        return combine_digests(
+            b"model",
+            content_digest(type(obj), known_digests),
+            content_digest(equations, known_digests),
+        )
+    elif isinstance(obj, pybamm.ParameterValues):
+        # functions given by their file are hashed by the contents of the file, so
+        # that the hash changes if the file is modified (files that can't be loaded
+        # are hashed by their name)
+        items = {}
+        for name, value in obj.items():
+            if isinstance(value, str) and value.endswith(".py"):
+                try:
+                    value = pybamm.load_function(value)
+                except ValueError:
+                    pass
+            items[name] = value
+        return content_digest(items, known_digests)
+    elif isinstance(obj, dict):
+        items = sorted(
+            combine_digests(
+                content_digest(key, known_digests),
+                content_digest(value, known_digests),
+            )
+            for key, value in obj.items()
+        )
+        return combine_digests(b"dict", *items)
+    elif isinstance(obj, (list, tuple)):
+        return combine_digests(
+            b"list", *[content_digest(item, known_digests) for item in obj]
+        )
+    elif isinstance(obj, (set, frozenset)):
+        return combine_digests(
+            b"set", *sorted(content_digest(item, known_digests) for item in obj)
+        )
+    elif isinstance(obj, slice):
+        return combine_digests(
+            b"slice", content_digest((obj.start, obj.stop, obj.step), known_digests)
+        )
+    elif obj is None:
+        return combine_digests(b"none")
+    elif isinstance(obj, str):
+        return combine_digests(b"str", obj.encode("utf-8"))
+    elif isinstance(obj, bytes):
+        return combine_digests(b"bytes", obj)
+    elif isinstance(obj, bool):
+        return combine_digests(b"bool", repr(obj).encode())
+    elif isinstance(obj, numbers.Real):
+        # numbers of different types with the same value have the same hash
+        if isinstance(obj, numbers.Integral) or float(obj).is_integer():
+            return combine_digests(b"int", repr(int(obj)).encode())
+        return combine_digests(b"float", repr(float(obj)).encode())
+    elif isinstance(obj, numbers.Complex):
+        return combine_digests(b"complex", repr(complex(obj)).encode())
+    elif sparse.issparse(obj):
+        matrix = sparse.csr_matrix(obj, copy=True)
+        matrix.sum_duplicates()
+        return combine_digests(
+            b"sparse",
+            content_digest(matrix.shape, known_digests),
+            content_digest(matrix.data, known_digests),
+            content_digest(matrix.indices, known_digests),
+            content_digest(matrix.indptr, known_digests),
+        )
+    elif isinstance(obj, (np.ndarray, np.generic)):
+        array = np.ascontiguousarray(obj)
+        if array.dtype.hasobject:
+            raise TypeError("cannot hash the content of an array of objects")
+        return combine_digests(
+            b"array",
+            array.dtype.str.encode(),
+            content_digest(array.shape, known_digests),
+            array.tobytes(),
+        )
+    elif isinstance(obj, type):
+        return combine_digests(b"class", pybamm.util.qualified_name(obj).encode())
+    elif callable(obj):
+        filename = (
+            pybamm.loaded_function_file(obj)
+            if isinstance(obj, types.FunctionType)
+            else None
+        )
+        if filename is not None:
+            with open(filename, "rb") as file:
+                return combine_digests(b"loaded function", file.read())
+        return combine_digests(b"function", pybamm.util.qualified_name(obj).encode())
+    else:
+        raise TypeError("cannot hash the content of {!r}".format(obj))
+
+
+def combine_digests(*parts):
+    """
+    Find the SHA-256 digest of a sequence of bytes objects. The length of each part
+    is included, so that different sequences with the same concatenation have
+    different digests.
+    """
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(len(part).to_bytes(8, "little"))
+        sha.update(part)
+    return sha.digest()
+
+
+class ModelCache(object):
+    """
+    A directory of processed (and discretised) models, saved with :mod:`pickle` and
+    keyed by a content hash of the model and the settings used to process it (see
+    :func:`pybamm.content_hash()`), so that these can be reused in later python
+    sessions. When the files in the directory take up more than `max_size` bytes,
+    the least recently used models are removed.
+
+    The hash doesn't include the code of PyBaMM itself, so the cache should be
+    cleared (see :meth:`clear()`) if PyBaMM is updated.
+
+    Loading a pickled file can run arbitrary code, so the directory must be trusted:
+    only use a directory that can't be written to by other users.
+
+    Parameters
+    ----------
+    directory : str, optional
+        The directory of the cache (default is ".cache/pybamm/models" in the home
+        directory). It is created when the first model is saved.
+    max_size : int, optional
+        The maximum total size, in bytes, of the files in the cache (default is
+        1 GB)
+    """
+
+    def __init__(self, directory=None, max_size=2**30):
+        if directory is None:
+            directory = os.path.join(
+                os.path.expanduser("~"), ".cache", "pybamm", "models"
+            )
+        self.directory = directory
+        self.max_size = max_size
+
+    def filename(self, key):
+        """The file in which the model with hash `key` is saved"""
+        return os.path.join(self.directory, "{}.pkl".format(key))
+
+    def __contains__(self, key):
+        return os.path.isfile(self.filename(key))
+
+    def get(self, key):
+        """
+        Load the model with hash `key`, and mark it as the most recently used.
+
+        Parameters
+        ----------
+        key : str
+            The content hash of the model and settings
+
+        Returns
+        -------
+        :class:`pybamm.BaseModel` or None
+            The model, or None if it isn't in the cache (or its file can't be
+            loaded, in which case the file is removed)
+        """
+        filename = self.filename(key)
+        try:
+            with open(filename, "rb") as file:
+                model = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self.remove(key)
+            return None
+        # the modification time of a file records when it was last used
+        os.utime(filename, ns=(time.time_ns(), time.time_ns()))
+        return model
+
+    def put(self, key, model):
+        """
+        Save a model, then remove the least recently used models if the cache is
+        too large.
+
+        Parameters
+        ----------
+        key : str
+            The content hash of the model and settings
+        model : :class:`pybamm.BaseModel`
+            The processed model
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        # write to a temporary file first, so that other processes never load a
+        # partially written model
+        file_descriptor, temporary_filename = tempfile.mkstemp(
+            dir=self.directory, suffix=".tmp"
+        )
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                pickle.dump(model, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_filename, self.filename(key))
+        except BaseException:
+            os.remove(temporary_filename)
+            raise
+        self.evict()
+
+    def remove(self, key):
+        """Remove the model with hash `key` from the cache, if it is there"""
+        try:
+            os.remove(self.filename(key))
+        except FileNotFoundError:
+            pass
+
+    def entries(self):
+        """
+        The hash, size and last use time of each model in the cache, from the least
+        to the most recently used
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for filename in os.listdir(self.directory):
+            key, extension = os.path.splitext(filename)
+            if extension != ".pkl":
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                continue
+            entries.append((key, stat.st_size, stat.st_mtime_ns))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    @property
+    def size(self):
+        """The total size, in bytes, of the models in the cache"""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Remove the least recently used models until the cache is small enough"""
+        entries = self.entries()
+        size = sum(size for _, size, _ in entries)
+        for key, entry_size, _ in entries:
+            if size <= self.max_size:
+                break
+            self.remove(key)
+            size -= entry_size
+
+    def clear(self):
+        """Remove all the models from the cache"""
+        for key, _, _ in self.entries():
+            self.remove(key)
@@ -38,6 +38,14 @@ class BaseModel(object):
     events: list
         A list of events that should cause the solver to terminate (e.g. concentration
         goes negative)
+    y_slices: dict
+        A dictionary that maps the variables of a discretised model to the slices of
+        the state vector y that hold their values
+    linear_decomposition: :class:`pybamm.LinearDecomposition`
+        The decomposition of the concatenated rhs of a discretised model into
+        `A @ y + b(t) + g(t, y)` (see :func:`pybamm.linear_decomposition()`), which
+        solvers use to evaluate the linear part with one sparse matrix
+        multiplication, and to use `A` as the Jacobian if the rhs is affine
 
     """
 
@@ -50,8 +58,12 @@ class BaseModel(object):
         self._boundary_conditions = {}
         self._variables = {}
         self._events = []
+        self._y_slices = {}
         self._concatenated_rhs = None
         self._concatenated_initial_conditions = None
+        self._jacobian = None
+        self._jacobian_sparsity = None
+        self._linear_decomposition = None
 
         # Default parameter values, geometry, submesh, spatial methods and solver
         input_path = os.path.join(
@@ -186,6 +198,14 @@ class BaseModel(object):
     def events(self, events):
         self._events = events
 
+    @property
+    def y_slices(self):
+        return self._y_slices
+
+    @y_slices.setter
+    def y_slices(self, y_slices):
+        self._y_slices = y_slices
+
     @property
     def concatenated_rhs(self):
         return self._concatenated_rhs
@@ -202,6 +222,30 @@ class BaseModel(object):
     def concatenated_initial_conditions(self, concatenated_initial_conditions):
         self._concatenated_initial_conditions = concatenated_initial_conditions
 
+    @property
+    def jacobian(self):
+        return self._jacobian
+
+    @jacobian.setter
+    def jacobian(self, jacobian):
+        self._jacobian = jacobian
+
+    @property
+    def jacobian_sparsity(self):
+        return self._jacobian_sparsity
+
+    @jacobian_sparsity.setter
+    def jacobian_sparsity(self, jacobian_sparsity):
+        self._jacobian_sparsity = jacobian_sparsity
+
+    @property
+    def linear_decomposition(self):
+        return self._linear_decomposition
+
+    @linear_decomposition.setter
+    def linear_decomposition(self, linear_decomposition):
+        self._linear_decomposition = linear_decomposition
+
     def __getitem__(self, key):
         return self.rhs[key]
 
@@ -227,6 +271,12 @@ class BaseModel(object):
             )
             self._variables.update(submodel.variables)  # keys are strings so no check
 
+    def save(self, filename):
+        """
+        Save the discretised model to a file. See :func:`pybamm.save_model()`.
+        """
+        pybamm.save_model(self, filename)
+
     def check_and_combine_dict(self, dict1, dict2):
         # check that the key ids are distinct
         ids1 = set(x.id for x in dict1.keys())
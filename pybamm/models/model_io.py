@@ -0,0 +1,277 @@
+#
+# Save discretised models to a file, and load them
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import json
+import numbers
+import numpy as np
+
+sparse = pybamm.util.lazy_import("scipy.sparse")
+
+# The attributes of a discretised model that are saved by save_model()
+SAVED_ATTRIBUTES = [
+    "rhs",
+    "algebraic",
+    "initial_conditions",
+    "initial_conditions_ydot",
+    "boundary_conditions",
+    "variables",
+    "events",
+    "y_slices",
+    "concatenated_rhs",
+    "concatenated_algebraic",
+    "concatenated_initial_conditions",
+    "concatenated_initial_conditions_ydot",
+    "concatenated_events",
+    "jacobian",
+    "jacobian_sparsity",
+    "linear_decomposition",
+]
+
+
+def save_model(model, filename):
+    """
+    Save a discretised model to a file, so that it can be loaded by
+    :func:`pybamm.load_model()` without processing its parameters or discretising
+    it again.
+
+    The file is a compressed numpy `.npz` archive. The expression trees of the model
+    are stored as a table with one row per node (identical nodes are only stored
+    once), giving the class of the node, its content (see
+    :meth:`pybamm.Symbol.content_state()`) and the rows of its children. The entries
+    of :class:`pybamm.Array` nodes (dense or sparse) and other arrays of the model
+    (e.g. its initial conditions) are stored as arrays of the archive. The functions
+    of :class:`pybamm.Function` nodes are stored by their import path, or by their
+    file if they were loaded by :func:`pybamm.load_function()`.
+
+    The default settings of the model (parameter values, geometry, etc.), which are
+    only used to process and discretise it, are not saved.
+
+    Parameters
+    ----------
+    model : :class:`pybamm.BaseModel` (or subclass)
+        The discretised model
+    filename : str
+        The name of the file (".npz" is added if it doesn't end with it)
+
+    Raises
+    ------
+    ValueError
+        If the model hasn't been discretised
+    TypeError
+        If the model contains a function that can't be identified by its import
+        path (e.g. a lambda function)
+    """
+    if model.concatenated_rhs is None:
+        raise ValueError("only discretised models can be saved")
+    writer = ModelWriter()
+    attributes = {
+        name: writer.encode(getattr(model, name, None)) for name in SAVED_ATTRIBUTES
+    }
+    table = {
+        "model": pybamm.util.qualified_name(type(model)),
+        "classes": writer.classes,
+        "nodes": writer.nodes,
+        "attributes": attributes,
+    }
+    if not filename.endswith(".npz"):
+        filename += ".npz"
+    np.savez_compressed(
+        filename,
+        table=np.frombuffer(json.dumps(table).encode("utf-8"), dtype=np.uint8),
+        **writer.arrays
+    )
+
+
+def load_model(filename):
+    """
+    Load a discretised model saved by :func:`pybamm.save_model()`. The model is
+    rebuilt from the file, without processing its parameters or discretising it, and
+    can be solved straight away.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file (".npz" is added if it doesn't end with it)
+
+    Returns
+    -------
+    :class:`pybamm.BaseModel` (or subclass)
+        The discretised model, of the class of the saved model (but without default
+        settings, see :func:`pybamm.save_model()`)
+    """
+    if not filename.endswith(".npz"):
+        filename += ".npz"
+    with np.load(filename, allow_pickle=False) as archive:
+        table = json.loads(archive["table"].tobytes().decode("utf-8"))
+        arrays = {name: archive[name] for name in archive.files if name != "table"}
+    reader = ModelReader(table["classes"], arrays)
+    for node in table["nodes"]:
+        reader.add_node(*node)
+
+    # build the model without calling __init__, which creates the default settings
+    model_class = pybamm.util.from_qualified_name(table["model"])
+    model = model_class.__new__(model_class)
+    # attributes that files saved by older versions don't have are set to None
+    for name in SAVED_ATTRIBUTES:
+        setattr(model, name, reader.decode(table["attributes"].get(name)))
+    return model
+
+
+class ModelWriter(object):
+    """
+    Encode the expression trees and other values of a model as JSON-compatible
+    values (see :func:`pybamm.save_model()`), collecting the rows of the node table
+    and the arrays
+    """
+
+    def __init__(self):
+        self.classes = []
+        self.nodes = []
+        self.arrays = {}
+        self._class_indices = {}
+        self._node_indices = {}
+
+    def encode(self, value):
+        """
+        Encode `value`. Symbols are added to the node table and encoded as their
+        row, and arrays are added to the arrays and encoded as their name.
+        """
+        if isinstance(value, pybamm.Symbol):
+            return {"node": self.add_node(value)}
+        elif value is None or isinstance(value, (bool, str)):
+            return value
+        elif isinstance(value, numbers.Integral):
+            return int(value)
+        elif isinstance(value, numbers.Real):
+            return float(value)
+        elif isinstance(value, list):
+            return [self.encode(item) for item in value]
+        elif isinstance(value, tuple):
+            return {"tuple": [self.encode(item) for item in value]}
+        elif isinstance(value, dict):
+            # keys can be symbols, so store the items as pairs
+            return {
+                "dict": [
+                    [self.encode(key), self.encode(item)] for key, item in value.items()
+                ]
+            }
+        elif isinstance(value, slice):
+            return {"slice": [value.start, value.stop, value.step]}
+        elif isinstance(value, pybamm.LinearDecomposition):
+            return {
+                "linear_decomposition": [
+                    self.encode(part)
+                    for part in [value.A, value.linear, value.b, value.g]
+                ]
+            }
+        elif sparse.issparse(value):
+            name = "array_{}".format(len(self.arrays))
+            matrix = value.tocsr()
+            self.arrays[name + "_data"] = matrix.data
+            self.arrays[name + "_indices"] = matrix.indices
+            self.arrays[name + "_indptr"] = matrix.indptr
+            return {"sparse": name, "shape": list(value.shape), "format": value.format}
+        elif isinstance(value, np.ndarray):
+            name = "array_{}".format(len(self.arrays))
+            self.arrays[name] = value
+            return {"array": name}
+        elif callable(value):
+            filename = pybamm.loaded_function_file(value)
+            if filename is not None:
+                return {"function_file": filename}
+            return {"object": pybamm.util.qualified_name(value)}
+        else:
+            raise TypeError("cannot save {!r}".format(value))
+
+    def add_node(self, symbol):
+        """
+        Add `symbol` (and its children) to the node table, if it isn't already
+        there, and return its row
+        """
+        try:
+            return self._node_indices[id(symbol)][1]
+        except KeyError:
+            children = [self.add_node(child) for child in symbol.children]
+            state = {
+                slot: self.encode(value)
+                for slot, value in symbol.content_state().items()
+            }
+            self.nodes.append([self.add_class(type(symbol)), state, children])
+            index = len(self.nodes) - 1
+            # keep the symbol, so that its python id isn't reused
+            self._node_indices[id(symbol)] = (symbol, index)
+            return index
+
+    def add_class(self, cls):
+        """Add `cls` to the classes of the nodes, and return its index"""
+        try:
+            return self._class_indices[cls]
+        except KeyError:
+            self.classes.append(pybamm.util.qualified_name(cls))
+            self._class_indices[cls] = len(self.classes) - 1
+            return self._class_indices[cls]
+
+
+class ModelReader(object):
+    """
+    Rebuild the nodes and values of a model from the node table and arrays written
+    by :class:`ModelWriter` (see :func:`pybamm.load_model()`)
+    """
+
+    def __init__(self, classes, arrays):
+        self.classes = [pybamm.util.from_qualified_name(name) for name in classes]
+        self.arrays = arrays
+        self.nodes = []
+
+    def add_node(self, class_index, state, children):
+        """
+        Rebuild a node from its row of the node table, whose children (which come
+        before it in the table) have already been rebuilt
+        """
+        cls = self.classes[class_index]
+        symbol = cls.__new__(cls)
+        state = {slot: self.decode(value) for slot, value in state.items()}
+        state["_children"] = tuple(self.nodes[child] for child in children)
+        symbol.__setstate__(state)
+        symbol.set_structure_flags()
+        self.nodes.append(symbol)
+
+    def decode(self, value):
+        """Decode a value encoded by :meth:`ModelWriter.encode()`"""
+        if isinstance(value, list):
+            return [self.decode(item) for item in value]
+        elif not isinstance(value, dict):
+            return value
+        elif "node" in value:
+            return self.nodes[value["node"]]
+        elif "tuple" in value:
+            return tuple(self.decode(item) for item in value["tuple"])
+        elif "dict" in value:
+            return {self.decode(key): self.decode(item) for key, item in value["dict"]}
+        elif "slice" in value:
+            return slice(*value["slice"])
+        elif "linear_decomposition" in value:
+            return pybamm.LinearDecomposition(
+                *[self.decode(part) for part in value["linear_decomposition"]]
+            )
+        elif "sparse" in value:
+            name = value["sparse"]
+            matrix = sparse.csr_matrix(
+                (
+                    self.arrays[name + "_data"],
+                    self.arrays[name + "_indices"],
+                    self.arrays[name + "_indptr"],
+                ),
+                shape=value["shape"],
+            )
+            return matrix.asformat(value["format"])
+        elif "array" in value:
+            return self.arrays[value["array"]]
+        elif "function_file" in value:
+            return pybamm.load_function(value["function_file"])
+        else:
+            return pybamm.util.from_qualified_name(value["object"])
@@ -5,8 +5,11 @@ from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 import pybamm
 
-import pandas as pd
-import copy
+import csv
+import os
+
+# Parameter files that have been read, {path: (modification time, parameters)}
+_READ_PARAMETER_FILES = {}
 
 
 class ParameterValues(dict):
@@ -23,6 +26,10 @@ class ParameterValues(dict):
         Optional parameters, overwrites base_parameters if there is a conflict
         If string, gets passed to read_parameters_csv to read a file.
 
+    Parameters whose value is "[input]" are replaced by a
+    :class:`pybamm.InputParameter`, whose value is given when the model is solved
+    (see :meth:`pybamm.BaseSolver.solve()`).
+
     """
 
     def __init__(self, base_parameters={}, optional_parameters={}):
@@ -42,9 +49,26 @@ class ParameterValues(dict):
         # doing parameter studies
         self.update(optional_parameters)
 
+        self._simplification = pybamm.Simplification()
+        self._processed_symbols = None
+
+    @property
+    def nodes_removed(self):
+        """The number of nodes removed by simplifying the last processed model"""
+        return self._simplification.nodes_removed
+
     def read_parameters_csv(self, filename):
         """Reads parameters from csv file into dict.
 
+        The file has a header row with "Name" and "Value" columns (other columns,
+        such as units and references, are ignored). Blank rows and rows starting with
+        "#" are skipped. Values are converted to floats where possible (empty values
+        are nan), and other values (e.g. "[input]") are kept as strings.
+
+        Read files are kept (for the whole python session), keyed by their path, so
+        that each file is only read once. A file is read again if it has been
+        modified since it was last read.
+
         Parameters
         ----------
         filename : string
@@ -56,10 +80,17 @@ class ParameterValues(dict):
             {name: value} pairs for the parameters.
 
         """
-        df = pd.read_csv(filename, comment="#", skip_blank_lines=True)
-        # Drop rows that are all NaN (seems to not work with skip_blank_lines)
-        df.dropna(how="all", inplace=True)
-        return {k: v for (k, v) in zip(df.Name, df.Value)}
+        path = os.path.realpath(filename)
+        modification_time = os.stat(path).st_mtime_ns
+        if path in _READ_PARAMETER_FILES:
+            read_time, parameters = _READ_PARAMETER_FILES[path]
+            if read_time == modification_time:
+                return dict(parameters)
+
+        with open(path, newline="", encoding="utf-8") as file:
+            parameters = parse_parameters_csv(file)
+        _READ_PARAMETER_FILES[path] = (modification_time, parameters)
+        return dict(parameters)
 
     def get_parameter_value(self, parameter):
         """
@@ -88,31 +119,46 @@ class ParameterValues(dict):
             Model to assign parameter values for
 
         """
+        # Simplify the processed symbols (fold constants, remove identities),
+        # keeping count of the number of nodes removed
+        self._simplification = pybamm.Simplification()
+        simplify = self._simplification.simplify
+
+        # Process each symbol only once while processing this model
+        self._processed_symbols = {}
+
         for variable, equation in model.rhs.items():
-            model.rhs[variable] = self.process_symbol(equation)
+            model.rhs[variable] = simplify(self.process_symbol(equation))
 
         for variable, equation in model.initial_conditions.items():
-            model.initial_conditions[variable] = self.process_symbol(equation)
+            model.initial_conditions[variable] = simplify(self.process_symbol(equation))
 
         for variable, equation in model.initial_conditions_ydot.items():
-            model.initial_conditions_ydot[variable] = self.process_symbol(equation)
+            model.initial_conditions_ydot[variable] = simplify(
+                self.process_symbol(equation)
+            )
 
         # Boundary conditions are dictionaries {"left": left bc, "right": right bc}
+        # The keys are simplified in the same way as the equations, so that they can
+        # still be found by id in the discretisation
         new_boundary_conditions = {}
         for variable, bcs in model.boundary_conditions.items():
-            processed_variable = self.process_symbol(variable)
+            processed_variable = simplify(self.process_symbol(variable))
             new_boundary_conditions[processed_variable] = {}
             for side in ["left", "right"]:
-                new_boundary_conditions[processed_variable][side] = self.process_symbol(
-                    bcs[side]
+                new_boundary_conditions[processed_variable][side] = simplify(
+                    self.process_symbol(bcs[side])
                 )
         model.boundary_conditions = new_boundary_conditions
 
         for variable, equation in model.variables.items():
-            model.variables[variable] = self.process_symbol(equation)
+            model.variables[variable] = simplify(self.process_symbol(equation))
 
         for idx, equation in enumerate(model.events):
-            model.events[idx] = self.process_symbol(equation)
+            model.events[idx] = simplify(self.process_symbol(equation))
+
+        # Free the processed symbols
+        self._processed_symbols = None
 
     def process_geometry(self, geometry):
         """Assign parameter values to a geometry.
@@ -132,7 +178,9 @@ class ParameterValues(dict):
                     ).evaluate()
 
     def process_symbol(self, symbol):
-        """Walk through the symbol and replace any Parameter with a Value.
+        """Walk through the symbol and replace any Parameter with a Value. While a
+        model is being processed (see :meth:`process_model()`), each symbol
+        (identified by its id) is only processed once, and then reused.
 
         Parameters
         ----------
@@ -145,8 +193,21 @@ class ParameterValues(dict):
             Symbol with Parameter instances replaced by Value
 
         """
+        if self._processed_symbols is None:
+            return self._process_symbol(symbol)
+        try:
+            return self._processed_symbols[symbol.id]
+        except KeyError:
+            processed_symbol = self._process_symbol(symbol)
+            self._processed_symbols[symbol.id] = processed_symbol
+            return processed_symbol
+
+    def _process_symbol(self, symbol):
+        """ See :meth:`ParameterValues.process_symbol()`. """
         if isinstance(symbol, pybamm.Parameter):
             value = self.get_parameter_value(symbol)
+            if isinstance(value, str) and value == "[input]":
+                return pybamm.InputParameter(symbol.name, domain=symbol.domain)
             return pybamm.Scalar(value, domain=symbol.domain)
 
         elif isinstance(symbol, pybamm.FunctionParameter):
@@ -180,6 +241,53 @@ class ParameterValues(dict):
             return pybamm.Concatenation(*new_children)
 
         else:
-            new_symbol = copy.deepcopy(symbol)
-            new_symbol.parent = None
-            return new_symbol
+            # symbols are immutable, so can be reused in the new expression tree
+            return symbol
+
+
+def parse_parameters_csv(lines):
+    """
+    Parse the lines of a parameters csv file. See
+    :meth:`ParameterValues.read_parameters_csv()`.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        The lines of the file (e.g. the open file)
+
+    Returns
+    -------
+    dict
+        {name: value} pairs for the parameters.
+
+    Raises
+    ------
+    ValueError
+        If the header row doesn't have "Name" and "Value" columns
+    """
+    rows = (
+        row
+        for row in csv.reader(lines)
+        if any(row) and not row[0].lstrip().startswith("#")
+    )
+    header = next(rows, [])
+    try:
+        name_column = header.index("Name")
+        value_column = header.index("Value")
+    except ValueError:
+        raise ValueError(
+            "expected a header row with 'Name' and 'Value' columns, but got "
+            "{}".format(header)
+        )
+
+    parameters = {}
+    for row in rows:
+        name = row[name_column] if name_column < len(row) else ""
+        if not name:
+            continue
+        value = row[value_column].strip() if value_column < len(row) else ""
+        try:
+            parameters[name] = float(value) if value else float("nan")
+        except ValueError:
+            parameters[name] = value
+    return parameters
@@ -5,95 +5,156 @@ from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 import pybamm
 
-import pickle
-import os
+import copy
+import numpy as np
 
 
 class Simulation(object):
     """
-    The simulation class for a battery model.
+    The simulation class for a battery model: processes the parameters of the model,
+    discretises it and solves it.
+
+    If it is given a :class:`pybamm.ModelCache`, the processed and discretised model
+    is kept there, keyed by a content hash of the model and settings (see
+    :func:`pybamm.content_hash()`), so that running the same simulation again (in
+    this or a later python session) skips parameter processing and discretisation.
+    The cached models are loaded with :mod:`pickle`, so the cache directory must
+    only be writable by trusted users.
 
     Parameters
     ---------
-    model : pybamm.models.(modelname).(ModelName)() instance
-        The model to be used for the simulation. (modelname) and (ModelName)
-        refer to a module and class to be chosen.
-    param : :class:`pybamm.ParameterValues.Parameters` instance
-        The parameters to be used for the simulation.
-    mesh : :class:`pybamm.mesh.Mesh` instance
-        The mesh to be used for the simulation.
-    solver : :class:`pybamm.solver.Solver` instance
-        The algorithm for solving the model.
+    model : :class:`pybamm.BaseModel` (or subclass)
+        The model to be used for the simulation, before its parameters are processed.
+        It is not modified.
+    parameter_values : :class:`pybamm.ParameterValues`, optional
+        The parameters to be used for the simulation (default is the default
+        parameter values of the model). The settings below also default to those of
+        the model.
+    geometry : :class:`pybamm.Geometry`, optional
+        The geometry of the mesh
+    submesh_types : dict, optional
+        The type of submesh of each domain
+    submesh_pts : dict, optional
+        The number of points in each submesh
+    spatial_methods : dict, optional
+        The spatial method of each domain
+    solver : :class:`pybamm.BaseSolver`, optional
+        The algorithm for solving the model
     name : string, optional
         The simulation name.
+    cache : :class:`pybamm.ModelCache`, optional
+        The cache of processed models. If None (default), no cache is used and the
+        model is processed every time it is built.
 
     """
 
-    def __init__(self, model, param=None, mesh=None, solver=None, name="unnamed"):
+    def __init__(
+        self,
+        model,
+        parameter_values=None,
+        geometry=None,
+        submesh_types=None,
+        submesh_pts=None,
+        spatial_methods=None,
+        solver=None,
+        name="unnamed",
+        cache=None,
+    ):
         # Defaults
-        if param is None:
-            param = pybamm.ParameterValues()
-        if mesh is None:
-            mesh = pybamm.Mesh(param)
+        if parameter_values is None:
+            parameter_values = model.default_parameter_values
+        if geometry is None:
+            geometry = model.default_geometry
+        if submesh_types is None:
+            submesh_types = model.default_submesh_types
+        if submesh_pts is None:
+            submesh_pts = model.default_submesh_pts
+        if spatial_methods is None:
+            spatial_methods = model.default_spatial_methods
         if solver is None:
-            solver = pybamm.Solver()
+            solver = model.default_solver
 
         # Assign attributes
         self.model = model
-        self.param = param
-        self.mesh = mesh
+        self.parameter_values = parameter_values
+        self.geometry = geometry
+        self.submesh_types = submesh_types
+        self.submesh_pts = submesh_pts
+        self.spatial_methods = spatial_methods
         self.solver = solver
         self.name = name
-
-        # Initialise simulation to prepare for solving
-        # Set mesh dependent parameters
-        self.param.set_mesh(self.mesh)
-
-        # Create operators from solver
-        self.operators = self.solver.operators(self.mesh)
-
-        # Assign param, operators and mesh as model attributes
-        self.model.set_simulation(self.param, self.operators, self.mesh)
+        self.cache = cache
+        self.built_model = None
 
     def __str__(self):
         return self.name
 
-    def run(self, use_force=False):
+    @property
+    def content_hash(self):
         """
-        Run the simulation.
+        The content hash of the model and settings (see
+        :func:`pybamm.content_hash()`), or None if they can't be hashed
+        """
+        try:
+            return pybamm.content_hash(
+                pybamm.VERSION,
+                self.model,
+                self.parameter_values,
+                self.geometry,
+                self.submesh_types,
+                self.submesh_pts,
+                self.spatial_methods,
+            )
+        except TypeError:
+            return None
+
+    def build(self, use_force=False):
+        """
+        Process the parameters of (a copy of) the model and discretise it, or load
+        the processed model from the cache if it is there. The processed model is
+        stored in `built_model`.
 
         Parameters
         ----------
         use_force : boolean, optional
-            If False (default), use a stored solution (if it exists). Otherwise, run the
-            model.
+            If False (default), use a cached model (if there is a cache, and the
+            model is in it). Otherwise, process the model again (and replace the
+            cached model).
         """
-        # if not use_force and os.path.isfile(self.filename):
-        #     self.load()
-        # else:
-        self.vars = self.solver.get_simulation_vars(self)
-        # self.save()
-
-    def average(self):
-        """Average simulation variable attributes over the relevant (sub)domain."""
-        self.vars.average()
-
-    @property
-    def filename_io(self):
-        path = os.path.join("out", "simulations")
-        filename = "model_{}_solver_{}".format(
-            pickle.dumps(self.model), pickle.dumps(self.solver)
-        )
-        return os.path.join(path, filename)
-
-    def load(self):
-        """Load saved simulation if it exists."""
-        with open(self.filename_io, "rb") as input:
-            return pickle.load(input)
-
-    def save(self):
-        """Save simulation."""
-        raise NotImplementedError
+        key = self.content_hash if self.cache else None
+        model = None
+        if key is not None and not use_force:
+            model = self.cache.get(key)
+        if model is None:
+            model = copy.deepcopy(self.model)
+            geometry = copy.deepcopy(self.geometry)
+            self.parameter_values.process_geometry(geometry)
+            self.parameter_values.process_model(model)
+            mesh = pybamm.Mesh(geometry, self.submesh_types, self.submesh_pts)
+            # the discretisation adds the domains of "macroscale" to the spatial
+            # methods, so give it a copy
+            disc = pybamm.Discretisation(mesh, dict(self.spatial_methods))
+            disc.process_model(model)
+            if key is not None:
+                self.cache.put(key, model)
+        self.built_model = model
+
+    def run(self, t_eval=None, use_force=False):
+        """
+        Run the simulation. The solution is stored in `t` and `y`.
 
-    def plot(self):
-        raise NotImplementedError
+        Parameters
+        ----------
+        t_eval : numeric type, optional
+            The times at which to compute the solution (default is 100 times between
+            0 and 1)
+        use_force : boolean, optional
+            If False (default), use a cached processed model (if it exists).
+            Otherwise, process the model again.
+        """
+        if t_eval is None:
+            t_eval = np.linspace(0, 1, 100)
+        self.build(use_force)
+        self.solver.solve(self.built_model, t_eval)
+        self.t = self.solver.t
+        self.y = self.solver.y
@@ -3,6 +3,7 @@
 #
 from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
+import pybamm
 
 
 class BaseSolver(object):
@@ -12,10 +13,16 @@ class BaseSolver(object):
     ----------
     tolerance : float, optional
         The tolerance for the solver (default is 1e-8).
+    evaluator : str, optional
+        How the model equations are evaluated during the solve (default is "python").
+        "python" compiles each expression tree into a python function (see
+        :class:`pybamm.EvaluatorPython`), "tape" flattens each expression tree into a
+        tape of instructions (see :class:`pybamm.EvaluatorTape`).
     """
 
-    def __init__(self, tol=1e-8):
+    def __init__(self, tol=1e-8, evaluator="python"):
         self._tol = tol
+        self.evaluator = evaluator
 
         # Solutions
         self._t = None
@@ -29,6 +36,58 @@ class BaseSolver(object):
     def tol(self, value):
         self._tol = value
 
+    @property
+    def evaluator(self):
+        return self._evaluator
+
+    @evaluator.setter
+    def evaluator(self, value):
+        if value not in ["python", "tape"]:
+            raise ValueError(
+                "evaluator must be 'python' or 'tape', not '{}'".format(value)
+            )
+        self._evaluator = value
+
+    def get_evaluator(self, symbol):
+        """Create the object that evaluates `symbol` during the solve, depending on
+        self.evaluator. The evaluator is created once and then called for every rhs,
+        residual or event evaluation.
+
+        Parameters
+        ----------
+        symbol : :class:`pybamm.Symbol`
+            The discretised expression tree to evaluate
+
+        Returns
+        -------
+        :class:`pybamm.EvaluatorPython` or :class:`pybamm.EvaluatorTape`
+            A callable object with the same signature as
+            :meth:`pybamm.Symbol.evaluate()`
+        """
+        if self.evaluator == "tape":
+            return pybamm.EvaluatorTape(symbol)
+        else:
+            return pybamm.EvaluatorPython(symbol)
+
+    def get_shared_evaluators(self, symbols):
+        """Create the objects that evaluate each of `symbols` during the solve, sharing
+        a single :class:`pybamm.SharedEvaluator` so that the subexpressions common to
+        several of the symbols are only evaluated once at each (t, y).
+
+        Parameters
+        ----------
+        symbols : list of :class:`pybamm.Symbol`
+            The discretised expression trees to evaluate
+
+        Returns
+        -------
+        list
+            A callable object for each symbol, with the same signature as
+            :meth:`pybamm.Symbol.evaluate()`
+        """
+        shared_evaluator = pybamm.SharedEvaluator(symbols, self.evaluator)
+        return [shared_evaluator[i] for i in range(len(symbols))]
+
     @property
     def t(self):
         return self._t
@@ -45,7 +104,7 @@ class BaseSolver(object):
     def y(self, value):
         self._y = value
 
-    def solve(self, model, t_eval):
+    def solve(self, model, t_eval, inputs=None):
         """Calculate the solution of the model at specified times.
 
         Parameters
@@ -55,6 +114,36 @@ class BaseSolver(object):
             initial_conditions
         t_eval : numeric type
             The times at which to compute the solution
+        inputs : dict, optional
+            The values of any :class:`pybamm.InputParameter` in the model, keyed by
+            name. The same discretised model can be solved for different inputs
+            without being processed again.
+
+        """
+
+        raise NotImplementedError
+
+    def solve_batch(self, model, t_eval, inputs_list):
+        """Calculate the solution of the model for each of several values of its
+        inputs, integrating them together as a single system.
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel` (or subclass)
+            The model whose solution to calculate. Must have attributes rhs and
+            initial_conditions
+        t_eval : numeric type
+            The times at which to compute the solution
+        inputs_list : list of dict
+            The values of the input parameters (see :class:`pybamm.InputParameter`)
+            of each member of the batch
+
+        Returns
+        -------
+        t : list of :class:`numpy.array`
+            The times of the solution of each member
+        y : list of :class:`numpy.array`
+            The values of the solution of each member
 
         """
 
@@ -7,6 +7,8 @@ from __future__ import print_function, unicode_literals
 import pybamm
 import numpy as np
 
+sparse = pybamm.util.lazy_import("scipy.sparse")
+
 
 class DaeSolver(pybamm.BaseSolver):
     """Solve a discretised model.
@@ -20,7 +22,7 @@ class DaeSolver(pybamm.BaseSolver):
     def __init__(self, tol=1e-8):
         super().__init__(tol)
 
-    def solve(self, model, t_eval):
+    def solve(self, model, t_eval, inputs=None):
         """Calculate the solution of the model at specified times.
 
         Parameters
@@ -30,18 +32,36 @@ class DaeSolver(pybamm.BaseSolver):
             initial_conditions
         t_eval : numeric type
             The times at which to compute the solution
+        inputs : dict, optional
+            The values of any :class:`pybamm.InputParameter` in the model, keyed by
+            name
 
         """
 
+        # Compile the rhs and algebraic equations once, to avoid walking the
+        # expression tree at every call. They are compiled together so that
+        # subexpressions that appear in both are only evaluated once
+        equations = pybamm.SharedEvaluator(
+            [model.concatenated_rhs, model.concatenated_algebraic], self.evaluator
+        )
+        concatenated_rhs, concatenated_algebraic = equations[0], equations[1]
+
         def residuals(t, y, ydot):
-            rhs_eval = model.concatenated_rhs.evaluate(t, y)
+            rhs_eval = concatenated_rhs.evaluate(t, y, inputs)
             return np.concatenate(
                 (
                     rhs_eval - ydot[: rhs_eval.shape[0]],
-                    model.concatenated_algebraic.evaluate(t, y),
+                    concatenated_algebraic.evaluate(t, y, inputs),
                 )
             )
 
+        def residuals_into(t, y, ydot, out):
+            # write the rhs and algebraic equations straight into their slices of
+            # the residuals
+            rhs_out = out[:n_rhs]
+            equations.evaluate_into([rhs_out, out[n_rhs:]], t, y, inputs)
+            rhs_out -= ydot[:n_rhs]
+
         y0 = model.concatenated_initial_conditions
         ydot0 = model.concatenated_initial_conditions_ydot
 
@@ -54,9 +74,47 @@ class DaeSolver(pybamm.BaseSolver):
             "function {}".format(y0.shape, residuals(0, y0, ydot0).shape)
         )
 
-        self.t, self.y = self.integrate(residuals, y0, ydot0, t_eval)
+        # The residuals depend on ydot through the rhs equations only, with
+        # derivative -mass_matrix
+        n_rhs = concatenated_rhs.evaluate(0, y0, inputs).shape[0]
+        mass_matrix = sparse.diags(
+            np.concatenate((np.ones(n_rhs), np.zeros(y0.shape[0] - n_rhs)))
+        )
+
+        # Compile the Jacobian, if the model has one (otherwise the solver can use
+        # the sparsity pattern of the Jacobian to calculate it by finite differences)
+        if model.jacobian is not None:
+            concatenated_jacobian = self.get_evaluator(model.jacobian)
+
+            def jacobian(t, y):
+                return concatenated_jacobian.evaluate(t, y, inputs)
+
+        else:
+            jacobian = None
+
+        self.t, self.y = self.integrate(
+            residuals,
+            y0,
+            ydot0,
+            t_eval,
+            jacobian=jacobian,
+            jacobian_sparsity=model.jacobian_sparsity,
+            mass_matrix=mass_matrix,
+            residuals_into=residuals_into,
+        )
 
-    def integrate(self, residuals, y0, ydot0, t_eval, events=None):
+    def integrate(
+        self,
+        residuals,
+        y0,
+        ydot0,
+        t_eval,
+        events=None,
+        jacobian=None,
+        jacobian_sparsity=None,
+        mass_matrix=None,
+        residuals_into=None,
+    ):
         """
         Solve a DAE model defined by residuals with initial conditions y0 and ydot0.
 
@@ -72,6 +130,22 @@ class DaeSolver(pybamm.BaseSolver):
         events : method, optional
             A function that takes in t and y and returns conditions for the solver to
             stop
+        jacobian : method, optional
+            A function that takes in t and y and returns the Jacobian of the
+            equations (rhs and algebraic) with respect to y, as a
+            :class:`scipy.sparse` matrix
+        jacobian_sparsity : :class:`scipy.sparse` matrix, optional
+            The sparsity pattern of the Jacobian of the equations with respect to y,
+            used to calculate the Jacobian by finite differences if `jacobian` is not
+            given
+        mass_matrix : :class:`scipy.sparse` matrix, optional
+            The (diagonal) mass matrix of the model, such that the Jacobian of the
+            residuals with respect to ydot is `-mass_matrix`
+        residuals_into : method, optional
+            A function that takes in t, y, ydot and a preallocated array, and writes
+            the residuals into the array (see :meth:`pybamm.Symbol.evaluate_into()`),
+            used instead of `residuals` by the solvers that own the array of the
+            residuals
 
         """
         raise NotImplementedError
@@ -0,0 +1,402 @@
+#
+# Solver class using exponential time differencing
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import numpy as np
+
+sparse = pybamm.util.lazy_import("scipy.sparse")
+linalg = pybamm.util.lazy_import("scipy.linalg")
+
+
+class ExponentialSolver(pybamm.OdeSolver):
+    """Solve a discretised model whose rhs is linear or semi-linear in y, i.e.
+    `A @ y + b(t) + g(t, y)` with a constant matrix `A` (see
+    :func:`pybamm.linear_decomposition()`), by exponential integration.
+
+    The linear part is integrated exactly, using the matrix exponential of `A`, so
+    the step size is not limited by the stiffness of `A`: if the rhs is `A @ y + b`
+    with a constant `b`, each interval of `t_eval` is a single exact step. Otherwise,
+    the steps are adapted to the tolerance, using the difference between two
+    schemes of different orders as the error estimate. If the rhs is affine, the
+    steps use the second-order exponential Runge-Kutta scheme ETD2RK (Cox and
+    Matthews, 2002), which treats `b` explicitly. Otherwise, they use the
+    third-order exponential Rosenbrock scheme exprb32 (Hochbruck and Ostermann,
+    2010), which integrates the linearisation of the whole rhs at the start of each
+    step exactly, so that a stiff nonlinear part doesn't limit the step size either.
+    The Jacobian of the rhs is the model's, or (if it doesn't have one) is found by
+    finite differences from its sparsity pattern (see
+    :class:`pybamm.FiniteDifferenceJacobian`). If neither is available, the steps
+    are ETD2RK steps that treat `g` explicitly (so they only take large steps if `g`
+    is not stiff).
+
+    If the linear part is a product of two matrices `L @ (R @ y)` (e.g. the
+    divergence of a gradient), the exponentials are found from those of `R @ L`,
+    since `phi_j(h L R) = I / j! + h L phi_(j+1)(h R L) R`. The differences taken by
+    `R` are then never added up into the rounding errors of `L @ R`, so a uniform
+    state stays uniform however large the entries of `A` are.
+
+    The matrix functions are found as dense matrices if the matrix is small (and
+    reused while the step size doesn't change), and otherwise by
+    :func:`scipy.sparse.linalg.expm_multiply` at each step, whose cost grows with
+    the norm of `hA` (so it is only suited to large, moderately stiff models).
+
+    Parameters
+    ----------
+    tol : float, optional
+        The tolerance for the solver (default is 1e-8), used as both the relative
+        and absolute tolerance of the adaptive steps
+    max_dense_size : int, optional
+        The largest size of a matrix whose matrix functions are found as dense
+        matrices (default is 500)
+    max_steps : int, optional
+        The largest number of steps (including rejected ones) taken to find the
+        solution (default is 100000), after which the solution stops
+
+    **Extends**: :class:`pybamm.OdeSolver`
+    """
+
+    def __init__(self, tol=1e-8, max_dense_size=500, max_steps=100000):
+        super().__init__(tol)
+        self.max_dense_size = max_dense_size
+        self.max_steps = max_steps
+
+    def solve(self, model, t_eval, inputs=None):
+        """Calculate the solution of the model at specified times.
+
+        Parameters
+        ----------
+        model : :class:`pybamm.BaseModel` (or subclass)
+            The model whose solution to calculate. Must have been discretised, so
+            that it has a linear decomposition of its rhs
+        t_eval : numeric type
+            The times at which to compute the solution
+        inputs : dict, optional
+            The values of any :class:`pybamm.InputParameter` in the model, keyed by
+            name
+
+        Raises
+        ------
+        :class:`pybamm.ModelError`
+            If the model doesn't have a linear decomposition of its rhs, or its rhs
+            is nonlinear, has no linear part, and has neither a Jacobian nor the
+            sparsity pattern of one
+        """
+        decomposition = model.linear_decomposition
+        if decomposition is None:
+            raise pybamm.ModelError(
+                "the exponential solver requires the linear decomposition of the rhs "
+                "of the model (see pybamm.linear_decomposition)"
+            )
+        y0 = model.concatenated_initial_conditions
+        zero = pybamm.Vector(np.zeros(np.size(y0)))
+
+        def evaluator(symbol):
+            def evaluate(t, y):
+                return np.reshape(symbol.evaluate(t, y, inputs), -1)
+
+            return evaluate
+
+        if decomposition.is_affine or (
+            model.jacobian is None and model.jacobian_sparsity is None
+        ):
+            # ETD2RK, with the linear part and the rest of the rhs (compiled
+            # together with the events, so that their common subexpressions are only
+            # evaluated once at each (t, y))
+            if decomposition.linear is None and not decomposition.is_affine:
+                raise pybamm.ModelError(
+                    "the exponential solver requires a linear part, a Jacobian or "
+                    "the sparsity pattern of a Jacobian for a nonlinear rhs"
+                )
+            nonlinear = zero
+            for part in [decomposition.b, decomposition.g]:
+                if part is not None:
+                    nonlinear = part if nonlinear is zero else nonlinear + part
+            linear, nonlinear, *events = self.get_shared_evaluators(
+                [decomposition.linear or zero, nonlinear] + model.events
+            )
+            stepper = ExponentialStepper(
+                *self.linear_factors(decomposition), self.max_dense_size
+            )
+            linear, nonlinear = evaluator(linear), evaluator(nonlinear)
+
+            def step(t, y, h):
+                return self.etd2rk_step(stepper, linear, nonlinear, t, y, h)
+
+        else:
+            # exprb32, with the whole rhs and its Jacobian (calculated by finite
+            # differences if the model doesn't have one)
+            rhs, *events = self.get_shared_evaluators(
+                [decomposition.symbol] + model.events
+            )
+            rhs = evaluator(rhs)
+            if model.jacobian is not None:
+                concatenated_jacobian = self.get_evaluator(model.jacobian)
+
+                def jacobian(t, y):
+                    return concatenated_jacobian.evaluate(t, y, inputs)
+
+            else:
+                jacobian = pybamm.FiniteDifferenceJacobian(rhs, model.jacobian_sparsity)
+
+            def step(t, y, h):
+                return self.exprb32_step(rhs, jacobian, t, y, h)
+
+        events = [evaluator(event) for event in events]
+        self.t, self.y = self.integrate_exponential(step, y0, t_eval, events=events)
+
+    def linear_factors(self, decomposition):
+        """
+        Write the matrix `A` of the linear part of a decomposition as a product of
+        two sparse matrices `L @ R`, taking the factors of its expression tree if it
+        is `L @ (R @ y)` (and otherwise `L` is None, i.e. the identity, and `R` is
+        `A`)
+
+        Parameters
+        ----------
+        decomposition : :class:`pybamm.LinearDecomposition`
+            The decomposition of the rhs of the model
+
+        Returns
+        -------
+        tuple
+            The matrices `R` and `L` (or None)
+        """
+        linear = decomposition.linear
+        if (
+            isinstance(linear, pybamm.MatrixMultiplication)
+            and isinstance(linear.children[0], pybamm.Matrix)
+            and isinstance(linear.children[1], pybamm.MatrixMultiplication)
+            and isinstance(linear.children[1].children[0], pybamm.Matrix)
+            and isinstance(linear.children[1].children[1], pybamm.StateVector)
+        ):
+            right = sparse.csr_matrix(linear.children[1].children[0].entries)
+            left = sparse.csr_matrix(linear.children[0].entries)
+            return right, left
+        return sparse.csr_matrix(decomposition.A), None
+
+    def integrate_exponential(self, step, y0, t_eval, events=None):
+        """
+        Solve a model with initial conditions y0, taking steps between the times of
+        `t_eval` with `step`.
+
+        Parameters
+        ----------
+        step : method
+            A function that takes in t, y and a step size h, and returns the solution
+            after the step and an estimate of its error
+        y0 : :class:`numpy.array`
+            The initial conditions
+        t_eval : :class:`numpy.array`
+            The times at which to compute the solution
+        events : list of method, optional
+            Functions that take in t and y; the solution stops at the last time in
+            `t_eval` before one of them changes sign
+
+        Returns
+        -------
+        tuple of :class:`numpy.array`
+            The times reached, and the solution at those times (one column per
+            time). If an event was reached, the step size became too small, or
+            `max_steps` steps were taken, these stop before the end of `t_eval`.
+        """
+        events = events or []
+        t, y = t_eval[0], np.reshape(np.asarray(y0, dtype=float), -1)
+        t_out, y_out = [t], [y]
+        event_signs = [np.sign(event(t, y)) for event in events]
+
+        # the step sizes are the length of the interval divided by a power of 2, so
+        # that the matrix functions can be reused
+        level = 0
+        n_steps = 0
+        for t_next in t_eval[1:]:
+            interval = t_next - t
+            while t < t_next:
+                if n_steps == self.max_steps:
+                    return np.array(t_out), np.array(y_out).T
+                n_steps += 1
+                h = min(interval / 2**level, t_next - t)
+                y_new, error = step(t, y, h)
+                scale = self.tol + self.tol * np.maximum(np.abs(y), np.abs(y_new))
+                error = np.sqrt(np.mean((error / scale) ** 2))
+                if not error <= 1:
+                    if level == MAX_LEVEL:
+                        return np.array(t_out), np.array(y_out).T
+                    level += 1
+                    continue
+                t, y = t + h, y_new
+                if t_next - t <= 1e-12 * interval:
+                    t = t_next
+                if any(
+                    np.sign(event(t, y)) != sign
+                    for event, sign in zip(events, event_signs)
+                ):
+                    return np.array(t_out), np.array(y_out).T
+                if error < 0.25 and level > 0:
+                    level -= 1
+            t_out.append(t)
+            y_out.append(y)
+        return np.array(t_out), np.array(y_out).T
+
+    def etd2rk_step(self, stepper, linear, nonlinear, t, y, h):
+        """
+        Take an ETD2RK step of size h from (t, y). The first-order prediction is
+        `a = exp(hA) y + h phi_1(hA) N(t, y) = y + h phi_1(hA) f(t, y)`, where `N` is
+        the nonlinear part and `f` the rhs, and the correction (which estimates the
+        error of the prediction) is `h phi_2(hA) (N(t + h, a) - N(t, y))`.
+
+        Returns
+        -------
+        tuple of :class:`numpy.array`
+            The solution after the step, and the correction
+        """
+        nonlinear_y = nonlinear(t, y)
+        prediction = y + stepper.phi(1, h, linear(t, y) + nonlinear_y)
+        difference = nonlinear(t + h, prediction) - nonlinear_y
+        if not np.any(difference):
+            return prediction, difference
+        correction = stepper.phi(2, h, difference)
+        return prediction + correction, correction
+
+    def exprb32_step(self, rhs, jacobian, t, y, h):
+        """
+        Take an exprb32 step of size h from (t, y). With `J` the Jacobian of the rhs
+        `f` at (t, y), the second-order (exponential Rosenbrock-Euler) prediction is
+        `a = y + h phi_1(hJ) f(t, y) + h phi_2(hJ) (f(t + h, y) - f(t, y))` (the
+        last term accounts for the dependence of `f` on t), and the correction
+        (which estimates the error of the prediction) is `2 h phi_3(hJ) D`, where
+        `D = f(t + h, a) - f(t + h, y) - J (a - y)` is the nonlinear remainder.
+
+        Returns
+        -------
+        tuple of :class:`numpy.array`
+            The solution after the step, and the correction
+        """
+        stepper = ExponentialStepper(
+            jacobian(t, y), None, self.max_dense_size, reuse=False
+        )
+        rhs_y = rhs(t, y)
+        rhs_next = rhs(t + h, y)
+        prediction = y + stepper.phi(1, h, rhs_y) + stepper.phi(2, h, rhs_next - rhs_y)
+        remainder = (
+            rhs(t + h, prediction) - rhs_next - stepper.matrix @ (prediction - y)
+        )
+        correction = 2 * stepper.phi(3, h, remainder)
+        return prediction + correction, correction
+
+
+# The largest number of times a step can be halved
+MAX_LEVEL = 40
+
+
+class ExponentialStepper(object):
+    """
+    Apply the matrix functions `h phi_j(hA)` (with `phi_0(z) = exp(z)` and
+    `phi_(j+1)(z) = (phi_j(z) - 1 / j!) / z`) of a matrix `A` to vectors. If `A` is
+    given as a product `L @ R`, they are found from those of `K = R @ L`. See
+    :class:`pybamm.ExponentialSolver`.
+
+    Parameters
+    ----------
+    right : :class:`scipy.sparse.csr_matrix`
+        The matrix `A`, or its right factor `R`
+    left : :class:`scipy.sparse.csr_matrix` or None
+        The left factor `L` of `A` (or None if `right` is `A`)
+    max_dense_size : int
+        The largest size of `K` for which its matrix functions are found as dense
+        matrices
+    reuse : bool, optional
+        Whether the stepper is used for many steps (default is True), in which case
+        the dense matrices `phi_k(hK)` are found and kept for each step size h.
+        Otherwise, each product is found from the exponential of a matrix only
+        slightly larger than `K`
+    """
+
+    def __init__(self, right, left, max_dense_size, reuse=True):
+        self.right = sparse.csr_matrix(right)
+        self.left = left
+        if left is None:
+            self.K = self.right
+        else:
+            self.K = sparse.csr_matrix(self.right @ left)
+        self.dense = self.K.shape[0] <= max_dense_size
+        self.reuse = reuse
+        # the dense matrices h^k phi_k(hK), {h: [h phi_1(hK), h^2 phi_2(hK), ...]}
+        self._phi_matrices = {}
+
+    @property
+    def matrix(self):
+        """The matrix `A`"""
+        if self.left is None:
+            return self.right
+        return self.left @ self.right
+
+    def phi(self, j, h, vector):
+        """
+        Returns `h phi_j(hA) @ vector`, for j = 1, 2 or 3 (or j = 1 or 2 if
+        `A = L @ R`, in which case this is `h / j! vector + h^2 L phi_(j+1)(hK) R
+        vector`)
+        """
+        if self.left is None:
+            return self.phi_K(j, h, vector) / h ** (j - 1)
+        return h / FACTORIALS[j] * vector + self.left @ self.phi_K(
+            j + 1, h, self.right @ vector
+        ) / h ** (j - 1)
+
+    def phi_K(self, k, h, vector):
+        """Returns `h^k phi_k(hK) @ vector`"""
+        if self.dense and self.reuse:
+            return self.phi_matrices(h)[k - 1] @ vector
+        # the top block of exp(h [[K, W], [0, J]]) @ [0, e_k], where the first column
+        # of W is `vector` (and the others are zero) and J shifts the extra entries,
+        # is h^k phi_k(hK) @ vector
+        m = self.K.shape[0]
+        augmented = sparse.bmat(
+            [
+                [
+                    self.K,
+                    sparse.hstack(
+                        [sparse.csr_matrix(np.reshape(vector, (-1, 1)))]
+                        + [sparse.csr_matrix((m, 1))] * (k - 1)
+                    ),
+                ],
+                [None, sparse.eye(k, k, 1)],
+            ],
+            format="csr",
+        )
+        if self.dense:
+            return linalg.expm(h * augmented.toarray())[:m, -1]
+        start = np.zeros(m + k)
+        start[-1] = 1
+        return sparse.linalg.expm_multiply(h * augmented, start)[:m]
+
+    def phi_matrices(self, h):
+        """
+        Returns the dense matrices `h^k phi_k(hK)` for k = 1, 2, 3, which are the
+        blocks of the first row of the exponential of the block matrix with `hK` in
+        its first block, and identities just above its diagonal, times `h^k`
+        """
+        try:
+            return self._phi_matrices[h]
+        except KeyError:
+            pass
+        m = self.K.shape[0]
+        n_blocks = len(FACTORIALS)
+        blocks = np.zeros((n_blocks * m, n_blocks * m))
+        blocks[:m, :m] = h * self.K.toarray()
+        for k in range(n_blocks - 1):
+            blocks[k * m : (k + 1) * m, (k + 1) * m : (k + 2) * m] = np.eye(m)
+        exponential = linalg.expm(blocks)
+        matrices = [
+            h**k * exponential[:m, k * m : (k + 1) * m] for k in range(1, n_blocks)
+        ]
+        if len(self._phi_matrices) > 100:
+            self._phi_matrices.clear()
+        self._phi_matrices[h] = matrices
+        return matrices
+
+
+# The factorials j! of the orders j of the matrix functions phi_j that are used
+FACTORIALS = [1, 1, 2, 6]
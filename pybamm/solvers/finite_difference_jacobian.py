@@ -0,0 +1,124 @@
+#
+# Finite-difference Jacobian using a column colouring of the sparsity pattern
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+
+import pybamm
+import numpy as np
+
+sparse = pybamm.util.lazy_import("scipy.sparse")
+
+
+def colour_columns(sparsity):
+    """
+    Colour the columns of a sparsity pattern (greedily, in order) so that no two
+    columns of the same colour have a nonzero in the same row. All the columns of
+    one colour can then be perturbed at once when calculating a finite-difference
+    Jacobian.
+
+    Parameters
+    ----------
+    sparsity : :class:`scipy.sparse` matrix
+        The sparsity pattern of the Jacobian
+
+    Returns
+    -------
+    :class:`numpy.array`
+        The colour of each column (colours are numbered from 0)
+    """
+    sparsity = sparse.csc_matrix(sparsity, dtype=bool)
+    # two columns are adjacent if they have a nonzero in the same row
+    adjacency = sparse.csr_matrix(sparsity.T.astype(int) @ sparsity.astype(int))
+
+    n_columns = sparsity.shape[1]
+    colours = np.full(n_columns, -1)
+    for column in range(n_columns):
+        neighbours = adjacency.indices[
+            adjacency.indptr[column] : adjacency.indptr[column + 1]
+        ]
+        used = colours[neighbours]
+        # smallest colour not used by any (already coloured) neighbour
+        colour = 0
+        used = set(used[used >= 0])
+        while colour in used:
+            colour += 1
+        colours[column] = colour
+    return colours
+
+
+class FiniteDifferenceJacobian(object):
+    """
+    Calculate the Jacobian of a function by forward differences, perturbing all
+    the columns of one colour (see :func:`pybamm.colour_columns()`) at once. This
+    needs one function evaluation per colour, instead of one per column.
+
+    Parameters
+    ----------
+    func : method
+        The function to differentiate, which takes in t and y (and any extra
+        arguments) and returns a vector
+    sparsity : :class:`scipy.sparse` matrix
+        The sparsity pattern of the Jacobian of `func` with respect to y
+    """
+
+    def __init__(self, func, sparsity):
+        self.func = func
+        self._sparsity = sparse.csr_matrix(sparsity, dtype=bool)
+        self._colours = colour_columns(self._sparsity)
+        rows, columns = self._sparsity.nonzero()
+        self._rows = rows
+        self._columns = columns
+
+    @property
+    def sparsity(self):
+        return self._sparsity
+
+    @property
+    def colours(self):
+        return self._colours
+
+    @property
+    def n_colours(self):
+        if len(self._colours) == 0:
+            return 0
+        return self._colours.max() + 1
+
+    def __call__(self, t, y, *args, f0=None):
+        """
+        Calculate the Jacobian of `func` at (t, y)
+
+        Parameters
+        ----------
+        t : float
+            The time at which to calculate the Jacobian
+        y : :class:`numpy.array`
+            The state vector at which to calculate the Jacobian
+        *args
+            Any extra arguments to pass to `func`
+        f0 : :class:`numpy.array`, optional
+            The value of `func` at (t, y), if already known
+
+        Returns
+        -------
+        :class:`scipy.sparse.csr_matrix`
+            The Jacobian
+        """
+        if f0 is None:
+            f0 = self.func(t, y, *args)
+        # step size for each column
+        step = np.sqrt(np.finfo(float).eps) * np.maximum(1, np.abs(y))
+        data = np.empty(len(self._rows))
+        for colour in range(self.n_colours):
+            perturbed = self._colours == colour
+            y_perturbed = y + step * perturbed
+            # the steps actually taken (after rounding)
+            step_taken = y_perturbed - y
+            difference = self.func(t, y_perturbed, *args) - f0
+            entries = perturbed[self._columns]
+            data[entries] = (
+                difference[self._rows[entries]] / step_taken[self._columns[entries]]
+            )
+        return sparse.csr_matrix(
+            (data, (self._rows, self._columns)), shape=self._sparsity.shape
+        )
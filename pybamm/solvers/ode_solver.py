@@ -5,6 +5,7 @@ from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 
 import pybamm
+import numpy as np
 
 
 class OdeSolver(pybamm.BaseSolver):
@@ -19,7 +20,7 @@ class OdeSolver(pybamm.BaseSolver):
     def __init__(self, tol=1e-8):
         super().__init__(tol)
 
-    def solve(self, model, t_eval):
+    def solve(self, model, t_eval, inputs=None):
         """Calculate the solution of the model at specified times.
 
         Parameters
@@ -29,18 +30,190 @@ class OdeSolver(pybamm.BaseSolver):
             initial_conditions
         t_eval : numeric type
             The times at which to compute the solution
+        inputs : dict, optional
+            The values of any :class:`pybamm.InputParameter` in the model, keyed by
+            name
 
         """
 
+        # If the model has a linear decomposition, evaluate the rhs as its linear,
+        # constant and nonlinear parts, so that the linear part is evaluated with a
+        # sparse matrix multiplication (see :func:`pybamm.linear_decomposition()`)
+        decomposition = model.linear_decomposition
+        if decomposition is not None:
+            rhs = decomposition.symbol
+        else:
+            rhs = model.concatenated_rhs
+
+        # Compile the rhs and events once, to avoid walking the expression tree at
+        # every call. They are compiled together so that subexpressions that appear
+        # in several of them are only evaluated once at each (t, y)
+        concatenated_rhs, *events = self.get_shared_evaluators([rhs] + model.events)
+
         def dydt(t, y):
-            return model.concatenated_rhs.evaluate(t, y)
+            return concatenated_rhs.evaluate(t, y, inputs)
+
+        def dydt_into(t, y, out):
+            concatenated_rhs.evaluate_into(out, t, y, inputs)
+
+        def event_function(event):
+            def evaluate_event(t, y):
+                return event.evaluate(t, y, inputs)
+
+            return evaluate_event
+
+        events = [event_function(event) for event in events]
+
+        # Compile the Jacobian, if the model has one (otherwise the solver can use
+        # the sparsity pattern of the Jacobian to calculate it by finite differences).
+        # If the rhs is affine, the Jacobian is the constant matrix of its linear part
+        if decomposition is not None and decomposition.is_affine:
+            linear_matrix = decomposition.A
+
+            def jacobian(t, y):
+                return linear_matrix
+
+        elif model.jacobian is not None:
+            concatenated_jacobian = self.get_evaluator(model.jacobian)
+
+            def jacobian(t, y):
+                return concatenated_jacobian.evaluate(t, y, inputs)
 
-        events = [lambda t, y: event.evaluate(t, y) for event in model.events]
+        else:
+            jacobian = None
 
         y0 = model.concatenated_initial_conditions
-        self.t, self.y = self.integrate(dydt, y0, t_eval, events=events)
+        self.t, self.y = self.integrate(
+            dydt,
+            y0,
+            t_eval,
+            events=events,
+            jacobian=jacobian,
+            jacobian_sparsity=model.jacobian_sparsity,
+            derivs_into=dydt_into,
+        )
 
-    def integrate(self, derivs, y0, t_eval, events=None):
+    def solve_batch(self, model, t_eval, inputs_list):
+        """See :meth:`pybamm.BaseSolver.solve_batch()`.
+
+        The state vectors of the members are interleaved into a single state vector
+        (see :func:`pybamm.batch_symbol()`), so that the rhs of every member is
+        evaluated at once, with a single sparse matrix multiplication for each
+        matrix multiplication in the model. The events are evaluated for each member
+        separately: when an event of a member is reached, the solution of that
+        member stops, and the other members carry on from the last time in `t_eval`
+        they reached.
+        """
+        # Compile the events and the Jacobian of a single member once
+        events = self.get_shared_evaluators(model.events)
+        if model.jacobian is not None:
+            concatenated_jacobian = self.get_evaluator(model.jacobian)
+
+        y0 = model.concatenated_initial_conditions
+        t_members = [None] * len(inputs_list)
+        y_members = [None] * len(inputs_list)
+
+        # the members that are still being solved for, with their current state
+        members = list(range(len(inputs_list)))
+        y_current = [y0] * len(members)
+        t_current = t_eval
+        while members:
+            n_batch = len(members)
+            member_inputs = [inputs_list[k] for k in members]
+            inputs = pybamm.batch_inputs(member_inputs)
+
+            concatenated_rhs = self.get_evaluator(
+                pybamm.batch_symbol(model.concatenated_rhs, n_batch, y0)
+            )
+
+            def dydt(t, y):
+                return concatenated_rhs.evaluate(t, y, inputs)
+
+            def dydt_into(t, y, out):
+                concatenated_rhs.evaluate_into(out, t, y, inputs)
+
+            member_events = [
+                MemberEvent(event, i, n_batch, member_inputs[i])
+                for i in range(n_batch)
+                for event in events
+            ]
+
+            # The Jacobian of the batch is block-diagonal, with the Jacobian of each
+            # member in each block
+            if model.jacobian is not None:
+
+                def jacobian(t, y):
+                    return pybamm.batch_matrices(
+                        [
+                            concatenated_jacobian.evaluate(t, y_member, inputs_member)
+                            for y_member, inputs_member in zip(
+                                pybamm.unbatch_vectors(y, n_batch), member_inputs
+                            )
+                        ]
+                    )
+
+            else:
+                jacobian = None
+            if model.jacobian_sparsity is not None:
+                jacobian_sparsity = pybamm.batch_matrices(
+                    [model.jacobian_sparsity] * n_batch
+                )
+            else:
+                jacobian_sparsity = None
+
+            t, y = self.integrate(
+                dydt,
+                pybamm.batch_vectors(y_current),
+                t_current,
+                events=member_events,
+                jacobian=jacobian,
+                jacobian_sparsity=jacobian_sparsity,
+                derivs_into=dydt_into,
+            )
+
+            # Find the members that have finished: if the integration stopped early,
+            # those whose event was reached before the next time in t_current (or
+            # all of them, if no event was reached, e.g. if the integration failed)
+            finished = set(range(n_batch))
+            if len(t) < len(t_current):
+                reached = {
+                    event.index
+                    for event in member_events
+                    if event.t_reached is not None
+                    and event.t_reached <= t_current[len(t)]
+                }
+                finished = reached or finished
+
+            # Add the solution of each member to its solution so far (the first
+            # time of this solution is the last time of the previous one)
+            for i, (k, y_member) in enumerate(
+                zip(members, pybamm.unbatch_vectors(y, n_batch))
+            ):
+                if t_members[k] is None:
+                    t_members[k], y_members[k] = t, np.array(y_member)
+                else:
+                    t_members[k] = np.concatenate([t_members[k], t[1:]])
+                    y_members[k] = np.concatenate(
+                        [y_members[k], y_member[:, 1:]], axis=1
+                    )
+
+            continuing = [i for i in range(n_batch) if i not in finished]
+            members = [members[i] for i in continuing]
+            y_current = [y_members[k][:, -1] for k in members]
+            t_current = t_current[len(t) - 1 :]
+
+        return t_members, y_members
+
+    def integrate(
+        self,
+        derivs,
+        y0,
+        t_eval,
+        events=None,
+        jacobian=None,
+        jacobian_sparsity=None,
+        derivs_into=None,
+    ):
         """
         Solve a model defined by dydt with initial conditions y0.
 
@@ -55,6 +228,54 @@ class OdeSolver(pybamm.BaseSolver):
         events : method, optional
             A function that takes in t and y and returns conditions for the solver to
             stop
+        jacobian : method, optional
+            A function that takes in t and y and returns the Jacobian of dydt with
+            respect to y, as a :class:`scipy.sparse` matrix
+        jacobian_sparsity : :class:`scipy.sparse` matrix, optional
+            The sparsity pattern of the Jacobian of dydt with respect to y, used to
+            calculate the Jacobian by finite differences if `jacobian` is not given
+        derivs_into : method, optional
+            A function that takes in t, y and a preallocated array, and writes dydt
+            into the array (see :meth:`pybamm.Symbol.evaluate_into()`), used instead
+            of `derivs` by the solvers that own the array of dydt
 
         """
         raise NotImplementedError
+
+
+class MemberEvent(object):
+    """
+    An event of a single member of a batch of members integrated together (see
+    :meth:`OdeSolver.solve_batch()`), which records the first time at which it is
+    evaluated past its root, i.e. with the opposite sign to its initial value
+
+    Parameters
+    ----------
+    event : method
+        The event of a single member, which takes in t, y and inputs
+    index : int
+        The index of the member in the batch
+    n_batch : int
+        The number of members in the batch
+    inputs : dict
+        The values of the input parameters of the member
+    """
+
+    def __init__(self, event, index, n_batch, inputs):
+        self.event = event
+        self.index = index
+        self.n_batch = n_batch
+        self.inputs = inputs
+        self.initial_sign = None
+        self.t_reached = None
+
+    def __call__(self, t, y):
+        value = self.event.evaluate(t, y[self.index :: self.n_batch], self.inputs)
+        sign = np.sign(value)
+        if self.initial_sign is None:
+            self.initial_sign = sign
+        elif sign != self.initial_sign and (
+            self.t_reached is None or t < self.t_reached
+        ):
+            self.t_reached = t
+        return value
@@ -6,14 +6,8 @@ from __future__ import print_function, unicode_literals
 import pybamm
 
 import numpy as np
-import importlib
 
-scikits_odes_spec = importlib.util.find_spec("scikits")
-if scikits_odes_spec is not None:
-    scikits_odes_spec = importlib.util.find_spec("scikits.odes")
-    if scikits_odes_spec is not None:
-        scikits_odes = importlib.util.module_from_spec(scikits_odes_spec)
-        scikits_odes_spec.loader.exec_module(scikits_odes)
+scikits_odes = pybamm.util.lazy_import_if_installed("scikits.odes")
 
 
 class ScikitsDaeSolver(pybamm.DaeSolver):
@@ -29,7 +23,7 @@ class ScikitsDaeSolver(pybamm.DaeSolver):
     """
 
     def __init__(self, method="ida", tol=1e-8):
-        if scikits_odes_spec is None:
+        if scikits_odes is None:
             raise ImportError("scikits.odes is not installed")
 
         super().__init__(tol)
@@ -43,7 +37,18 @@ class ScikitsDaeSolver(pybamm.DaeSolver):
     def method(self, value):
         self._method = value
 
-    def integrate(self, residuals, y0, ydot0, t_eval, events=None):
+    def integrate(
+        self,
+        residuals,
+        y0,
+        ydot0,
+        t_eval,
+        events=None,
+        jacobian=None,
+        jacobian_sparsity=None,
+        mass_matrix=None,
+        residuals_into=None,
+    ):
         """
         Solve a DAE model defined by residuals with initial conditions y0 and ydot_0.
 
@@ -59,18 +64,66 @@ class ScikitsDaeSolver(pybamm.DaeSolver):
         events : method, optional
             A function that takes in t and y and returns conditions for the solver to
             stop
+        jacobian : method, optional
+            A function that takes in t and y and returns the Jacobian of the
+            equations (rhs and algebraic) with respect to y, as a
+            :class:`scipy.sparse` matrix
+        jacobian_sparsity : :class:`scipy.sparse` matrix, optional
+            The sparsity pattern of the Jacobian of the equations with respect to y,
+            used to calculate the Jacobian by (coloured) finite differences if
+            `jacobian` is not given
+        mass_matrix : :class:`scipy.sparse` matrix, optional
+            The (diagonal) mass matrix of the model, such that the Jacobian of the
+            residuals with respect to ydot is `-mass_matrix`. Required if `jacobian`
+            or `jacobian_sparsity` is given
+        residuals_into : method, optional
+            A function that takes in t, y, ydot and a preallocated array, and writes
+            the residuals into the array. If given, the residuals are written
+            straight into the array owned by scikits.odes, instead of being returned
+            by `residuals` and copied
 
         """
+        if residuals_into is not None:
 
-        def eqsres(t, y, ydot, return_residuals):
-            return_residuals[:] = residuals(t, y, ydot)
+            def eqsres(t, y, ydot, return_residuals):
+                residuals_into(t, y, ydot, return_residuals)
+
+        else:
+
+            def eqsres(t, y, ydot, return_residuals):
+                return_residuals[:] = residuals(t, y, ydot)
 
         def rootfn(t, y, ydot, return_root):
             return_root[:] = [event(t, y) for event in events]
 
+        if jacobian is None and jacobian_sparsity is not None:
+            # the Jacobian of the residuals with respect to y (at fixed ydot) is the
+            # Jacobian of the equations, which we calculate by finite differences
+            residuals_jacobian = pybamm.FiniteDifferenceJacobian(
+                residuals, jacobian_sparsity
+            )
+
+            def jacobian_eval(t, y, ydot, residuals_eval):
+                return residuals_jacobian(t, y, ydot, f0=residuals_eval)
+
+        else:
+
+            def jacobian_eval(t, y, ydot, residuals_eval):
+                return jacobian(t, y)
+
+        def jacfn(t, y, ydot, residuals_eval, cj, J):
+            # Jacobian of the residuals: d(residuals)/dy + cj * d(residuals)/d(ydot)
+            # scikits.odes requires a dense Jacobian
+            J[:, :] = (
+                jacobian_eval(t, y, ydot, residuals_eval) - cj * mass_matrix
+            ).toarray()
+            return 0
+
         extra_options = {"old_api": False, "rtol": self.tol, "atol": self.tol}
         if events:
             extra_options.update({"rootfn": rootfn, "nr_rootfns": len(events)})
+        if jacobian or jacobian_sparsity is not None:
+            extra_options.update({"jacfn": jacfn})
 
         dae_solver = scikits_odes.dae(self.method, eqsres, **extra_options)
         sol = dae_solver.solve(t_eval, y0, ydot0)
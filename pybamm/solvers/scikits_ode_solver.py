@@ -6,14 +6,8 @@ from __future__ import print_function, unicode_literals
 import pybamm
 
 import numpy as np
-import importlib
 
-scikits_odes_spec = importlib.util.find_spec("scikits")
-if scikits_odes_spec is not None:
-    scikits_odes_spec = importlib.util.find_spec("scikits.odes")
-    if scikits_odes_spec is not None:
-        scikits_odes = importlib.util.module_from_spec(scikits_odes_spec)
-        scikits_odes_spec.loader.exec_module(scikits_odes)
+scikits_odes = pybamm.util.lazy_import_if_installed("scikits.odes")
 
 
 class ScikitsOdeSolver(pybamm.OdeSolver):
@@ -29,7 +23,7 @@ class ScikitsOdeSolver(pybamm.OdeSolver):
     """
 
     def __init__(self, method="cvode", tol=1e-8):
-        if scikits_odes_spec is None:
+        if scikits_odes is None:
             raise ImportError("scikits.odes is not installed")
 
         super().__init__(tol)
@@ -43,7 +37,16 @@ class ScikitsOdeSolver(pybamm.OdeSolver):
     def method(self, value):
         self._method = value
 
-    def integrate(self, derivs, y0, t_eval, events=None):
+    def integrate(
+        self,
+        derivs,
+        y0,
+        t_eval,
+        events=None,
+        jacobian=None,
+        jacobian_sparsity=None,
+        derivs_into=None,
+    ):
         """
         Solve a model defined by dydt with initial conditions y0.
 
@@ -58,18 +61,54 @@ class ScikitsOdeSolver(pybamm.OdeSolver):
         events : method, optional
             A function that takes in t and y and returns conditions for the solver to
             stop
+        jacobian : method, optional
+            A function that takes in t and y and returns the Jacobian of dydt with
+            respect to y, as a :class:`scipy.sparse` matrix
+        jacobian_sparsity : :class:`scipy.sparse` matrix, optional
+            The sparsity pattern of the Jacobian of dydt with respect to y, used to
+            calculate the Jacobian by (coloured) finite differences if `jacobian` is
+            not given
+        derivs_into : method, optional
+            A function that takes in t, y and a preallocated array, and writes dydt
+            into the array. If given, dydt is written straight into the array owned
+            by scikits.odes, instead of being returned by `derivs` and copied
 
         """
+        if derivs_into is not None:
 
-        def eqsydot(t, y, return_ydot):
-            return_ydot[:] = derivs(t, y)
+            def eqsydot(t, y, return_ydot):
+                derivs_into(t, y, return_ydot)
+
+        else:
+
+            def eqsydot(t, y, return_ydot):
+                return_ydot[:] = derivs(t, y)
 
         def rootfn(t, y, return_root):
             return_root[:] = [event(t, y) for event in events]
 
+        if jacobian is None and jacobian_sparsity is not None:
+            # calculate the Jacobian by finite differences
+            derivs_jacobian = pybamm.FiniteDifferenceJacobian(derivs, jacobian_sparsity)
+
+            def jacobian_eval(t, y, fy):
+                return derivs_jacobian(t, y, f0=fy)
+
+        else:
+
+            def jacobian_eval(t, y, fy):
+                return jacobian(t, y)
+
+        def jacfn(t, y, fy, J):
+            # scikits.odes requires a dense Jacobian
+            J[:, :] = jacobian_eval(t, y, fy).toarray()
+            return 0
+
         extra_options = {"old_api": False, "rtol": self.tol, "atol": self.tol}
         if events:
             extra_options.update({"rootfn": rootfn, "nr_rootfns": len(events)})
+        if jacobian or jacobian_sparsity is not None:
+            extra_options.update({"jacfn": jacfn})
 
         ode_solver = scikits_odes.ode(self.method, eqsydot, **extra_options)
         sol = ode_solver.solve(t_eval, y0)
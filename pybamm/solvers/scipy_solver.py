@@ -5,7 +5,7 @@ from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 import pybamm
 
-import scipy.integrate as it
+it = pybamm.util.lazy_import("scipy.integrate")
 
 
 class ScipySolver(pybamm.OdeSolver):
@@ -32,7 +32,16 @@ class ScipySolver(pybamm.OdeSolver):
     def method(self, value):
         self._method = value
 
-    def integrate(self, derivs, y0, t_eval, events=None):
+    def integrate(
+        self,
+        derivs,
+        y0,
+        t_eval,
+        events=None,
+        jacobian=None,
+        jacobian_sparsity=None,
+        derivs_into=None,
+    ):
         """
         Solve a model defined by dydt with initial conditions y0.
 
@@ -48,6 +57,16 @@ class ScipySolver(pybamm.OdeSolver):
         events : method, optional
             A function that takes in t and y and returns conditions for the solver to
             stop
+        jacobian : method, optional
+            A function that takes in t and y and returns the Jacobian of dydt with
+            respect to y, as a :class:`scipy.sparse` matrix. Only used by the implicit
+            methods ("Radau", "BDF" and "LSODA")
+        jacobian_sparsity : :class:`scipy.sparse` matrix, optional
+            The sparsity pattern of the Jacobian of dydt with respect to y, used by
+            "Radau" and "BDF" to calculate the Jacobian by (coloured) finite
+            differences if `jacobian` is not given
+        derivs_into : method, optional
+            Not used, since scipy's solvers use the arrays returned by `derivs`
 
         Returns
         -------
@@ -60,6 +79,21 @@ class ScipySolver(pybamm.OdeSolver):
             for event in events:
                 event.terminal = True
 
+        # pass the Jacobian to the implicit methods (LSODA needs a dense Jacobian)
+        extra_options = {}
+        if jacobian is not None:
+            if self.method in ["Radau", "BDF"]:
+                extra_options.update({"jac": jacobian})
+            elif self.method == "LSODA":
+
+                def jac_dense(t, y):
+                    return jacobian(t, y).toarray()
+
+                extra_options.update({"jac": jac_dense})
+        elif jacobian_sparsity is not None:
+            if self.method in ["Radau", "BDF"]:
+                extra_options.update({"jac_sparsity": jacobian_sparsity})
+
         sol = it.solve_ivp(
             derivs,
             (t_eval[0], t_eval[-1]),
@@ -69,6 +103,7 @@ class ScipySolver(pybamm.OdeSolver):
             rtol=self.tol,
             atol=self.tol,
             events=events,
+            **extra_options
         )
 
         return sol.t, sol.y
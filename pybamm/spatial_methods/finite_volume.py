@@ -6,7 +6,8 @@ from __future__ import print_function, unicode_literals
 import pybamm
 
 import numpy as np
-from scipy.sparse import spdiags
+
+sparse = pybamm.util.lazy_import("scipy.sparse")
 
 
 class FiniteVolume(pybamm.SpatialMethod):
@@ -14,6 +15,11 @@ class FiniteVolume(pybamm.SpatialMethod):
     A class which implements the steps specific to the finite volume method during
     discretisation.
 
+    The gradient and divergence matrices and the integral vectors are built once
+    for each domain (including any ghost cells), and then reused. Discretisations
+    share the instance for their mesh (see :meth:`pybamm.Mesh.spatial_method()`), so
+    discretising more models on the same mesh doesn't build them again.
+
     Parameters
     ----------
     mesh : :class:`pybamm.Mesh` (or subclass)
@@ -27,6 +33,8 @@ class FiniteVolume(pybamm.SpatialMethod):
         for dom in mesh.keys():
             mesh[dom].npts_for_broadcast = mesh[dom].npts
         super().__init__(mesh)
+        # The operators built so far, {(operator, domain): operator}
+        self._operators = {}
 
     def spatial_variable(self, symbol):
         """
@@ -81,6 +89,7 @@ class FiniteVolume(pybamm.SpatialMethod):
             )
         # Discretise symbol
         domain = symbol.domain
+        discretised_child = discretised_symbol
         # Add Dirichlet boundary conditions, if defined
         if symbol.id in boundary_conditions:
             lbc = boundary_conditions[symbol.id]["left"]
@@ -94,7 +103,7 @@ class FiniteVolume(pybamm.SpatialMethod):
 
         # note in 1D spherical grad and normal grad are the same
         gradient_matrix = self.gradient_matrix(domain)
-        return gradient_matrix @ discretised_symbol
+        return self.affine_form(gradient_matrix @ discretised_symbol, discretised_child)
 
     def gradient_matrix(self, domain):
         """
@@ -111,6 +120,10 @@ class FiniteVolume(pybamm.SpatialMethod):
         :class:`pybamm.Matrix`
             The (sparse) finite volume gradient matrix for the domain
         """
+        key = ("gradient", tuple(domain))
+        if key in self._operators:
+            return self._operators[key]
+
         # Create appropriate submesh by combining submeshes in domain
         submesh = self.mesh.combine_submeshes(*domain)
 
@@ -121,8 +134,9 @@ class FiniteVolume(pybamm.SpatialMethod):
             [np.concatenate([-e, np.array([0])]), np.concatenate([np.array([0]), e])]
         )
         diags = np.array([0, 1])
-        matrix = spdiags(data, diags, n - 1, n)
-        return pybamm.Matrix(matrix)
+        matrix = sparse.spdiags(data, diags, n - 1, n)
+        self._operators[key] = pybamm.Matrix(matrix.tocsr())
+        return self._operators[key]
 
     def divergence(self, symbol, discretised_symbol, boundary_conditions):
         """Matrix-vector multiplication to implement the divergence operator.
@@ -133,6 +147,7 @@ class FiniteVolume(pybamm.SpatialMethod):
             assert isinstance(key, int), TypeError(
                 "boundary condition keys should be hashes, not {}".format(type(key))
             )
+        flux = discretised_symbol
         # Add Neumann boundary conditions if defined
         if symbol.id in boundary_conditions:
             # for the particles there will be a "negative particle" "left" and "right"
@@ -152,9 +167,8 @@ class FiniteVolume(pybamm.SpatialMethod):
                 divergence_matrix @ ((r_edges ** 2) * discretised_symbol)
             )
         else:
-            divergence_matrix = self.divergence_matrix(domain)
             out = divergence_matrix @ discretised_symbol
-        return out
+        return self.affine_form(out, flux)
 
     def divergence_matrix(self, domain):
         """
@@ -171,6 +185,10 @@ class FiniteVolume(pybamm.SpatialMethod):
         :class:`pybamm.Matrix`
             The (sparse) finite volume divergence matrix for the domain
         """
+        key = ("divergence", tuple(domain))
+        if key in self._operators:
+            return self._operators[key]
+
         # Create appropriate submesh by combining submeshes in domain
         submesh = self.mesh.combine_submeshes(*domain)
 
@@ -181,8 +199,9 @@ class FiniteVolume(pybamm.SpatialMethod):
             [np.concatenate([-e, np.array([0])]), np.concatenate([np.array([0]), e])]
         )
         diags = np.array([0, 1])
-        matrix = spdiags(data, diags, n - 1, n)
-        return pybamm.Matrix(matrix)
+        matrix = sparse.spdiags(data, diags, n - 1, n)
+        self._operators[key] = pybamm.Matrix(matrix.tocsr())
+        return self._operators[key]
 
     def integral(self, symbol, discretised_symbol):
         """Vector-vector dot product to implement the integral operator.
@@ -219,13 +238,163 @@ class FiniteVolume(pybamm.SpatialMethod):
         :class:`pybamm.Vector`
             The finite volume integral vector for the domain
         """
+        key = ("integral", tuple(domain))
+        if key in self._operators:
+            return self._operators[key]
+
         # Create appropriate submesh by combining submeshes in domain
         submesh = self.mesh.combine_submeshes(*domain)
 
         # Create vector of ones using submesh
         vector = submesh.d_edges * np.ones_like(submesh.nodes)
 
-        return pybamm.Vector(vector)
+        self._operators[key] = pybamm.Vector(vector)
+        return self._operators[key]
+
+    def affine_form(self, discretised_symbol, discretised_child):
+        """
+        Write the result of a discretised spatial operator, if it is affine in the
+        discretised child of the operator with constant coefficients, as sparse
+        matrix-vector products plus a constant vector, `M @ x + B @ c + b`, where `x`
+        is the discretised child. The operator matrices, constant factors (e.g. the
+        radial factors of the particles) and the concatenations of the boundary
+        values are folded into `M`, and the constant boundary conditions (of the
+        ghost nodes, or the fluxes at the boundaries) into `b`. Boundary conditions
+        that are not constant (e.g. that depend on `t`) are concatenated into `c`,
+        and act through `B`. The operator is then evaluated with one sparse
+        matrix-vector product, instead of a chain of concatenations, products and
+        sums.
+
+        The gradient and the divergence of a flux are folded separately, so that
+        differences of `y` are still taken before they are scaled (folding them into
+        a single matrix loses precision when `y` is large compared to its
+        differences).
+
+        Parameters
+        ----------
+        discretised_symbol : :class:`pybamm.Symbol`
+            The result of the discretised operator
+        discretised_child : :class:`pybamm.Symbol`
+            The discretised child of the operator. If it is a
+            :class:`pybamm.StateVector`, the slices of it in `discretised_symbol`
+            (e.g. in the ghost nodes) are also folded into `M`.
+
+        Returns
+        -------
+        :class:`pybamm.Symbol`
+            The expression `M @ x + B @ c + b`, or `discretised_symbol` itself if it
+            isn't affine in `x` with constant coefficients
+        """
+        # Write the operator as a function of one vector w = [x, c], by replacing the
+        # child (and its slices) and each source (a part that is not constant and
+        # doesn't depend on y, e.g. a boundary condition that depends on t) by a
+        # slice of w
+        try:
+            with np.errstate(all="ignore"):
+                y = np.zeros(self._state_vector_stop(discretised_child))
+                child_size = np.size(
+                    discretised_child.evaluate(0, y, pybamm.UnknownInputs())
+                )
+                sources = {}
+                symbol_w = self._replace_symbols(
+                    discretised_symbol, discretised_child, child_size, sources, {}
+                )
+                w_size = child_size + sum(size for _, size in sources.values())
+                jacobian = symbol_w.jac(pybamm.StateVector(slice(0, w_size)))
+                if not jacobian.is_constant():
+                    return discretised_symbol
+                jacobian = sparse.csr_matrix(jacobian.evaluate())
+                b = symbol_w.evaluate(0, np.zeros(w_size))
+        except (NotImplementedError, TypeError, ValueError):
+            return discretised_symbol
+        if not isinstance(b, np.ndarray) or b.shape != (jacobian.shape[0],):
+            return discretised_symbol
+
+        # [M, B] is the Jacobian with respect to w, and b is the value at w = 0
+        M = jacobian[:, :child_size]
+        M.eliminate_zeros()
+        affine_symbol = pybamm.Matrix(M) @ discretised_child
+        if sources:
+            B = jacobian[:, child_size:]
+            if B.shape[1] == 1:
+                # a single boundary value scales a vector
+                source, _ = next(iter(sources.values()))
+                column = pybamm.Vector(B.toarray()[:, 0])
+                affine_symbol = affine_symbol + column * source
+            else:
+                B.eliminate_zeros()
+                c = pybamm.NumpyConcatenation(
+                    *[source for source, _ in sources.values()]
+                )
+                affine_symbol = affine_symbol + pybamm.Matrix(B) @ c
+        if np.any(b):
+            affine_symbol = affine_symbol + pybamm.Vector(b)
+        return affine_symbol
+
+    def _state_vector_stop(self, symbol):
+        """The end of the last slice of the state vector used by `symbol`"""
+        if isinstance(symbol, pybamm.StateVector):
+            return symbol.y_slice.stop
+        return max(
+            [self._state_vector_stop(child) for child in symbol.children], default=0
+        )
+
+    def _replace_symbols(self, symbol, child, child_size, sources, replaced_symbols):
+        """
+        Replace `child` (and, if it is a :class:`pybamm.StateVector`, the slices of
+        it) in `symbol` by the first `child_size` entries of the vector w, and the
+        sources by the following entries, adding them to `sources`
+        ({id: (source, size)}). See :meth:`affine_form()`.
+
+        Raises
+        ------
+        NotImplementedError
+            If `symbol` depends on y other than through `child`, or if a node that
+            contains a replaced node cannot be rebuilt
+        ValueError
+            If a source doesn't evaluate to a vector
+        """
+        if symbol.id in replaced_symbols:
+            return replaced_symbols[symbol.id]
+
+        if symbol.id == child.id:
+            new_symbol = pybamm.StateVector(slice(0, child_size))
+        elif isinstance(symbol, pybamm.StateVector):
+            if not isinstance(child, pybamm.StateVector) or not (
+                child.y_slice.start <= symbol.y_slice.start
+                and symbol.y_slice.stop <= child.y_slice.stop
+            ):
+                raise NotImplementedError("the operator depends on other variables")
+            start = child.y_slice.start
+            new_symbol = pybamm.StateVector(
+                slice(symbol.y_slice.start - start, symbol.y_slice.stop - start)
+            )
+        elif not symbol.has_state_vector():
+            if symbol.is_constant():
+                return symbol
+            value = symbol.evaluate(0, None, pybamm.UnknownInputs())
+            size = np.size(value)
+            if size == 0 or np.ndim(value) > 2:
+                raise ValueError("sources must evaluate to vectors")
+            start = child_size + sum(size for _, size in sources.values())
+            sources[symbol.id] = (symbol, size)
+            new_symbol = pybamm.StateVector(slice(start, start + size))
+        else:
+            children = [
+                self._replace_symbols(
+                    child_node, child, child_size, sources, replaced_symbols
+                )
+                for child_node in symbol.children
+            ]
+            new_symbol = pybamm.rebuild(symbol, children)
+            if new_symbol is symbol and any(
+                new is not old for new, old in zip(children, symbol.children)
+            ):
+                raise NotImplementedError(
+                    "cannot rebuild symbol of type {}".format(type(symbol))
+                )
+        replaced_symbols[symbol.id] = new_symbol
+        return new_symbol
 
     def add_ghost_nodes(self, discretised_symbol, lbc, rbc):
         """
@@ -238,11 +407,10 @@ class FiniteVolume(pybamm.SpatialMethod):
 
         Currently, Dirichlet boundary conditions can only be applied on state
         variables (e.g. concentration, temperature), and not on expressions.
-        To access the value of the first node (y1), we create a "first_node" object
-        which is a StateVector whose y_slice is the start of the y_slice of
-        discretised_symbol.
-        Similarly, the last node is a StateVector whose y_slice is the end of the
-        y_slice of discretised_symbol
+        The nodes, with the first node (y1) and the last node subtracted from the
+        ghost nodes, are read from the state vector with a single sparse
+        "extraction" matrix, and the boundary values are placed in the ghost nodes
+        by a second sparse matrix.
 
         Parameters
         ----------
@@ -255,8 +423,8 @@ class FiniteVolume(pybamm.SpatialMethod):
 
         Returns
         -------
-        :class:`pybamm.Concatenation` (size n+2)
-            Concatenation of the variable (a state vector) and ghost nodes
+        :class:`pybamm.Symbol` (size n+2)
+            The variable (a state vector) with the ghost nodes at either end
 
         """
         assert isinstance(discretised_symbol, pybamm.StateVector), NotImplementedError(
@@ -264,17 +432,25 @@ class FiniteVolume(pybamm.SpatialMethod):
                 type(discretised_symbol)
             )
         )
-        # left ghost cell
-        y_slice_start = discretised_symbol.y_slice.start
-        first_node = pybamm.StateVector(slice(y_slice_start, y_slice_start + 1))
-        left_ghost_cell = 2 * lbc - first_node
-        # right ghost cell
-        y_slice_stop = discretised_symbol.y_slice.stop
-        last_node = pybamm.StateVector(slice(y_slice_stop - 1, y_slice_stop))
-        right_ghost_cell = 2 * rbc - last_node
-        # concatenate
-        return pybamm.NumpyConcatenation(
-            left_ghost_cell, discretised_symbol, right_ghost_cell
+        y_slice = discretised_symbol.y_slice
+        n = y_slice.stop - y_slice.start
+        # [-y1, y1, ..., yn, -yn]
+        extraction = sparse.csr_matrix(
+            (
+                np.concatenate([[-1], np.ones(n), [-1]]),
+                (np.arange(n + 2), np.concatenate([[0], np.arange(n), [n - 1]])),
+            ),
+            shape=(n + 2, n),
+        )
+        # [2 * lbc, 0, ..., 0, 2 * rbc]
+        placement = sparse.csr_matrix(
+            (np.ones(2), (np.array([0, n + 1]), np.array([0, 1]))), shape=(n + 2, 2)
+        )
+        boundary_values = pybamm.Matrix(placement) @ pybamm.NumpyConcatenation(
+            2 * lbc, 2 * rbc
+        )
+        return (
+            pybamm.Matrix(extraction) @ pybamm.StateVector(y_slice) + boundary_values
         )
 
     def surface_value(self, discretised_symbol):
@@ -293,16 +469,15 @@ class FiniteVolume(pybamm.SpatialMethod):
         :class:`pybamm.Variable`
             The variable representing the surface value.
         """
-        # Better to make class similar NodeToEdge and pass function?
-        # def surface_value(array):
-        #     "Linear extrapolation for surface value"
-        #     array[-1] + (array[-1] - array[-2]) / 2
-        # ... or make StateVector and add?
-        y_slice_stop = discretised_symbol.y_slice.stop
-        last_node = pybamm.StateVector(slice(y_slice_stop - 1, y_slice_stop))
-        penultimate_node = pybamm.StateVector(slice(y_slice_stop - 2, y_slice_stop - 1))
-        surface_value = last_node + (last_node - penultimate_node) / 2
-        return surface_value
+        # Linear extrapolation from the last two nodes, y[-1] + (y[-1] - y[-2]) / 2,
+        # as a single sparse "extraction" row
+        y_slice = discretised_symbol.y_slice
+        n = y_slice.stop - y_slice.start
+        extraction = sparse.csr_matrix(
+            (np.array([-1 / 2, 3 / 2]), (np.array([0, 0]), np.array([n - 2, n - 1]))),
+            shape=(1, n),
+        )
+        return pybamm.Matrix(extraction) @ pybamm.StateVector(y_slice)
 
     #######################################################
     # Can probably be moved outside of the spatial method
@@ -330,12 +505,12 @@ class FiniteVolume(pybamm.SpatialMethod):
             Averaged symbol. When evaluated, this returns either a scalar or an array of
             shape (n-1,) as appropriate.
         """
+        return pybamm.NodeToEdge(symbol, arithmetic_mean)
 
-        def arithmetic_mean(array):
-            """Calculate the arithemetic mean of an array"""
-            return (array[1:] + array[:-1]) / 2
 
-        return pybamm.NodeToEdge(symbol, arithmetic_mean)
+def arithmetic_mean(array):
+    """Calculate the arithemetic mean of consecutive entries of an array"""
+    return (array[1:] + array[:-1]) / 2
 
 
 class NodeToEdge(pybamm.SpatialOperator):
@@ -356,6 +531,8 @@ class NodeToEdge(pybamm.SpatialOperator):
     **Extends:** :class:`pybamm.SpatialOperator`
     """
 
+    __slots__ = ["_node_to_edge_function"]
+
     def __init__(self, child, node_to_edge_function):
         """ See :meth:`pybamm.UnaryOperator.__init__()`. """
         super().__init__(
@@ -363,14 +540,31 @@ class NodeToEdge(pybamm.SpatialOperator):
         )
         self._node_to_edge_function = node_to_edge_function
 
-    def evaluate(self, t=None, y=None):
-        """ See :meth:`pybamm.Symbol.evaluate()`. """
-        evaluated_child = self.children[0].evaluate(t, y)
+    def id_from_children_ids(self, children_ids):
+        """ See :meth:`pybamm.Symbol.id_from_children_ids()`. """
+        return hash(
+            (self.__class__, self.name, self._node_to_edge_function)
+            + tuple(children_ids)
+            + tuple(self.domain)
+        )
+
+    def _unary_evaluate(self, evaluated_child):
+        """ See :meth:`pybamm.UnaryOperator._unary_evaluate()`. """
         # If the evaluated child is a numpy array of shape (n,), do the averaging
         # NOTE: Doing this check every time might be slow?
         # NOTE: Will need to deal with 2D arrays at some point
         if isinstance(evaluated_child, np.ndarray) and len(evaluated_child.shape) == 1:
             return self._node_to_edge_function(evaluated_child)
+        # If the evaluated child is a sparse matrix (a Jacobian), average the rows
+        elif sparse.issparse(evaluated_child):
+            return self._node_to_edge_function(evaluated_child.tocsr())
         # If not, no need to average
         else:
             return evaluated_child
+
+    def _jac(self, variable):
+        """ See :meth:`pybamm.Symbol._jac()`. """
+        # The node-to-edge functions are linear, so act on the rows of the Jacobian
+        return NodeToEdge(
+            self.children[0].jac(variable), self._node_to_edge_function
+        )
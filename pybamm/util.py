@@ -7,10 +7,9 @@
 from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 
-import cProfile
 import importlib
+import importlib.util
 import os
-import pstats
 import sys
 import timeit
 
@@ -77,18 +76,33 @@ class Timer(object):
 
 def profile(code, sort="cumulative", num=30):
     """Common-use for cProfile"""
+    # the profilers are only imported when they are used
+    import cProfile
+    import pstats
+
     cProfile.run(code)
     stats = pstats.Stats()
     stats.sort_stats(sort)
     return stats
 
 
+# Functions loaded by load_function, {path: (modification time, function)}
+_LOADED_FUNCTIONS = {}
+# Files found (by searching the PyBaMM directory) for relative filenames,
+# {filename: path}
+_FOUND_FILES = {}
+
+
 def load_function(filename):
     """
     Load a python function from a file "function_name.py" called "function_name".
     The filename might either be an absolute path, in which case that specific file will
     be used, or the file will be searched for relative to PyBaMM root.
 
+    Loaded functions are kept in a registry (for the whole python session), keyed by
+    the path of the file, so that each file is only searched for and loaded once. A
+    file is loaded again if it has been modified since it was last loaded.
+
     Arguments
     ---------
     filename : str
@@ -111,40 +125,112 @@ def load_function(filename):
 
         valid_filename = filename
 
+    # Else, use the file found last time, if it still exists
+    elif filename in _FOUND_FILES and os.path.isfile(_FOUND_FILES[filename]):
+        valid_filename = _FOUND_FILES[filename]
+
     # Else, search in the whole PyBaMM directory for matches
     else:
-        search_path = os.path.commonpath([pth for pth in sys.path if 'PyBaMM' in pth])
-        head, tail = os.path.split(filename)
+        valid_filename = find_file(filename)
+        _FOUND_FILES[filename] = valid_filename
 
-        matching_files = []
+    # Return the function loaded from this file, unless the file has been modified
+    valid_filename = os.path.realpath(valid_filename)
+    modification_time = os.path.getmtime(valid_filename)
+    if valid_filename in _LOADED_FUNCTIONS:
+        loaded_time, function = _LOADED_FUNCTIONS[valid_filename]
+        if loaded_time == modification_time:
+            return function
 
-        for root, _, files in os.walk(search_path):
-            for file in files:
-                if file == tail:
-                    full_path = os.path.join(root, file)
-                    if full_path.endswith(filename):
-                        matching_files.append(full_path)
+    function = load_function_from_file(valid_filename)
+    _LOADED_FUNCTIONS[valid_filename] = (modification_time, function)
+    return function
 
-        if len(matching_files) == 0:
-            raise ValueError(
-                "{} cannot be found in the PyBaMM directory".format(filename))
-        elif len(matching_files) > 1:
-            raise ValueError(
-                "{} found multiple times in the PyBaMM directory".format(filename))
 
-        valid_filename = matching_files[0]
+def loaded_function_file(function):
+    """
+    Find the file from which `function` was loaded by :func:`load_function()`.
+
+    Arguments
+    ---------
+    function : function
+        The python function.
+
+    Returns
+    -------
+    str or None
+        The full path of the file, or None if the function was not loaded by
+        :func:`load_function()` (or if its file has been loaded again since).
+    """
+    for filename, (_, loaded_function) in _LOADED_FUNCTIONS.items():
+        if loaded_function is function:
+            return filename
+    return None
+
+
+def find_file(filename):
+    """
+    Find the file `filename` (a relative path) in the PyBaMM directory. See
+    :func:`load_function()`.
+
+    Arguments
+    ---------
+    filename : str
+        The (relative) name of the file.
+
+    Returns
+    -------
+    str
+        The full path of the file.
+    """
+    search_path = os.path.commonpath([pth for pth in sys.path if 'PyBaMM' in pth])
+    head, tail = os.path.split(filename)
+
+    matching_files = []
+
+    for root, _, files in os.walk(search_path):
+        for file in files:
+            if file == tail:
+                full_path = os.path.join(root, file)
+                if full_path.endswith(filename):
+                    matching_files.append(full_path)
+
+    if len(matching_files) == 0:
+        raise ValueError(
+            "{} cannot be found in the PyBaMM directory".format(filename))
+    elif len(matching_files) > 1:
+        raise ValueError(
+            "{} found multiple times in the PyBaMM directory".format(filename))
+
+    return matching_files[0]
 
-    # Now: we have some /path/to/valid/filename.py
-    # Add "/path/to/vaid" to the python path, and load the module "filename".
-    # Then, check "filename" module contains "filename" function.  If it does, return
-    # that function object, or raise an exception
 
+def load_function_from_file(valid_filename):
+    """
+    Load the function "filename" from the file /path/to/valid/filename.py. See
+    :func:`load_function()`.
+
+    Arguments
+    ---------
+    valid_filename : str
+        The full path of the file containing the function of the same name.
+
+    Returns
+    -------
+    function
+        The python function loaded from the file.
+    """
+    # Load the module "filename" directly from the file (so that modules with the
+    # same name in different directories don't clash), then check that it contains
+    # a "filename" function. If it does, return that function object, or raise an
+    # exception
     valid_path, valid_leaf = os.path.split(valid_filename)
-    sys.path.append(valid_path)
 
-    # Load the module, which must be the leaf of filename, minus the .py extension
+    # The module must be the leaf of filename, minus the .py extension
     valid_module = valid_leaf.replace('.py', '')
-    module_object = importlib.import_module(valid_module)
+    spec = importlib.util.spec_from_file_location(valid_module, valid_filename)
+    module_object = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module_object)
 
     # Check that a function of the same name exists in the loaded module
     if valid_module not in dir(module_object):
@@ -152,3 +238,123 @@ def load_function(filename):
             "No function {} found in module {}".format(valid_module, valid_module))
 
     return getattr(module_object, valid_module)
+
+
+def qualified_name(obj):
+    """
+    Find the module and (qualified) name of a class or function, which identify it
+    in every python session. See :func:`from_qualified_name()`.
+
+    Arguments
+    ---------
+    obj : class or function
+        The class or function.
+
+    Returns
+    -------
+    str
+        The name, as "module:name".
+
+    Raises
+    ------
+    TypeError
+        If the name does not identify the object (e.g. a lambda function, or a
+        function defined inside another function).
+    """
+    name = '{}:{}'.format(
+        getattr(obj, '__module__', None),
+        getattr(obj, '__qualname__', getattr(obj, '__name__', None)))
+    try:
+        identified = from_qualified_name(name) is obj
+    except (ImportError, AttributeError):
+        identified = False
+    if not identified:
+        raise TypeError('the name of {!r} does not identify it'.format(obj))
+    return name
+
+
+def from_qualified_name(name):
+    """
+    Import the class or function identified by `name`. See
+    :func:`qualified_name()`.
+
+    Arguments
+    ---------
+    name : str
+        The module and name of the class or function, as "module:name".
+
+    Returns
+    -------
+    class or function
+        The class or function.
+    """
+    module_name, _, object_name = name.partition(':')
+    obj = importlib.import_module(module_name)
+    for attribute in object_name.split('.'):
+        obj = getattr(obj, attribute)
+    return obj
+
+
+def lazy_import(name):
+    """
+    Import the module `name` lazily: the module is registered (as if it had been
+    imported), but its code only runs when one of its attributes is first used. This
+    keeps ``import pybamm`` fast when heavy dependencies (e.g. pandas, or parts of
+    scipy) are only needed by some functions.
+
+    Arguments
+    ---------
+    name : str
+        The full name of the module (e.g. 'scipy.sparse').
+
+    Returns
+    -------
+    module
+        The module (which may not have been executed yet).
+
+    Raises
+    ------
+    ImportError
+        If the module cannot be found.
+    """
+    try:
+        return sys.modules[name]
+    except KeyError:
+        pass
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError('No module named {!r}'.format(name), name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    # bind the module to its parent package, as the import statement does
+    parent_name, _, child_name = name.rpartition('.')
+    if parent_name:
+        setattr(sys.modules[parent_name], child_name, module)
+    return module
+
+
+def lazy_import_if_installed(name):
+    """
+    Import the module `name` lazily (see :func:`lazy_import()`) if it is installed.
+    This is for optional dependencies: checking whether they are installed doesn't
+    run their code, even if they have already been imported lazily.
+
+    Arguments
+    ---------
+    name : str
+        The full name of the module (e.g. 'scikits.odes').
+
+    Returns
+    -------
+    module or None
+        The module (which may not have been executed yet), or None if it is not
+        installed.
+    """
+    try:
+        return lazy_import(name)
+    except ImportError:
+        # also raised by find_spec if a parent package is not installed
+        return None
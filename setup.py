@@ -18,8 +18,6 @@ setup(
     install_requires=[
         "numpy>=1.14",
         "scipy>=1.0",
-        "pandas>=0.23",
-        "anytree>=2.4.3",
         # Note: Matplotlib is loaded for debug plots, but to ensure pints runs
         # on systems without an attached display, it should never be imported
         # outside of plot() methods.
@@ -5,6 +5,7 @@ import pybamm
 
 import numpy as np
 import unittest
+import unittest.mock
 from tests import get_mesh_for_testing, get_discretisation_for_testing
 
 
@@ -345,6 +346,26 @@ class TestDiscretise(unittest.TestCase):
         # grad and div are identity operators here
         np.testing.assert_array_equal(y0, model.variables["c"].evaluate(None, y0))
         np.testing.assert_array_equal(y0, model.variables["N"].evaluate(None, y0))
+        # the model records the slice of y of each variable
+        self.assertEqual(model.y_slices, {c: slice(0, combined_submesh.npts)})
+
+        # jacobian is identity
+        jacobian = model.jacobian.evaluate(0, y0).toarray()
+        np.testing.assert_array_equal(np.eye(combined_submesh.npts), jacobian)
+        np.testing.assert_array_equal(
+            np.eye(combined_submesh.npts), model.jacobian_sparsity.toarray()
+        )
+
+        # no jacobian if the equations cannot be differentiated, but the sparsity
+        # pattern can still be found
+        model = pybamm.BaseModel()
+        model.rhs = {c: pybamm.Function(np.cbrt, c)}
+        model.initial_conditions = {c: pybamm.Scalar(3)}
+        disc.process_model(model)
+        self.assertIsNone(model.jacobian)
+        np.testing.assert_array_equal(
+            np.eye(combined_submesh.npts), model.jacobian_sparsity.toarray()
+        )
 
         # several equations
         T = pybamm.Variable("T", domain=["negative electrode"])
@@ -393,6 +414,41 @@ class TestDiscretise(unittest.TestCase):
         with self.assertRaises(pybamm.ModelError):
             disc.process_model(model)
 
+    def test_process_model_discretises_symbols_once(self):
+        whole_cell = ["negative electrode", "separator", "positive electrode"]
+        c = pybamm.Variable("c", domain=whole_cell)
+        N = pybamm.grad(c)
+        model = pybamm.BaseModel()
+        model.rhs = {c: pybamm.div(N)}
+        model.initial_conditions = {c: pybamm.Scalar(3)}
+        model.boundary_conditions = {
+            N: {"left": pybamm.Scalar(0), "right": pybamm.Scalar(0)}
+        }
+        model.variables = {"c": c, "N": N, "div(N)": pybamm.div(N)}
+        model.events = [pybamm.div(N) - 1]
+
+        disc = get_discretisation_for_testing()
+        spatial_method = disc._spatial_methods["negative electrode"]
+        with unittest.mock.patch.object(
+            spatial_method, "gradient", wraps=spatial_method.gradient
+        ) as gradient:
+            disc.process_model(model)
+            # N appears in the rhs, variables and events, but is discretised once
+            self.assertEqual(gradient.call_count, 1)
+        self.assertIs(model.variables["div(N)"], model.rhs[c])
+        y0 = model.concatenated_initial_conditions
+        np.testing.assert_array_equal(
+            model.events[0].evaluate(0, y0), model.rhs[c].evaluate(0, y0) - 1
+        )
+
+        # timings of each phase
+        self.assertEqual(
+            list(disc.timings.keys()),
+            ["initial conditions", "rhs and algebraic", "variables", "events"],
+        )
+        for time in disc.timings.values():
+            self.assertGreaterEqual(time, 0)
+
     def test_process_model_dae(self):
         # one rhs equation and one algebraic
         whole_cell = ["negative electrode", "separator", "positive electrode"]
@@ -448,6 +504,14 @@ class TestDiscretise(unittest.TestCase):
             np.zeros_like(combined_submesh.nodes),
         )
 
+        # jacobian
+        eye = np.eye(combined_submesh.npts)
+        zero = np.zeros_like(eye)
+        np.testing.assert_array_equal(
+            np.block([[eye, zero], [-2 * eye, eye]]),
+            model.jacobian.evaluate(0, y0).toarray(),
+        )
+
         # test that not enough initial conditions for ydot raises an error
         model = pybamm.BaseModel()
         model.rhs = {c: pybamm.div(N)}
@@ -0,0 +1,87 @@
+#
+# Test the ensemble runner class
+#
+import pybamm
+
+import numpy as np
+import pickle
+import unittest
+
+
+class TestEnsembleRunner(unittest.TestCase):
+    def test_run(self):
+        model = pybamm.ReactionDiffusionModel()
+        t_eval = np.linspace(0, 1, 10)
+        solver = pybamm.ScipySolver(method="BDF")
+        fine_pts = {
+            domain: {var: 2 * npts for var, npts in pts.items()}
+            for domain, pts in model.default_submesh_pts.items()
+        }
+        parameter_values = pybamm.ParameterValues(
+            base_parameters=model.default_parameter_values
+        )
+        # a parameter that is missing makes the pipeline of its member fail
+        missing_parameter_values = pybamm.ParameterValues({"Cation transference": 1})
+
+        runner = pybamm.EnsembleRunner(
+            model, t_eval, solver=solver, max_workers=2, chunksize=2
+        )
+        results = runner.run(
+            parameter_values=[None, parameter_values, missing_parameter_values, None],
+            submesh_pts=[None, None, None, fine_pts],
+        )
+        self.assertEqual(len(results), 4)
+
+        # the results are in the same order as the members, and are the same as if
+        # the members were run in this process
+        for result, submesh_pts in zip(
+            [results[0], results[1], results[3]], [None, None, fine_pts]
+        ):
+            self.assertTrue(result.success)
+            expected = pybamm.ensemble_runner.run_member(
+                model, solver, t_eval, submesh_pts=submesh_pts
+            )
+            np.testing.assert_array_equal(result.t, expected.t)
+            np.testing.assert_allclose(result.y, expected.y)
+            self.assertIsInstance(result.model, pybamm.ReactionDiffusionModel)
+        self.assertEqual(results[3].submesh_pts, fine_pts)
+        self.assertGreater(results[3].y.shape[0], results[0].y.shape[0])
+
+        # the member that failed keeps its error, and doesn't stop the others
+        self.assertFalse(results[2].success)
+        self.assertIsInstance(results[2].error, KeyError)
+        self.assertIn("KeyError", results[2].traceback)
+        self.assertIsNone(results[2].y)
+
+        # the model is not modified
+        self.assertIsNone(model.concatenated_rhs)
+
+    def test_run_errors(self):
+        model = pybamm.ReactionDiffusionModel()
+        runner = pybamm.EnsembleRunner(model, np.linspace(0, 1, 10))
+        with self.assertRaisesRegex(ValueError, "must be given"):
+            runner.run()
+        with self.assertRaisesRegex(ValueError, "same length"):
+            runner.run(parameter_values=[None], submesh_pts=[None, None])
+        with self.assertRaisesRegex(ValueError, "chunksize"):
+            pybamm.EnsembleRunner(model, np.linspace(0, 1, 10), chunksize=0)
+
+    def test_pickle_processed_model(self):
+        model = pybamm.ReactionDiffusionModel()
+        t_eval = np.linspace(0, 1, 10)
+        solver = pybamm.ScipySolver(method="BDF")
+        result = pybamm.ensemble_runner.run_member(model, solver, t_eval)
+
+        # models with functions loaded from files can be pickled
+        unpickled_model = pickle.loads(pickle.dumps(result.model))
+        solver.solve(unpickled_model, t_eval)
+        np.testing.assert_array_equal(solver.y, result.y)
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    unittest.main()
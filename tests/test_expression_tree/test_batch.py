@@ -0,0 +1,172 @@
+#
+# Tests for batching expression trees over several members
+#
+import pybamm
+from tests import get_mesh_for_testing
+
+import unittest
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+
+
+class TestBatch(unittest.TestCase):
+    def assert_batch_equal(self, expr, ys, inputs_list, t=0.5):
+        """Check that the batched `expr` gives the value of `expr` for each member"""
+        n_batch = len(ys)
+        batched = pybamm.batch_symbol(expr, n_batch, ys[0], inputs_list[0])
+        value = batched.evaluate(
+            t, pybamm.batch_vectors(ys), pybamm.batch_inputs(inputs_list)
+        )
+        for y, inputs, member_value in zip(
+            ys, inputs_list, pybamm.unbatch_vectors(value, n_batch)
+        ):
+            np.testing.assert_allclose(
+                member_value, np.reshape(expr.evaluate(t, y, inputs), -1)
+            )
+
+    def test_batch_symbol(self):
+        u = pybamm.StateVector(slice(0, 2))
+        v = pybamm.StateVector(slice(2, 4))
+        w = pybamm.StateVector(slice(3, 4))
+        a = pybamm.InputParameter("a")
+        b = pybamm.Vector(np.array([2, 3]))
+        A = pybamm.Matrix(csr_matrix(np.array([[1, 0], [1, 1], [0, 2]])))
+        ys = [np.array([1.0, 2.0, 3.0, 4.0]), np.array([-1.0, 0.0, 5.0, 2.0])]
+        inputs_list = [{"a": 2}, {"a": -3}]
+
+        expressions = [
+            u,
+            a,
+            u + v,
+            b * u - v / 2,
+            u * w,
+            w * b,
+            a * u + b,
+            a * b,
+            (a + 1) * w,
+            pybamm.t * u,
+            pybamm.t * b + u,
+            A @ u,
+            A @ (a * u) + 1,
+            -abs(v),
+            pybamm.Function(np.exp, a * v),
+            pybamm.NumpyConcatenation(u, a * b, w),
+            pybamm.NumpyConcatenation(a + 1, pybamm.t * b, u),
+        ]
+        for expr in expressions:
+            self.assert_batch_equal(expr, ys, inputs_list)
+
+        # the same for every member
+        self.assert_batch_equal(b * 2, ys, inputs_list)
+        self.assert_batch_equal(pybamm.t * 2, ys, inputs_list)
+        self.assert_batch_equal(pybamm.t * b, ys, inputs_list)
+
+        # matrix multiplications act on every member at once
+        batched = pybamm.batch_symbol(A @ u, 2, ys[0])
+        self.assertIsInstance(batched.children[0], pybamm.Matrix)
+        self.assertEqual(batched.children[0].shape, (6, 4))
+        self.assertEqual(batched.children[1].y_slice, slice(0, 4))
+
+    def test_batch_broadcasts(self):
+        mesh = get_mesh_for_testing()
+        for dom in mesh.keys():
+            mesh[dom].npts_for_broadcast = mesh[dom].npts
+        u = pybamm.StateVector(slice(0, 1))
+        a = pybamm.InputParameter("a")
+        ys = [np.array([1.0]), np.array([2.0]), np.array([3.0])]
+        inputs_list = [{"a": 2}, {"a": -3}, {"a": 0.5}]
+        for child in [u, a * u, a]:
+            broad = pybamm.NumpyBroadcast(child, ["separator"], mesh)
+            self.assert_batch_equal(broad, ys, inputs_list)
+            self.assert_batch_equal(broad * u + child, ys, inputs_list)
+
+    def test_batch_discretised(self):
+        # domain concatenations and finite volume operators
+        whole_cell = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=whole_cell)
+        a = pybamm.InputParameter("a")
+        N = a * var * pybamm.grad(var)
+        model = pybamm.BaseModel()
+        model.rhs = {var: pybamm.div(N)}
+        model.boundary_conditions = {N: {"left": 0, "right": a}}
+        model.initial_conditions = {var: 1}
+
+        mesh = get_mesh_for_testing()
+        disc = pybamm.Discretisation(mesh, {"macroscale": pybamm.FiniteVolume})
+        disc.process_model(model)
+        y0 = model.concatenated_initial_conditions
+        ys = [y0 * np.linspace(1, 2, len(y0)), np.exp(y0), y0]
+        inputs_list = [{"a": 2}, {"a": -3}, {"a": 0.5}]
+        self.assert_batch_equal(model.concatenated_rhs, ys, inputs_list)
+        self.assertTrue(
+            any(
+                isinstance(node, pybamm.NodeToEdge)
+                for node in model.concatenated_rhs.pre_order()
+            )
+        )
+
+        # concatenation of discretised variables
+        a_dom = ["negative electrode"]
+        b_dom = ["separator"]
+        a_npts = mesh[a_dom[0]].npts
+        b_npts = mesh[b_dom[0]].npts
+        u = pybamm.StateVector(slice(0, a_npts), domain=a_dom)
+        v = pybamm.StateVector(slice(a_npts, a_npts + b_npts), domain=b_dom)
+        expr = pybamm.DomainConcatenation([a * v, u * 3], mesh)
+        ys = [np.linspace(1, 2, a_npts + b_npts), np.linspace(0, 3, a_npts + b_npts)]
+        self.assert_batch_equal(expr, ys, inputs_list[:2])
+
+    def test_batch_errors(self):
+        u = pybamm.StateVector(slice(0, 2))
+        y0 = np.array([1.0, 2.0])
+        with self.assertRaisesRegex(NotImplementedError, "elementwise"):
+            pybamm.batch_symbol(pybamm.Function(np.min, u), 3, y0)
+        with self.assertRaisesRegex(NotImplementedError, "left child is constant"):
+            pybamm.batch_symbol(pybamm.MatrixMultiplication(u, u), 3, y0)
+        with self.assertRaisesRegex(NotImplementedError, "size 1"):
+            pybamm.batch_symbol(pybamm.NumpyBroadcast(u, [], {}), 3, y0)
+        with self.assertRaises(NotImplementedError):
+            pybamm.batch_symbol(pybamm.Variable("a") + u, 3, y0)
+
+    def test_batch_inputs(self):
+        inputs = pybamm.batch_inputs([{"a": 1, "b": 2}, {"a": 3, "b": 4}])
+        self.assertEqual(set(inputs), {"a", "b"})
+        np.testing.assert_array_equal(inputs["a"], [1, 3])
+        np.testing.assert_array_equal(inputs["b"], [2, 4])
+        self.assertEqual(pybamm.batch_inputs([{}, {}]), {})
+        with self.assertRaisesRegex(ValueError, "same inputs"):
+            pybamm.batch_inputs([{"a": 1}, {"b": 2}])
+
+    def test_batch_vectors(self):
+        ys = [np.array([1, 2, 3]), np.array([4, 5, 6])]
+        y = pybamm.batch_vectors(ys)
+        np.testing.assert_array_equal(y, [1, 4, 2, 5, 3, 6])
+        for y_member, y_original in zip(pybamm.unbatch_vectors(y, 2), ys):
+            np.testing.assert_array_equal(y_member, y_original)
+
+        # solutions, with one column for each time
+        solution = np.stack([y, 2 * y], axis=1)
+        for y_member, y_original in zip(pybamm.unbatch_vectors(solution, 2), ys):
+            np.testing.assert_array_equal(
+                y_member, np.stack([y_original, 2 * y_original], axis=1)
+            )
+
+    def test_batch_matrices(self):
+        A = diags([1.0, -2.0, 1.0], [-1, 0, 1], shape=(3, 3), format="csr")
+        B = csr_matrix(np.array([[1.0, 2.0, 0.0], [0.0, 0.0, 3.0], [4.0, 0.0, 0.0]]))
+        batched = pybamm.batch_matrices([A, B])
+        self.assertEqual(batched.shape, (6, 6))
+        ys = [np.array([1.0, 2.0, 3.0]), np.array([-1.0, 5.0, 0.5])]
+        for value, matrix, y in zip(
+            pybamm.unbatch_vectors(batched @ pybamm.batch_vectors(ys), 2), [A, B], ys
+        ):
+            np.testing.assert_array_equal(value, matrix @ y)
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    unittest.main()
@@ -72,6 +72,15 @@ class TestBroadcasts(unittest.TestCase):
             broad.evaluate(y=y), (y[1:2].T * np.ones_like(combined_submeshes.nodes)).T
         )
 
+        # the broadcasts are read-only views of the value of the child
+        t_broad = pybamm.NumpyBroadcast(t, whole_cell, mesh)
+        for value in [broad.evaluate(y=y), t_broad.evaluate(t=np.linspace(0, 1))]:
+            self.assertFalse(value.flags.writeable)
+            self.assertEqual(value.strides[0], 0)
+        value = pybamm.NumpyBroadcast(pybamm.Scalar(7), whole_cell, mesh).evaluate()
+        self.assertEqual(value.dtype, np.float64)
+        self.assertFalse(value.flags.writeable)
+
         # state vector - bad input
         state_vec = pybamm.StateVector(slice(1, 5))
         broad = pybamm.NumpyBroadcast(state_vec, whole_cell, mesh)
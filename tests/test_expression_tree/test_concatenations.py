@@ -58,6 +58,10 @@ class TestConcatenations(unittest.TestCase):
         conc = pybamm.NumpyConcatenation(a, b, c)
         y = np.linspace(0, 1, 23)
         np.testing.assert_array_equal(conc.evaluate(None, y), y)
+        # into a preallocated array
+        out = np.empty(23)
+        self.assertIs(conc.evaluate_into(out, None, y), out)
+        np.testing.assert_array_equal(out, y)
 
     def test_numpy_concatenation_vector_scalar(self):
         # with entries
@@ -91,7 +95,7 @@ class TestConcatenations(unittest.TestCase):
 
         a_dom = ["negative electrode"]
         b_dom = ["positive electrode"]
-        a = pybamm.NumpyBroadcast(pybamm.Scalar(2, a_dom), a_dom, mesh)
+        a = pybamm.NumpyBroadcast(pybamm.Scalar(2, domain=a_dom), a_dom, mesh)
         b = pybamm.Vector(np.ones_like(mesh[b_dom[0]].nodes), domain=b_dom)
 
         # concatenate them the "wrong" way round to check they get reordered correctly
@@ -106,7 +110,7 @@ class TestConcatenations(unittest.TestCase):
         # check the reordering in case a child vector has to be split up
         a_dom = ["separator"]
         b_dom = ["negative electrode", "positive electrode"]
-        a = pybamm.NumpyBroadcast(pybamm.Scalar(2, a_dom), a_dom, mesh)
+        a = pybamm.NumpyBroadcast(pybamm.Scalar(2, domain=a_dom), a_dom, mesh)
         b = pybamm.Vector(
             np.concatenate(
                 [np.full(mesh[b_dom[0]].npts, 1), np.full(mesh[b_dom[1]].npts, 3)]
@@ -125,6 +129,24 @@ class TestConcatenations(unittest.TestCase):
                 ]
             ),
         )
+        # into a preallocated array
+        out = np.empty(len(conc.evaluate()))
+        self.assertIs(conc.evaluate_into(out), out)
+        np.testing.assert_array_equal(out, conc.evaluate())
+
+        # the entries are gathered from the stacked children with precomputed indices
+        n_neg, n_sep = mesh[b_dom[0]].npts, mesh[a_dom[0]].npts
+        np.testing.assert_array_equal(
+            conc._indices[n_neg : n_neg + n_sep], np.arange(n_sep)
+        )
+        conc = pybamm.DomainConcatenation([b, a], mesh)
+        self.assertIsNotNone(conc._indices)
+        # unless the children are already in order
+        a = pybamm.Vector(np.ones(mesh["negative electrode"].npts), domain=b_dom[:1])
+        b = pybamm.Vector(np.ones(mesh["separator"].npts), domain=a_dom)
+        conc = pybamm.DomainConcatenation([a, b], mesh)
+        self.assertIsNone(conc._indices)
+        np.testing.assert_array_equal(conc.evaluate(), np.ones(n_neg + n_sep))
 
     def test_concatenation_orphans(self):
         a = pybamm.Variable("a")
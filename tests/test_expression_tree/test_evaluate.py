@@ -0,0 +1,437 @@
+#
+# Tests for the compiled evaluation of expression trees
+#
+import pybamm
+from tests import get_mesh_for_testing
+
+import unittest
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class TestEvaluate(unittest.TestCase):
+    def test_to_python(self):
+        a = pybamm.StateVector(slice(0, 1))
+        b = pybamm.Vector(np.array([1, 2]))
+        constants, source = pybamm.to_python(a * b + 3)
+        # the vector is bound as a constant, the scalar is inlined
+        self.assertEqual(len(constants), 1)
+        np.testing.assert_array_equal(list(constants.values())[0], np.array([1, 2]))
+        self.assertIn("y[0:1]", source)
+        self.assertIn("(3.0)", source)
+        self.assertTrue(source.split("\n")[-1].startswith("return"))
+
+        # only slices with a step of 1 can be converted
+        with self.assertRaisesRegex(ValueError, "step of 1"):
+            pybamm.to_python(pybamm.StateVector(slice(0, 4, 2)))
+
+    def test_evaluator_python(self):
+        a = pybamm.StateVector(slice(0, 1))
+        b = pybamm.StateVector(slice(1, 2))
+        y_tests = [np.array([[2], [3]]), np.array([[1], [3]]), np.array([1, 3])]
+        t_tests = [1, 2, 0.5]
+
+        expressions = [
+            a + b,
+            a - b,
+            a * b,
+            a / b,
+            a**b,
+            -a,
+            abs(-a),
+            2 * a - 1,
+            -(a + 3) * b,
+            pybamm.Function(np.exp, a) + pybamm.t * b,
+            pybamm.Scalar(-2) ** a,
+            pybamm.Scalar(np.inf) * a,
+        ]
+        for expr in expressions:
+            evaluator = pybamm.EvaluatorPython(expr)
+            for t, y in zip(t_tests, y_tests):
+                np.testing.assert_array_equal(
+                    evaluator.evaluate(t, y), expr.evaluate(t, y)
+                )
+                np.testing.assert_array_equal(evaluator(t, y), expr.evaluate(t, y))
+
+        # matrices, dense and sparse
+        A = pybamm.Matrix(np.array([[1, 2], [3, 4]]))
+        B = pybamm.Matrix(csr_matrix(np.array([[1, 0], [0, 4]])))
+        c = pybamm.StateVector(slice(0, 2))
+        for expr in [A @ c, B @ c, A @ (B @ c) + c]:
+            evaluator = pybamm.EvaluatorPython(expr)
+            for y in [np.array([1, 2]), np.array([-3.0, 0.5])]:
+                np.testing.assert_array_equal(
+                    evaluator.evaluate(None, y), expr.evaluate(None, y)
+                )
+
+    def test_evaluator_python_shared_nodes(self):
+        a = pybamm.StateVector(slice(0, 3))
+        expr = a * a + a
+        evaluator = pybamm.EvaluatorPython(expr)
+        y = np.array([1.0, 2.0, 3.0])
+        np.testing.assert_array_equal(
+            evaluator.evaluate(None, y), expr.evaluate(None, y)
+        )
+        self.assertEqual(evaluator.symbol.id, expr.id)
+        self.assertIn("def evaluate(t=None, y=None, inputs=None):", evaluator.source)
+
+    def test_common_subexpressions(self):
+        a = pybamm.StateVector(slice(0, 3))
+        b = pybamm.Vector(np.array([1.0, 2.0, 3.0]))
+        # the same subexpression, built twice
+        expr = pybamm.Function(np.exp, a * b) + pybamm.Function(np.exp, a * b)
+        y = np.array([1.0, 2.0, 3.0])
+
+        # y[0:3], a * b, exp(a * b) and the addition
+        _, source = pybamm.to_python(expr)
+        self.assertEqual(len(source.split("\n")), 4 + 1)
+        np.testing.assert_array_equal(
+            pybamm.EvaluatorPython(expr).evaluate(None, y), expr.evaluate(None, y)
+        )
+
+        # getitem, *, exp and +
+        instructions, constants, _, _ = pybamm.to_tape(expr)
+        self.assertEqual(len(instructions), 4)
+        self.assertEqual(len(constants), 2)
+        np.testing.assert_array_equal(
+            pybamm.EvaluatorTape(expr).evaluate(None, y), expr.evaluate(None, y)
+        )
+
+        # arrays with the same shape but different entries are not shared
+        c = pybamm.Vector(np.array([4.0, 5.0, 6.0]))
+        expr = a * b + a * c
+        for evaluator in [pybamm.EvaluatorPython(expr), pybamm.EvaluatorTape(expr)]:
+            np.testing.assert_array_equal(
+                evaluator.evaluate(None, y), expr.evaluate(None, y)
+            )
+
+    def test_evaluate_several_symbols(self):
+        a = pybamm.StateVector(slice(0, 2))
+        b = pybamm.StateVector(slice(1, 2))
+        symbols = [a * b, a * b + 1, pybamm.t * b, pybamm.Scalar(2)]
+        y = np.array([2.0, 3.0])
+        for evaluator in [
+            pybamm.EvaluatorPython(symbols),
+            pybamm.EvaluatorTape(symbols),
+        ]:
+            values = evaluator.evaluate(2, y)
+            self.assertEqual(len(values), len(symbols))
+            for value, symbol in zip(values, symbols):
+                np.testing.assert_array_equal(value, symbol.evaluate(2, y))
+
+        # the value of a * b is kept for the second symbol
+        instructions, _, _, result = pybamm.to_tape(symbols)
+        self.assertEqual(len(result), len(symbols))
+        self.assertEqual(len(set(result)), len(symbols))
+
+    def test_shared_evaluator(self):
+        evaluations = []
+
+        def counted_exp(x):
+            evaluations.append(x)
+            return np.exp(x)
+
+        a = pybamm.StateVector(slice(0, 2))
+        shared = pybamm.Function(counted_exp, a)
+        symbols = [shared + 1, 2 * shared, pybamm.t * a]
+        y = np.array([1.0, 2.0])
+
+        for evaluator_type in ["python", "tape"]:
+            evaluator = pybamm.SharedEvaluator(symbols, evaluator_type)
+            self.assertEqual(len(evaluator), 3)
+            self.assertEqual(evaluator.symbols, symbols)
+            for t in [0, 1]:
+                for y_eval in [y, y + 1]:
+                    expected = [symbol.evaluate(t, y_eval) for symbol in symbols]
+                    evaluations.clear()
+                    for i in range(len(symbols)):
+                        np.testing.assert_array_equal(
+                            evaluator[i].evaluate(t, y_eval), expected[i]
+                        )
+                        np.testing.assert_array_equal(
+                            evaluator[i](t, y_eval), expected[i]
+                        )
+                    # the shared subexpression is evaluated once for each (t, y)
+                    self.assertEqual(len(evaluations), 1)
+
+            # changing y in place is noticed
+            y_eval = y.copy()
+            evaluator[0].evaluate(0, y_eval)
+            y_eval[0] = 5
+            np.testing.assert_array_equal(
+                evaluator[0].evaluate(0, y_eval), np.exp(y_eval) + 1
+            )
+
+            # changing the inputs is noticed
+            c = pybamm.InputParameter("c")
+            evaluator = pybamm.SharedEvaluator([c * shared, c + 1], evaluator_type)
+            inputs = {"c": 2}
+            np.testing.assert_array_equal(evaluator[1](0, y, inputs), 3)
+            inputs["c"] = 3
+            np.testing.assert_array_equal(evaluator[1](0, y, inputs), 4)
+            np.testing.assert_array_equal(evaluator[0](0, y, inputs), 3 * np.exp(y))
+
+            # array inputs are compared by value, and changing them in place is
+            # noticed
+            inputs = {"c": np.array([1.0, 2.0])}
+            np.testing.assert_array_equal(evaluator[1](0, y, inputs), [2, 3])
+            np.testing.assert_array_equal(
+                evaluator[0](0, y, {"c": np.array([1.0, 2.0])}), [1, 2] * np.exp(y)
+            )
+            inputs["c"][0] = 3
+            np.testing.assert_array_equal(evaluator[1](0, y, inputs), [4, 3])
+            np.testing.assert_array_equal(evaluator[1](0, y, {"c": 2}), 3)
+            np.testing.assert_array_equal(evaluator[1](0, y, {"c": 2, "d": 1}), 3)
+
+        with self.assertRaisesRegex(ValueError, "evaluator must be"):
+            pybamm.SharedEvaluator(symbols, "bad evaluator")
+
+    def test_evaluator_python_concatenations(self):
+        a = pybamm.StateVector(slice(0, 3))
+        b = pybamm.Vector(np.array([4.0, 5.0]))
+        conc = pybamm.NumpyConcatenation(a, b, 2 * pybamm.t)
+        evaluator = pybamm.EvaluatorPython(conc)
+        y = np.array([1.0, 2.0, 3.0])
+        np.testing.assert_array_equal(evaluator.evaluate(3, y), conc.evaluate(3, y))
+
+        empty = pybamm.EvaluatorPython(pybamm.NumpyConcatenation())
+        np.testing.assert_array_equal(empty.evaluate(), np.array([]))
+
+        # domain concatenation
+        mesh = get_mesh_for_testing()
+        a_dom = ["negative electrode"]
+        b_dom = ["separator", "positive electrode"]
+        a_npts = mesh[a_dom[0]].npts
+        b_npts = mesh[b_dom[0]].npts + mesh[b_dom[1]].npts
+        a = pybamm.StateVector(slice(0, a_npts), domain=a_dom)
+        b = pybamm.StateVector(slice(a_npts, a_npts + b_npts), domain=b_dom)
+        conc = pybamm.DomainConcatenation([b, 2 * a], mesh)
+        evaluator = pybamm.EvaluatorPython(conc)
+        y = np.linspace(0, 1, a_npts + b_npts)
+        np.testing.assert_array_equal(
+            evaluator.evaluate(None, y), conc.evaluate(None, y)
+        )
+
+    def test_evaluate_into(self):
+        a = pybamm.StateVector(slice(0, 3))
+        b = pybamm.StateVector(slice(1, 3))
+        shared = pybamm.Function(np.exp, b) * b
+        conc = pybamm.NumpyConcatenation(
+            2 * a + 1, shared, -b, pybamm.t * b, b, pybamm.NumpyConcatenation(b, b / 2)
+        )
+        symbols = [conc, shared + 1, pybamm.Function(np.sum, a)]
+        for evaluator in [
+            pybamm.EvaluatorPython(symbols),
+            pybamm.EvaluatorTape(symbols),
+        ]:
+            out = np.empty(15)
+            y = np.array([1.0, 2.0, 3.0])
+            values = evaluator.evaluate_into([out, None, None], 2, y)
+            self.assertIs(values[0], out)
+            for value, symbol in zip(values, symbols):
+                np.testing.assert_array_equal(value, symbol.evaluate(2, y))
+            # the scratch arrays are reused, but the values that are returned as new
+            # arrays are not changed by the next evaluation
+            other_values = evaluator.evaluate_into([out, None, None], 3, 2 * y)
+            for value, symbol in zip(values[1:], symbols[1:]):
+                np.testing.assert_array_equal(value, symbol.evaluate(2, y))
+            for value, symbol in zip(other_values, symbols):
+                np.testing.assert_array_equal(value, symbol.evaluate(3, 2 * y))
+
+        # the children of the concatenation are written straight into the output
+        evaluator = pybamm.EvaluatorPython(conc)
+        out = np.empty(15)
+        self.assertIs(evaluator.evaluate_into(out, 2, y), out)
+        np.testing.assert_array_equal(out, conc.evaluate(2, y))
+        self.assertNotIn("np.concatenate", evaluator._into_source)
+        self.assertIn("out=", evaluator._into_source)
+
+        # the function is compiled again if the shapes change
+        c = pybamm.InputParameter("c")
+        evaluator = pybamm.EvaluatorPython(c * a)
+        out = np.empty(3)
+        evaluator.evaluate_into(out, 0, y, {"c": 2.0})
+        np.testing.assert_array_equal(out, 2 * y)
+        out = np.empty((3, 2))
+        evaluator.evaluate_into(out, 0, y[:, np.newaxis], {"c": np.array([1.0, 2.0])})
+        np.testing.assert_array_equal(out, np.outer(y, [1, 2]))
+
+        # domain concatenations
+        mesh = get_mesh_for_testing()
+        a_dom = ["negative electrode"]
+        b_dom = ["separator", "positive electrode"]
+        a_npts = mesh[a_dom[0]].npts
+        b_npts = mesh[b_dom[0]].npts + mesh[b_dom[1]].npts
+        a = pybamm.StateVector(slice(0, a_npts), domain=a_dom)
+        b = pybamm.StateVector(slice(a_npts, a_npts + b_npts), domain=b_dom)
+        conc = pybamm.DomainConcatenation([b + 1, 2 * a], mesh)
+        y = np.linspace(0, 1, a_npts + b_npts)
+        for evaluator in [pybamm.EvaluatorPython(conc), pybamm.EvaluatorTape(conc)]:
+            out = np.empty(a_npts + b_npts)
+            evaluator.evaluate_into(out, None, y)
+            np.testing.assert_array_equal(out, conc.evaluate(None, y))
+        # a child whose domains aren't contiguous is written with one fancy index
+        b_dom = ["negative electrode", "positive electrode"]
+        a_dom = ["separator"]
+        a_npts = mesh[a_dom[0]].npts
+        b_npts = mesh[b_dom[0]].npts + mesh[b_dom[1]].npts
+        a = pybamm.StateVector(slice(0, a_npts), domain=a_dom)
+        b = pybamm.StateVector(slice(0, b_npts), domain=b_dom)
+        conc = pybamm.DomainConcatenation([a * 2, b + 1], mesh)
+        evaluator = pybamm.EvaluatorPython(conc)
+        out = np.empty(a_npts + b_npts)
+        evaluator.evaluate_into(out, None, y)
+        np.testing.assert_array_equal(out, conc.evaluate(None, y))
+        self.assertIn("_index_", evaluator._into_source)
+        np.testing.assert_array_equal(evaluator.evaluate(None, y), out)
+
+    def test_evaluator_python_discretised(self):
+        # expressions with spatial operators, boundary conditions and broadcasts
+        whole_cell = ["negative electrode", "separator", "positive electrode"]
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        combined_submesh = mesh.combine_submeshes(*whole_cell)
+
+        var = pybamm.Variable("var", domain=whole_cell)
+        disc.set_variable_slices([var])
+        N = var * pybamm.grad(var)
+        disc._bcs = {N.id: {"left": pybamm.Scalar(0), "right": pybamm.Scalar(1)}}
+        for eqn in [
+            pybamm.div(N) + pybamm.Broadcast(pybamm.t, whole_cell),
+            pybamm.Function(np.sin, var) * pybamm.grad(var),
+            pybamm.Integral(var, pybamm.SpatialVariable("x", whole_cell)),
+        ]:
+            eqn_disc = disc.process_symbol(eqn)
+            evaluator = pybamm.EvaluatorPython(eqn_disc)
+            y = combined_submesh.nodes**2
+            for t in [0, 1.5]:
+                np.testing.assert_allclose(
+                    evaluator.evaluate(t, y), eqn_disc.evaluate(t, y), rtol=1e-14
+                )
+
+    def test_evaluator_python_not_implemented(self):
+        # symbols that cannot be evaluated raise when the function is called
+        evaluator = pybamm.EvaluatorPython(pybamm.Parameter("a") + 1)
+        with self.assertRaises(NotImplementedError):
+            evaluator.evaluate()
+        evaluator = pybamm.EvaluatorPython(pybamm.grad(pybamm.Scalar(1)))
+        with self.assertRaises(NotImplementedError):
+            evaluator.evaluate()
+
+    def test_to_tape(self):
+        a = pybamm.StateVector(slice(0, 2))
+        b = pybamm.Vector(np.array([1.0, 2.0]))
+        instructions, constants, n_registers, result = pybamm.to_tape(
+            (a * b + 3) * pybamm.t
+        )
+        # a, b and 3 are loaded into constant registers (the slice for a is stored as
+        # a constant)
+        self.assertEqual(len(constants), 3)
+        # getitem, *, +, * (time uses register 0)
+        self.assertEqual(len(instructions), 4)
+        self.assertEqual(instructions[-1][2][1], 0)
+        # the register for intermediate values is reused by every instruction
+        self.assertEqual(n_registers, 3 + len(constants) + 1)
+        self.assertTrue(all(instruction[1] == result for instruction in instructions))
+        self.assertEqual(instructions[-1][1], result)
+
+    def test_evaluator_tape(self):
+        a = pybamm.StateVector(slice(0, 1))
+        b = pybamm.StateVector(slice(1, 2))
+        c = pybamm.StateVector(slice(0, 2))
+        A = pybamm.Matrix(csr_matrix(np.array([[1, 2], [0, 4]])))
+        y_tests = [np.array([2.0, 3.0]), np.array([1.0, 3.0])]
+        t_tests = [1, 0.5]
+        expressions = [
+            a + b,
+            a - b,
+            a * b,
+            a / b,
+            a**b,
+            -a,
+            abs(-a),
+            (a * a + a) / (2 * a) - pybamm.t,
+            pybamm.Function(np.exp, a) + pybamm.t * b,
+            A @ c + c,
+            pybamm.NumpyConcatenation(a, 2 * b, pybamm.t),
+        ]
+        for expr in expressions:
+            evaluator = pybamm.EvaluatorTape(expr)
+            self.assertEqual(evaluator.symbol.id, expr.id)
+            for t, y in zip(t_tests, y_tests):
+                np.testing.assert_array_equal(
+                    evaluator.evaluate(t, y), expr.evaluate(t, y)
+                )
+                np.testing.assert_array_equal(evaluator(t, y), expr.evaluate(t, y))
+
+        # constants only
+        evaluator = pybamm.EvaluatorTape(pybamm.Scalar(4))
+        self.assertEqual(evaluator.evaluate(), 4)
+
+    def test_evaluators_input_parameter(self):
+        a = pybamm.StateVector(slice(0, 2))
+        b = pybamm.InputParameter("b")
+        expr = pybamm.Function(np.exp, b * a) + b
+        y = np.array([1.0, 2.0])
+        for evaluator_type in [pybamm.EvaluatorPython, pybamm.EvaluatorTape]:
+            evaluator = evaluator_type(expr)
+            for inputs in [{"b": 2}, {"b": -1}]:
+                np.testing.assert_array_equal(
+                    evaluator(0, y, inputs), expr.evaluate(0, y, inputs)
+                )
+            with self.assertRaises(KeyError):
+                evaluator(0, y, {"c": 1})
+
+    def test_evaluator_tape_discretised(self):
+        whole_cell = ["negative electrode", "separator", "positive electrode"]
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        combined_submesh = mesh.combine_submeshes(*whole_cell)
+
+        var = pybamm.Variable("var", domain=whole_cell)
+        disc.set_variable_slices([var])
+        N = var * pybamm.grad(var)
+        disc._bcs = {N.id: {"left": pybamm.Scalar(0), "right": pybamm.Scalar(1)}}
+        x = pybamm.SpatialVariable("x", whole_cell)
+        for eqn in [
+            pybamm.div(N) + pybamm.Broadcast(pybamm.t, whole_cell),
+            pybamm.Concatenation(
+                pybamm.Broadcast(1, ["negative electrode"]),
+                pybamm.Broadcast(pybamm.t, ["separator"]),
+                pybamm.Broadcast(3, ["positive electrode"]),
+            ),
+            pybamm.Integral(var, x),
+        ]:
+            eqn_disc = disc.process_symbol(eqn)
+            evaluator = pybamm.EvaluatorTape(eqn_disc)
+            y = combined_submesh.nodes**2
+            for t in [0, 1.5]:
+                np.testing.assert_allclose(
+                    evaluator.evaluate(t, y), eqn_disc.evaluate(t, y), rtol=1e-14
+                )
+
+    def test_evaluator_tape_deep_tree(self):
+        # recursive evaluation fails on very deep trees, the tape doesn't
+        a = pybamm.StateVector(slice(0, 1))
+        expr = a
+        for i in range(2000):
+            expr = expr + 1
+        y = np.array([1.0])
+        with self.assertRaises(RecursionError):
+            expr.evaluate(None, y)
+        evaluator = pybamm.EvaluatorTape(expr)
+        np.testing.assert_array_equal(evaluator.evaluate(None, y), np.array([2001.0]))
+        # t, y, inputs, 2 constants (slice and scalar, as all the scalars have the
+        # same id) and one intermediate register
+        self.assertEqual(evaluator.n_registers, 3 + 2 + 1)
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    unittest.main()
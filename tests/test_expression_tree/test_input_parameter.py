@@ -0,0 +1,60 @@
+#
+# Tests for the InputParameter class
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import unittest
+import numpy as np
+
+
+class TestInputParameter(unittest.TestCase):
+    def test_input_parameter_init(self):
+        a = pybamm.InputParameter("a")
+        self.assertEqual(a.name, "a")
+        self.assertEqual(a.domain, [])
+        c = pybamm.InputParameter("c", domain=["test"])
+        self.assertEqual(c.domain[0], "test")
+
+    def test_evaluate(self):
+        a = pybamm.InputParameter("a")
+        y = pybamm.StateVector(slice(0, 2))
+        expr = a * y + a
+        y0 = np.array([1, 2])
+        np.testing.assert_array_equal(expr.evaluate(0, y0, {"a": 3}), [6, 9])
+        np.testing.assert_array_equal(expr.evaluate(0, y0, {"a": 2, "b": 1}), [4, 6])
+        with self.assertRaisesRegex(TypeError, "cannot evaluate input 'inputs=None'"):
+            expr.evaluate(0, y0)
+        with self.assertRaisesRegex(KeyError, "'a' not found in inputs"):
+            expr.evaluate(0, y0, {"b": 1})
+
+        # unknown inputs are nan
+        self.assertTrue(np.isnan(a.evaluate(inputs=pybamm.UnknownInputs())))
+
+    def test_structure_flags(self):
+        a = pybamm.InputParameter("a")
+        # input parameters are numbers, but their value is not constant
+        self.assertFalse(a.is_constant())
+        self.assertTrue(a.evaluates_to_number())
+        self.assertTrue((2 * a + 1).evaluates_to_number())
+        self.assertTrue((2 * a).has_input_parameter())
+        self.assertFalse(pybamm.Scalar(2).has_input_parameter())
+
+    def test_jac(self):
+        a = pybamm.InputParameter("a")
+        y = pybamm.StateVector(slice(0, 2))
+        y0 = np.array([1, 2])
+        jac = a.jac(y).evaluate(0, y0, {"a": 3})
+        np.testing.assert_array_equal(jac.toarray(), np.zeros((1, 2)))
+        jac = (a * y).jac(y).evaluate(0, y0, {"a": 3})
+        np.testing.assert_array_equal(jac.toarray(), 3 * np.eye(2))
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    unittest.main()
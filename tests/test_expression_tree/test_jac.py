@@ -0,0 +1,161 @@
+#
+# Tests for the Jacobian of expression trees
+#
+import pybamm
+from tests import get_mesh_for_testing
+
+import unittest
+import numpy as np
+from scipy.sparse import csr_matrix, eye
+
+
+def finite_difference_jacobian(symbol, y, h=1e-7):
+    """Approximate the Jacobian of `symbol` at y using forward differences"""
+    f0 = symbol.evaluate(0, y)
+    jac = np.zeros((np.size(f0), np.size(y)))
+    for j in range(np.size(y)):
+        y_h = y.copy()
+        y_h[j] += h
+        jac[:, j] = (symbol.evaluate(0, y_h) - f0) / h
+    return jac
+
+
+class TestJacobian(unittest.TestCase):
+    def test_linear(self):
+        y = pybamm.StateVector(slice(0, 4))
+        u = pybamm.StateVector(slice(0, 2))
+        v = pybamm.StateVector(slice(2, 4))
+        y0 = np.ones(4)
+
+        jacobian = np.array([[1, 0, 0, 0], [0, 1, 0, 0]])
+        np.testing.assert_array_equal(u.jac(y).evaluate(0, y0).toarray(), jacobian)
+
+        jacobian = np.array([[1, 0, 1, 0], [0, 1, 0, 1]])
+        np.testing.assert_array_equal(
+            (u + v).jac(y).evaluate(0, y0).toarray(), jacobian
+        )
+
+        jacobian = np.array([[1, 0, -1, 0], [0, 1, 0, -1]])
+        np.testing.assert_array_equal(
+            (u - v).jac(y).evaluate(0, y0).toarray(), jacobian
+        )
+
+        jacobian = np.array([[-2, 0, 0, 0], [0, -2, 0, 0]])
+        np.testing.assert_array_equal(
+            (-2 * u + 3).jac(y).evaluate(0, y0).toarray(), jacobian
+        )
+
+        A = pybamm.Matrix(csr_matrix(np.array([[1, 2], [3, 4]])))
+        jacobian = np.array([[1, 2, 0, 0], [3, 4, 0, 0]])
+        np.testing.assert_array_equal(
+            (A @ u).jac(y).evaluate(0, y0).toarray(), jacobian
+        )
+
+        # differentiate with respect to part of the state vector
+        np.testing.assert_array_equal(
+            (u + v).jac(v).evaluate(0, y0).toarray(), np.eye(2)
+        )
+
+        # no dependence on y
+        b = pybamm.Vector(np.array([1, 2]))
+        np.testing.assert_array_equal(
+            (b * pybamm.t).jac(y).evaluate(0, y0).toarray(), np.zeros((2, 4))
+        )
+
+    def test_nonlinear(self):
+        y = pybamm.StateVector(slice(0, 4))
+        u = pybamm.StateVector(slice(0, 2))
+        v = pybamm.StateVector(slice(2, 4))
+        w = pybamm.StateVector(slice(3, 4))
+        b = pybamm.Vector(np.array([2, 3]))
+        y0 = np.array([1.0, 2.0, 3.0, 4.0])
+
+        expressions = [
+            u * v,
+            b * u,
+            u * w,
+            u / v,
+            b / u,
+            u / 2,
+            u ** 2,
+            u ** v,
+            b ** u,
+            abs(u - 1.5),
+            pybamm.Function(np.exp, u * v),
+            pybamm.Function(np.log, u) + pybamm.Function(np.sqrt, v),
+            pybamm.Function(np.sin, u) * pybamm.Function(np.cos, v),
+            pybamm.Function(np.tanh, u) - pybamm.t * pybamm.Function(np.sinh, v),
+        ]
+        for expr in expressions:
+            np.testing.assert_allclose(
+                expr.jac(y).evaluate(0, y0).toarray(),
+                finite_difference_jacobian(expr, y0),
+                rtol=1e-5,
+                atol=1e-5,
+            )
+
+    def test_concatenations(self):
+        y = pybamm.StateVector(slice(0, 4))
+        u = pybamm.StateVector(slice(0, 2))
+        v = pybamm.StateVector(slice(2, 4))
+        y0 = np.array([1.0, 2.0, 3.0, 4.0])
+
+        expr = pybamm.NumpyConcatenation(u * v, 2 * v, pybamm.Scalar(3))
+        jacobian = expr.jac(y).evaluate(0, y0)
+        self.assertEqual(jacobian.shape, (5, 4))
+        np.testing.assert_allclose(
+            jacobian.toarray(), finite_difference_jacobian(expr, y0), atol=1e-5
+        )
+
+        # domain concatenation, with the children's domains in a different order
+        mesh = get_mesh_for_testing()
+        a_dom = ["negative electrode"]
+        b_dom = ["separator"]
+        a_npts = mesh[a_dom[0]].npts
+        b_npts = mesh[b_dom[0]].npts
+        y = pybamm.StateVector(slice(0, a_npts + b_npts))
+        a = pybamm.StateVector(slice(0, a_npts), domain=a_dom)
+        b = pybamm.StateVector(slice(a_npts, a_npts + b_npts), domain=b_dom)
+        expr = pybamm.DomainConcatenation([b ** 2, a * 3], mesh)
+        y0 = np.linspace(1, 2, a_npts + b_npts)
+        np.testing.assert_allclose(
+            expr.jac(y).evaluate(0, y0).toarray(),
+            finite_difference_jacobian(expr, y0),
+            atol=1e-5,
+        )
+
+    def test_evaluators(self):
+        y = pybamm.StateVector(slice(0, 4))
+        u = pybamm.StateVector(slice(0, 2))
+        v = pybamm.StateVector(slice(2, 4))
+        y0 = np.array([1.0, 2.0, 3.0, 4.0])
+        expr = pybamm.NumpyConcatenation(u * v, pybamm.Function(np.exp, v))
+        jac = expr.jac(y)
+        result = jac.evaluate(0, y0).toarray()
+        np.testing.assert_allclose(
+            pybamm.EvaluatorPython(jac).evaluate(0, y0).toarray(), result
+        )
+        np.testing.assert_allclose(
+            pybamm.EvaluatorTape(jac).evaluate(0, y0).toarray(), result
+        )
+
+    def test_jac_errors(self):
+        y = pybamm.StateVector(slice(0, 2))
+        a = pybamm.Variable("a")
+        with self.assertRaises(TypeError):
+            y.jac(a)
+        with self.assertRaises(NotImplementedError):
+            a.jac(y)
+        with self.assertRaises(NotImplementedError):
+            pybamm.Function(np.min, y).jac(y)
+        with self.assertRaises(NotImplementedError):
+            (pybamm.Matrix(eye(2)) * y @ y).jac(y)
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    unittest.main()
@@ -0,0 +1,140 @@
+#
+# Tests for the decomposition of expression trees into linear and nonlinear parts
+#
+import pybamm
+from tests import get_mesh_for_testing
+
+import unittest
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class TestLinearDecomposition(unittest.TestCase):
+    def test_linear_decomposition(self):
+        y = pybamm.StateVector(slice(0, 4))
+        u = pybamm.StateVector(slice(0, 2))
+        v = pybamm.StateVector(slice(2, 4))
+        w = pybamm.StateVector(slice(3, 4))
+        b = pybamm.Vector(np.array([2, 3]))
+        A = pybamm.Matrix(csr_matrix(np.array([[1, 0], [1, 1]])))
+        t = pybamm.t
+        y0 = np.array([1.0, 2.0, 3.0, 4.0])
+
+        # affine expressions
+        affine_expressions = [
+            u,
+            u + v,
+            b * u - v / 2 + 3 * t,
+            -(A @ (2 * u)) + b,
+            pybamm.NumpyConcatenation(A @ u, -v + pybamm.Function(np.sin, t), 2 * w),
+        ]
+        matrices = [
+            [[1, 0, 0, 0], [0, 1, 0, 0]],
+            [[1, 0, 1, 0], [0, 1, 0, 1]],
+            [[2, 0, -0.5, 0], [0, 3, 0, -0.5]],
+            [[-2, 0, 0, 0], [-2, -2, 0, 0]],
+            [
+                [1, 0, 0, 0],
+                [1, 1, 0, 0],
+                [0, 0, -1, 0],
+                [0, 0, 0, -1],
+                [0, 0, 0, 2],
+            ],
+        ]
+        for expr, matrix in zip(affine_expressions, matrices):
+            decomposition = pybamm.linear_decomposition(expr, y, y0)
+            self.assertTrue(decomposition.is_affine)
+            np.testing.assert_array_equal(decomposition.A.toarray(), matrix)
+            np.testing.assert_array_almost_equal(
+                decomposition.symbol.evaluate(2, y0), expr.evaluate(2, y0)
+            )
+        decomposition = pybamm.linear_decomposition(u + v, y, y0)
+        self.assertIsNone(decomposition.b)
+        self.assertIsInstance(decomposition.linear, pybamm.MatrixMultiplication)
+        self.assertEqual(decomposition.linear.children[1].id, y.id)
+
+        # expressions with nonlinear parts
+        nonlinear_expressions = [
+            u * v,
+            pybamm.Function(np.exp, u) + A @ v,
+            t * u,
+            pybamm.NumpyConcatenation(u * w, 2 * v),
+        ]
+        matrices = [
+            [[0, 0, 0, 0], [0, 0, 0, 0]],
+            [[0, 0, 1, 0], [0, 0, 1, 1]],
+            [[0, 0, 0, 0], [0, 0, 0, 0]],
+            [[0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 2, 0], [0, 0, 0, 2]],
+        ]
+        for expr, matrix in zip(nonlinear_expressions, matrices):
+            decomposition = pybamm.linear_decomposition(expr, y, y0)
+            self.assertFalse(decomposition.is_affine)
+            np.testing.assert_array_equal(decomposition.A.toarray(), matrix)
+            np.testing.assert_array_almost_equal(
+                decomposition.symbol.evaluate(2, y0), expr.evaluate(2, y0)
+            )
+
+        # numbers and vectors that are broadcast
+        expr = pybamm.NumpyConcatenation(u + t, w * pybamm.Function(np.sin, w))
+        decomposition = pybamm.linear_decomposition(expr, y, y0)
+        np.testing.assert_array_almost_equal(
+            decomposition.symbol.evaluate(2, y0), expr.evaluate(2, y0)
+        )
+        expr = pybamm.NumpyConcatenation(b * w, u)
+        decomposition = pybamm.linear_decomposition(expr, y, y0)
+        np.testing.assert_array_almost_equal(
+            decomposition.symbol.evaluate(2, y0), expr.evaluate(2, y0)
+        )
+
+    def test_linear_decomposition_discretised(self):
+        # the matrices of the diffusion of each variable are kept as factors
+        whole_cell = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=whole_cell)
+        other_var = pybamm.Variable("other var", domain=whole_cell)
+        model = pybamm.BaseModel()
+        model.rhs = {
+            var: pybamm.div(pybamm.grad(var)),
+            other_var: 2 * pybamm.div(pybamm.grad(other_var)) + pybamm.t,
+        }
+        model.initial_conditions = {var: 1, other_var: 2}
+        model.boundary_conditions = {
+            var: {"left": pybamm.Scalar(0), "right": pybamm.Scalar(1)},
+            other_var: {"left": pybamm.Scalar(1), "right": pybamm.Scalar(1)},
+        }
+        mesh = get_mesh_for_testing()
+        mesh.add_ghost_meshes()
+        disc = pybamm.Discretisation(mesh, {"macroscale": pybamm.FiniteVolume})
+        disc.process_model(model)
+
+        decomposition = model.linear_decomposition
+        self.assertIsInstance(decomposition, pybamm.LinearDecomposition)
+        self.assertTrue(decomposition.is_affine)
+        y0 = model.concatenated_initial_conditions
+        y = y0 * np.linspace(0.5, 1.5, len(y0))
+        np.testing.assert_array_almost_equal(
+            decomposition.symbol.evaluate(1, y), model.concatenated_rhs.evaluate(1, y)
+        )
+        np.testing.assert_array_almost_equal(
+            decomposition.A.toarray(), model.jacobian.evaluate(1, y).toarray()
+        )
+        # the stacked divergence matrices multiply the stacked gradient matrices
+        linear = decomposition.linear
+        self.assertIsInstance(linear, pybamm.MatrixMultiplication)
+        self.assertIsInstance(linear.children[1], pybamm.MatrixMultiplication)
+        self.assertIsInstance(linear.children[1].children[1], pybamm.StateVector)
+        # the differences of a uniform state are exactly zero (away from the
+        # boundaries, where the ghost nodes are folded in)
+        n = len(y0) // 2
+        interior = np.r_[1 : n - 1, n + 1 : 2 * n - 1]
+        np.testing.assert_array_equal(
+            linear.evaluate(0, np.full(len(y0), 0.1))[interior], 0
+        )
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    unittest.main()
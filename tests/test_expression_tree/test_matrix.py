@@ -5,6 +5,7 @@ from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 import pybamm
 import numpy as np
+from scipy.sparse import csr_matrix
 
 import unittest
 
@@ -31,6 +32,16 @@ class TestMatrix(unittest.TestCase):
             (self.mat @ self.vect).evaluate(), np.array([5, 2, 3])
         )
 
+    def test_matrix_id(self):
+        # the id depends on the entries, not just the shape
+        self.assertEqual(self.mat.id, pybamm.Matrix(self.A.copy()).id)
+        self.assertNotEqual(self.mat.id, pybamm.Matrix(2 * self.A).id)
+        self.assertNotEqual(self.vect.id, pybamm.Vector(self.x + 1).id)
+        sparse_mat = pybamm.Matrix(csr_matrix(self.A))
+        self.assertEqual(sparse_mat.id, pybamm.Matrix(csr_matrix(self.A)).id)
+        self.assertNotEqual(sparse_mat.id, pybamm.Matrix(csr_matrix(2 * self.A)).id)
+        self.assertNotEqual(sparse_mat.id, self.mat.id)
+
     def test_matrix_modification(self):
         exp = self.mat @ self.mat + self.mat
         self.A[0, 0] = -1
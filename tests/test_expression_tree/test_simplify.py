@@ -0,0 +1,248 @@
+#
+# Tests for the simplification of expression trees
+#
+import pybamm
+from tests import get_mesh_for_testing, get_discretisation_for_testing
+
+import unittest
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class TestSimplify(unittest.TestCase):
+    def test_fold_constants(self):
+        a = pybamm.Scalar(2)
+        b = pybamm.Scalar(3)
+        v = pybamm.Vector(np.array([1, 2]))
+        A = pybamm.Matrix(np.array([[1, 0], [2, 1]]))
+
+        # scalars
+        expr = pybamm.simplify((a + b) * pybamm.Function(np.exp, a - a))
+        self.assertIsInstance(expr, pybamm.Scalar)
+        self.assertEqual(expr.value, 5)
+
+        # vectors
+        expr = pybamm.simplify(A @ v + a * v)
+        self.assertIsInstance(expr, pybamm.Vector)
+        np.testing.assert_array_equal(expr.evaluate(), np.array([3, 8]))
+
+        # matrices
+        expr = pybamm.simplify(pybamm.Matrix(csr_matrix(A.entries)) * b)
+        self.assertIsInstance(expr, pybamm.Matrix)
+        np.testing.assert_array_equal(expr.evaluate().toarray(), 3 * A.entries)
+
+        # only constant subtrees are folded
+        var = pybamm.Variable("var")
+        expr = pybamm.simplify((a * b) * var)
+        self.assertIsInstance(expr, pybamm.Multiplication)
+        self.assertIsInstance(expr.children[0], pybamm.Scalar)
+        self.assertEqual(expr.children[0].value, 6)
+        self.assertEqual(expr.children[1].id, var.id)
+
+        # time is not constant
+        expr = pybamm.simplify(a * pybamm.t)
+        self.assertIsInstance(expr, pybamm.Multiplication)
+
+        # domains are kept
+        c = pybamm.Scalar(1, domain=["test"])
+        expr = pybamm.simplify(c + a)
+        self.assertIsInstance(expr, pybamm.Scalar)
+        self.assertEqual(expr.domain, ["test"])
+
+    def test_remove_identities(self):
+        zero = pybamm.Scalar(0)
+        one = pybamm.Scalar(1)
+        var = pybamm.Variable("var")
+        t = pybamm.t
+
+        for expr in [
+            var + zero,
+            zero + var,
+            var - zero,
+            var * one,
+            one * var,
+            var / one,
+            var**one,
+            -(-var),
+        ]:
+            self.assertEqual(pybamm.simplify(expr).id, var.id)
+
+        expr = pybamm.simplify(zero - var)
+        self.assertIsInstance(expr, pybamm.Negate)
+        self.assertEqual(expr.children[0].id, var.id)
+
+        # multiplying by zero only gives zero if the other side is a number
+        for expr in [zero * t, t * zero, zero / (t + one)]:
+            simp_expr = pybamm.simplify(expr)
+            self.assertIsInstance(simp_expr, pybamm.Scalar)
+            self.assertEqual(simp_expr.value, 0)
+        self.assertIsInstance(pybamm.simplify(zero * var), pybamm.Multiplication)
+        simp_expr = pybamm.simplify(t**zero)
+        self.assertIsInstance(simp_expr, pybamm.Scalar)
+        self.assertEqual(simp_expr.value, 1)
+
+        # identities that would change the domain are not removed
+        one = pybamm.Scalar(1, domain=["negative electrode"])
+        expr = pybamm.simplify(one * var)
+        self.assertIsInstance(expr, pybamm.Multiplication)
+        self.assertEqual(expr.domain, ["negative electrode"])
+        var = pybamm.Variable("var", domain=["negative electrode"])
+        self.assertEqual(pybamm.simplify(one * var).id, var.id)
+
+    def test_premultiply_matrices(self):
+        A = pybamm.Matrix(csr_matrix(np.array([[1, 0], [2, 1]])))
+        B = pybamm.Matrix(csr_matrix(np.array([[0, 1], [1, 3]])))
+        y = pybamm.StateVector(slice(0, 2))
+        y0 = np.array([1, 2])
+
+        expressions = [
+            A @ (B @ y),
+            A @ (B @ (A @ y)),
+            pybamm.Scalar(2) * (A @ y),
+            (A @ y) * pybamm.Scalar(2),
+            (A @ y) / pybamm.Scalar(2),
+            -(A @ y),
+        ]
+        for expr in expressions:
+            simp_expr = pybamm.simplify(expr)
+            self.assertIsInstance(simp_expr, pybamm.MatrixMultiplication)
+            self.assertIsInstance(simp_expr.children[0], pybamm.Matrix)
+            self.assertIsInstance(simp_expr.children[1], pybamm.StateVector)
+            np.testing.assert_array_equal(simp_expr.evaluate(y=y0), expr.evaluate(y=y0))
+
+        # matrices that take differences are not premultiplied
+        D = pybamm.Matrix(csr_matrix(np.array([[-1, 1], [0, 1]])))
+        expr = A @ (D @ y)
+        simp_expr = pybamm.simplify(expr)
+        self.assertIsInstance(simp_expr.children[1], pybamm.MatrixMultiplication)
+        np.testing.assert_array_equal(simp_expr.evaluate(y=y0), expr.evaluate(y=y0))
+        # unless they are only scaled
+        S = pybamm.Matrix(csr_matrix(np.array([[2, 0], [0, 3]])))
+        expr = S @ (D @ y)
+        simp_expr = pybamm.simplify(expr)
+        self.assertIsInstance(simp_expr.children[1], pybamm.StateVector)
+        np.testing.assert_array_equal(simp_expr.evaluate(y=y0), expr.evaluate(y=y0))
+
+    def test_lift_broadcasts(self):
+        mesh = get_discretisation_for_testing().mesh
+        for dom in mesh.keys():
+            mesh[dom].npts_for_broadcast = mesh[dom].npts
+        whole_cell = ["negative electrode", "separator", "positive electrode"]
+        a = pybamm.StateVector(slice(0, 1))
+        b = pybamm.StateVector(slice(1, 2))
+        broad_a = pybamm.NumpyBroadcast(a, whole_cell, mesh)
+        broad_b = pybamm.NumpyBroadcast(b, whole_cell, mesh)
+        y0 = np.array([2.0, 3.0])
+
+        # elementwise operations are applied before broadcasting
+        for expr in [
+            broad_a * broad_b + pybamm.Scalar(2),
+            pybamm.Function(np.exp, -broad_a) / broad_b,
+            pybamm.Scalar(1) - broad_a ** pybamm.Scalar(2),
+        ]:
+            simp_expr = pybamm.simplify(expr)
+            self.assertIsInstance(simp_expr, pybamm.NumpyBroadcast)
+            self.assertEqual(simp_expr.domain, whole_cell)
+            self.assertNotIn(
+                pybamm.NumpyBroadcast,
+                [type(node) for node in simp_expr.children[0].pre_order()],
+            )
+            np.testing.assert_array_almost_equal(
+                simp_expr.evaluate(y=y0), expr.evaluate(y=y0)
+            )
+
+        # but not other operations
+        vec = pybamm.Vector(np.ones(broad_a.broadcasting_vector_size))
+        broad_neg = pybamm.NumpyBroadcast(b, ["negative electrode"], mesh)
+        for expr in [
+            broad_a * vec,
+            pybamm.Function(np.sum, broad_a),
+            pybamm.NumpyConcatenation(broad_neg, broad_a),
+        ]:
+            simp_expr = pybamm.simplify(expr)
+            self.assertNotIsInstance(simp_expr, pybamm.NumpyBroadcast)
+            np.testing.assert_array_almost_equal(
+                simp_expr.evaluate(y=y0), expr.evaluate(y=y0)
+            )
+
+    def test_coalesce_state_vectors(self):
+        a = pybamm.StateVector(slice(0, 3))
+        b = pybamm.StateVector(slice(3, 5))
+        c = pybamm.StateVector(slice(5, 6))
+        d = pybamm.StateVector(slice(8, 9))
+        y0 = np.arange(10.0)
+
+        # contiguous slices are merged into one state vector
+        expr = pybamm.simplify(pybamm.NumpyConcatenation(a, b, c))
+        self.assertIsInstance(expr, pybamm.StateVector)
+        self.assertEqual(expr.y_slice, slice(0, 6))
+        np.testing.assert_array_equal(expr.evaluate(y=y0), y0[:6])
+
+        # only adjacent children with contiguous slices are merged
+        for children in [[a, b, d], [a, 2 * b, c], [b, a]]:
+            conc = pybamm.NumpyConcatenation(*children)
+            expr = pybamm.simplify(conc)
+            self.assertIsInstance(expr, pybamm.NumpyConcatenation)
+            np.testing.assert_array_equal(expr.evaluate(y=y0), conc.evaluate(y=y0))
+        expr = pybamm.simplify(pybamm.NumpyConcatenation(a, b, d))
+        self.assertEqual(len(expr.children), 2)
+        self.assertEqual(expr.children[0].y_slice, slice(0, 5))
+
+        # domain concatenations of a contiguous slice
+        mesh = get_mesh_for_testing()
+        n_neg = mesh["negative electrode"].npts
+        n_sep = mesh["separator"].npts
+        neg = pybamm.StateVector(slice(0, n_neg), domain=["negative electrode"])
+        sep = pybamm.StateVector(slice(n_neg, n_neg + n_sep), domain=["separator"])
+        expr = pybamm.simplify(pybamm.DomainConcatenation([sep, neg], mesh))
+        self.assertIsInstance(expr, pybamm.StateVector)
+        self.assertEqual(expr.y_slice, slice(0, n_neg + n_sep))
+        self.assertEqual(expr.domain, ["negative electrode", "separator"])
+        # but not of slices in a different order
+        neg = pybamm.StateVector(slice(n_sep, n_sep + n_neg), domain=neg.domain)
+        sep = pybamm.StateVector(slice(0, n_sep), domain=sep.domain)
+        conc = pybamm.DomainConcatenation([sep, neg], mesh)
+        self.assertIsInstance(pybamm.simplify(conc), pybamm.DomainConcatenation)
+
+    def test_nodes_removed(self):
+        a = pybamm.Scalar(2)
+        var = pybamm.Variable("var")
+        simplification = pybamm.Simplification()
+        self.assertEqual(simplification.nodes_removed, 0)
+        simplification.simplify((a + a) * var)
+        self.assertEqual(simplification.nodes_removed, 2)
+        simplification.simplify(var * pybamm.Scalar(1))
+        self.assertEqual(simplification.nodes_removed, 4)
+        # nothing to simplify
+        simplification.simplify(var * a)
+        self.assertEqual(simplification.nodes_removed, 4)
+
+    def test_simplify_discretised(self):
+        # simplifying a discretised expression doesn't change its value
+        whole_cell = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=whole_cell)
+        N = pybamm.grad(var)
+        expr = pybamm.Scalar(2) * pybamm.div(N) + pybamm.Scalar(0)
+
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        disc._bcs = {N.id: {"left": pybamm.Scalar(0), "right": pybamm.Scalar(0)}}
+        disc.set_variable_slices([var])
+        expr = disc.process_symbol(expr)
+        simp_expr = pybamm.simplify(expr)
+
+        y0 = np.linspace(0, 1, disc._y_slices[var.id].stop) ** 2
+        np.testing.assert_array_almost_equal(
+            simp_expr.evaluate(y=y0), expr.evaluate(y=y0)
+        )
+        self.assertLess(len(list(simp_expr.pre_order())), len(list(expr.pre_order())))
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    unittest.main()
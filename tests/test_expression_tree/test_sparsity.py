@@ -0,0 +1,122 @@
+#
+# Tests for the sparsity pattern of the Jacobian of expression trees
+#
+import pybamm
+from tests import get_mesh_for_testing
+
+import unittest
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+
+
+def mystery_function(x):
+    """A function whose derivative is not known"""
+    return x**3
+
+
+class TestSparsity(unittest.TestCase):
+    def test_jacobian_sparsity(self):
+        y = pybamm.StateVector(slice(0, 4))
+        u = pybamm.StateVector(slice(0, 2))
+        v = pybamm.StateVector(slice(2, 4))
+        w = pybamm.StateVector(slice(3, 4))
+        b = pybamm.Vector(np.array([2, 3]))
+        A = pybamm.Matrix(csr_matrix(np.array([[1, 0], [1, 1]])))
+        y0 = np.array([1.0, 2.0, 3.0, 4.0])
+
+        expressions = [
+            u,
+            u + v,
+            b * u - v / 2,
+            u * w,
+            A @ u,
+            A @ (u * v),
+            pybamm.Function(mystery_function, u) * v,
+            pybamm.Function(mystery_function, A @ v),
+        ]
+        patterns = [
+            [[1, 0, 0, 0], [0, 1, 0, 0]],
+            [[1, 0, 1, 0], [0, 1, 0, 1]],
+            [[1, 0, 1, 0], [0, 1, 0, 1]],
+            [[1, 0, 0, 1], [0, 1, 0, 1]],
+            [[1, 0, 0, 0], [1, 1, 0, 0]],
+            [[1, 0, 1, 0], [1, 1, 1, 1]],
+            [[1, 0, 1, 0], [0, 1, 0, 1]],
+            [[0, 0, 1, 0], [0, 0, 1, 1]],
+        ]
+        for expr, pattern in zip(expressions, patterns):
+            sparsity = pybamm.jacobian_sparsity(expr, y, y0)
+            np.testing.assert_array_equal(sparsity.toarray(), np.array(pattern))
+
+        # reductions depend on every entry of their child
+        sparsity = pybamm.jacobian_sparsity(pybamm.Function(np.min, u), y, y0)
+        np.testing.assert_array_equal(sparsity.toarray(), np.array([[1, 1, 0, 0]]))
+
+        # no dependence on y
+        sparsity = pybamm.jacobian_sparsity(b * pybamm.t, y, y0)
+        np.testing.assert_array_equal(sparsity.toarray(), np.zeros((2, 4)))
+
+        # differentiate with respect to part of the state vector
+        sparsity = pybamm.jacobian_sparsity(u * v, v, y0)
+        np.testing.assert_array_equal(sparsity.toarray(), np.eye(2))
+
+    def test_sparsity_matches_jacobian(self):
+        n = 10
+        y = pybamm.StateVector(slice(0, n))
+        y0 = np.linspace(1, 2, n)
+        A = pybamm.Matrix(
+            diags([1.0, -2.0, 1.0], [-1, 0, 1], shape=(n, n), format="csr")
+        )
+        expr = pybamm.NumpyConcatenation(
+            A @ y * pybamm.Function(np.exp, y), pybamm.Function(np.sqrt, y) ** 2
+        )
+        jac = expr.jac(y).evaluate(0, y0)
+        sparsity = pybamm.jacobian_sparsity(expr, y, y0)
+        np.testing.assert_array_equal(sparsity.toarray(), jac.toarray() != 0)
+
+    def test_concatenations(self):
+        y = pybamm.StateVector(slice(0, 4))
+        u = pybamm.StateVector(slice(0, 2))
+        v = pybamm.StateVector(slice(2, 4))
+        y0 = np.array([1.0, 2.0, 3.0, 4.0])
+
+        expr = pybamm.NumpyConcatenation(pybamm.Function(mystery_function, v), u)
+        sparsity = pybamm.jacobian_sparsity(expr, y, y0)
+        np.testing.assert_array_equal(
+            sparsity.toarray(),
+            np.block([[np.zeros((2, 2)), np.eye(2)], [np.eye(2), np.zeros((2, 2))]]),
+        )
+
+        # domain concatenation, with the children's domains in a different order
+        mesh = get_mesh_for_testing()
+        a_dom = ["negative electrode"]
+        b_dom = ["separator"]
+        a_npts = mesh[a_dom[0]].npts
+        b_npts = mesh[b_dom[0]].npts
+        y = pybamm.StateVector(slice(0, a_npts + b_npts))
+        a = pybamm.StateVector(slice(0, a_npts), domain=a_dom)
+        b = pybamm.StateVector(slice(a_npts, a_npts + b_npts), domain=b_dom)
+        expr = pybamm.DomainConcatenation(
+            [pybamm.Function(mystery_function, b), a * 3], mesh
+        )
+        y0 = np.linspace(1, 2, a_npts + b_npts)
+        sparsity = pybamm.jacobian_sparsity(expr, y, y0)
+        np.testing.assert_array_equal(sparsity.toarray(), np.eye(a_npts + b_npts))
+
+    def test_sparsity_errors(self):
+        y = pybamm.StateVector(slice(0, 2))
+        y0 = np.array([1.0, 2.0])
+        with self.assertRaises(NotImplementedError):
+            pybamm.jacobian_sparsity(pybamm.Variable("a") + y, y, y0)
+        broad = pybamm.NumpyBroadcast(y, [], {})
+        with self.assertRaises(NotImplementedError):
+            pybamm.jacobian_sparsity(broad, y, y0)
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    unittest.main()
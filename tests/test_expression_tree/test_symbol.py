@@ -4,8 +4,12 @@
 from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 import pybamm
+from tests import get_mesh_for_testing
 
+import copy
+import pickle
 import unittest
+import unittest.mock
 import numpy as np
 
 
@@ -246,17 +250,155 @@ class TestSymbol(unittest.TestCase):
         self.assertFalse(algebraic_eqn.has_gradient())
         self.assertFalse(algebraic_eqn.has_divergence())
 
+    def test_structure_flags(self):
+        # the flags are found from the children when the node is created
+        y = pybamm.StateVector(slice(0, 1))
+        expr = pybamm.Scalar(1)
+        for i in range(1000):
+            expr = expr * pybamm.Scalar(i) + 1
+        self.assertTrue(expr.is_constant())
+        self.assertFalse(expr.has_state_vector())
+        expr = pybamm.grad(expr * y)
+        self.assertFalse(expr.is_constant())
+        self.assertTrue(expr.has_state_vector())
+        self.assertTrue(expr.has_gradient_and_not_divergence())
+        self.assertFalse(pybamm.div(expr).has_gradient_and_not_divergence())
+
+        # evaluates_to_number only evaluates the expression once
+        a = pybamm.Scalar(2)
+        expr = a + pybamm.Scalar(3)
+        with unittest.mock.patch.object(
+            pybamm.Addition, "evaluate", return_value=5, autospec=True
+        ) as evaluate:
+            self.assertTrue(expr.evaluates_to_number())
+            self.assertTrue(expr.evaluates_to_number())
+            self.assertEqual(evaluate.call_count, 1)
+            # trees containing a state vector are not evaluated
+            self.assertFalse((a + y).evaluates_to_number())
+            self.assertEqual(evaluate.call_count, 1)
+
     def test_orphans(self):
         a = pybamm.Symbol("a")
         b = pybamm.Symbol("b")
         sum = a + b
 
         a_orp, b_orp = sum.orphans
-        self.assertIsNone(a_orp.parent)
-        self.assertIsNone(b_orp.parent)
         self.assertEqual(a.id, a_orp.id)
         self.assertEqual(b.id, b_orp.id)
 
+    def test_immutable_children(self):
+        # children are not copied, so a symbol can be shared between trees
+        a = pybamm.Symbol("a")
+        b = pybamm.Symbol("b")
+        sum = a + b
+        product = a * sum
+        self.assertIs(sum.children[0], a)
+        self.assertIs(product.children[0], a)
+        self.assertIs(product.children[1], sum)
+        self.assertIsInstance(sum.children, tuple)
+        with self.assertRaises(AttributeError):
+            sum.children = (b, a)
+        # nodes have no __dict__
+        for symbol in [a, sum, pybamm.Scalar(1), pybamm.Variable("c"), pybamm.t]:
+            self.assertFalse(hasattr(symbol, "__dict__"))
+            with self.assertRaises(AttributeError):
+                symbol.new_attribute = 1
+        # nodes are shared, so their content can't be changed
+        mesh = get_mesh_for_testing()
+        separator = pybamm.Vector(np.ones(mesh["separator"].npts), domain="separator")
+        for symbol, attribute, value in [
+            (a, "domain", ["negative electrode"]),
+            (pybamm.Scalar(2), "value", 5),
+            (pybamm.Function(np.sin, a), "func", np.cos),
+            (pybamm.NumpyBroadcast(pybamm.Scalar(2), [], mesh), "mesh", None),
+            (pybamm.DomainConcatenation([separator], mesh), "mesh", None),
+        ]:
+            with self.assertRaises(AttributeError):
+                setattr(symbol, attribute, value)
+        self.assertEqual(pybamm.Scalar(2).evaluate(), 2)
+
+    def test_interned_symbols(self):
+        a = pybamm.Symbol("a")
+        b = pybamm.Symbol("b")
+        # identical symbols are only created once
+        self.assertIs(pybamm.Symbol("a"), a)
+        self.assertIs(a + b, a + b)
+        self.assertIs(pybamm.Function(np.sin, a * b), pybamm.Function(np.sin, a * b))
+        self.assertIs(pybamm.Scalar(2), pybamm.Scalar(2))
+        self.assertIs(
+            pybamm.Vector(np.array([1, 2])), pybamm.Vector(np.array([1, 2]))
+        )
+        # symbols that differ are different nodes
+        self.assertIsNot(a + b, b + a)
+        self.assertIsNot(a + b, a - b)
+        self.assertIsNot(pybamm.Scalar(2), pybamm.Scalar(2, domain=["test"]))
+        self.assertIsNot(
+            pybamm.Vector(np.array([1, 2])), pybamm.Vector(np.array([1, 3]))
+        )
+        self.assertIsNot(
+            pybamm.StateVector(slice(0, 2), name="y"),
+            pybamm.StateVector(slice(0, 3), name="y"),
+        )
+
+        # symbols whose ids collide (hash(-1) == hash(-2)) are different nodes, with
+        # different ids
+        minus_one = pybamm.Scalar(-1, name="k")
+        minus_two = pybamm.Scalar(-2, name="k")
+        self.assertIsNot(minus_two, minus_one)
+        self.assertNotEqual(minus_two.id, minus_one.id)
+        self.assertEqual(minus_one.evaluate(), -1)
+        self.assertEqual(minus_two.evaluate(), -2)
+        self.assertIs(pybamm.Scalar(-2, name="k"), minus_two)
+        self.assertEqual(pickle.loads(pickle.dumps(minus_two)).id, minus_two.id)
+        self.assertEqual((3 * minus_two).evaluate(), -6)
+        self.assertEqual((3 * minus_one).evaluate(), -3)
+        self.assertIsNot(pybamm.Scalar(1), pybamm.Scalar(1.0))
+
+        # symbols are removed from the table once they are no longer used
+        sum_id = (a + pybamm.Symbol("unused")).id
+        self.assertNotIn(sum_id, pybamm.INTERNED_SYMBOLS)
+        sum = a + b
+        self.assertIs(pybamm.INTERNED_SYMBOLS[sum.id], sum)
+
+    def test_copy_interned_symbols(self):
+        a = pybamm.Symbol("a", domain=["test"])
+        expr = pybamm.Function(np.cos, 2 * a + pybamm.Variable("var"))
+        for new_expr in [copy.deepcopy(expr), pickle.loads(pickle.dumps(expr))]:
+            self.assertEqual(new_expr.id, expr.id)
+            self.assertEqual(new_expr.domain, ["test"])
+            self.assertEqual(str(new_expr), str(expr))
+
+    def test_render(self):
+        a = pybamm.Symbol("a")
+        b = pybamm.Symbol("b")
+        c = pybamm.Symbol("c")
+        with unittest.mock.patch("builtins.print") as mock_print:
+            (a * (b + c) - a).render()
+        lines = [call[0][0] for call in mock_print.call_args_list]
+        self.assertEqual(
+            lines,
+            [
+                "a * b + c - a",
+                "├── a * b + c",
+                "│   ├── a",
+                "│   └── b + c",
+                "│       ├── b",
+                "│       └── c",
+                "└── a",
+            ],
+        )
+
+    def test_relabel_tree(self):
+        a = pybamm.Symbol("a")
+        b = pybamm.Symbol("b")
+        node, lines, counter = a.relabel_tree(pybamm.grad(a * b), 0)
+        self.assertEqual(node, "0")
+        self.assertEqual(counter, 4)
+        self.assertIn('"0" [label="&nabla;"];', lines)
+        self.assertIn('"1" [label="&times;"];', lines)
+        self.assertIn('"0" -> "1";', lines)
+        self.assertIn('"1" -> "3";', lines)
+
 
 if __name__ == "__main__":
     print("Add -v for more debug output")
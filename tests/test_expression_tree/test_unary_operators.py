@@ -5,6 +5,8 @@ from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 import pybamm
 
+import os
+import pickle
 import unittest
 import numpy as np
 
@@ -46,6 +48,18 @@ class TestUnaryOperators(unittest.TestCase):
         self.assertEqual(funca.name, "function (test_function)")
         self.assertEqual(funca.children[0].name, a.name)
 
+        # functions with the same name have different ids
+        def square(x):
+            return x ** 2
+
+        def cube(x):
+            return x ** 3
+
+        cube.__name__ = "square"
+        self.assertEqual(pybamm.Function(square, a).name, pybamm.Function(cube, a).name)
+        self.assertNotEqual(pybamm.Function(square, a).id, pybamm.Function(cube, a).id)
+        self.assertEqual(pybamm.Function(square, a).id, pybamm.Function(square, a).id)
+
         b = pybamm.Scalar(1)
         sina = pybamm.Function(np.sin, b)
         self.assertEqual(sina.evaluate(), np.sin(1))
@@ -55,6 +69,21 @@ class TestUnaryOperators(unittest.TestCase):
         cosb = pybamm.Function(np.cos, c)
         np.testing.assert_array_equal(cosb.evaluate(), np.cos(c.evaluate()))
 
+        # functions loaded from a file are pickled by their file
+        func = pybamm.load_function(
+            os.path.join(
+                os.getcwd(),
+                "tests",
+                "test_parameters",
+                "data",
+                "process_symbol_test_function.py",
+            )
+        )
+        funcb = pybamm.Function(func, b)
+        unpickled = pickle.loads(pickle.dumps(funcb))
+        self.assertEqual(unpickled.id, funcb.id)
+        self.assertEqual(unpickled.evaluate(), funcb.evaluate())
+
         var = pybamm.StateVector(slice(0, 100))
         y = np.linspace(0, 1, 100)
         logvar = pybamm.Function(np.log1p, var)
@@ -2,6 +2,8 @@
 # Test for the Finite Volume Mesh class
 #
 import pybamm
+from tests import get_mesh_for_testing
+
 import numpy as np
 import unittest
 
@@ -139,6 +141,31 @@ class TestMesh(unittest.TestCase):
         with self.assertRaises(pybamm.DomainError):
             submesh = mesh.combine_submeshes("negative electrode", "positive electrode")
 
+        # combined submeshes are kept, until one of their submeshes is replaced
+        submesh = mesh.combine_submeshes("negative electrode", "separator")
+        self.assertIs(
+            mesh.combine_submeshes("negative electrode", "separator"), submesh
+        )
+        mesh["separator"] = pybamm.SubMesh1D(mesh["separator"].edges[::2])
+        new_submesh = mesh.combine_submeshes("negative electrode", "separator")
+        self.assertIsNot(new_submesh, submesh)
+        self.assertEqual(new_submesh.npts, 15)
+
+    def test_spatial_method(self):
+        mesh = get_mesh_for_testing()
+        spatial_method = mesh.spatial_method(pybamm.FiniteVolume)
+        self.assertIsInstance(spatial_method, pybamm.FiniteVolume)
+        self.assertIs(spatial_method.mesh, mesh)
+        self.assertIs(mesh.spatial_method(pybamm.FiniteVolume), spatial_method)
+
+        # discretisations on the mesh share the spatial method
+        disc = pybamm.Discretisation(mesh, {"macroscale": pybamm.FiniteVolume})
+        self.assertIs(disc._spatial_methods["separator"], spatial_method)
+
+        # replacing a submesh creates a new spatial method
+        mesh["separator"] = mesh["separator"]
+        self.assertIsNot(mesh.spatial_method(pybamm.FiniteVolume), spatial_method)
+
     def test_ghost_cells(self):
         param = pybamm.ParameterValues(
             base_parameters={
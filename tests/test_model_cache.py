@@ -0,0 +1,186 @@
+#
+# Test the content hash and the cache of processed models
+#
+import pybamm
+from tests import get_mesh_for_testing
+
+import numpy as np
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from scipy.sparse import csr_matrix
+
+
+def get_discretised_model():
+    whole_cell = ["negative electrode", "separator", "positive electrode"]
+    var = pybamm.Variable("var", domain=whole_cell)
+    N = pybamm.grad(var)
+    model = pybamm.BaseModel()
+    model.rhs = {var: pybamm.div(N)}
+    model.boundary_conditions = {N: {"left": 0, "right": 1}}
+    model.initial_conditions = {var: 1}
+    model.variables = {"var": var}
+    disc = pybamm.Discretisation(
+        get_mesh_for_testing(), {"macroscale": pybamm.FiniteVolume}
+    )
+    disc.process_model(model)
+    return model
+
+
+class TestContentHash(unittest.TestCase):
+    def test_content_hash(self):
+        a = pybamm.Parameter("a")
+        b = pybamm.Variable("b", domain=["negative electrode"])
+        expr = pybamm.Function(np.exp, a * b) + pybamm.Scalar(2)
+        self.assertEqual(len(pybamm.content_hash(expr)), 64)
+        self.assertEqual(
+            pybamm.content_hash(expr),
+            pybamm.content_hash(pybamm.Function(np.exp, a * b) + 2),
+        )
+        different = [
+            pybamm.Function(np.exp, b * a) + 2,
+            pybamm.Function(np.sin, a * b) + 2,
+            pybamm.Function(np.exp, a * b) + 3,
+            pybamm.Variable("b", domain=["separator"]),
+            pybamm.StateVector(slice(0, 2)),
+            pybamm.StateVector(slice(0, 3)),
+            pybamm.Vector(np.array([1, 2])),
+            pybamm.Vector(np.array([1, 3])),
+            pybamm.Matrix(csr_matrix(np.array([[1, 0], [0, 1]]))),
+        ]
+        hashes = [pybamm.content_hash(expr)] + [
+            pybamm.content_hash(symbol) for symbol in different
+        ]
+        self.assertEqual(len(set(hashes)), len(hashes))
+
+        # settings
+        self.assertEqual(
+            pybamm.content_hash({"a": 1, "b": [1.0, "c"]}),
+            pybamm.content_hash({"b": [1, "c"], "a": np.float64(1)}),
+        )
+        self.assertNotEqual(
+            pybamm.content_hash({"a": 1}), pybamm.content_hash({"a": 2})
+        )
+        self.assertNotEqual(
+            pybamm.content_hash(["a", "b"]), pybamm.content_hash(["ab"])
+        )
+        self.assertNotEqual(
+            pybamm.content_hash(pybamm.FiniteVolume),
+            pybamm.content_hash(pybamm.SpatialMethod),
+        )
+
+        # things that can't be hashed
+        with self.assertRaisesRegex(TypeError, "does not identify"):
+            pybamm.content_hash(pybamm.Function(lambda x: x, a))
+        with self.assertRaisesRegex(TypeError, "cannot hash"):
+            pybamm.content_hash(object())
+
+    def test_content_hash_model(self):
+        model = get_discretised_model()
+        other_model = get_discretised_model()
+        self.assertEqual(pybamm.content_hash(model), pybamm.content_hash(other_model))
+        other_model.initial_conditions = {
+            var: 2 * value for var, value in model.initial_conditions.items()
+        }
+        self.assertNotEqual(
+            pybamm.content_hash(model), pybamm.content_hash(other_model)
+        )
+
+    def test_content_hash_between_sessions(self):
+        # the hash is the same in python sessions with different string hashes
+        code = (
+            "import pybamm, numpy as np;"
+            "a = pybamm.Parameter('a');"
+            "var = pybamm.Variable('var', domain=['separator']);"
+            "print(pybamm.content_hash(pybamm.Function(np.exp, a * var), "
+            "pybamm.Geometry('1D macro'), {'macroscale': pybamm.FiniteVolume}))"
+        )
+        hashes = []
+        for seed in ["1", "2"]:
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            output = subprocess.check_output([sys.executable, "-c", code], env=env)
+            hashes.append(output.strip())
+        self.assertEqual(hashes[0], hashes[1])
+
+    def test_content_hash_loaded_function(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "hash_test_function.py")
+            with open(filename, "w") as file:
+                file.write("def hash_test_function(x):\n    return x + 1\n")
+            os.utime(filename, (0, 0))
+            parameter_values = pybamm.ParameterValues({"function": filename})
+            old_hash = pybamm.content_hash(parameter_values)
+            self.assertEqual(old_hash, pybamm.content_hash(parameter_values))
+
+            # modifying the file changes the hash
+            with open(filename, "w") as file:
+                file.write("def hash_test_function(x):\n    return x + 2\n")
+            os.utime(filename, (1, 1))
+            self.assertNotEqual(old_hash, pybamm.content_hash(parameter_values))
+
+
+class TestModelCache(unittest.TestCase):
+    def test_get_put(self):
+        model = get_discretised_model()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = pybamm.ModelCache(os.path.join(tmp_dir, "models"))
+            key = pybamm.content_hash(model)
+            self.assertNotIn(key, cache)
+            self.assertIsNone(cache.get(key))
+            self.assertEqual(cache.size, 0)
+
+            cache.put(key, model)
+            self.assertIn(key, cache)
+            self.assertGreater(cache.size, 0)
+            cached_model = cache.get(key)
+            self.assertEqual(pybamm.content_hash(cached_model), key)
+            y0 = model.concatenated_initial_conditions
+            np.testing.assert_array_equal(
+                cached_model.concatenated_rhs.evaluate(0, y0),
+                model.concatenated_rhs.evaluate(0, y0),
+            )
+
+            # files that can't be loaded are removed
+            with open(cache.filename(key), "wb") as file:
+                file.write(b"not a model")
+            self.assertIsNone(cache.get(key))
+            self.assertNotIn(key, cache)
+
+            cache.put(key, model)
+            cache.clear()
+            self.assertNotIn(key, cache)
+            self.assertEqual(os.listdir(cache.directory), [])
+
+    def test_evict(self):
+        model = get_discretised_model()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = pybamm.ModelCache(tmp_dir)
+            cache.put("a", model)
+            model_size = cache.size
+            cache.max_size = 2 * model_size
+
+            cache.put("b", model)
+            # use "a", so that "b" is the least recently used model
+            os.utime(cache.filename("a"), ns=(0, 0))
+            os.utime(cache.filename("b"), ns=(1, 1))
+            cache.get("a")
+            cache.put("c", model)
+            self.assertIn("a", cache)
+            self.assertNotIn("b", cache)
+            self.assertIn("c", cache)
+            self.assertEqual(cache.size, 2 * model_size)
+
+            # models bigger than the cache are not kept
+            cache.max_size = model_size - 1
+            cache.evict()
+            self.assertEqual(cache.size, 0)
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+
+    if "-v" in sys.argv:
+        debug = True
+    unittest.main()
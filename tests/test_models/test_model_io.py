@@ -0,0 +1,147 @@
+#
+# Tests for saving and loading discretised models
+#
+import pybamm
+from tests import get_mesh_for_testing
+
+import numpy as np
+import os
+import tempfile
+import unittest
+
+
+def exponential_decay(x):
+    return np.exp(-x)
+
+
+class TestModelIO(unittest.TestCase):
+    def test_save_load(self):
+        whole_cell = ["negative electrode", "separator", "positive electrode"]
+        c = pybamm.Variable("c", domain=whole_cell)
+        d = pybamm.Variable("d", domain=["negative electrode"])
+        N = pybamm.grad(c)
+        model = pybamm.BaseModel()
+        model.rhs = {
+            c: pybamm.div(N) + pybamm.Function(exponential_decay, c),
+            d: -pybamm.Function(np.sinh, d),
+        }
+        model.initial_conditions = {c: 1, d: 2}
+        model.boundary_conditions = {N: {"left": 0, "right": 1}}
+        model.variables = {"c": c, "d": d, "N": N}
+        model.events = [pybamm.Function(np.min, c - 0.5)]
+        disc = pybamm.Discretisation(
+            get_mesh_for_testing(), {"macroscale": pybamm.FiniteVolume}
+        )
+        disc.process_model(model)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "model")
+            model.save(filename)
+            self.assertTrue(os.path.isfile(filename + ".npz"))
+            loaded_model = pybamm.load_model(filename)
+        self.assertIsInstance(loaded_model, pybamm.BaseModel)
+
+        # the loaded model gives the same values as the model
+        y0 = model.concatenated_initial_conditions
+        np.testing.assert_array_equal(loaded_model.concatenated_initial_conditions, y0)
+        y = y0 * np.linspace(0.5, 1.5, len(y0))
+        np.testing.assert_array_equal(
+            loaded_model.concatenated_rhs.evaluate(0.5, y),
+            model.concatenated_rhs.evaluate(0.5, y),
+        )
+        # the jacobian can't be found, but its sparsity pattern can
+        self.assertIsNone(loaded_model.jacobian)
+        for loaded_event, event in zip(loaded_model.events, model.events):
+            self.assertEqual(loaded_event.evaluate(0.5, y), event.evaluate(0.5, y))
+        self.assertEqual(
+            pybamm.content_hash(loaded_model.concatenated_events),
+            pybamm.content_hash(model.concatenated_events),
+        )
+        for name, variable in model.variables.items():
+            np.testing.assert_array_equal(
+                loaded_model.variables[name].evaluate(0.5, y), variable.evaluate(0.5, y)
+            )
+        np.testing.assert_array_equal(
+            loaded_model.jacobian_sparsity.toarray(), model.jacobian_sparsity.toarray()
+        )
+        decomposition = loaded_model.linear_decomposition
+        self.assertFalse(decomposition.is_affine)
+        np.testing.assert_array_equal(
+            decomposition.A.toarray(), model.linear_decomposition.A.toarray()
+        )
+        np.testing.assert_array_equal(
+            decomposition.symbol.evaluate(0.5, y),
+            model.linear_decomposition.symbol.evaluate(0.5, y),
+        )
+        self.assertEqual(pybamm.content_hash(loaded_model), pybamm.content_hash(model))
+
+        # the variables of the loaded model are the keys of its equations and slices
+        self.assertEqual(
+            [variable.name for variable in loaded_model.y_slices], ["c", "d"]
+        )
+        self.assertEqual(
+            list(loaded_model.y_slices.values()), list(model.y_slices.values())
+        )
+        for variable in loaded_model.y_slices:
+            self.assertIn(variable, loaded_model.rhs)
+            self.assertIn(variable, loaded_model.initial_conditions)
+
+        # the loaded model can be solved
+        solver = pybamm.ScipySolver(tol=1e-8, method="BDF")
+        t_eval = np.linspace(0, 1, 10)
+        solver.solve(model, t_eval)
+        y_model = solver.y
+        solver.solve(loaded_model, t_eval)
+        np.testing.assert_array_equal(solver.y, y_model)
+
+    def test_save_load_lead_acid(self):
+        # models with functions loaded from files, and domain concatenations
+        model = pybamm.lead_acid.LOQS()
+        geometry = model.default_geometry
+        param = model.default_parameter_values
+        param.process_geometry(geometry)
+        param.process_model(model)
+        mesh = pybamm.Mesh(
+            geometry, model.default_submesh_types, model.default_submesh_pts
+        )
+        disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+        disc.process_model(model)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "model.npz")
+            pybamm.save_model(model, filename)
+            loaded_model = pybamm.load_model(filename)
+        self.assertIsInstance(loaded_model, pybamm.lead_acid.LOQS)
+        y0 = model.concatenated_initial_conditions
+        np.testing.assert_array_equal(
+            loaded_model.concatenated_rhs.evaluate(0, y0),
+            model.concatenated_rhs.evaluate(0, y0),
+        )
+        for name, variable in model.variables.items():
+            np.testing.assert_array_equal(
+                loaded_model.variables[name].evaluate(0, y0), variable.evaluate(0, y0)
+            )
+
+    def test_save_errors(self):
+        model = pybamm.BaseModel()
+        c = pybamm.Variable("c")
+        model.rhs = {c: -c}
+        model.initial_conditions = {c: 1}
+        with self.assertRaisesRegex(ValueError, "only discretised models"):
+            model.save("model")
+
+        model.rhs = {c: pybamm.Function(lambda x: -x, c)}
+        disc = pybamm.Discretisation(get_mesh_for_testing(), {})
+        disc.process_model(model)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaisesRegex(TypeError, "does not identify"):
+                model.save(os.path.join(tmp_dir, "model"))
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    unittest.main()
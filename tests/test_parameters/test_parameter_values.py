@@ -3,7 +3,10 @@
 #
 import pybamm
 
+import os
+import tempfile
 import unittest
+import unittest.mock
 import numpy as np
 
 
@@ -14,6 +17,46 @@ class TestParameterValues(unittest.TestCase):
         )
         self.assertEqual(data["Ideal gas constant"], 8.314)
 
+    def test_read_parameters_csv_values(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, "parameters.csv")
+            with open(filename, "w") as file:
+                file.write(
+                    "Name,Value,Units\n"
+                    "# a comment,,\n"
+                    ",,\n"
+                    "\n"
+                    "a,1,m\n"
+                    '"b, with comma", 2e-3 ,\n'
+                    "c,[input],\n"
+                    "d,,\n"
+                )
+            os.utime(filename, ns=(0, 0))
+            data = pybamm.ParameterValues().read_parameters_csv(filename)
+            self.assertEqual(list(data), ["a", "b, with comma", "c", "d"])
+            self.assertEqual(data["a"], 1)
+            self.assertEqual(data["b, with comma"], 2e-3)
+            self.assertEqual(data["c"], "[input]")
+            self.assertTrue(np.isnan(data["d"]))
+
+            # the file is only read again when it has been modified
+            data["a"] = 5
+            with unittest.mock.patch(
+                "pybamm.parameters.parameter_values.parse_parameters_csv"
+            ) as parse:
+                self.assertEqual(pybamm.ParameterValues(filename)["a"], 1)
+                parse.assert_not_called()
+            with open(filename, "w") as file:
+                file.write("Name,Value\na,3\n")
+            os.utime(filename, ns=(1, 1))
+            self.assertEqual(pybamm.ParameterValues(filename), {"a": 3})
+
+            with open(filename, "w") as file:
+                file.write("Parameter,Value\na,3\n")
+            os.utime(filename, ns=(2, 2))
+            with self.assertRaisesRegex(ValueError, "'Name' and 'Value'"):
+                pybamm.ParameterValues(filename)
+
     def test_init(self):
         # from dict
         param = pybamm.ParameterValues({"a": 1})
@@ -52,6 +95,15 @@ class TestParameterValues(unittest.TestCase):
         self.assertIsInstance(processed_a, pybamm.Scalar)
         self.assertEqual(processed_a.value, 1)
 
+        # process input parameter
+        parameter_values = pybamm.ParameterValues({"a": 1, "b": 2, "c": "[input]"})
+        c = pybamm.Parameter("c", domain=["test"])
+        processed_c = parameter_values.process_symbol(c)
+        self.assertIsInstance(processed_c, pybamm.InputParameter)
+        self.assertEqual(processed_c.name, "c")
+        self.assertEqual(processed_c.domain, ["test"])
+        self.assertEqual(processed_c.evaluate(inputs={"c": 5}), 5)
+
         # process binary operation
         b = pybamm.Parameter("b")
         sum = a + b
@@ -186,11 +238,10 @@ class TestParameterValues(unittest.TestCase):
         model.variables = {"var": var, "grad_var": pybamm.grad(var), "d_var": d * var}
         parameter_values = pybamm.ParameterValues({"a": 1, "b": 2, "c": 3, "d": 42})
         parameter_values.process_model(model)
-        # rhs
-        self.assertIsInstance(model.rhs[var], pybamm.Multiplication)
-        self.assertIsInstance(model.rhs[var].children[0], pybamm.Scalar)
-        self.assertIsInstance(model.rhs[var].children[1], pybamm.Gradient)
-        self.assertEqual(model.rhs[var].children[0].value, 1)
+        # rhs (multiplication by a = 1 is simplified away)
+        self.assertIsInstance(model.rhs[var], pybamm.Gradient)
+        self.assertIsInstance(model.rhs[var].children[0], pybamm.Variable)
+        self.assertEqual(parameter_values.nodes_removed, 2)
         # initial conditions
         self.assertIsInstance(model.initial_conditions[var], pybamm.Scalar)
         self.assertEqual(model.initial_conditions[var].value, 2)
@@ -216,6 +267,30 @@ class TestParameterValues(unittest.TestCase):
             isinstance(model.variables["d_var"].children[1], pybamm.Variable)
         )
 
+    def test_process_model_processes_symbols_once(self):
+        model = pybamm.BaseModel()
+        a = pybamm.Parameter("a")
+        var = pybamm.Variable("var")
+        model.rhs = {var: a * var}
+        model.initial_conditions = {var: a}
+        model.variables = {"a_var": a * var, "grad_a_var": pybamm.grad(a * var)}
+        model.events = [a * var - 1]
+        parameter_values = pybamm.ParameterValues({"a": 2})
+        with unittest.mock.patch.object(
+            parameter_values,
+            "get_parameter_value",
+            wraps=parameter_values.get_parameter_value,
+        ) as get_parameter_value:
+            parameter_values.process_model(model)
+            self.assertEqual(get_parameter_value.call_count, 1)
+        self.assertIs(model.variables["a_var"], model.rhs[var])
+        self.assertEqual(model.events[0].id, (2 * var - 1).id)
+
+        # symbols processed outside process_model are not stored, so that the
+        # parameter values can change
+        parameter_values["a"] = 3
+        self.assertEqual(parameter_values.process_symbol(a).value, 3)
+
 
 if __name__ == "__main__":
     print("Add -v for more debug output")
@@ -4,31 +4,101 @@
 import pybamm
 
 import numpy as np
-
+import os
+import tempfile
 import unittest
 
 
-@unittest.skip("not yet implemented")
 class TestSimulation(unittest.TestCase):
     """Test the simulation class."""
 
     def test_simulation_name(self):
         model = pybamm.ReactionDiffusionModel()
-        param = pybamm.Parameters()
-        mesh = pybamm.Mesh(param, target_npts=50)
-        solver = pybamm.Solver()
-        sim = pybamm.Simulation(
-            model, param=param, mesh=mesh, solver=solver, name="test name"
-        )
+        sim = pybamm.Simulation(model, name="test name")
+        self.assertEqual(str(sim), "test name")
+        self.assertEqual(sim.parameter_values, model.default_parameter_values)
+        self.assertEqual(sim.submesh_pts, model.default_submesh_pts)
+        # no cache is used by default
+        self.assertIsNone(sim.cache)
 
-        self.assertEqual(sim.param.electrolyte.s.shape, sim.mesh.x.centres.shape)
-        np.testing.assert_array_equal(
-            sim.operators.x.div(mesh.x.edges), np.ones_like(mesh.x.centres)
+    def test_run(self):
+        model = pybamm.ReactionDiffusionModel()
+        solver = pybamm.ScipySolver(method="BDF")
+        t_eval = np.linspace(0, 1, 10)
+        sim = pybamm.Simulation(model, solver=solver)
+        sim.run(t_eval)
+        np.testing.assert_array_equal(sim.t, t_eval)
+        self.assertEqual(
+            sim.y.shape,
+            (sim.built_model.concatenated_initial_conditions.shape[0], len(t_eval)),
         )
-        self.assertEqual(param, sim.model.param)
-        self.assertEqual(mesh, sim.model.mesh)
+        # the model is not modified
+        self.assertIsNone(model.concatenated_rhs)
 
-        self.assertEqual(str(sim), "test name")
+    def test_run_cached(self):
+        model = pybamm.ReactionDiffusionModel()
+        solver = pybamm.ScipySolver(method="BDF")
+        t_eval = np.linspace(0, 1, 10)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = pybamm.ModelCache(tmp_dir)
+            sim = pybamm.Simulation(model, solver=solver, cache=cache)
+            sim.run(t_eval)
+            key = sim.content_hash
+            self.assertIn(key, cache)
+            y = sim.y
+
+            # a new simulation of the same model loads the processed model from the
+            # cache
+            cached_sim = pybamm.Simulation(
+                pybamm.ReactionDiffusionModel(), solver=solver, cache=cache
+            )
+            self.assertEqual(cached_sim.content_hash, key)
+            os.utime(cache.filename(key), ns=(0, 0))
+            cached_sim.run(t_eval)
+            self.assertGreater(os.stat(cache.filename(key)).st_mtime_ns, 0)
+            np.testing.assert_array_equal(cached_sim.y, y)
+
+            # different settings are cached separately
+            submesh_pts = {
+                domain: {var: 2 * npts for var, npts in pts.items()}
+                for domain, pts in model.default_submesh_pts.items()
+            }
+            fine_sim = pybamm.Simulation(
+                model, submesh_pts=submesh_pts, solver=solver, cache=cache
+            )
+            self.assertNotEqual(fine_sim.content_hash, key)
+            fine_sim.run(t_eval)
+            self.assertGreater(fine_sim.y.shape[0], y.shape[0])
+            self.assertEqual(len(cache.entries()), 2)
+
+            # processing again replaces the cached model
+            os.utime(cache.filename(key), ns=(0, 0))
+            sim.run(t_eval, use_force=True)
+            self.assertGreater(os.stat(cache.filename(key)).st_mtime_ns, 0)
+            np.testing.assert_array_equal(sim.y, y)
+
+    def test_run_not_hashable(self):
+        # models that can't be hashed are not cached
+        model = pybamm.BaseModel()
+        var = pybamm.Variable("var")
+        model.rhs = {var: pybamm.Function(lambda x: -x, var)}
+        model.initial_conditions = {var: 1}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = pybamm.ModelCache(tmp_dir)
+            sim = pybamm.Simulation(
+                model,
+                parameter_values=pybamm.ParameterValues({}),
+                geometry=pybamm.Geometry(),
+                submesh_types={},
+                submesh_pts={},
+                spatial_methods={},
+                solver=pybamm.ScipySolver(method="RK45"),
+                cache=cache,
+            )
+            self.assertIsNone(sim.content_hash)
+            sim.run(np.linspace(0, 1, 10))
+            np.testing.assert_allclose(sim.y[0], np.exp(-sim.t), rtol=1e-2)
+            self.assertEqual(cache.entries(), [])
 
 
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ from __future__ import print_function, unicode_literals
 import pybamm
 
 import unittest
+import numpy as np
 
 
 class TestBaseSolver(unittest.TestCase):
@@ -14,6 +15,29 @@ class TestBaseSolver(unittest.TestCase):
         self.assertEqual(solver.tol, 1e-4)
         self.assertEqual(solver.t, None)
         self.assertEqual(solver.y, None)
+        self.assertEqual(solver.evaluator, "python")
+
+    def test_evaluator(self):
+        y = pybamm.StateVector(slice(0, 1))
+        solver = pybamm.BaseSolver()
+        self.assertIsInstance(solver.get_evaluator(y), pybamm.EvaluatorPython)
+        solver.evaluator = "tape"
+        self.assertIsInstance(solver.get_evaluator(y), pybamm.EvaluatorTape)
+        with self.assertRaisesRegex(ValueError, "evaluator must be"):
+            pybamm.BaseSolver(evaluator="recursive")
+
+    def test_shared_evaluators(self):
+        y = pybamm.StateVector(slice(0, 2))
+        y0 = np.array([1.0, 2.0])
+        symbols = [2 * y, 2 * y + 1]
+        for evaluator in ["python", "tape"]:
+            solver = pybamm.BaseSolver(evaluator=evaluator)
+            evaluators = solver.get_shared_evaluators(symbols)
+            self.assertEqual(len(evaluators), 2)
+            for symbol_evaluator, symbol in zip(evaluators, symbols):
+                np.testing.assert_array_equal(
+                    symbol_evaluator.evaluate(0, y0), symbol.evaluate(0, y0)
+                )
 
 
 if __name__ == "__main__":
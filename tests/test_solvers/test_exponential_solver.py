@@ -0,0 +1,253 @@
+#
+# Tests for the Exponential Solver class
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import unittest
+import numpy as np
+from tests import get_mesh_for_testing
+
+
+def get_diffusion_model(rhs, boundary_conditions):
+    # Create a model for the variable "var" on the whole cell, with a rhs that is a
+    # function of var, and discretise it
+    model = pybamm.BaseModel()
+    whole_cell = ["negative electrode", "separator", "positive electrode"]
+    var = pybamm.Variable("var", domain=whole_cell)
+    model.rhs = {var: rhs(var)}
+    x = pybamm.SpatialVariable("x", domain=whole_cell)
+    model.initial_conditions = {var: 1 + x}
+    model.boundary_conditions = {var: boundary_conditions}
+    mesh = get_mesh_for_testing()
+    mesh.add_ghost_meshes()
+    spatial_methods = {"macroscale": pybamm.FiniteVolume}
+    disc = pybamm.Discretisation(mesh, spatial_methods)
+    disc.process_model(model)
+    return model
+
+
+class TestExponentialSolver(unittest.TestCase):
+    def test_integrate_exponential(self):
+        # Exact steps give the solution at t_eval
+        solver = pybamm.ExponentialSolver(tol=1e-8)
+
+        def exact_step(t, y, h):
+            return y * np.exp(-h), np.zeros_like(y)
+
+        y0 = np.array([1.0, 2.0])
+        t_eval = np.linspace(0, 1, 10)
+        t_sol, y_sol = solver.integrate_exponential(exact_step, y0, t_eval)
+        np.testing.assert_array_equal(t_sol, t_eval)
+        np.testing.assert_allclose(y_sol, np.outer(y0, np.exp(-t_eval)))
+
+        # Steps whose error is larger than the tolerance are halved
+        step_sizes = []
+
+        def euler_step(t, y, h):
+            step_sizes.append(h)
+            return y - h * y, h**2 * y / 2
+
+        t_sol, y_sol = solver.integrate_exponential(euler_step, y0, t_eval)
+        np.testing.assert_array_equal(t_sol, t_eval)
+        np.testing.assert_allclose(y_sol, np.outer(y0, np.exp(-t_eval)), rtol=1e-3)
+        self.assertLess(min(step_sizes), 1e-3)
+
+        # Events stop the solution
+        def y_eq_1(t, y):
+            return y[1] - 1
+
+        t_sol, y_sol = solver.integrate_exponential(
+            exact_step, y0, t_eval, events=[y_eq_1]
+        )
+        self.assertLess(len(t_sol), len(t_eval))
+        np.testing.assert_array_less(1, y_sol[1])
+
+        # The solution stops after max_steps steps
+        solver = pybamm.ExponentialSolver(tol=1e-8, max_steps=5)
+        t_sol, y_sol = solver.integrate_exponential(exact_step, y0, t_eval)
+        np.testing.assert_array_equal(t_sol, t_eval[:6])
+
+    def test_model_solver(self):
+        # Create model
+        model = pybamm.BaseModel()
+        domain = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=domain)
+        model.rhs = {var: 0.1 * var}
+        model.initial_conditions = {var: 1}
+        # No need to set parameters; can use base discretisation (no spatial operators)
+
+        # create discretisation
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        disc.process_model(model)
+        # Solve, with dense and sparse matrix functions
+        t_eval = np.linspace(0, 1, 100)
+        for max_dense_size in [500, 0]:
+            solver = pybamm.ExponentialSolver(tol=1e-8, max_dense_size=max_dense_size)
+            solver.solve(model, t_eval)
+            np.testing.assert_array_equal(solver.t, t_eval)
+            np.testing.assert_allclose(solver.y[0], np.exp(0.1 * solver.t))
+
+        # The model must have a linear decomposition
+        model.linear_decomposition = None
+        with self.assertRaisesRegex(pybamm.ModelError, "linear decomposition"):
+            solver.solve(model, t_eval)
+
+    def test_model_solver_diffusion(self):
+        # The matrix of the linear part is a product of the divergence and gradient
+        # matrices, which are used as factors
+        model = get_diffusion_model(
+            lambda var: pybamm.div(pybamm.grad(var)),
+            {"left": pybamm.Scalar(0), "right": pybamm.Scalar(0)},
+        )
+        self.assertTrue(model.linear_decomposition.is_affine)
+        solver = pybamm.ExponentialSolver(tol=1e-8)
+        right, left = solver.linear_factors(model.linear_decomposition)
+        self.assertIsNotNone(left)
+        np.testing.assert_allclose(
+            (left @ right).toarray(), model.linear_decomposition.A.toarray()
+        )
+
+        t_eval = np.linspace(0, 1, 100)
+        scipy_solver = pybamm.ScipySolver(tol=1e-10, method="BDF")
+        scipy_solver.solve(model, t_eval)
+        for max_dense_size in [500, 0]:
+            solver = pybamm.ExponentialSolver(tol=1e-8, max_dense_size=max_dense_size)
+            solver.solve(model, t_eval)
+            np.testing.assert_array_equal(solver.t, t_eval)
+            np.testing.assert_allclose(solver.y, scipy_solver.y, rtol=1e-5, atol=1e-7)
+
+    def test_model_solver_nonlinear(self):
+        # With a Jacobian, the steps are exponential Rosenbrock steps
+        model = get_diffusion_model(
+            lambda var: pybamm.div(pybamm.grad(var)) - 10 * var**2,
+            {"left": pybamm.Scalar(1), "right": pybamm.Scalar(0)},
+        )
+        self.assertFalse(model.linear_decomposition.is_affine)
+        self.assertIsNotNone(model.jacobian)
+        t_eval = np.linspace(0, 1, 100)
+        scipy_solver = pybamm.ScipySolver(tol=1e-10, method="BDF")
+        scipy_solver.solve(model, t_eval)
+        solver = pybamm.ExponentialSolver(tol=1e-8)
+        solver.solve(model, t_eval)
+        np.testing.assert_array_equal(solver.t, t_eval)
+        np.testing.assert_allclose(solver.y, scipy_solver.y, rtol=1e-5, atol=1e-7)
+
+        # Without a Jacobian, it is calculated by finite differences
+        t_eval = t_eval[::11]
+        scipy_solver.solve(model, t_eval)
+        solver = pybamm.ExponentialSolver(tol=1e-6)
+        model.jacobian = None
+        solver.solve(model, t_eval)
+        np.testing.assert_array_equal(solver.t, t_eval)
+        np.testing.assert_allclose(solver.y, scipy_solver.y, rtol=1e-5, atol=1e-6)
+
+        # Without the sparsity pattern either, the nonlinear part is integrated
+        # explicitly
+        model.jacobian_sparsity = None
+        solver.solve(model, t_eval)
+        np.testing.assert_array_equal(solver.t, t_eval)
+        np.testing.assert_allclose(solver.y, scipy_solver.y, rtol=1e-5, atol=1e-6)
+
+        # A nonlinear rhs with no linear part needs a Jacobian or its sparsity
+        model = pybamm.BaseModel()
+        domain = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=domain)
+        model.rhs = {var: -pybamm.Function(np.cbrt, var) ** 3}
+        model.initial_conditions = {var: 1}
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        disc.process_model(model)
+        self.assertIsNone(model.jacobian)
+        solver.solve(model, t_eval)
+        np.testing.assert_array_equal(solver.t, t_eval)
+        np.testing.assert_allclose(solver.y[0], np.exp(-solver.t), rtol=1e-6)
+        model.jacobian_sparsity = None
+        with self.assertRaisesRegex(pybamm.ModelError, "linear part"):
+            solver.solve(model, t_eval)
+
+    def test_model_solver_reaction_diffusion(self):
+        # A nonlinear model without a Jacobian (which is calculated by finite
+        # differences from its sparsity pattern)
+        model = pybamm.ReactionDiffusionModel()
+        geometry = model.default_geometry
+        param = model.default_parameter_values
+        param.process_model(model)
+        param.process_geometry(geometry)
+        mesh = pybamm.Mesh(
+            geometry, model.default_submesh_types, model.default_submesh_pts
+        )
+        disc = pybamm.Discretisation(mesh, model.default_spatial_methods)
+        disc.process_model(model)
+        self.assertIsNone(model.jacobian)
+        self.assertFalse(model.linear_decomposition.is_affine)
+
+        t_eval = np.linspace(0, 0.1, 50)
+        scipy_solver = pybamm.ScipySolver(tol=1e-8, method="BDF")
+        scipy_solver.solve(model, t_eval)
+        solver = pybamm.ExponentialSolver(tol=1e-6)
+        solver.solve(model, t_eval)
+        np.testing.assert_array_equal(solver.t, t_eval)
+        np.testing.assert_allclose(solver.y, scipy_solver.y, rtol=1e-4, atol=1e-6)
+
+    def test_model_solver_with_event(self):
+        # Create model
+        model = pybamm.BaseModel()
+        domain = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=domain)
+        model.rhs = {var: -0.1 * var}
+        model.initial_conditions = {var: 1}
+        model.events = [pybamm.Function(np.min, var - 0.5)]
+        # No need to set parameters; can use base discretisation (no spatial operators)
+
+        # create discretisation
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        disc.process_model(model)
+        # Solve
+        solver = pybamm.ExponentialSolver(tol=1e-8)
+        t_eval = np.linspace(0, 10, 100)
+        solver.solve(model, t_eval)
+        self.assertLess(len(solver.t), len(t_eval))
+        np.testing.assert_array_equal(solver.t, t_eval[: len(solver.t)])
+        np.testing.assert_allclose(solver.y[0], np.exp(-0.1 * solver.t))
+
+    def test_model_solver_with_inputs(self):
+        # Create model
+        model = pybamm.BaseModel()
+        domain = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=domain)
+        rate = pybamm.InputParameter("rate")
+        model.rhs = {var: -rate * var}
+        model.initial_conditions = {var: 1}
+        model.events = [pybamm.Function(np.min, var - 0.5)]
+        # No need to set parameters; can use base discretisation (no spatial operators)
+
+        # create discretisation
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        disc.process_model(model)
+        # Solve for two different rates, without discretising again
+        solver = pybamm.ExponentialSolver(tol=1e-8)
+        t_eval = np.linspace(0, 10, 100)
+        solver.solve(model, t_eval, inputs={"rate": 0.1})
+        self.assertLess(len(solver.t), len(t_eval))
+        np.testing.assert_allclose(solver.y[0], np.exp(-0.1 * solver.t), rtol=1e-6)
+        solver.solve(model, t_eval, inputs={"rate": 0.01})
+        np.testing.assert_array_equal(solver.t, t_eval)
+        np.testing.assert_allclose(solver.y[0], np.exp(-0.01 * solver.t), rtol=1e-6)
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    unittest.main()
@@ -0,0 +1,90 @@
+#
+# Tests for the coloured finite-difference Jacobian
+#
+from __future__ import absolute_import, division
+from __future__ import print_function, unicode_literals
+import pybamm
+
+import unittest
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+
+
+class TestFiniteDifferenceJacobian(unittest.TestCase):
+    def test_colour_columns(self):
+        # tridiagonal: three colours
+        n = 20
+        sparsity = diags([1, 1, 1], [-1, 0, 1], shape=(n, n), dtype=bool)
+        colours = pybamm.colour_columns(sparsity)
+        self.assertEqual(colours.max() + 1, 3)
+        # no two columns of the same colour share a row
+        for row in sparsity.toarray():
+            columns = np.flatnonzero(row)
+            self.assertEqual(len(set(colours[columns])), len(columns))
+
+        # diagonal: one colour
+        colours = pybamm.colour_columns(diags([1], [0], shape=(n, n), dtype=bool))
+        np.testing.assert_array_equal(colours, np.zeros(n))
+
+        # dense: one colour per column
+        colours = pybamm.colour_columns(csr_matrix(np.ones((3, 3))))
+        np.testing.assert_array_equal(colours, np.arange(3))
+
+    def test_finite_difference_jacobian(self):
+        n = 20
+        A = diags([1.0, -2.0, 1.0], [-1, 0, 1], shape=(n, n), format="csr")
+
+        def func(t, y):
+            return A @ y + t * y**2
+
+        def jac(t, y):
+            return A + diags(2 * t * y)
+
+        sparsity = diags([1, 1, 1], [-1, 0, 1], shape=(n, n), dtype=bool)
+        fd_jacobian = pybamm.FiniteDifferenceJacobian(func, sparsity)
+        self.assertEqual(fd_jacobian.n_colours, 3)
+
+        # count the function evaluations
+        calls = []
+
+        def counted_func(t, y):
+            calls.append(t)
+            return func(t, y)
+
+        fd_jacobian.func = counted_func
+        t = 2
+        y = np.linspace(0, 10, n)
+        np.testing.assert_allclose(
+            fd_jacobian(t, y).toarray(), jac(t, y).toarray(), rtol=1e-6, atol=1e-6
+        )
+        self.assertEqual(len(calls), 4)
+        # pass in the value of the function
+        calls.clear()
+        np.testing.assert_allclose(
+            fd_jacobian(t, y, f0=func(t, y)).toarray(),
+            jac(t, y).toarray(),
+            rtol=1e-6,
+            atol=1e-6,
+        )
+        self.assertEqual(len(calls), 3)
+
+        # extra arguments
+        def residuals(t, y, ydot):
+            return func(t, y) - ydot
+
+        fd_jacobian = pybamm.FiniteDifferenceJacobian(residuals, sparsity)
+        np.testing.assert_allclose(
+            fd_jacobian(t, y, np.ones(n)).toarray(),
+            jac(t, y).toarray(),
+            rtol=1e-6,
+            atol=1e-6,
+        )
+
+
+if __name__ == "__main__":
+    print("Add -v for more debug output")
+    import sys
+
+    if "-v" in sys.argv:
+        debug = True
+    unittest.main()
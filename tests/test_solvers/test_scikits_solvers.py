@@ -4,14 +4,14 @@
 from __future__ import absolute_import, division
 from __future__ import print_function, unicode_literals
 import pybamm
-from pybamm.solvers.scikits_ode_solver import scikits_odes_spec
+from pybamm.solvers.scikits_ode_solver import scikits_odes
 from tests import StandardModelTest
 
 import unittest
 import numpy as np
 
 
-@unittest.skipIf(scikits_odes_spec is None, "scikits.odes not installed")
+@unittest.skipIf(scikits_odes is None, "scikits.odes not installed")
 class TestScikitsSolver(unittest.TestCase):
     def test_ode_integrate(self):
         # Constant
@@ -37,6 +37,15 @@ class TestScikitsSolver(unittest.TestCase):
         t_sol, y_sol = solver.integrate(exponential_decay, y0, t_eval)
         np.testing.assert_allclose(y_sol[0], np.exp(-0.1 * t_sol))
 
+        # Exponential decay, written into the array of scikits.odes
+        def exponential_decay_into(t, y, out):
+            np.multiply(-0.1, y, out=out)
+
+        t_sol, y_sol = solver.integrate(
+            exponential_decay, y0, t_eval, derivs_into=exponential_decay_into
+        )
+        np.testing.assert_allclose(y_sol[0], np.exp(-0.1 * t_sol))
+
     def test_ode_integrate_with_event(self):
         # Constant
         solver = pybamm.ScikitsOdeSolver(tol=1e-8)
@@ -105,6 +114,21 @@ class TestScikitsSolver(unittest.TestCase):
         np.testing.assert_allclose(y_sol[0], np.exp(-0.1 * t_sol))
         np.testing.assert_allclose(y_sol[1], 2 * np.exp(-0.1 * t_sol))
 
+        # Exponential decay, written into the array of scikits.odes
+        def exponential_decay_dae_into(t, y, ydot, out):
+            out[0] = -0.1 * y[0] - ydot[0]
+            out[1] = 2 * y[0] - y[1]
+
+        t_sol, y_sol = solver.integrate(
+            exponential_decay_dae,
+            y0,
+            ydot0,
+            t_eval,
+            residuals_into=exponential_decay_dae_into,
+        )
+        np.testing.assert_allclose(y_sol[0], np.exp(-0.1 * t_sol))
+        np.testing.assert_allclose(y_sol[1], 2 * np.exp(-0.1 * t_sol))
+
     def test_dae_integrate_with_event(self):
         # Constant
         solver = pybamm.ScikitsDaeSolver(tol=1e-8)
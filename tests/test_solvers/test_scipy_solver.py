@@ -94,6 +94,54 @@ class TestScipySolver(unittest.TestCase):
         np.testing.assert_array_equal(solver.t, t_eval)
         np.testing.assert_allclose(solver.y[0], np.exp(0.1 * solver.t))
 
+        # Solve using the tape evaluator
+        solver = pybamm.ScipySolver(tol=1e-8, method="RK45")
+        solver.evaluator = "tape"
+        solver.solve(model, t_eval)
+        np.testing.assert_array_equal(solver.t, t_eval)
+        np.testing.assert_allclose(solver.y[0], np.exp(0.1 * solver.t))
+
+        # Solve using an implicit method, with the jacobian of the model
+        self.assertIsNotNone(model.jacobian)
+        for method in ["BDF", "Radau", "LSODA"]:
+            solver = pybamm.ScipySolver(tol=1e-8, method=method)
+            solver.solve(model, t_eval)
+            np.testing.assert_array_equal(solver.t, t_eval)
+            np.testing.assert_allclose(
+                solver.y[0], np.exp(0.1 * solver.t), rtol=1e-6
+            )
+
+        # The rhs is linear, so the matrix of its linear decomposition is used as
+        # the jacobian; without it, the solution is the same
+        self.assertTrue(model.linear_decomposition.is_affine)
+        y_linear = solver.y
+        model.linear_decomposition = None
+        solver.solve(model, t_eval)
+        np.testing.assert_allclose(solver.y, y_linear, rtol=1e-6)
+
+    def test_model_solver_jacobian_sparsity(self):
+        # Create model whose jacobian cannot be found exactly
+        model = pybamm.BaseModel()
+        domain = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=domain)
+        model.rhs = {var: -pybamm.Function(np.cbrt, var) ** 3}
+        model.initial_conditions = {var: 1}
+
+        # create discretisation
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        disc.process_model(model)
+        self.assertIsNone(model.jacobian)
+        self.assertIsNotNone(model.jacobian_sparsity)
+
+        # Solve
+        solver = pybamm.ScipySolver(tol=1e-8, method="BDF")
+        t_eval = np.linspace(0, 1, 100)
+        solver.solve(model, t_eval)
+        np.testing.assert_array_equal(solver.t, t_eval)
+        np.testing.assert_allclose(solver.y[0], np.exp(-solver.t), rtol=1e-6)
+
     def test_model_solver_with_event(self):
         # Create model
         model = pybamm.BaseModel()
@@ -117,6 +165,68 @@ class TestScipySolver(unittest.TestCase):
         np.testing.assert_array_equal(solver.t, t_eval[: len(solver.t)])
         np.testing.assert_allclose(solver.y[0], np.exp(-0.1 * solver.t))
 
+    def test_model_solver_with_inputs(self):
+        # Create model
+        model = pybamm.BaseModel()
+        domain = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=domain)
+        rate = pybamm.InputParameter("rate")
+        model.rhs = {var: -rate * var}
+        model.initial_conditions = {var: 1}
+        model.events = [pybamm.Function(np.min, var - 0.5)]
+        # No need to set parameters; can use base discretisation (no spatial operators)
+
+        # create discretisation
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        disc.process_model(model)
+        # Solve for two different rates, without discretising again
+        solver = pybamm.ScipySolver(tol=1e-8, method="RK45")
+        t_eval = np.linspace(0, 10, 100)
+        solver.solve(model, t_eval, inputs={"rate": 0.1})
+        self.assertLess(len(solver.t), len(t_eval))
+        np.testing.assert_allclose(solver.y[0], np.exp(-0.1 * solver.t), rtol=1e-6)
+        solver.solve(model, t_eval, inputs={"rate": 0.01})
+        np.testing.assert_array_equal(solver.t, t_eval)
+        np.testing.assert_allclose(solver.y[0], np.exp(-0.01 * solver.t), rtol=1e-6)
+
+    def test_model_solver_batch(self):
+        # Create model
+        model = pybamm.BaseModel()
+        domain = ["negative electrode", "separator", "positive electrode"]
+        var = pybamm.Variable("var", domain=domain)
+        rate = pybamm.InputParameter("rate")
+        model.rhs = {var: -rate * var}
+        model.initial_conditions = {var: 1}
+        model.events = [pybamm.Function(np.min, var - 0.5)]
+        # No need to set parameters; can use base discretisation (no spatial operators)
+
+        # create discretisation
+        mesh = get_mesh_for_testing()
+        spatial_methods = {"macroscale": pybamm.FiniteVolume}
+        disc = pybamm.Discretisation(mesh, spatial_methods)
+        disc.process_model(model)
+
+        # Solve for several rates at once: each member stops at its own event, as
+        # when it is solved on its own
+        t_eval = np.linspace(0, 10, 100)
+        rates = [0.01, 0.2, 0.1, 0.3]
+        for method in ["RK45", "BDF"]:
+            solver = pybamm.ScipySolver(tol=1e-8, method=method)
+            t_batch, y_batch = solver.solve_batch(
+                model, t_eval, [{"rate": rate} for rate in rates]
+            )
+            self.assertEqual(len(t_batch), len(rates))
+            for rate, t, y in zip(rates, t_batch, y_batch):
+                solver.solve(model, t_eval, inputs={"rate": rate})
+                np.testing.assert_array_equal(t, solver.t)
+                self.assertEqual(y.shape, solver.y.shape)
+                np.testing.assert_allclose(y[0], np.exp(-rate * t), rtol=1e-6)
+                np.testing.assert_allclose(y, solver.y, rtol=1e-6)
+            self.assertEqual(len(t_batch[0]), len(t_eval))
+            self.assertLess(len(t_batch[3]), len(t_batch[2]))
+
 
 if __name__ == "__main__":
     print("Add -v for more debug output")
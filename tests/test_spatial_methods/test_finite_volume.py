@@ -32,6 +32,87 @@ class TestFiniteVolume(unittest.TestCase):
         avd = pybamm.NodeToEdge(d, arithmetic_mean)
         np.testing.assert_array_equal(avd.evaluate(None, y_test), np.ones(9))
 
+    def test_cached_operators(self):
+        whole_cell = ["negative electrode", "separator", "positive electrode"]
+        mesh = get_mesh_for_testing()
+        mesh.add_ghost_meshes()
+        fin_vol = pybamm.FiniteVolume(mesh)
+
+        # each operator is built once for each domain, and stored as CSR
+        gradient_matrix = fin_vol.gradient_matrix(whole_cell)
+        self.assertIs(fin_vol.gradient_matrix(whole_cell), gradient_matrix)
+        self.assertEqual(gradient_matrix.entries.format, "csr")
+        divergence_matrix = fin_vol.divergence_matrix(whole_cell)
+        self.assertIs(fin_vol.divergence_matrix(whole_cell), divergence_matrix)
+        self.assertEqual(divergence_matrix.entries.format, "csr")
+        integral_vector = fin_vol.definite_integral_vector(whole_cell)
+        self.assertIs(fin_vol.definite_integral_vector(whole_cell), integral_vector)
+
+        # domains with ghost cells have their own operators
+        ghost_domain = (
+            ["negative electrode_left ghost cell"]
+            + whole_cell
+            + ["positive electrode_right ghost cell"]
+        )
+        ghost_gradient_matrix = fin_vol.gradient_matrix(ghost_domain)
+        self.assertEqual(ghost_gradient_matrix.shape[1], gradient_matrix.shape[1] + 2)
+        self.assertIsNot(
+            fin_vol.gradient_matrix(["negative electrode"]), gradient_matrix
+        )
+
+    def test_affine_form(self):
+        whole_cell = ["negative electrode", "separator", "positive electrode"]
+        mesh = get_mesh_for_testing()
+        mesh.add_ghost_meshes()
+        fin_vol = pybamm.FiniteVolume(mesh)
+        var = pybamm.Variable("var", domain=whole_cell)
+        disc = pybamm.Discretisation(mesh, {"macroscale": pybamm.FiniteVolume})
+        disc.set_variable_slices([var])
+        y_slice = disc._y_slices[var.id]
+        y_test = np.linspace(0, 1, y_slice.stop) ** 2
+        discretised_var = pybamm.StateVector(y_slice)
+
+        # Dirichlet conditions are folded into a matrix and a vector
+        grad_eqn = pybamm.grad(var)
+        bcs = {"left": pybamm.Scalar(1), "right": pybamm.Scalar(2)}
+        grad_disc = fin_vol.gradient(grad_eqn, discretised_var, {grad_eqn.id: bcs})
+        self.assertIsInstance(grad_disc, pybamm.Addition)
+        self.assertIsInstance(grad_disc.children[0], pybamm.MatrixMultiplication)
+        self.assertEqual(grad_disc.children[0].children[1].id, discretised_var.id)
+        self.assertIsInstance(grad_disc.children[1], pybamm.Vector)
+        ghost_domain = (
+            ["negative electrode_left ghost cell"]
+            + whole_cell
+            + ["positive electrode_right ghost cell"]
+        )
+        unfolded = fin_vol.gradient_matrix(ghost_domain) @ fin_vol.add_ghost_nodes(
+            discretised_var, bcs["left"], bcs["right"]
+        )
+        np.testing.assert_array_almost_equal(
+            grad_disc.evaluate(None, y_test), unfolded.evaluate(None, y_test)
+        )
+
+        # Neumann conditions that depend on t act through a vector
+        div_eqn = pybamm.div(grad_eqn)
+        bcs = {"left": pybamm.Scalar(0), "right": 3 * pybamm.t}
+        flux = fin_vol.gradient_matrix(whole_cell) @ discretised_var
+        div_disc = fin_vol.divergence(div_eqn, flux, {div_eqn.id: bcs})
+        self.assertNotIn(
+            pybamm.NumpyConcatenation, [type(node) for node in div_disc.pre_order()]
+        )
+        unfolded = fin_vol.divergence_matrix(whole_cell) @ pybamm.NumpyConcatenation(
+            bcs["left"], flux, bcs["right"]
+        )
+        np.testing.assert_array_almost_equal(
+            div_disc.evaluate(2, y_test), unfolded.evaluate(2, y_test)
+        )
+
+        # operators that are not affine with constant coefficients are not folded
+        nonlinear_flux = pybamm.NumpyConcatenation(discretised_var) * flux
+        div_disc = fin_vol.divergence(div_eqn, nonlinear_flux, {div_eqn.id: bcs})
+        self.assertIsInstance(div_disc, pybamm.MatrixMultiplication)
+        self.assertIsInstance(div_disc.children[1], pybamm.NumpyConcatenation)
+
     def test_surface_value(self):
         # create discretisation
         mesh = get_mesh_for_testing()
@@ -53,7 +134,12 @@ class TestFiniteVolume(unittest.TestCase):
         # check linear variable extrapolates correctly
         linear_y = combined_submesh.nodes
         y_surf = combined_submesh.nodes[-1] + combined_submesh.d_nodes[-1] / 2
-        self.assertEqual(surf_eqn_disc.evaluate(None, linear_y), y_surf)
+        # (the extrapolation is a weighted sum of the last two nodes, so it can differ
+        # from y_surf in the last bit)
+        self.assertAlmostEqual(surf_eqn_disc.evaluate(None, linear_y)[0], y_surf)
+        # it is read with a single sparse row
+        self.assertIsInstance(surf_eqn_disc, pybamm.MatrixMultiplication)
+        self.assertEqual(surf_eqn_disc.children[0].shape, (1, len(linear_y)))
 
     def test_discretise_diffusivity_times_spatial_operator(self):
         # Set up
@@ -128,6 +214,12 @@ class TestFiniteVolume(unittest.TestCase):
             discretised_symbol, lbc, rbc
         )
 
+        # the nodes are read with a single sparse matrix
+        extraction = symbol_plus_ghost.children[0]
+        self.assertIsInstance(extraction, pybamm.MatrixMultiplication)
+        self.assertIsInstance(extraction.children[0], pybamm.Matrix)
+        self.assertIsInstance(extraction.children[1], pybamm.StateVector)
+
         # Test
         combined_submesh = mesh.combine_submeshes(*whole_cell)
         y_test = np.ones_like(combined_submesh.nodes)
@@ -5,6 +5,9 @@
 # (see https://github.com/pints-team/pints)
 #
 import os
+import subprocess
+import sys
+import tempfile
 import pybamm
 import unittest
 
@@ -52,10 +55,121 @@ class TestUtil(unittest.TestCase):
         func = pybamm.load_function('process_symbol_test_function.py')
         self.assertEqual(func(3), 369)
 
+    def test_load_function_registry(self):
+        # Functions are only loaded once
+        abs_test_path = os.path.join(os.getcwd(), 'tests', 'test_parameters', 'data',
+                                     'process_symbol_test_function.py')
+        func = pybamm.load_function(abs_test_path)
+        self.assertIs(pybamm.load_function(abs_test_path), func)
+
+        # Functions are loaded again if their file is modified
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'registry_test_function.py')
+            with open(filename, 'w') as file:
+                file.write('def registry_test_function(x):\n    return x + 1\n')
+            os.utime(filename, (0, 0))
+            func = pybamm.load_function(filename)
+            self.assertEqual(func(1), 2)
+            self.assertIs(pybamm.load_function(filename), func)
+
+            with open(filename, 'w') as file:
+                file.write('def registry_test_function(x):\n    return x + 2\n')
+            os.utime(filename, (1, 1))
+            new_func = pybamm.load_function(filename)
+            self.assertIsNot(new_func, func)
+            self.assertEqual(new_func(1), 3)
+
+    def test_loaded_function_file(self):
+        abs_test_path = os.path.join(os.getcwd(), 'tests', 'test_parameters', 'data',
+                                     'process_symbol_test_function.py')
+        func = pybamm.load_function(abs_test_path)
+        self.assertEqual(pybamm.loaded_function_file(func), abs_test_path)
+        self.assertIsNone(pybamm.loaded_function_file(os.path.join))
+
+    def test_qualified_name(self):
+        name = pybamm.util.qualified_name(pybamm.FiniteVolume)
+        self.assertEqual(name, 'pybamm.spatial_methods.finite_volume:FiniteVolume')
+        self.assertIs(pybamm.util.from_qualified_name(name), pybamm.FiniteVolume)
+        self.assertIs(
+            pybamm.util.from_qualified_name(pybamm.util.qualified_name(os.path.join)),
+            os.path.join)
+
+        def local_function(x):
+            return x
+
+        with self.assertRaisesRegex(TypeError, 'does not identify'):
+            pybamm.util.qualified_name(local_function)
+        with self.assertRaisesRegex(TypeError, 'does not identify'):
+            pybamm.util.qualified_name(lambda x: x)
+
+    def test_lazy_import(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # the module records when it is executed
+            filename = os.path.join(tmp_dir, 'lazy_test_module.py')
+            with open(filename, 'w') as file:
+                file.write("open(__file__ + '.run', 'w').close()\nvalue = 1\n")
+            sys.path.insert(0, tmp_dir)
+            try:
+                module = pybamm.util.lazy_import('lazy_test_module')
+                self.assertIs(sys.modules['lazy_test_module'], module)
+                self.assertIs(pybamm.util.lazy_import('lazy_test_module'), module)
+                self.assertFalse(os.path.exists(filename + '.run'))
+                self.assertEqual(module.value, 1)
+                self.assertTrue(os.path.exists(filename + '.run'))
+            finally:
+                sys.path.remove(tmp_dir)
+                del sys.modules['lazy_test_module']
+
+        with self.assertRaisesRegex(ImportError, 'not_a_module'):
+            pybamm.util.lazy_import('not_a_module')
+
+    def test_import_is_lazy(self):
+        # importing pybamm (and reading parameter files) doesn't run the heavy
+        # dependencies or build the standard parameters
+        code = (
+            'import sys, pybamm;'
+            'pybamm.ParameterValues("input/parameters/lead-acid/default.csv");'
+            'print(sorted(name for name in ["pandas.core", "scipy.sparse._base", '
+            '"scipy.integrate._ivp"] if name in sys.modules));'
+            'pybamm.standard_parameters_lithium_ion.c_n_max;'
+            'print(isinstance(pybamm.standard_parameters.t_plus, pybamm.Parameter))'
+        )
+        output = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(output.decode().split(), ['[]', 'True'])
+
+    def test_import_optional_dependency_is_lazy(self):
+        # importing pybamm doesn't run scikits.odes, which is only run when it is
+        # used by the scikits solvers
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            package = os.path.join(tmp_dir, 'scikits', 'odes')
+            os.makedirs(package)
+            filename = os.path.join(package, '__init__.py')
+            with open(filename, 'w') as file:
+                file.write("open(__file__ + '.run', 'w').close()\node = None\n")
+            code = (
+                'import os, pybamm;'
+                'print(os.path.exists({0!r}));'
+                'pybamm.ScikitsOdeSolver(); pybamm.ScikitsDaeSolver();'
+                'print(os.path.exists({0!r}));'
+                'pybamm.solvers.scikits_ode_solver.scikits_odes.ode;'
+                'print(os.path.exists({0!r}))'
+            ).format(filename + '.run')
+            env = dict(os.environ)
+            env['PYTHONPATH'] = os.pathsep.join(
+                [tmp_dir, os.getcwd(), env.get('PYTHONPATH', '')]
+            )
+            output = subprocess.check_output([sys.executable, '-c', code], env=env)
+        self.assertEqual(output.decode().split(), ['False', 'False', 'True'])
+
+        # a module that isn't installed is None
+        self.assertIsNone(pybamm.util.lazy_import_if_installed('not_a_module'))
+        self.assertIsNone(
+            pybamm.util.lazy_import_if_installed('not_a_package.module')
+        )
+
 
 if __name__ == "__main__":
     print("Add -v for more debug output")
-    import sys
 
     if "-v" in sys.argv:
         debug = True